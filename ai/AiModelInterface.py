@@ -1,8 +1,21 @@
+import string
+import time
+
+from .JsonObjectScanner import JsonObjectScanner
+
+# Instrução de sistema de todos os provedores (fixa: faz parte do prefixo reaproveitável do prompt)
+SYSTEM_PROMPT = ("Você é um analisador de código que responde APENAS com JSON válido em uma única linha, "
+                 "sem formatação ou textos adicionais.")
+
+# Cabeçalho do trecho comum a todos os métodos de um mesmo arquivo
+FILE_CONTEXT_HEADER = "Início do arquivo (imports, declarações e cabeçalho da classe), comum aos métodos dele:\n"
+
 # Interface abstrata para modelos de IA
 class AIModelInterface:
     """Interface base para os modelos de IA usados na análise de código."""
     
-    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "") -> str:
+    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "",
+                     file_context: str = "") -> str:
         """
         Analisa o código usando um modelo de IA.
         
@@ -11,8 +24,70 @@ class AIModelInterface:
             language: Linguagem de programação do código
             code: Código a ser analisado
             context_extra: Contexto adicional como dependências
+            file_context: Início do arquivo do código (imports, cabeçalho da classe), repetido
+                entre os métodos do mesmo arquivo
             
         Returns:
             Resposta textual do modelo de IA
         """
-        raise NotImplementedError("Este método deve ser implementado nas subclasses")
\ No newline at end of file
+        raise NotImplementedError("Este método deve ser implementado nas subclasses")
+
+    @staticmethod
+    def prompt_parts(prompt: str, language: str, code: str, context_extra: str = "", file_context: str = ""):
+        """
+        Divide o prompt em prefixo estático, contexto do arquivo e parte variável.
+
+        O prefixo é o texto do template até a última quebra de linha antes do
+        primeiro campo ({language} ou {code}), igual em todas as chamadas; o
+        contexto do arquivo se repete entre os métodos de um mesmo arquivo.
+        Nessa ordem, os provedores podem reaproveitar o processamento das duas
+        primeiras partes. Sem contexto do arquivo, as partes juntas são
+        exatamente prompt.format(...).
+
+        Returns:
+            tuple: (prefixo, contexto do arquivo, parte variável)
+        """
+        prefix = ''
+        for literal, field, _, _ in string.Formatter().parse(prompt):
+            if field is not None:
+                prefix += literal[:literal.rfind('\n') + 1]
+                break
+            prefix += literal
+        text = prompt.format(language=language, code=code + context_extra)
+        file_block = f"{FILE_CONTEXT_HEADER}{file_context}\n\n" if file_context else ""
+        return prefix, file_block, text[len(prefix):]
+
+    def _read_stream(self, chunks, started, max_tokens, usage=None):
+        """
+        Consome uma resposta em streaming até o JSON da análise ficar completo.
+
+        Ao sair do laço antes do fim, o chamador fecha a conexão (bloco with),
+        o que cancela a geração no provedor. As métricas vão para self.stats.
+
+        Args:
+            chunks: Iterável com os pedaços de texto da resposta
+            started (float): Instante (time.perf_counter) em que a requisição foi enviada
+            max_tokens (int): Limite de tokens da requisição, para estimar o tempo economizado
+            usage (callable, optional): Retorna (tokens sem cache, lidos do cache, gravados no cache)
+                ao fim da leitura, ou None se o provedor não informou; vai para self.cache_stats
+
+        Returns:
+            str: O objeto JSON, se completo, ou todo o texto recebido
+        """
+        scanner = JsonObjectScanner()
+        ttft = None
+        stopped_early = False
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            if scanner.feed(chunk) is not None:
+                stopped_early = True
+                break
+        duration = time.perf_counter() - started
+        self.stats.record(ttft, duration, len(scanner.received), stopped_early, max_tokens)
+        tokens = usage() if usage is not None else None
+        if tokens is not None:
+            self.cache_stats.record(*tokens, ttft if ttft is not None else duration)
+        return scanner.text if scanner.done else scanner.received
@@ -1,22 +1,106 @@
-from .AiModelInterface import AIModelInterface
-import anthropic
+from .AiModelInterface import AIModelInterface, SYSTEM_PROMPT
+from .StreamStats import StreamStats
+from .PromptCacheStats import PromptCacheStats
+from .basemodel import analise_json_schema
+import json
+import time
+
+# Ferramenta usada na saída estruturada: o modelo é obrigado a "chamá-la" com a análise
+ANALISE_TOOL_NAME = "registrar_analise"
+
+# Ponto de cache do prompt: tudo até o bloco marcado (ferramentas, sistema e blocos anteriores) é reaproveitado
+CACHE_BREAKPOINT = {"type": "ephemeral"}
 
 # Implementação para Anthropic Claude
 class AnthropicModel(AIModelInterface):
-    def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    provider_name = "anthropic"
+    DEFAULT_MODEL = "claude-3-haiku-20240307"
+
+    def __init__(self, api_key: str, stream: bool = True, base_url: str = None, structured: bool = True,
+                 prompt_cache: bool = True):
+        import anthropic  # Importação pesada: só quando o provedor Anthropic é usado
+        self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url)
+        self.model_name = self.DEFAULT_MODEL
+        self.max_tokens = 1024
+        self.stream = stream
+        self.structured = structured
+        self.prompt_cache = prompt_cache
+        self.stats = StreamStats()
+        self.cache_stats = PromptCacheStats()
         
-    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "") -> str:
-        message = self.client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=1024,
+    def build_request(self, prompt: str, language: str, code: str, context_extra: str = "",
+                      file_context: str = "") -> dict:
+        """
+        Parâmetros da Messages API para a análise de um método (usados também nos lotes, ai.Batch).
+
+        Returns:
+            dict: Argumentos de messages.create, sem o modo de streaming
+        """
+        prefix, file_block, variable = self.prompt_parts(prompt, language, code, context_extra, file_context)
+        if self.prompt_cache:
+            # Instruções fixas e contexto do arquivo em blocos próprios, cada um com um ponto de cache;
+            # a API só guarda prefixos a partir de um tamanho mínimo (1024 a 2048 tokens, conforme o modelo)
+            content = [
+                dict(type="text", text=text, **({"cache_control": CACHE_BREAKPOINT} if cached else {}))
+                for text, cached in ((prefix, True), (file_block, True), (variable, False)) if text
+            ]
+        else:
+            content = prefix + file_block + variable
+        request = dict(
+            model=self.model_name,
+            max_tokens=self.max_tokens,
             temperature=0,
-            system="Você é um analisador de código que responde APENAS com JSON válido em uma única linha, sem formatação ou textos adicionais.",
+            system=SYSTEM_PROMPT,
             messages=[
                 {
                     "role": "user",
-                    "content": prompt.format(language=language, code=code + context_extra)
+                    "content": content
                 }
             ]
         )
-        return message.content[0].text
\ No newline at end of file
+        if self.structured:
+            # Uso de ferramenta forçado: a resposta é o input da ferramenta, validado contra o schema
+            request['tools'] = [{
+                "name": ANALISE_TOOL_NAME,
+                "description": "Registra a análise do uso de CNPJ no código.",
+                "input_schema": analise_json_schema()
+            }]
+            request['tool_choice'] = {"type": "tool", "name": ANALISE_TOOL_NAME}
+        return request
+
+    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "",
+                     file_context: str = "") -> str:
+        request = self.build_request(prompt, language, code, context_extra, file_context)
+        started = time.perf_counter()
+        if not self.stream:
+            message = self.client.messages.create(**request)
+            self.cache_stats.record(*self._usage_tokens(message.usage), time.perf_counter() - started)
+            return self.message_text(message)
+
+        # Streaming: ao sair do bloco with a conexão é fechada e a geração cancelada
+        with self.client.messages.stream(**request) as stream:
+            chunks = self._tool_input_chunks(stream) if self.structured else stream.text_stream
+            # O uso de tokens de entrada (com cache) chega no evento message_start
+            return self._read_stream(chunks, started, self.max_tokens,
+                                     usage=lambda: self._usage_tokens(stream.current_message_snapshot.usage))
+
+    def message_text(self, message):
+        """Texto da análise em uma resposta completa: o input da ferramenta (JSON) ou o primeiro bloco de texto."""
+        if self.structured:
+            for block in message.content:
+                if block.type == "tool_use":
+                    return json.dumps(block.input, ensure_ascii=False)
+        return message.content[0].text
+
+    @staticmethod
+    def _usage_tokens(usage):
+        """(tokens sem cache, lidos do cache, gravados no cache) do uso informado pela API."""
+        return (usage.input_tokens or 0, getattr(usage, 'cache_read_input_tokens', None) or 0,
+                getattr(usage, 'cache_creation_input_tokens', None) or 0)
+
+    @staticmethod
+    def _tool_input_chunks(stream):
+        """Pedaços do JSON de entrada da ferramenta em uma resposta em streaming."""
+        for event in stream:
+            if event.type == "content_block_delta" and event.delta.type == "input_json_delta":
+                yield event.delta.partial_json
@@ -0,0 +1,184 @@
+"""
+Clientes das APIs de lote dos provedores (processamento assíncrono, com desconto no preço).
+
+Cada cliente recebe os prompts de vários métodos de uma vez, identificados
+por um custom_id, e devolve as respostas quando o provedor termina o lote,
+em geral em minutos ou horas (até 24 h). Não há streaming nem limite de
+chamadas por minuto: o lote inteiro é uma única requisição.
+
+    anthropic  Message Batches API: POST /v1/messages/batches, consulta do
+               lote e resultados em JSONL (results_url)
+    mistral    Batch API: upload de um arquivo JSONL (POST /v1/files),
+               criação do job (POST /v1/batch/jobs), consulta do job e
+               download do arquivo de saída (GET /v1/files/{id}/content)
+"""
+import json
+import logging
+
+import requests
+
+# Estados finais dos jobs de lote da Mistral
+MISTRAL_FINAL_STATUSES = ('SUCCESS', 'FAILED', 'TIMEOUT_EXCEEDED', 'CANCELLED')
+
+
+class BatchClient:
+    """
+    Interface comum dos clientes de lote.
+
+    Attributes:
+        model (AIModelInterface): Modelo do provedor, que monta as requisições de cada método
+        provider_name (str): Nome do provedor
+    """
+
+    provider_name = None
+
+    def __init__(self, model):
+        self.model = model
+
+    def request_body(self, prompt, language, code, context_extra="", file_context=""):
+        """
+        Requisição de um método no formato do lote do provedor.
+
+        Returns:
+            dict: Parâmetros da requisição (sem o custom_id)
+        """
+        raise NotImplementedError
+
+    def submit(self, requests_by_id):
+        """
+        Cria um lote com as requisições informadas.
+
+        Args:
+            requests_by_id (dict): custom_id -> corpo de request_body
+
+        Returns:
+            str: Id do lote no provedor
+        """
+        raise NotImplementedError
+
+    def status(self, batch_id):
+        """
+        Situação de um lote.
+
+        Returns:
+            tuple: (terminado, contagem de requisições por situação)
+        """
+        raise NotImplementedError
+
+    def results(self, batch_id):
+        """
+        Respostas de um lote terminado.
+
+        Returns:
+            iterator: (custom_id, texto da resposta, erro) de cada requisição; o erro é
+            None quando há resposta, e a resposta é None quando há erro
+        """
+        raise NotImplementedError
+
+
+class AnthropicBatchClient(BatchClient):
+    """Lotes da Message Batches API, pelo cliente do SDK do AnthropicModel."""
+
+    provider_name = "anthropic"
+
+    def request_body(self, prompt, language, code, context_extra="", file_context=""):
+        # Os blocos com cache_control valem também dentro do lote
+        return self.model.build_request(prompt, language, code, context_extra, file_context)
+
+    def submit(self, requests_by_id):
+        batch = self.model.client.messages.batches.create(
+            requests=[{"custom_id": custom_id, "params": params} for custom_id, params in requests_by_id.items()]
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        batch = self.model.client.messages.batches.retrieve(batch_id)
+        return batch.processing_status == "ended", batch.request_counts.model_dump()
+
+    def results(self, batch_id):
+        for entry in self.model.client.messages.batches.results(batch_id):
+            result = entry.result
+            if result.type == "succeeded":
+                yield entry.custom_id, self.model.message_text(result.message), None
+            elif result.type == "errored":
+                yield entry.custom_id, None, f"{result.error.error.type}: {result.error.error.message}"
+            else:
+                yield entry.custom_id, None, f"requisição {result.type} no lote"
+
+
+class MistralBatchClient(BatchClient):
+    """Lotes da Batch API da Mistral, no mesmo endereço base do MistralAPIModel."""
+
+    provider_name = "mistral"
+    endpoint = "/v1/chat/completions"
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.model.api_key}"}
+
+    def _request(self, method, path, **kwargs):
+        response = requests.request(method, f"{self.model.base_url}{path}", headers=self._headers(),
+                                    timeout=300, **kwargs)
+        response.raise_for_status()
+        return response
+
+    def request_body(self, prompt, language, code, context_extra="", file_context=""):
+        body = self.model.build_payload(prompt, language, code, context_extra, file_context, stream=False)
+        del body["model"], body["stream"]  # O modelo é informado no job
+        return body
+
+    def submit(self, requests_by_id):
+        lines = ''.join(json.dumps({"custom_id": custom_id, "body": body}, ensure_ascii=False) + "\n"
+                        for custom_id, body in requests_by_id.items())
+        uploaded = self._request("POST", "/v1/files", data={"purpose": "batch"},
+                                 files={"file": ("metodos.jsonl", lines.encode('utf-8'))}).json()
+        job = self._request("POST", "/v1/batch/jobs", json={
+            "input_files": [uploaded["id"]],
+            "model": self.model.model_name,
+            "endpoint": self.endpoint
+        }).json()
+        return job["id"]
+
+    def status(self, batch_id):
+        job = self._request("GET", f"/v1/batch/jobs/{batch_id}").json()
+        counts = {key: job.get(key) for key in ('total_requests', 'succeeded_requests', 'failed_requests')}
+        return job["status"] in MISTRAL_FINAL_STATUSES, dict(counts, status=job["status"])
+
+    def results(self, batch_id):
+        job = self._request("GET", f"/v1/batch/jobs/{batch_id}").json()
+        for file_id in (job.get("output_file"), job.get("error_file")):
+            if not file_id:
+                continue
+            content = self._request("GET", f"/v1/files/{file_id}/content").content.decode('utf-8')
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                body = response.get("body") or {}
+                choices = body.get("choices") or []
+                if entry.get("error") or response.get("status_code", 200) >= 400 or not choices:
+                    yield entry["custom_id"], None, str(entry.get("error") or body or "resposta sem conteúdo")
+                else:
+                    yield entry["custom_id"], choices[0]["message"]["content"], None
+
+
+def create_batch_client(model):
+    """
+    Cria o cliente de lote do provedor de um modelo.
+
+    Args:
+        model (AIModelInterface): AnthropicModel ou MistralAPIModel, sem envoltórios de cache ou limite de taxa
+
+    Returns:
+        BatchClient: Cliente de lote do provedor
+
+    Raises:
+        ValueError: Se o provedor não tem API de lote
+    """
+    clients = {client.provider_name: client for client in (AnthropicBatchClient, MistralBatchClient)}
+    provider = getattr(model, 'provider_name', None)
+    if provider not in clients:
+        raise ValueError(f"O modo em lote requer o provedor 'anthropic' ou 'mistral' "
+                         f"(modelo: {provider or type(model).__name__})")
+    logging.info(f"Usando a API de lote do provedor {provider}")
+    return clients[provider](model)
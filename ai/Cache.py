@@ -0,0 +1,96 @@
+from .AiModelInterface import AIModelInterface
+from .JsonObjectScanner import JsonObjectScanner
+import hashlib
+import logging
+import sqlite3
+import threading
+
+
+class LLMCache:
+    """
+    Cache de respostas do modelo de IA, seguro para uso entre threads.
+
+    Sem caminho, mantém as respostas em memória; com caminho, persiste em um
+    arquivo SQLite, permitindo reaproveitar respostas entre execuções.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS respostas (chave TEXT PRIMARY KEY, resposta TEXT NOT NULL)")
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode('utf-8', errors='ignore'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            if self._conn is not None:
+                row = self._conn.execute("SELECT resposta FROM respostas WHERE chave = ?", (key,)).fetchone()
+                value = row[0] if row else None
+            else:
+                value = self._memory.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute("INSERT OR REPLACE INTO respostas (chave, resposta) VALUES (?, ?)", (key, value))
+                self._conn.commit()
+            else:
+                self._memory[key] = value
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Decorador de modelo que reaproveita respostas para entradas idênticas
+class CachedModel(AIModelInterface):
+    def __init__(self, model: AIModelInterface, cache: LLMCache = None):
+        self.model = model
+        self.cache = cache or LLMCache()
+        # A chave usa a classe do provedor, mesmo sob outros decoradores (ex.: RateLimitedModel)
+        provider = model
+        while isinstance(vars(provider).get('model'), AIModelInterface):
+            provider = provider.model
+        self._provider_type = type(provider).__name__
+
+    def __getattr__(self, name):
+        # Expor atributos do modelo decorado (ex.: model_name)
+        if name == 'model':
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "",
+                     file_context: str = "") -> str:
+        key = LLMCache.make_key(
+            self._provider_type, str(getattr(self.model, 'model_name', '')),
+            prompt, language, code, context_extra, file_context
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            logging.debug("Resposta do modelo obtida do cache")
+            return cached
+        response = self.model.analyze_code(prompt, language, code, context_extra, file_context=file_context)
+        # Respostas sem JSON válido não são guardadas: a nova tentativa deve chamar o modelo
+        if response and JsonObjectScanner().feed(response) is not None:
+            self.cache.set(key, response)
+        return response
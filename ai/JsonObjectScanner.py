@@ -0,0 +1,102 @@
+import json
+
+# Campos de AnaliseResponse que a análise exige na resposta do modelo
+ANALISE_REQUIRED_FIELDS = ('tipo_uso', 'operacoes_numericas', 'impactos', 'riscos', 'modificacoes',
+                           'severidade', 'horas_desenvolvimento', 'horas_testes')
+
+
+# Leitor incremental do primeiro objeto JSON completo em um texto recebido aos pedaços
+class JsonObjectScanner:
+    """
+    Localiza, de forma incremental, o primeiro objeto JSON válido em um texto.
+
+    Recebe o texto em pedaços (streaming) e acompanha o balanceamento de
+    chaves fora de strings. Assim que um objeto fecha, faz o parse e verifica
+    os campos obrigatórios; objetos inválidos (ex.: "{x}" no texto anterior
+    à resposta) são descartados e a busca continua. Substitui a busca gulosa
+    por "\\{.*\\}", que falhava quando o modelo escrevia algo com chaves
+    depois do JSON.
+
+    Attributes:
+        value (dict): Objeto encontrado, ou None
+        text (str): Texto do objeto encontrado, ou None
+        error (str): Motivo da última rejeição, para mensagens de erro
+    """
+
+    def __init__(self, required_fields=ANALISE_REQUIRED_FIELDS):
+        self.required_fields = required_fields
+        self.value = None
+        self.text = None
+        self.error = "JSON não encontrado na resposta"
+        self._buffer = ''
+        self._pos = 0
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self):
+        return self.value is not None
+
+    @property
+    def received(self):
+        """Todo o texto recebido até agora."""
+        return self._buffer
+
+    def feed(self, chunk):
+        """
+        Acrescenta um pedaço do texto e continua a busca.
+
+        Args:
+            chunk (str): Próximo pedaço da resposta
+
+        Returns:
+            dict: O objeto, assim que estiver completo e válido; None enquanto isso
+        """
+        if self.done:
+            return self.value
+        self._buffer += chunk
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            if self._start is None:
+                if char == '{':
+                    self._start, self._depth = self._pos, 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0 and self._accept(buffer[self._start:self._pos + 1]):
+                    self._pos += 1
+                    return self.value
+                if self._depth == 0:
+                    # Objeto rejeitado: recomeça logo após a chave de abertura
+                    self._pos, self._start = self._start, None
+            self._pos += 1
+        return None
+
+    def _accept(self, candidate):
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError as e:
+            self.error = f"Erro no parse do JSON: {str(e)}"
+            return False
+        if not isinstance(value, dict):
+            self.error = "A resposta não é um objeto JSON"
+            return False
+        missing = [field for field in self.required_fields if field not in value]
+        if missing:
+            self.error = f"Campos obrigatórios ausentes: {', '.join(missing)}"
+            return False
+        self.value, self.text = value, candidate
+        return True
@@ -1,4 +1,6 @@
-from .AiModelInterface import AIModelInterface
+from .AiModelInterface import AIModelInterface, SYSTEM_PROMPT
+from .StreamStats import StreamStats
+import json
 import requests  # Faltava esta importação
 import logging
 import time
@@ -6,36 +8,28 @@ import random
 
 # Implementação para API da Mistral
 class MistralAPIModel(AIModelInterface):
-    def __init__(self, api_key: str, model_name: str = "mistral-large-latest"):
+    provider_name = "mistral"
+
+    def __init__(self, api_key: str, model_name: str = "mistral-large-latest", stream: bool = True,
+                 structured: bool = True, base_url: str = "https://api.mistral.ai"):
         self.api_key = api_key
         self.model_name = model_name
-        self.api_url = "https://api.mistral.ai/v1/chat/completions"
+        self.base_url = base_url.rstrip('/')
+        self.api_url = f"{self.base_url}/v1/chat/completions"
+        self.max_tokens = 1024
+        self.stream = stream
+        self.structured = structured
+        self.stats = StreamStats()
         
-    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "") -> str:
+    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "",
+                     file_context: str = "") -> str:
         headers = {
             "Content-Type": "application/json",
-            "Accept": "application/json",
+            "Accept": "text/event-stream" if self.stream else "application/json",
             "Authorization": f"Bearer {self.api_key}"
         }
         
-        # Formatar o prompt para o Mistral
-        formatted_prompt = prompt.format(language=language, code=code + context_extra)
-        
-        payload = {
-            "model": self.model_name,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "Você é um analisador de código que responde APENAS com JSON válido em uma única linha, sem formatação ou textos adicionais."
-                },
-                {
-                    "role": "user",
-                    "content": formatted_prompt
-                }
-            ],
-            "temperature": 0.0,
-            "max_tokens": 1024
-        }
+        payload = self.build_payload(prompt, language, code, context_extra, file_context)
         
         # Implementar retry com exponential backoff
         max_retries = 5
@@ -43,6 +37,13 @@ class MistralAPIModel(AIModelInterface):
         
         while retry_count < max_retries:
             try:
+                if self.stream:
+                    # Fechar a conexão (fim do bloco with) interrompe a geração
+                    started = time.perf_counter()
+                    with requests.post(self.api_url, headers=headers, json=payload, stream=True) as response:
+                        response.raise_for_status()
+                        return self._read_stream(self._chunks(response), started, self.max_tokens)
+
                 response = requests.post(self.api_url, headers=headers, json=payload)
                 response.raise_for_status()
                 
@@ -71,3 +72,53 @@ class MistralAPIModel(AIModelInterface):
                 raise
                 
         raise Exception("Falha após múltiplas tentativas na API Mistral")
+
+    def build_payload(self, prompt: str, language: str, code: str, context_extra: str = "",
+                      file_context: str = "", stream: bool = None) -> dict:
+        """
+        Corpo da requisição de chat completions para a análise de um método (usado também nos lotes, ai.Batch).
+
+        Args:
+            stream (bool, optional): Modo de streaming (padrão: o do modelo)
+
+        Returns:
+            dict: Corpo da requisição
+        """
+        stream = self.stream if stream is None else stream
+        # Formatar o prompt para o Mistral (instruções fixas primeiro, depois o contexto do arquivo)
+        formatted_prompt = ''.join(self.prompt_parts(prompt, language, code, context_extra, file_context))
+        
+        payload = {
+            "model": self.model_name,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": formatted_prompt
+                }
+            ],
+            "temperature": 0.0,
+            "max_tokens": self.max_tokens,
+            "stream": stream
+        }
+        if self.structured:
+            # Modo JSON: a API garante um objeto JSON válido como resposta
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+
+    @staticmethod
+    def _chunks(response):
+        """Pedaços de texto de uma resposta em streaming (server-sent events) da API Mistral."""
+        for raw in response.iter_lines():
+            line = raw.decode('utf-8')  # SSE sem charset: requests suporia ISO-8859-1
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            choices = json.loads(data).get("choices") or []
+            if choices:
+                yield choices[0].get("delta", {}).get("content") or ""
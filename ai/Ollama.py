@@ -1,32 +1,66 @@
-
-from .AiModelInterface import AIModelInterface
+from .AiModelInterface import AIModelInterface, SYSTEM_PROMPT
+from .StreamStats import StreamStats
+from .PromptCacheStats import PromptCacheStats
+from .basemodel import analise_json_schema
+import json
 import requests
 import logging
+import time
 from typing import Optional
 
 # Implementação para Ollama com CodeMistral
 class OllamaModel(AIModelInterface):
-    def __init__(self, base_url: str = "http://localhost:11434", model_name: str = "codellama"):
+    provider_name = "ollama"
+
+    def __init__(self, base_url: str = "http://localhost:11434", model_name: str = "codellama",
+                 stream: bool = True, structured: bool = True, keep_alive: Optional[str] = None):
         self.base_url = base_url
         self.model_name = model_name
+        self.max_tokens = 1024
+        self.stream = stream
+        self.structured = structured
+        self.keep_alive = keep_alive  # Tempo que o modelo (e o cache do prompt) fica carregado; None = padrão do servidor
+        self.stats = StreamStats()
+        self.cache_stats = PromptCacheStats()
         
-    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "") -> str:
-        # Formatar o prompt para o Ollama
-        formatted_prompt = prompt.format(language=language, code=code + context_extra)
+    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "",
+                     file_context: str = "") -> str:
+        # Instruções fixas primeiro, depois o contexto do arquivo: com o modelo carregado, o
+        # servidor reaproveita o processamento do início do prompt que coincide com a chamada anterior
+        formatted_prompt = ''.join(self.prompt_parts(prompt, language, code, context_extra, file_context))
         
         # Preparar a requisição para a API do Ollama
         url = f"{self.base_url}/api/generate"
         payload = {
             "model": self.model_name,
             "prompt": formatted_prompt,
-            "system": "Você é um analisador de código que responde APENAS com JSON válido em uma única linha, sem formatação ou textos adicionais.",
-            "stream": False
+            "system": SYSTEM_PROMPT,
+            "stream": self.stream,
+            "options": {"num_predict": self.max_tokens}
         }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if self.structured:
+            # Decodificação restrita ao schema (o Ollama também aceita "json" sem schema)
+            payload["format"] = analise_json_schema()
         
         try:
+            started = time.perf_counter()
+            if self.stream:
+                # Fechar a conexão (fim do bloco with) interrompe a geração no servidor
+                final = {}
+                with requests.post(url, json=payload, stream=True) as response:
+                    response.raise_for_status()
+                    chunks = self._chunks(response, final)
+                    return self._read_stream(chunks, started, self.max_tokens,
+                                             usage=lambda: self._stream_usage(chunks, final, formatted_prompt))
+
             response = requests.post(url, json=payload)
             response.raise_for_status()
             data = response.json()
+            tokens = self._usage_tokens(data, formatted_prompt)
+            if tokens is not None:
+                self.cache_stats.record(*tokens, time.perf_counter() - started)
             
             if "response" in data:
                 return data["response"]
@@ -34,4 +68,57 @@ class OllamaModel(AIModelInterface):
                 raise ValueError("Formato de resposta inesperado do Ollama")
         except Exception as e:
             logging.error(f"Erro na comunicação com Ollama: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    @staticmethod
+    def _usage_tokens(data, formatted_prompt):
+        """
+        Tokens de entrada de uma resposta do Ollama.
+
+        O Ollama informa em prompt_eval_count apenas os tokens processados na
+        chamada; o que foi reaproveitado do cache é estimado pelo tamanho do
+        prompt (cerca de 4 caracteres por token). Sem a última linha da
+        resposta (streaming encerrado antes do fim), retorna None.
+        """
+        if "prompt_eval_count" not in data:
+            return None
+        evaluated = data["prompt_eval_count"]
+        estimated = (len(SYSTEM_PROMPT) + len(formatted_prompt)) // 4
+        return evaluated, max(estimated - evaluated, 0), 0
+
+    @classmethod
+    def _stream_usage(cls, chunks, final, formatted_prompt):
+        """
+        Tokens de entrada de uma resposta em streaming.
+
+        Com a saída estruturada, a linha final (done) costuma vir logo após o
+        fechamento do JSON, onde a leitura parou: é lida no máximo mais uma linha.
+        A análise já está completa: se essa leitura falhar (linha de erro do
+        servidor, conexão encerrada), só as contagens ficam de fora (None).
+        """
+        if not final:
+            try:
+                next(chunks, None)
+            except (ValueError, requests.RequestException) as e:
+                logging.debug(f"Linha final do Ollama não lida: {str(e)}")
+                return None
+        return cls._usage_tokens(final, formatted_prompt)
+
+    @staticmethod
+    def _chunks(response, final=None):
+        """
+        Pedaços de texto de uma resposta em streaming do Ollama (uma linha JSON por pedaço).
+
+        A última linha (done), com as contagens de tokens, é copiada para final.
+        """
+        for line in response.iter_lines():
+            if not line:
+                continue
+            data = json.loads(line)
+            if "error" in data:
+                raise ValueError(f"Erro do Ollama: {data['error']}")
+            if data.get("done") and final is not None:
+                final.update(data)
+            yield data.get("response", "")
+            if data.get("done"):
+                return
@@ -0,0 +1,181 @@
+from .AiModelInterface import AIModelInterface
+from .Ollama import OllamaModel
+from .StreamStats import StreamStats
+from .PromptCacheStats import PromptCacheStats
+import logging
+import threading
+import time
+import requests
+
+
+# Um servidor Ollama do pool, com suas métricas
+class OllamaNode:
+    def __init__(self, model: OllamaModel):
+        self.model = model
+        self.url = model.base_url
+        self.outstanding = 0  # Requisições em andamento
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency_total = 0.0
+        self.ejected_until = 0.0  # Instante (time.monotonic) até o qual o nó fica fora do pool
+
+    def available(self, now):
+        return self.ejected_until <= now
+
+    def summary(self, now):
+        completed = self.requests - self.failures
+        return {
+            'url': self.url,
+            'requisicoes': self.requests,
+            'em_andamento': self.outstanding,
+            'falhas': self.failures,
+            'ejetado': not self.available(now),
+            'latencia_media_s': round(self.latency_total / completed, 3) if completed else None
+        }
+
+
+# Implementação para vários servidores Ollama com balanceamento de carga
+class OllamaPoolModel(AIModelInterface):
+    """
+    Distribui as chamadas entre vários servidores Ollama que servem o mesmo modelo.
+
+    Cada chamada vai para o nó com menos requisições em andamento. Um nó com
+    eject_after falhas de comunicação seguidas é ejetado por eject_seconds e a
+    chamada é repetida em outro nó. Com health_interval, uma thread consulta
+    /api/tags de cada nó periodicamente: nós ejetados que respondem voltam ao
+    pool e nós que não respondem são ejetados antes de receber chamadas.
+
+    Args:
+        base_urls (list): URLs dos servidores Ollama
+        model_name (str): Modelo usado em todos os servidores
+        stream (bool): Receber as respostas em streaming
+        structured (bool): Restringir a saída ao schema de AnaliseResponse
+        keep_alive (str, optional): Tempo que o modelo fica carregado em cada servidor
+        eject_after (int): Falhas seguidas para ejetar um nó
+        eject_seconds (float): Tempo que um nó ejetado fica fora do pool
+        health_interval (float): Intervalo das verificações de saúde em segundos (0 = desativadas)
+    """
+
+    provider_name = "ollama"
+
+    def __init__(self, base_urls, model_name: str = "codellama", stream: bool = True, structured: bool = True,
+                 keep_alive: str = None, eject_after: int = 3, eject_seconds: float = 30.0, health_interval: float = 10.0):
+        if not base_urls:
+            raise ValueError("Informe ao menos uma URL de servidor Ollama")
+        self.model_name = model_name
+        self.max_tokens = 1024
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.stats = StreamStats()  # Compartilhado pelos nós: métricas de streaming do pool
+        self.cache_stats = PromptCacheStats()
+        self.nodes = []
+        for url in base_urls:
+            model = OllamaModel(base_url=url.rstrip('/'), model_name=model_name, stream=stream,
+                                structured=structured, keep_alive=keep_alive)
+            model.stats = self.stats
+            model.cache_stats = self.cache_stats
+            self.nodes.append(OllamaNode(model))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+        if health_interval:
+            self._health_thread = threading.Thread(target=self._health_loop, name='ollama-health', daemon=True)
+            self._health_thread.start()
+
+    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "",
+                     file_context: str = "") -> str:
+        tried = set()
+        while True:
+            node = self._acquire(tried)
+            started = time.perf_counter()
+            try:
+                response = node.model.analyze_code(prompt, language, code, context_extra, file_context)
+            except requests.exceptions.RequestException as e:
+                self._release(node, time.perf_counter() - started, failed=True)
+                tried.add(id(node))
+                if len(tried) >= len(self.nodes):
+                    raise
+                logging.warning(f"Falha no servidor Ollama {node.url}; repetindo em outro servidor: {str(e)}")
+                continue
+            except BaseException:
+                self._release(node, time.perf_counter() - started)
+                raise
+            self._release(node, time.perf_counter() - started)
+            return response
+
+    def _acquire(self, tried):
+        """Escolhe o nó disponível com menos requisições em andamento e reserva uma vaga nele."""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [node for node in self.nodes if id(node) not in tried]
+            available = [node for node in candidates if node.available(now)]
+            if available:
+                node = min(available, key=lambda n: (n.outstanding, n.requests))
+            else:
+                # Todos ejetados: tenta o que volta primeiro, em vez de falhar sem tentar
+                node = min(candidates, key=lambda n: n.ejected_until)
+            node.outstanding += 1
+            node.requests += 1
+            return node
+
+    def _release(self, node, latency, failed=False):
+        with self._lock:
+            node.outstanding -= 1
+            if not failed:
+                node.consecutive_failures = 0
+                node.latency_total += latency
+                return
+            node.failures += 1
+            node.consecutive_failures += 1
+            if node.consecutive_failures >= self.eject_after and node.available(time.monotonic()):
+                node.ejected_until = time.monotonic() + self.eject_seconds
+                logging.warning(f"Servidor Ollama {node.url} ejetado por {self.eject_seconds:.0f}s "
+                                f"após {node.consecutive_failures} falhas seguidas")
+
+    def check_health(self):
+        """
+        Consulta /api/tags de cada nó, readmitindo os que respondem e ejetando os que não respondem.
+
+        Returns:
+            int: Quantidade de nós disponíveis após a verificação
+        """
+        for node in self.nodes:
+            try:
+                healthy = requests.get(f"{node.url}/api/tags", timeout=5).ok
+            except requests.exceptions.RequestException:
+                healthy = False
+            with self._lock:
+                now = time.monotonic()
+                if healthy and not node.available(now):
+                    node.ejected_until = 0.0
+                    node.consecutive_failures = 0
+                    logging.info(f"Servidor Ollama {node.url} readmitido no pool")
+                elif not healthy and node.available(now):
+                    node.ejected_until = now + self.eject_seconds
+                    logging.warning(f"Servidor Ollama {node.url} ejetado: verificação de saúde falhou")
+        with self._lock:
+            now = time.monotonic()
+            return sum(1 for node in self.nodes if node.available(now))
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def node_stats(self):
+        """
+        Métricas por servidor.
+
+        Returns:
+            list: Um dicionário por nó (url, requisicoes, em_andamento, falhas, ejetado, latencia_media_s)
+        """
+        with self._lock:
+            now = time.monotonic()
+            return [node.summary(now) for node in self.nodes]
+
+    def close(self):
+        """Encerra a thread de verificação de saúde."""
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
@@ -0,0 +1,64 @@
+import threading
+
+
+# Métricas do cache de prefixo de prompt de um cliente de modelo de IA
+class PromptCacheStats:
+    """
+    Acumula o uso do cache de prefixo de prompt do provedor.
+
+    Cada requisição informa os tokens de entrada processados sem cache, os
+    lidos do cache e os gravados nele, além da latência: tempo até o primeiro
+    token no streaming ou duração total sem streaming. As latências são
+    separadas entre requisições que leram ou não o cache, para comparar o
+    ganho do prefixo reaproveitado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.uncached_tokens = 0
+        self.cached_tokens = 0
+        self.written_tokens = 0
+        self.hit_latency = [0.0, 0]  # Soma das latências, requisições
+        self.miss_latency = [0.0, 0]
+
+    def record(self, uncached_tokens, cached_tokens, written_tokens, latency):
+        """
+        Registra uma requisição.
+
+        Args:
+            uncached_tokens (int): Tokens de entrada processados sem cache
+            cached_tokens (int): Tokens de entrada lidos do cache
+            written_tokens (int): Tokens de entrada gravados no cache
+            latency (float): Segundos até o primeiro token (ou duração da chamada)
+        """
+        with self._lock:
+            self.requests += 1
+            self.uncached_tokens += uncached_tokens
+            self.cached_tokens += cached_tokens
+            self.written_tokens += written_tokens
+            bucket = self.hit_latency if cached_tokens else self.miss_latency
+            bucket[0] += latency
+            bucket[1] += 1
+
+    def summary(self):
+        """
+        Resumo das métricas acumuladas.
+
+        Returns:
+            dict: requisicoes, tokens_sem_cache, tokens_lidos_cache, tokens_gravados_cache,
+            fracao_em_cache, latencia_media_com_cache_s, latencia_media_sem_cache_s
+        """
+        with self._lock:
+            total = self.uncached_tokens + self.cached_tokens + self.written_tokens
+            return {
+                'requisicoes': self.requests,
+                'tokens_sem_cache': self.uncached_tokens,
+                'tokens_lidos_cache': self.cached_tokens,
+                'tokens_gravados_cache': self.written_tokens,
+                'fracao_em_cache': round(self.cached_tokens / total, 3) if total else None,
+                'latencia_media_com_cache_s': (round(self.hit_latency[0] / self.hit_latency[1], 3)
+                                               if self.hit_latency[1] else None),
+                'latencia_media_sem_cache_s': (round(self.miss_latency[0] / self.miss_latency[1], 3)
+                                               if self.miss_latency[1] else None)
+            }
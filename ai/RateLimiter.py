@@ -0,0 +1,71 @@
+from .AiModelInterface import AIModelInterface
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Limita as chamadas a um provedor de IA por concorrência e por requisições/minuto.
+
+    Pode ser compartilhado entre vários analisadores para que todos respeitem a
+    mesma cota do provedor.
+    """
+
+    def __init__(self, max_concurrent: int = 4, requests_per_minute: float = 0):
+        self.max_concurrent = max_concurrent
+        self.requests_per_minute = requests_per_minute
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._tokens = float(requests_per_minute or 0)
+        self._last_refill = time.monotonic()
+
+    def _wait_for_token(self):
+        if not self.requests_per_minute:
+            return
+        rate = self.requests_per_minute / 60.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.requests_per_minute, self._tokens + (now - self._last_refill) * rate)
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / rate
+            time.sleep(wait_time)
+
+    def __enter__(self):
+        self._slots.acquire()
+        try:
+            self._wait_for_token()
+        except BaseException:
+            self._slots.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._slots.release()
+
+
+# Decorador de modelo que passa cada chamada pelo limitador compartilhado
+class RateLimitedModel(AIModelInterface):
+    def __init__(self, model: AIModelInterface, limiter: RateLimiter):
+        self.model = model
+        self.limiter = limiter
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        if name in ('model', '_local'):
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def waited(self) -> float:
+        """Segundos acumulados pela thread atual aguardando o limitador (vaga e cota por minuto)."""
+        return getattr(self._local, 'waited', 0.0)
+
+    def analyze_code(self, prompt: str, language: str, code: str, context_extra: str = "",
+                     file_context: str = "") -> str:
+        started = time.perf_counter()
+        with self.limiter:
+            self._local.waited = self.waited() + time.perf_counter() - started
+            return self.model.analyze_code(prompt, language, code, context_extra, file_context=file_context)
@@ -0,0 +1,64 @@
+import threading
+
+
+# Métricas de streaming de um cliente de modelo de IA
+class StreamStats:
+    """
+    Acumula métricas das respostas recebidas por streaming.
+
+    O tempo economizado é estimado para as respostas interrompidas assim que
+    o JSON ficou completo: tokens que ainda restavam até max_tokens vezes o
+    tempo médio por token observado naquela resposta. É um limite superior,
+    pois o modelo poderia ter parado antes por conta própria.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.early_stops = 0
+        self.ttft_total = 0.0
+        self.ttft_count = 0
+        self.duration_total = 0.0
+        self.saved_total = 0.0
+
+    def record(self, ttft, duration, generated_chars, stopped_early, max_tokens):
+        """
+        Registra uma resposta.
+
+        Args:
+            ttft (float): Segundos até o primeiro pedaço de texto (None se nada chegou)
+            duration (float): Duração total da chamada em segundos
+            generated_chars (int): Caracteres recebidos
+            stopped_early (bool): Se a geração foi cancelada ao completar o JSON
+            max_tokens (int): Limite de tokens da requisição
+        """
+        saved = 0.0
+        if stopped_early and ttft is not None:
+            tokens = max(1, generated_chars // 4)
+            per_token = max(duration - ttft, 0.0) / tokens
+            saved = max(max_tokens - tokens, 0) * per_token
+        with self._lock:
+            self.requests += 1
+            self.duration_total += duration
+            if ttft is not None:
+                self.ttft_total += ttft
+                self.ttft_count += 1
+            if stopped_early:
+                self.early_stops += 1
+                self.saved_total += saved
+
+    def summary(self):
+        """
+        Resumo das métricas acumuladas.
+
+        Returns:
+            dict: requisicoes, interrompidas_cedo, ttft_medio_s, duracao_media_s, tempo_economizado_s
+        """
+        with self._lock:
+            return {
+                'requisicoes': self.requests,
+                'interrompidas_cedo': self.early_stops,
+                'ttft_medio_s': round(self.ttft_total / self.ttft_count, 3) if self.ttft_count else None,
+                'duracao_media_s': round(self.duration_total / self.requests, 3) if self.requests else None,
+                'tempo_economizado_s': round(self.saved_total, 1)
+            }
@@ -1,5 +1,35 @@
-from .basemodel import AnaliseResponse
+import importlib
+
 from .AiModelInterface import AIModelInterface
-from .Anthropic import AnthropicModel
-from .Mistral import MistralAPIModel
-from .Ollama import OllamaModel 
\ No newline at end of file
+from .Cache import CachedModel, LLMCache
+from .JsonObjectScanner import JsonObjectScanner, ANALISE_REQUIRED_FIELDS
+from .StreamStats import StreamStats
+from .PromptCacheStats import PromptCacheStats
+from .RateLimiter import RateLimitedModel, RateLimiter
+
+# Os clientes dos provedores (anthropic, requests) e o modelo pydantic são
+# importados sob demanda, no primeiro acesso, para que apenas o provedor em
+# uso seja carregado.
+_LAZY_EXPORTS = {
+    'AnaliseResponse': '.basemodel',
+    'AnthropicModel': '.Anthropic',
+    'AnthropicBatchClient': '.Batch',
+    'BatchClient': '.Batch',
+    'MistralBatchClient': '.Batch',
+    'create_batch_client': '.Batch',
+    'MistralAPIModel': '.Mistral',
+    'OllamaModel': '.Ollama',
+    'OllamaPoolModel': '.OllamaPool',
+}
+
+__all__ = ['AIModelInterface', 'CachedModel', 'LLMCache', 'RateLimitedModel', 'RateLimiter',
+           'JsonObjectScanner', 'ANALISE_REQUIRED_FIELDS', 'StreamStats', 'PromptCacheStats',
+           *_LAZY_EXPORTS]
+
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
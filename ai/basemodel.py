@@ -11,4 +11,13 @@ class AnaliseResponse(BaseModel):
     horas_desenvolvimento: int = Field(description="Estimativa em horas para desenvolvimento")
     horas_testes: int = Field(description="Estimativa em horas para testes unitários")
     dependencias: List[str] = Field(description="Outros métodos/classes que dependem ou são chamados")
-    sistemas_impactados: List[str] = Field(description="Outros sistemas/integrações impactados")
\ No newline at end of file
+    sistemas_impactados: List[str] = Field(description="Outros sistemas/integrações impactados")
+
+def analise_json_schema():
+    """
+    JSON Schema de AnaliseResponse, usado para restringir a saída dos provedores.
+
+    Returns:
+        dict: Schema com todos os campos obrigatórios
+    """
+    return AnaliseResponse.model_json_schema()
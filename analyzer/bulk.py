@@ -0,0 +1,278 @@
+"""
+Modo em lote: análise pelas APIs de lote dos provedores, para execuções longas (ex.: noturnas).
+
+Na avaliação de um portfólio inteiro a latência não importa, mas a vazão e
+o custo sim: em vez de uma chamada síncrona por método, os prompts de todos
+os métodos pendentes são enviados em lotes (ai.Batch), que o provedor
+processa em segundo plano e com desconto. Os lotes são consultados
+periodicamente e, ao terminarem, cada resposta volta ao seu método pelo
+custom_id e vira um resultado como nas chamadas diretas.
+
+O estado fica em disco, em um diretório informado:
+
+- <trabalho>_<provedor>.lotes.json: lotes enviados e ainda não coletados
+  e as tentativas de cada método, regravado por inteiro (arquivo temporário
+  e os.replace) a cada mudança;
+- <trabalho>_<provedor>.resultados.jsonl: resultados finais, um por linha,
+  acrescentados ao coletar cada lote.
+
+O id do trabalho é o mesmo do modo distribuído (analyzer.distributed.job_id):
+executar de novo sobre a mesma origem, com os mesmos métodos, retoma o
+trabalho. Os métodos com resultado gravado não são reenviados, os lotes em
+andamento voltam a ser consultados em vez de reenviados, e só os métodos
+que não chegaram a ser enviados entram em novos lotes. Respostas inválidas
+ou com erro são reenviadas em um novo lote até AI_PARSE_RETRIES vezes.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+
+from config import AI_PARSE_RETRIES, BATCH_MAX_REQUESTS, BATCH_POLL_INTERVAL
+from analyzer.distributed import job_id
+
+# Consultas seguidas com erro a um lote antes de desistir do trabalho
+MAX_POLL_FAILURES = 10
+
+
+def custom_id(path, candidate):
+    """Id de um método nas requisições dos lotes (até 64 caracteres [a-zA-Z0-9_-], exigido pela Anthropic)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(path.encode('utf-8', errors='surrogatepass'))
+    digest.update(repr(candidate.spans).encode('ascii'))
+    digest.update(candidate.digest)
+    return digest.hexdigest()
+
+
+class BulkJob:
+    """
+    Análise em lote dos métodos pendentes de um analisador, com estado em disco para retomada.
+
+    Attributes:
+        analyzer (GenericCNPJAnalyzer): Analisador com os métodos já extraídos (collect)
+        client (ai.BatchClient): Cliente de lote do provedor
+        origin (str): Origem analisada
+        job (str): Id do trabalho
+        batches (dict): Lotes enviados e ainda não coletados: id -> custom_ids
+        done (set): custom_ids com resultado final gravado
+        resumed (int): Resultados reaproveitados de uma execução anterior
+        error (str): Erro que interrompeu o trabalho, ou None
+    """
+
+    def __init__(self, analyzer, client, state_dir, origin, ref=None, max_retries=AI_PARSE_RETRIES):
+        """
+        Args:
+            analyzer (GenericCNPJAnalyzer): Analisador com os métodos já extraídos (collect)
+            client (ai.BatchClient): Cliente de lote do provedor
+            state_dir (str): Diretório do estado dos trabalhos em lote
+            origin (str): Origem analisada
+            ref (str, optional): Revisão git analisada
+            max_retries (int): Novos envios de métodos com resposta inválida ou erro
+        """
+        pending = analyzer.prioritize_pending()
+        analyzer.pending = []
+        self.analyzer = analyzer
+        self.client = client
+        self.origin = origin
+        self.max_retries = max_retries
+        self.candidates = {custom_id(analyzer.files.path(candidate.file_id), candidate): candidate
+                           for candidate in pending}
+        self._ids = {id(candidate): key for key, candidate in self.candidates.items()}
+        self.job = job_id(origin, ref, (candidate.digest for candidate in pending))
+        os.makedirs(state_dir, exist_ok=True)
+        basename = os.path.join(state_dir, f"{self.job}_{client.provider_name}")
+        self.state_path = f"{basename}.lotes.json"
+        self.results_path = f"{basename}.resultados.jsonl"
+        self.batches = {}
+        self.done = set()
+        self.resumed = 0
+        self.error = None
+        self._poll_failures = 0
+        self._load()
+        in_flight = {key for keys in self.batches.values() for key in keys}
+        # Na ordem de prioridade: os métodos de maior risco vão nos primeiros lotes
+        self._waiting = [key for key in self.candidates if key not in self.done and key not in in_flight]
+
+    def _load(self):
+        """Retoma o estado e os resultados gravados por uma execução anterior do mesmo trabalho."""
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.batches = {batch: [key for key in keys if key in self.candidates]
+                            for batch, keys in state['lotes'].items()}
+            for key, attempts in state['tentativas'].items():
+                if key in self.candidates:
+                    self.candidates[key].attempts = attempts
+            self.analyzer.parse_stats = state.get('parse_stats', {})
+        if os.path.exists(self.results_path):
+            with open(self.results_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        logging.warning(f"Linha incompleta ignorada em {self.results_path} (execução interrompida)")
+                        continue
+                    key = entry['custom_id']
+                    if key in self.candidates and key not in self.done:
+                        self.done.add(key)
+                        self.analyzer.findings.append(entry['resultado'])
+        self.resumed = len(self.done)
+        if self.resumed or self.batches:
+            logging.info(f"Trabalho em lote {self.job} ({self.origin}) retomado: {self.resumed} resultados "
+                         f"gravados, {len(self.batches)} lotes em andamento")
+
+    def _save(self):
+        state = {
+            'trabalho': self.job,
+            'origem': self.origin,
+            'provedor': self.client.provider_name,
+            'lotes': self.batches,
+            'tentativas': {key: candidate.attempts for key, candidate in self.candidates.items()
+                           if candidate.attempts},
+            'parse_stats': self.analyzer.parse_stats,
+            'atualizado': time.time()
+        }
+        temporary = f"{self.state_path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.state_path)
+
+    @property
+    def finished(self):
+        """Todos os métodos têm resultado final (ou o trabalho foi interrompido por erro)."""
+        return self.error is not None or (not self.batches and not self._waiting)
+
+    def progress(self):
+        """
+        Returns:
+            dict: Métodos concluídos, em lotes em andamento e aguardando envio
+        """
+        return {'concluidos': len(self.done), 'em_lotes': sum(len(keys) for keys in self.batches.values()),
+                'aguardando': len(self._waiting), 'lotes': len(self.batches)}
+
+    def submit(self, max_requests=BATCH_MAX_REQUESTS):
+        """
+        Envia em lotes de até max_requests os métodos que ainda não foram enviados.
+
+        O estado é gravado após a criação de cada lote; se a execução for
+        interrompida entre a criação e a gravação, os métodos desse lote são
+        reenviados na retomada.
+
+        Returns:
+            int: Métodos enviados
+        """
+        submitted = 0
+        analyzer = self.analyzer
+        while self._waiting:
+            chunk = self._waiting[:max_requests]
+            bodies = {}
+            for key in chunk:
+                node, _, _, language, dependencies, _, _, file_context = analyzer.candidate_inputs(self.candidates[key])
+                bodies[key] = self.client.request_body(analyzer.prompt, language, node,
+                                                       analyzer.dependency_context(dependencies), file_context)
+            batch = self.client.submit(bodies)
+            self.batches[batch] = chunk
+            del self._waiting[:len(chunk)]
+            self._save()
+            submitted += len(chunk)
+            logging.info(f"Lote {batch} enviado ({self.origin}): {len(chunk)} métodos")
+        analyzer.files.close()  # Libera as origens reabertas para montar os prompts
+        return submitted
+
+    def poll(self):
+        """
+        Consulta os lotes em andamento e coleta os que terminaram.
+
+        Erros na consulta são tolerados (a próxima consulta tenta de novo) até
+        MAX_POLL_FAILURES seguidos, quando o trabalho é interrompido.
+
+        Returns:
+            int: Métodos com resultado final nesta consulta
+        """
+        collected = 0
+        for batch in list(self.batches):
+            try:
+                finished, counts = self.client.status(batch)
+                if finished:
+                    collected += self._collect(batch)
+                else:
+                    logging.debug(f"Lote {batch} ({self.origin}) em andamento: {counts}")
+                self._poll_failures = 0
+            except Exception as e:
+                self._poll_failures += 1
+                logging.warning(f"Erro ao consultar o lote {batch} ({self.origin}): {str(e)}")
+                if self._poll_failures >= MAX_POLL_FAILURES:
+                    self.error = f"{self._poll_failures} consultas seguidas aos lotes com erro: {str(e)}"
+                    logging.error(f"Trabalho em lote {self.job} ({self.origin}) interrompido: {self.error}")
+                    break
+        return collected
+
+    def _collect(self, batch):
+        """Transforma as respostas de um lote terminado em resultados e devolve as falhas ao envio."""
+        expected = set(self.batches[batch])
+        results = list(self.client.results(batch))  # Baixadas antes de alterar o analisador
+        completed = []
+        for key, text, error in results:
+            if key not in expected or key in self.done:
+                continue  # Resposta repetida ou de um método já concluído
+            expected.discard(key)
+            completed.append((key, self.analyzer.complete_candidate(self.candidates[key], text, error)))
+        for key in self.batches[batch]:
+            if key in expected and key not in self.done:
+                completed.append((key, self.analyzer.complete_candidate(self.candidates[key],
+                                                                        error="método sem resposta no lote")))
+
+        self.analyzer.requeue_failed(self.max_retries)
+        retry = {self._ids[id(candidate)] for candidate in self.analyzer.pending}
+        self.analyzer.pending = []
+        final = [(key, finding) for key, finding in completed if key not in retry]
+        with open(self.results_path, 'a', encoding='utf-8') as f:
+            for key, finding in final:
+                f.write(json.dumps({'custom_id': key, 'resultado': finding}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(key for key, _ in final)
+        self._waiting.extend(key for key, _ in completed if key in retry)
+        del self.batches[batch]
+        self._save()
+        logging.info(f"Lote {batch} coletado ({self.origin}): {len(final)} resultados, "
+                     f"{len(retry)} métodos a reenviar")
+        return len(final)
+
+
+def run_jobs(jobs, poll_interval=BATCH_POLL_INTERVAL, max_requests=BATCH_MAX_REQUESTS):
+    """
+    Envia e acompanha os lotes de vários trabalhos até todos terminarem.
+
+    Os lotes de todas as origens são enviados antes da primeira espera, para
+    que o provedor processe todos ao mesmo tempo.
+
+    Args:
+        jobs (list): BulkJob de cada origem
+        poll_interval (float): Intervalo entre as consultas aos lotes
+        max_requests (int): Métodos por lote
+    """
+    last = None
+    while True:
+        for job in jobs:
+            if job.finished:
+                continue
+            job.poll()
+            if job.error is None:
+                try:
+                    job.submit(max_requests)
+                except Exception as e:
+                    job.error = f"Erro ao enviar lote: {str(e)}"
+                    logging.error(f"Trabalho em lote {job.job} ({job.origin}) interrompido: {job.error}")
+        remaining = [job for job in jobs if not job.finished]
+        if not remaining:
+            return
+        progress = {key: sum(job.progress()[key] for job in remaining) for key in ('concluidos', 'em_lotes', 'lotes')}
+        if progress != last:
+            logging.info(f"Modo em lote: {progress['concluidos']} métodos concluídos, {progress['em_lotes']} em "
+                         f"{progress['lotes']} lotes em andamento ({len(remaining)} origens)")
+            last = progress
+        time.sleep(poll_interval)
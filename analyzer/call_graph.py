@@ -0,0 +1,317 @@
+"""
+Grafo de chamadas entre os métodos coletados e propagação de impacto.
+
+Os métodos registrados na SymbolTable durante a extração viram nós e cada
+chamada por nome vira uma aresta para os métodos com o mesmo nome curto,
+em qualquer arquivo. O grafo é guardado em arrays no formato CSR (lista de
+adjacência compactada) nos dois sentidos e condensado em componentes
+fortemente conexas: métodos em um ciclo de chamadas são alcançados juntos,
+de modo que ciclos não exigem tratamento especial nas travessias.
+
+O alcance transitivo (quem chama, direta ou indiretamente, e quem é chamado)
+é calculado sobre o grafo condensado, que é acíclico, com memoização: o
+alcance de cada componente é um inteiro usado como conjunto de bits, obtido
+pela união dos alcances dos vizinhos, e é descartado assim que todos os
+componentes que dependem dele já o usaram. Assim, cada aresta é percorrida
+uma vez por consulta, mesmo com muitos métodos de origem.
+"""
+import logging
+import time
+from array import array
+
+# Severidades cujo impacto é propagado pelo grafo
+PROPAGATED_SEVERITIES = ('ALTA', 'MEDIA')
+
+# Palavras reservadas seguidas de parênteses: não são chamadas, e os padrões de
+# método de algumas linguagens (ex.: C/C++) as registram como métodos
+CONTROL_KEYWORDS = frozenset({
+    'if', 'for', 'foreach', 'while', 'switch', 'catch', 'return', 'sizeof', 'typeof', 'using',
+    'lock', 'elif', 'function', 'new', 'and', 'or', 'not', 'in', 'print', 'super', 'this'
+})
+
+# Quantidade de chamadores listados como exemplo em cada resultado
+SAMPLE_CALLERS = 10
+
+
+def _csr(node_count, sources, targets):
+    """
+    Monta a lista de adjacência compactada de um conjunto de arestas.
+
+    Args:
+        node_count (int): Quantidade de nós
+        sources (array): Origem de cada aresta
+        targets (array): Destino de cada aresta
+
+    Returns:
+        tuple: (início das arestas de cada nó, destinos), vizinhos do nó n em
+        destinos[início[n]:início[n + 1]]
+    """
+    starts = array('I', bytes(4 * (node_count + 1)))
+    for source in sources:
+        starts[source + 1] += 1
+    for node in range(node_count):
+        starts[node + 1] += starts[node]
+    position = array('I', starts[:node_count])
+    adjacency = array('I', bytes(4 * len(targets)))
+    for source, target in zip(sources, targets):
+        adjacency[position[source]] = target
+        position[source] += 1
+    return starts, adjacency
+
+
+def _strongly_connected(node_count, starts, adjacency):
+    """
+    Componentes fortemente conexas (algoritmo de Tarjan, iterativo).
+
+    Os componentes são numerados em ordem topológica reversa: um componente
+    só chama componentes de número menor.
+
+    Returns:
+        tuple: (componente de cada nó, quantidade de componentes)
+    """
+    unvisited = 0xFFFFFFFF
+    index = array('I', [unvisited]) * node_count
+    low = array('I', bytes(4 * node_count))
+    component = array('I', [unvisited]) * node_count
+    stack = []
+    count = 0
+    counter = 0
+    for root in range(node_count):
+        if index[root] != unvisited:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        work = [(root, starts[root])]
+        while work:
+            node, edge = work[-1]
+            end = starts[node + 1]
+            while edge < end:
+                target = adjacency[edge]
+                edge += 1
+                if index[target] == unvisited:
+                    work[-1] = (node, edge)
+                    index[target] = low[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    work.append((target, starts[target]))
+                    break
+                if component[target] == unvisited and index[target] < low[node]:
+                    low[node] = index[target]
+            else:
+                work.pop()
+                if work and low[node] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[node]
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        component[member] = count
+                        if member == node:
+                            break
+                    count += 1
+    return component, count
+
+
+class CallGraph:
+    """
+    Grafo de chamadas condensado, com consultas de alcance transitivo.
+
+    Args:
+        node_count (int): Quantidade de métodos (nós numerados de 0 a node_count - 1)
+        callers (array): Método que faz cada chamada
+        callees (array): Método chamado em cada chamada
+
+    Attributes:
+        component (array): Componente fortemente conexo de cada método
+        members (list): Métodos de cada componente
+        edge_count (int): Quantidade de chamadas distintas entre métodos
+    """
+
+    def __init__(self, node_count, callers, callees):
+        self.node_count = node_count
+        self.edge_count = len(callers)
+        starts, adjacency = _csr(node_count, callers, callees)
+        self.component, self.component_count = _strongly_connected(node_count, starts, adjacency)
+        self.members = [[] for _ in range(self.component_count)]
+        for node, comp in enumerate(self.component):
+            self.members[comp].append(node)
+        # Componentes com mais de um método: contados à parte no tamanho dos alcances
+        self.cycles = [(comp, len(nodes) - 1) for comp, nodes in enumerate(self.members) if len(nodes) > 1]
+        # Métodos a mais de cada ciclo decompostos em potências de 2: a máscara j tem os componentes
+        # cujo excedente tem o bit j, e size soma as contagens de bits de cada máscara deslocadas de j
+        masks = [bytearray((self.component_count + 7) // 8)
+                 for _ in range(max((extra for _, extra in self.cycles), default=0).bit_length())]
+        for comp, extra in self.cycles:
+            for j, mask in enumerate(masks):
+                if extra >> j & 1:
+                    mask[comp >> 3] |= 1 << (comp & 7)
+        self._cycle_masks = [int.from_bytes(mask, 'little') for mask in masks]
+
+        # Arestas do grafo condensado, sem repetição e sem laços
+        component = self.component
+        edges = set()
+        for caller, callee in zip(callers, callees):
+            source, target = component[caller], component[callee]
+            if source != target:
+                edges.add((source, target))
+        sources = array('I', (source for source, _ in edges))
+        targets = array('I', (target for _, target in edges))
+        self._callees = _csr(self.component_count, sources, targets)
+        self._callers = _csr(self.component_count, targets, sources)
+
+    @classmethod
+    def from_symbols(cls, symbols):
+        """
+        Monta o grafo a partir das chamadas registradas na SymbolTable.
+
+        Cada nome chamado é ligado a todos os registros atuais de métodos com
+        o mesmo nome curto (sem a classe), pois o tipo do objeto não é conhecido.
+        Palavras reservadas (CONTROL_KEYWORDS) não geram arestas.
+
+        Args:
+            symbols (SymbolTable): Métodos coletados pela extração
+
+        Returns:
+            CallGraph: Grafo com um nó por registro da SymbolTable
+        """
+        by_name = {}
+        for full_name in symbols:
+            name = full_name.rsplit('.', 1)[-1]
+            if name not in CONTROL_KEYWORDS:
+                by_name.setdefault(name, []).append(symbols.index_of(full_name))
+        # Nome chamado (id interno da SymbolTable) -> métodos com esse nome
+        resolved = [by_name.get(name, ()) for name in symbols.call_names]
+        callers, callees = array('I'), array('I')
+        for idx in range(len(symbols.names)):
+            targets = set()
+            for name_id in symbols.calls(idx):
+                targets.update(resolved[name_id])
+            targets.discard(idx)  # Recursão direta não altera o alcance
+            callers.extend([idx] * len(targets))
+            callees.extend(targets)
+        return cls(len(symbols.names), callers, callees)
+
+    def reach(self, nodes, upstream=True):
+        """
+        Alcance transitivo de um conjunto de métodos.
+
+        Args:
+            nodes (iterable): Métodos de origem
+            upstream (bool): True para quem chama (direta ou indiretamente), False para quem é chamado
+
+        Returns:
+            dict: Componente de origem -> conjunto de bits dos componentes alcançados (incluindo ele mesmo)
+        """
+        starts, adjacency = self._callers if upstream else self._callees
+        wanted = {self.component[node] for node in nodes}
+
+        # Pós-ordem do subgrafo alcançável, contando quantos componentes usam o alcance de cada um
+        users = {}
+        order = []
+        for root in wanted:
+            if root in users:
+                continue
+            users[root] = 0
+            work = [(root, starts[root])]
+            while work:
+                comp, edge = work[-1]
+                if edge < starts[comp + 1]:
+                    work[-1] = (comp, edge + 1)
+                    target = adjacency[edge]
+                    if target in users:
+                        users[target] += 1
+                    else:
+                        users[target] = 1
+                        work.append((target, starts[target]))
+                else:
+                    work.pop()
+                    order.append(comp)
+
+        memo = {}
+        result = {}
+        for comp in order:
+            bits = 1 << comp
+            for edge in range(starts[comp], starts[comp + 1]):
+                target = adjacency[edge]
+                bits |= memo[target]
+                users[target] -= 1
+                if not users[target]:
+                    del memo[target]  # Nenhum outro componente depende mais deste alcance
+            if comp in wanted:
+                result[comp] = bits
+            if users[comp]:
+                memo[comp] = bits
+        return result
+
+    def size(self, bits):
+        """Quantidade de métodos em um conjunto de componentes."""
+        return bits.bit_count() + sum((bits & mask).bit_count() << j for j, mask in enumerate(self._cycle_masks))
+
+    def sample(self, bits, limit):
+        """Até limit métodos de um conjunto de componentes, dos componentes de maior número para o menor."""
+        nodes = []
+        while bits and len(nodes) < limit:
+            comp = bits.bit_length() - 1
+            bits ^= 1 << comp
+            nodes.extend(self.members[comp][:limit - len(nodes)])
+        return nodes
+
+
+def propagate_impact(findings, symbols, files, severities=PROPAGATED_SEVERITIES):
+    """
+    Anota nos resultados de maior severidade o impacto transitivo pelo grafo de chamadas.
+
+    Cada resultado recebe 'chamadores_transitivos' e 'chamados_transitivos'
+    (quantidade de métodos que o chamam ou são chamados por ele, direta ou
+    indiretamente) e 'exemplos_chamadores'. Nenhuma chamada ao modelo de IA
+    é feita.
+
+    Args:
+        findings (list): Resultados da análise (alterados no lugar)
+        symbols (SymbolTable): Métodos e chamadas coletados na extração
+        files (FileTable): Arquivos da análise
+        severities (tuple): Severidades cujo impacto é propagado
+
+    Returns:
+        dict: Métodos, chamadas e ciclos do grafo, resultados anotados e duração
+    """
+    started = time.perf_counter()
+    graph = CallGraph.from_symbols(symbols)
+
+    # Registro da SymbolTable de cada resultado: mesmo arquivo e nome, linha mais próxima
+    by_location = {}
+    for idx, name in enumerate(symbols.names):
+        key = (files.path(symbols.file_ids[idx]), name.rsplit('.', 1)[-1])
+        by_location.setdefault(key, []).append(idx)
+    targets = []
+    for finding in findings:
+        if finding.get('severidade') not in severities:
+            continue
+        candidates = by_location.get((finding.get('arquivo'), finding.get('metodo')))
+        if candidates:
+            line = finding.get('linha') or 0
+            targets.append((finding, min(candidates, key=lambda idx: abs(symbols.lines[idx] - line))))
+
+    nodes = [idx for _, idx in targets]
+    upstream = graph.reach(nodes, upstream=True)
+    downstream = graph.reach(nodes, upstream=False)
+    for finding, idx in targets:
+        comp = graph.component[idx]
+        callers = upstream[comp] ^ (1 << comp)
+        finding['chamadores_transitivos'] = graph.size(upstream[comp]) - 1
+        finding['chamados_transitivos'] = graph.size(downstream[comp]) - 1
+        # Métodos do mesmo ciclo chamam o resultado e são listados primeiro
+        examples = [node for node in graph.members[comp] if node != idx] + graph.sample(callers, SAMPLE_CALLERS)
+        finding['exemplos_chamadores'] = "\n".join(
+            symbols.describe(node, files) for node in examples[:SAMPLE_CALLERS])
+
+    stats = {
+        'metodos': graph.node_count,
+        'chamadas': graph.edge_count,
+        'ciclos': len(graph.cycles),
+        'resultados_propagados': len(targets),
+        'duracao_s': round(time.perf_counter() - started, 3)
+    }
+    logging.info(f"Propagação de impacto: {stats['resultados_propagados']} resultados, "
+                 f"{stats['metodos']} métodos, {stats['chamadas']} chamadas em {stats['duracao_s']}s")
+    return stats
@@ -1,19 +1,26 @@
 import re
-from pathlib import Path
-import pandas as pd
-import json
-import anthropic
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
-from langchain.output_parsers import PydanticOutputParser
 import os
-from dotenv import load_dotenv
 import logging
-import requests
-from config import AI_MODEL_TYPE, OLLAMA_URL, OLLAMA_MODEL, MISTRAL_MODEL
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import CancelledError
+from config import (AI_MODEL_TYPE, OLLAMA_URL, OLLAMA_MODEL, MISTRAL_MODEL, MISTRAL_API_URL, AI_STREAMING,
+                    AI_STRUCTURED_OUTPUT, AI_PARSE_RETRIES, OLLAMA_EJECT_AFTER, OLLAMA_EJECT_SECONDS,
+                    OLLAMA_HEALTH_INTERVAL, AI_PROMPT_CACHE, OLLAMA_KEEP_ALIVE, PROMPT_FILE_CONTEXT_CHARS)
 
-from ai import AIModelInterface, AnaliseResponse, AnthropicModel, MistralAPIModel, OllamaModel
+from ai import AIModelInterface, JsonObjectScanner
+from ai.AiModelInterface import SYSTEM_PROMPT
 from analyzer.utils import extract_method_name, detect_language
+from analyzer.sources import open_source, FileSystemSource
+from analyzer.prioritization import score_candidates, estimate_tokens, static_risk, called_names
+from analyzer.records import FileTable, MethodCandidate, SymbolTable, SECTION_SEPARATOR, content_digest
+from analyzer.sampling import draw_stratified_sample, extrapolate
+from analyzer.call_graph import propagate_impact, CONTROL_KEYWORDS
+from analyzer.regex_guard import RegexTimeout, shared_guard
+from analyzer.python_extractor import extract_functions
+from analyzer.source_index import SourceIndex, mention_pattern
 
 # Configurar logging no início do arquivo
 logging.basicConfig(
@@ -26,6 +33,183 @@ logging.basicConfig(
 )
 
 
+# Mapeamento de extensões para linguagens suportadas (corrigido)
+SUPPORTED_EXTENSIONS = {
+    'java': ['.java'],
+    'csharp': ['.cs', '.cshtml', '.csx'],
+    'c': ['.c', '.h'],
+    'cpp': ['.cpp', '.hpp', '.cc', '.cxx', '.h', '.hxx', '.hh'],
+    'html': ['.html', '.htm', '.xhtml', '.aspx'],
+    'javascript': ['.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs'],
+    'python': ['.py', '.pyw', '.ipynb', '.pyc'],
+    'go': ['.go'],
+    'sql': ['.sql']
+}
+
+# Regex para encontrar menções a CNPJ em qualquer contexto (padrões separados para cada linguagem)
+CNPJ_PATTERN = r'(?:cnpj|cadastro\s+nacional\s+(?:de|da)\s+pessoa\s+jur[íi]dica|\b\d{2}[.-]?\d{3}[.-]?\d{3}[/]?\d{4}[-]?\d{2}\b)'
+
+# Chamadas por nome dentro do corpo de um método, para o grafo de chamadas
+CALL_PATTERN = re.compile(r'(\w+)\s*\(')
+
+# Padrões específicos por linguagem para melhor detecção
+CNPJ_LANGUAGE_PATTERNS = {
+    'java': r'(?:cnpj|CNPJ|getCnpj|setCnpj|validaCnpj|cadastro\s+nacional)',
+    'csharp': r'(?:cnpj|CNPJ|GetCnpj|SetCnpj|ValidaCnpj|cadastro\s+nacional)',
+    'python': r'(?:cnpj|CNPJ|get_cnpj|set_cnpj|valida_cnpj|cadastro\s+nacional)',
+    'javascript': r'(?:cnpj|CNPJ|getCnpj|setCnpj|validaCnpj|cadastro\s+nacional)',
+    'c': r'(?:cnpj|CNPJ|get_cnpj|set_cnpj|valida_cnpj|cadastro\s+nacional)',
+    'cpp': r'(?:cnpj|CNPJ|getCnpj|setCnpj|validaCnpj|cadastro\s+nacional)',
+    'go': r'(?:cnpj|CNPJ|GetCnpj|SetCnpj|ValidaCnpj|cadastro\s+nacional)',
+    'sql': r'(?:cnpj|CNPJ|cadastro\s+nacional)',
+    'html': r'(?:cnpj|CNPJ|cadastro\s+nacional)'
+}
+
+# Primeiros caracteres possíveis das menções acima e de CNPJ_PATTERN (filtro do padrão combinado de menções)
+CNPJ_FIRST_CHARS = r'cgsv\d'
+
+# Padrões de detecção para cada linguagem (refinados)
+PATTERNS = {
+    'java': {
+        'class': r'class\s+(\w+)',
+        'method': r'(?:public|private|protected)?\s+(?:static\s+)?[\w<>\[\]]+\s+(\w+)\s*\([^)]*\)\s*(?:\{|throws)',
+        'cnpj_method': None  # Preenchido abaixo, uma única vez por processo
+    },
+    'csharp': {
+        'class': r'class\s+(\w+)',
+        # Melhorado para capturar métodos C# mais precisamente, incluindo async/readonly/override
+        'method': r'(?:public|private|protected|internal)?\s+(?:static\s+|virtual\s+|async\s+|override\s+|readonly\s+)?[\w<>\[\]\.]+\s+(\w+)\s*\([^)]*\)\s*(?:\{|=>|\s*where)',
+        'cnpj_method': None
+    },
+    'c': {
+        'class': r'struct\s+(\w+)',
+        'method': r'[\w\*]+\s+(\w+)\s*\([^;]*\)\s*\{',
+        'cnpj_method': None
+    },
+    'cpp': {
+        'class': r'(?:class|struct)\s+(\w+)(?:\s*:\s*[\w\s,:<>]+)?(?=\s*\{)',
+        'method': r'(?:(?:virtual|static|explicit|inline|constexpr)\s+)?(?:[\w:~\*<>\[\]&]+\s+)?(\w+)\s*\([^{;]*\)(?:\s*(?:const|noexcept|override|final|=\s*0))?\s*(?=\{)',
+        'cnpj_method': None
+    },
+    'html': {
+        'class': r'<[^>]*class=["\'](.*?)["\']',
+        'method': r'(?:<script[^>]*>.*?)?function\s+(\w+)|(\w+)\s*=\s*function',
+        'cnpj_method': None
+    },
+    'javascript': {
+        'class': r'class\s+(\w+)|function\s+(\w+)',
+        'method': r'(?:function\s+(\w+)|const\s+(\w+)\s*=|let\s+(\w+)\s*=|var\s+(\w+)\s*=|(\w+)\s*:\s*function)\s*\([^)]*\)',
+        'cnpj_method': None
+    },
+    'python': {
+        'class': r'class\s+(\w+)',
+        'method': r'def\s+(\w+)\s*\([^)]*\)\s*:',
+        'cnpj_method': None
+    },
+    'go': {
+        'class': r'type\s+(\w+)\s+struct',
+        'method': r'func\s+(?:\([^)]*\))?\s*(\w+)',
+        'cnpj_method': None
+    },
+    'sql': {
+        'class': r'CREATE\s+TABLE\s+(\w+)',
+        'method': r'CREATE\s+(?:OR\s+REPLACE\s+)?(?:PROCEDURE|FUNCTION)\s+(\w+)',
+        'cnpj_method': None
+    }
+}
+
+
+def _cnpj_method_pattern(language, patterns, lang_cnpj_pattern):
+    """Monta o padrão de métodos que mencionam CNPJ para uma linguagem."""
+    # Tratamento especial para Java, restaurando o padrão original que funcionava
+    if language == 'java':
+        # Restaurar o padrão original do JavaCNPJAnalyzer que funcionava bem
+        return r'(?:public|private|protected)?\s+(?:static\s+)?[\w<>\[\]]+\s+(\w+)\s*\([^)]*\)\s*(?:\{|throws)[^}]*cnpj[^}]*\}'
+    elif language == 'csharp':
+        # Padrão específico e mais abrangente para C#
+        return r'(?:public|private|protected|internal)?\s+(?:static\s+|virtual\s+|async\s+|override\s+|readonly\s+)?[\w<>\[\]\.]+\s+(\w+)\s*\([^)]*\)\s*(?:\{|=>|\s*where)[^}]*(?:cnpj|CNPJ|Cnpj)[^}]*\}'
+    elif language == 'cpp':
+        # Padrão específico e mais abrangente para C++
+        return r'(?:(?:virtual|static|explicit|inline|constexpr)\s+)?(?:[\w:~\*<>\[\]&]+\s+)?(\w+)\s*\([^{;]*\)(?:\s*(?:const|noexcept|override|final|=\s*0))?\s*\{[^}]*(?:cnpj|CNPJ|Cnpj)[^}]*\}'
+    elif language == 'python':
+        return patterns['method'] + r'(?:[^#]*?(?:' + lang_cnpj_pattern + r'))'
+    elif language == 'sql':
+        return patterns['method'] + r'(?:[^;]*?(?:' + lang_cnpj_pattern + r')[^;]*?;)'
+    elif language == 'html' or language == 'javascript':
+        return patterns['method'].replace(')', r')[^}]*(?:' + lang_cnpj_pattern + r')[^}]*\}')
+    elif language == 'go':
+        return patterns['method'] + r'(?:[^}]*?(?:' + lang_cnpj_pattern + r')[^}]*?\})'
+    elif language == 'c':
+        return patterns['method'].replace('{', r'{[^}]*(?:' + lang_cnpj_pattern + r')[^}]*\}')
+    return None
+
+
+for _language, _patterns in PATTERNS.items():
+    _patterns['cnpj_method'] = _cnpj_method_pattern(
+        _language, _patterns, CNPJ_LANGUAGE_PATTERNS.get(_language, CNPJ_PATTERN))
+
+# Menções a CNPJ por linguagem: termos da linguagem e padrão geral em uma única passagem (analyzer.source_index)
+MENTION_PATTERNS = {language: mention_pattern(CNPJ_LANGUAGE_PATTERNS.get(language, CNPJ_PATTERN), CNPJ_PATTERN,
+                                               CNPJ_FIRST_CHARS)
+                    for language in PATTERNS}
+
+
+def create_ai_model(model_type=AI_MODEL_TYPE, ollama_url=OLLAMA_URL, ollama_model=OLLAMA_MODEL,
+                    mistral_model=MISTRAL_MODEL, stream=AI_STREAMING, structured=AI_STRUCTURED_OUTPUT,
+                    prompt_cache=AI_PROMPT_CACHE, keep_alive=OLLAMA_KEEP_ALIVE):
+    """
+    Cria o cliente do modelo de IA configurado.
+
+    Args:
+        model_type (str): Tipo de modelo a ser usado ('anthropic', 'ollama' ou 'mistral')
+        ollama_url (str): URL do servidor Ollama; várias URLs separadas por vírgula criam
+            um pool com balanceamento de carga (ver ai.OllamaPool)
+        ollama_model (str): Nome do modelo no Ollama
+        mistral_model (str): Nome do modelo da Mistral API
+        stream (bool): Receber as respostas em streaming, encerrando a geração assim que o JSON fica completo
+        structured (bool): Restringir a saída ao schema de AnaliseResponse (uso de ferramenta na
+            Anthropic, modo JSON na Mistral e schema no parâmetro format do Ollama)
+        prompt_cache (bool): Marcar o prefixo do prompt para cache na Anthropic
+        keep_alive (str): Tempo que o Ollama mantém o modelo carregado, preservando o
+            processamento do prefixo entre chamadas (vazio = padrão do servidor)
+
+    Returns:
+        AIModelInterface: Cliente do modelo de IA
+
+    Raises:
+        ValueError: Se o tipo de modelo não for suportado ou a chave de API estiver ausente
+    """
+    # Cada provedor é importado só quando escolhido (o SDK da Anthropic é pesado)
+    if model_type.lower() == "anthropic":
+        from ai.Anthropic import AnthropicModel
+        api_key = os.getenv("ANTHROPIC_API_KEY")
+        if not api_key:
+            raise ValueError("ANTHROPIC_API_KEY não encontrada nas variáveis de ambiente")
+        logging.info("Usando modelo Anthropic Claude para análise")
+        return AnthropicModel(api_key=api_key, stream=stream, structured=structured, prompt_cache=prompt_cache)
+    elif model_type.lower() == "ollama":
+        keep_alive = keep_alive or None
+        urls = [url.strip() for url in ollama_url.split(',') if url.strip()]
+        if len(urls) > 1:
+            from ai.OllamaPool import OllamaPoolModel
+            logging.info(f"Usando modelo Ollama ({ollama_model}) em {len(urls)} servidores para análise")
+            return OllamaPoolModel(urls, model_name=ollama_model, stream=stream, structured=structured,
+                                   keep_alive=keep_alive, eject_after=OLLAMA_EJECT_AFTER, eject_seconds=OLLAMA_EJECT_SECONDS,
+                                   health_interval=OLLAMA_HEALTH_INTERVAL)
+        from ai.Ollama import OllamaModel
+        logging.info(f"Usando modelo Ollama ({ollama_model}) para análise")
+        return OllamaModel(base_url=ollama_url, model_name=ollama_model, stream=stream,
+                           structured=structured, keep_alive=keep_alive)
+    elif model_type.lower() == "mistral":
+        from ai.Mistral import MistralAPIModel
+        api_key = os.getenv("MISTRAL_API_KEY")
+        if not api_key:
+            raise ValueError("MISTRAL_API_KEY não encontrada nas variáveis de ambiente")
+        logging.info(f"Usando modelo Mistral API ({mistral_model}) para análise")
+        return MistralAPIModel(api_key=api_key, model_name=mistral_model, stream=stream,
+                               structured=structured, base_url=MISTRAL_API_URL)
+    raise ValueError(f"Tipo de modelo '{model_type}' não suportado. Use 'anthropic', 'ollama' ou 'mistral'.")
+
 
 class GenericCNPJAnalyzer:
     """
@@ -39,13 +223,23 @@ class GenericCNPJAnalyzer:
         findings (list): Lista de resultados das análises
         ai_model (AIModelInterface): Modelo de IA para análise de código
         parser (PydanticOutputParser): Parser para validação de saída
-        all_methods (dict): Dicionário com todos os métodos encontrados
+        all_methods (SymbolTable): Índice compacto de todos os métodos encontrados
+        files (FileTable): Arquivos analisados; o texto dos métodos é relido daqui sob demanda
+        pending (list): Métodos com CNPJ (MethodCandidate) extraídos e ainda não enviados ao modelo de IA
+        skipped (int): Métodos não analisados por orçamento de tempo/tokens esgotado
+        failed (list): Pares (MethodCandidate, resultado) cuja resposta não pôde ser usada
+        parse_stats (dict): Respostas, falhas de parse e recuperações por provedor
+        estimate (dict): Horas e severidades extrapoladas no modo de amostragem
+        profiler (RunProfiler): Perfil de desempenho da análise, quando ativado (padrão: None)
+        regex_guard (RegexGuard): Executa os padrões da extração com prazo (analyzer.regex_guard)
+        degraded (list): Arquivos cujos padrões estouraram o prazo e foram analisados por trechos
+        call_samples (list): (tokens de entrada, tokens de saída, segundos) de cada chamada ao modelo
         supported_extensions (dict): Mapeamento de extensões para linguagens suportadas
         patterns (dict): Padrões regex para cada linguagem suportada
     """
 
     def __init__(self, model_type=AI_MODEL_TYPE, ollama_url=OLLAMA_URL, ollama_model=OLLAMA_MODEL, 
-                mistral_model=MISTRAL_MODEL):
+                mistral_model=MISTRAL_MODEL, ai_model=None):
         """
         Inicializa o analisador com as configurações padrão e carrega as variáveis de ambiente.
         
@@ -54,117 +248,44 @@ class GenericCNPJAnalyzer:
             ollama_url (str): URL do servidor Ollama
             ollama_model (str): Nome do modelo no Ollama (padrão: codellama)
             mistral_model (str): Nome do modelo da Mistral API (padrão: mistral-large-latest)
+            ai_model (AIModelInterface, optional): Modelo já construído, compartilhado entre
+                analisadores (ex.: com cache e limite de taxa); quando informado, os demais
+                parâmetros de modelo são ignorados
         """
         self.findings = []
+        self.pending = []  # Métodos aguardando análise pelo modelo de IA
+        self.skipped = 0  # Métodos não analisados por orçamento esgotado
+        self.sample_population = None  # Métodos por estrato quando a análise é por amostragem
+        self.sample_drawn = None  # Métodos sorteados na amostra
+        self.estimate = None  # Estimativas extrapoladas da amostra
+        self.failed = []  # (método, resultado ERRO) candidatos a nova tentativa
+        self._retrying = {}  # Método em nova tentativa -> resultado ERRO mantido até ser substituído
+        self._replaced = set()  # Ids dos resultados ERRO já substituídos, removidos em requeue_failed
+        self.parse_stats = {}  # Provedor -> contadores de respostas e falhas de parse
+        self.profiler = None  # RunProfiler opcional (analyzer.profiling)
+        self.regex_guard = shared_guard()
+        self.degraded = []  # Arquivos analisados por trechos após estourar o prazo dos padrões
+        self.call_samples = []  # Latência das chamadas ao modelo (analyzer.estimation)
+        self._stats_lock = threading.Lock()
         
-
-            
-        # Inicializar o modelo de IA apropriado
-        if model_type.lower() == "anthropic":
-            api_key = os.getenv("ANTHROPIC_API_KEY")
-            if not api_key:
-                raise ValueError("ANTHROPIC_API_KEY não encontrada nas variáveis de ambiente")
-            self.ai_model = AnthropicModel(api_key=api_key)
-            logging.info("Usando modelo Anthropic Claude para análise")
-        elif model_type.lower() == "ollama":
-            self.ai_model = OllamaModel(base_url=ollama_url, model_name=ollama_model)
-            logging.info(f"Usando modelo Ollama ({ollama_model}) para análise")
-        elif model_type.lower() == "mistral":
-            api_key = os.getenv("MISTRAL_API_KEY")
-            if not api_key:
-                raise ValueError("MISTRAL_API_KEY não encontrada nas variáveis de ambiente")
-            self.ai_model = MistralAPIModel(api_key=api_key, model_name=mistral_model)
-            logging.info(f"Usando modelo Mistral API ({mistral_model}) para análise")
-        else:
-            raise ValueError(f"Tipo de modelo '{model_type}' não suportado. Use 'anthropic', 'ollama' ou 'mistral'.")
+        self.ai_model = ai_model or create_ai_model(model_type, ollama_url, ollama_model, mistral_model)
+        self._parser = None  # Criado no primeiro acesso a self.parser
             
-        self.parser = PydanticOutputParser(pydantic_object=AnaliseResponse)
-        self.all_methods = {}  # Armazenar todos os métodos para análise de dependências
+        self.all_methods = SymbolTable()  # Todos os métodos, para análise de dependências
+        self.files = FileTable()  # Arquivos analisados, relidos sob demanda ao montar os prompts
+        self.callers = Counter()  # Quantos métodos pendentes chamam cada nome (fan-in)
         
-        # Mapeamento de extensões para linguagens suportadas (corrigido)
-        self.supported_extensions = {
-            'java': ['.java'],
-            'csharp': ['.cs', '.cshtml', '.csx'],
-            'c': ['.c', '.h'],
-            'cpp': ['.cpp', '.hpp', '.cc', '.cxx', '.h', '.hxx', '.hh'],
-            'html': ['.html', '.htm', '.xhtml', '.aspx'],
-            'javascript': ['.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs'],
-            'python': ['.py', '.pyw', '.ipynb', '.pyc'],
-            'go': ['.go'],
-            'sql': ['.sql']
-        }
-        
-        # Regex para encontrar menções a CNPJ em qualquer contexto (padrões separados para cada linguagem)
-        self.cnpj_pattern = r'(?:cnpj|cadastro\s+nacional\s+(?:de|da)\s+pessoa\s+jur[íi]dica|\b\d{2}[.-]?\d{3}[.-]?\d{3}[/]?\d{4}[-]?\d{2}\b)'
-        
-        # Padrões específicos por linguagem para melhor detecção
-        self.cnpj_language_patterns = {
-            'java': r'(?:cnpj|CNPJ|getCnpj|setCnpj|validaCnpj|cadastro\s+nacional)',
-            'csharp': r'(?:cnpj|CNPJ|GetCnpj|SetCnpj|ValidaCnpj|cadastro\s+nacional)',
-            'python': r'(?:cnpj|CNPJ|get_cnpj|set_cnpj|valida_cnpj|cadastro\s+nacional)',
-            'javascript': r'(?:cnpj|CNPJ|getCnpj|setCnpj|validaCnpj|cadastro\s+nacional)',
-            'c': r'(?:cnpj|CNPJ|get_cnpj|set_cnpj|valida_cnpj|cadastro\s+nacional)',
-            'cpp': r'(?:cnpj|CNPJ|getCnpj|setCnpj|validaCnpj|cadastro\s+nacional)',
-            'go': r'(?:cnpj|CNPJ|GetCnpj|SetCnpj|ValidaCnpj|cadastro\s+nacional)',
-            'sql': r'(?:cnpj|CNPJ|cadastro\s+nacional)',
-            'html': r'(?:cnpj|CNPJ|cadastro\s+nacional)'
-        }
-        
-        # Padrões de detecção para cada linguagem (refinados)
-        self.patterns = {
-            'java': {
-                'class': r'class\s+(\w+)',
-                'method': r'(?:public|private|protected)?\s+(?:static\s+)?[\w<>\[\]]+\s+(\w+)\s*\([^)]*\)\s*(?:\{|throws)',
-                'cnpj_method': None  # Definido dinamicamente no método analyze_file
-            },
-            'csharp': {
-                'class': r'class\s+(\w+)',
-                # Melhorado para capturar métodos C# mais precisamente, incluindo async/readonly/override
-                'method': r'(?:public|private|protected|internal)?\s+(?:static\s+|virtual\s+|async\s+|override\s+|readonly\s+)?[\w<>\[\]\.]+\s+(\w+)\s*\([^)]*\)\s*(?:\{|=>|\s*where)',
-                'cnpj_method': None
-            },
-            'c': {
-                'class': r'struct\s+(\w+)',
-                'method': r'[\w\*]+\s+(\w+)\s*\([^;]*\)\s*\{',
-                'cnpj_method': None
-            },
-            'cpp': {
-                'class': r'(?:class|struct)\s+(\w+)(?:\s*:\s*[\w\s,:<>]+)?(?=\s*\{)',
-                'method': r'(?:(?:virtual|static|explicit|inline|constexpr)\s+)?(?:[\w:~\*<>\[\]&]+\s+)?(\w+)\s*\([^{;]*\)(?:\s*(?:const|noexcept|override|final|=\s*0))?\s*(?=\{)',
-                'cnpj_method': None
-            },
-            'html': {
-                'class': r'<[^>]*class=["\'](.*?)["\']',
-                'method': r'(?:<script[^>]*>.*?)?function\s+(\w+)|(\w+)\s*=\s*function',
-                'cnpj_method': None
-            },
-            'javascript': {
-                'class': r'class\s+(\w+)|function\s+(\w+)',
-                'method': r'(?:function\s+(\w+)|const\s+(\w+)\s*=|let\s+(\w+)\s*=|var\s+(\w+)\s*=|(\w+)\s*:\s*function)\s*\([^)]*\)',
-                'cnpj_method': None
-            },
-            'python': {
-                'class': r'class\s+(\w+)',
-                'method': r'def\s+(\w+)\s*\([^)]*\)\s*:',
-                'cnpj_method': None
-            },
-            'go': {
-                'class': r'type\s+(\w+)\s+struct',
-                'method': r'func\s+(?:\([^)]*\))?\s*(\w+)',
-                'cnpj_method': None
-            },
-            'sql': {
-                'class': r'CREATE\s+TABLE\s+(\w+)',
-                'method': r'CREATE\s+(?:OR\s+REPLACE\s+)?(?:PROCEDURE|FUNCTION)\s+(\w+)',
-                'cnpj_method': None
-            }
-        }
+        # Tabelas de padrões compartilhadas (construídas uma vez por processo; não devem ser alteradas)
+        self.supported_extensions = SUPPORTED_EXTENSIONS
+        self.cnpj_pattern = CNPJ_PATTERN
+        self.cnpj_language_patterns = CNPJ_LANGUAGE_PATTERNS
+        self.mention_patterns = MENTION_PATTERNS
+        self.patterns = PATTERNS
         
-        # Prompt genérico para análise de código
+        # Prompt genérico para análise de código. As instruções e o formato da resposta vêm
+        # antes do código: esse prefixo é igual em todas as chamadas e fica em cache no provedor
         self.prompt = r"""
-Analise este código de {language} que manipula CNPJ e suas dependências:
-
-{code}
+Você vai analisar um código que manipula CNPJ e suas dependências.
 
 Retorne APENAS um JSON válido com o seguinte formato, sem texto adicional.
 IMPORTANTE: 
@@ -184,9 +305,14 @@ IMPORTANTE:
     "horas_testes": 0,
     "dependencias": ["lista", "de", "dependencias"],
     "sistemas_impactados": ["lista", "de", "sistemas"]
-}}"""
+}}
+
+Analise este código de {language}:
+
+{code}"""
 
-    def analyze_with_llm(self, node, file_path, start_line, language, dependencies=None):
+    def analyze_with_llm(self, node, file_path, start_line, language, dependencies=None, risk_score=None,
+                         stratum=None, file_context=""):
         """
         Analisa um trecho de código usando o modelo de linguagem configurado.
 
@@ -196,50 +322,88 @@ IMPORTANTE:
             start_line (int): Número da linha inicial
             language (str): Linguagem de programação
             dependencies (list, optional): Lista de dependências encontradas
+            risk_score (float, optional): Risco estático usado na priorização
+            stratum (str, optional): Estrato do método no modo de amostragem
+            file_context (str, optional): Início do arquivo, comum aos prompts dos métodos dele
 
         Returns:
-            None
+            dict: Resultado registrado em self.findings
         """
+        finding = self._analyze_with_llm(node, file_path, start_line, language, dependencies, risk_score,
+                                         file_context)
+        if stratum is not None:
+            finding['estrato'] = stratum
+        self.findings.append(finding)
+        return finding
+
+    def _analyze_with_llm(self, node, file_path, start_line, language, dependencies, risk_score, file_context=""):
+        """Executa a chamada ao modelo e monta o resultado (ou o registro de erro) de um método."""
         try:
             logging.info(f"Analisando código {language}: {file_path}")
             
             # Incluir dependências encontradas no prompt
-            contexto_extra = ""
-            if dependencies:
-                contexto_extra = "\nDependências encontradas:\n" + "\n".join(dependencies)
+            contexto_extra = self.dependency_context(dependencies)
 
-            # Usar o modelo de IA configurado para análise
+            # Usar o modelo de IA configurado para análise. A espera no limitador de taxa
+            # (RateLimitedModel.waited) fica fora da latência: estimate_run já modela a cota
+            waited = getattr(self.ai_model, 'waited', None)
+            waited_before = waited() if waited else 0.0
+            started = time.perf_counter()
             response_text = self.ai_model.analyze_code(
                 prompt=self.prompt,
                 language=language,
                 code=node,
-                context_extra=contexto_extra
+                context_extra=contexto_extra,
+                file_context=file_context
             )
-            
+            if response_text:
+                seconds = time.perf_counter() - started - (waited() - waited_before if waited else 0.0)
+                sample = (estimate_tokens(SYSTEM_PROMPT + self.prompt + file_context + node + contexto_extra),
+                          estimate_tokens(response_text), seconds)
+                with self._stats_lock:
+                    self.call_samples.append(sample)
+        except Exception as e:
+            logging.error(f"Erro na análise: {str(e)}")
+            return self._error_finding(node, file_path, language, risk_score, e)
+        return self.finding_from_response(node, file_path, start_line, language, dependencies, risk_score,
+                                          response_text)
+
+    @staticmethod
+    def dependency_context(dependencies):
+        """Trecho do prompt com as dependências encontradas (vazio se não houver)."""
+        return "\nDependências encontradas:\n" + "\n".join(dependencies) if dependencies else ""
+
+    def finding_from_response(self, node, file_path, start_line, language, dependencies, risk_score, response_text):
+        """
+        Monta o resultado de um método a partir da resposta do modelo.
+
+        Usado tanto nas chamadas diretas quanto nas respostas obtidas em lote
+        (analyzer.bulk).
+
+        Args:
+            node (str): Trecho de código analisado
+            file_path (str): Caminho do arquivo
+            start_line (int): Número da linha inicial
+            language (str): Linguagem de programação
+            dependencies (list): Dependências encontradas
+            risk_score (float): Risco estático usado na priorização
+            response_text (str): Texto da resposta do modelo
+
+        Returns:
+            dict: Resultado do método, ou o registro ERRO se a resposta não tiver uma análise válida
+        """
+        try:
+            # Encontrar o primeiro objeto JSON válido e com os campos obrigatórios
+            scanner = JsonObjectScanner()
+            analysis = scanner.feed(response_text) if response_text else None
+            self._count_response(parse_failed=analysis is None)
+
             if not response_text:
                 raise ValueError("Resposta vazia do modelo de IA")
-            
-            # Encontrar o JSON na string
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if not json_match:
-                raise ValueError("JSON não encontrado na resposta")
-                
-            json_str = json_match.group()
-            
-            # Parse do JSON
-            try:
-                analysis = json.loads(json_str)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Erro no parse do JSON: {str(e)}")
-
-            # Validar campos obrigatórios
-            required_fields = ['tipo_uso', 'operacoes_numericas', 'impactos', 
-                             'riscos', 'modificacoes', 'severidade', 'horas_desenvolvimento', 'horas_testes']
-            missing_fields = [field for field in required_fields if field not in analysis]
-            if missing_fields:
-                raise ValueError(f"Campos obrigatórios ausentes: {', '.join(missing_fields)}")
-
-            self.findings.append({
+            if analysis is None:
+                raise ValueError(scanner.error)
+
+            return {
                 'arquivo': file_path,
                 'linguagem': language,
                 'metodo': self.extract_method_name(node, language),
@@ -254,35 +418,128 @@ IMPORTANTE:
                 'horas_teste': analysis['horas_testes'],
                 'horas_total': analysis['horas_desenvolvimento'] + analysis['horas_testes'],
                 'dependencias': "\n".join(dependencies) if dependencies else "Nenhuma dependência encontrada",
-                'sistemas_impactados': "\n".join(analysis.get('sistemas_impactados', []))
-            })
+                'sistemas_impactados': "\n".join(analysis.get('sistemas_impactados', [])),
+                'risco_estatico': risk_score
+            }
         except Exception as e:
             logging.error(f"Erro na análise: {str(e)}")
-            self.findings.append({
-                'arquivo': file_path,
-                'linguagem': language,
-                'metodo': self.extract_method_name(node, language),
-                'tipo_uso': 'ERRO',
-                'operacoes_numericas': f'Erro na análise: {str(e)}',
-                'impactos': 'Erro na análise',
-                'riscos': 'Erro na análise',
-                'modificacoes': 'Erro na análise',
-                'severidade': 'N/A',
-                'horas_dev': 0,
-                'horas_teste': 0,
-                'horas_total': 0
-            })
+            return self._error_finding(node, file_path, language, risk_score, e)
 
-    def scan_directory(self, directory):
+    def _error_finding(self, node, file_path, language, risk_score, error):
+        """Registro ERRO de um método cuja análise falhou."""
+        return {
+            'arquivo': file_path,
+            'linguagem': language,
+            'metodo': self.extract_method_name(node, language),
+            'tipo_uso': 'ERRO',
+            'operacoes_numericas': f'Erro na análise: {str(error)}',
+            'impactos': 'Erro na análise',
+            'riscos': 'Erro na análise',
+            'modificacoes': 'Erro na análise',
+            'severidade': 'N/A',
+            'horas_dev': 0,
+            'horas_teste': 0,
+            'horas_total': 0,
+            'risco_estatico': risk_score
+        }
+
+    def scan_directory(self, directory, ref=None, executor=None, sample_size=None, seed=None):
         """
         Escaneia um diretório em busca de arquivos de código com referências a CNPJ.
 
+        Além de diretórios comuns, aceita arquivos .zip/.tar(.gz) e repositórios git,
+        lidos diretamente sem extração ou checkout (ver analyzer.sources).
+
         Args:
-            directory (str): Caminho do diretório a ser analisado
+            directory (str): Caminho do diretório, arquivo compactado ou repositório git
+            ref (str, optional): Revisão git a ser analisada (commit, branch ou tag)
+            executor (concurrent.futures.Executor, optional): Pool usado para as chamadas
+                ao modelo de IA; sem ele, os métodos são analisados sequencialmente
+            sample_size (int | float, optional): Ativa o modo de amostragem: apenas uma
+                amostra estratificada (quantidade ou fração) é enviada ao modelo e as horas
+                e severidades são extrapoladas em self.estimate
+            seed (int, optional): Semente do sorteio da amostra
 
         Returns:
             None
         """
+        self.collect(directory, ref)
+        if sample_size:
+            self.sample_pending(sample_size, seed)
+        skipped = self.run_pending(executor)
+        if skipped:
+            logging.info(f"{skipped} métodos não analisados por orçamento esgotado")
+        if sample_size:
+            self.estimate_from_sample()
+        self.propagate_impact()
+
+    def propagate_impact(self):
+        """
+        Anota nos resultados ALTA e MEDIA os métodos afetados transitivamente pelo grafo de chamadas.
+
+        Usa apenas os métodos e chamadas coletados na extração, sem novas
+        chamadas ao modelo de IA (ver analyzer.call_graph).
+
+        Returns:
+            dict: Tamanho do grafo, resultados anotados e duração
+        """
+        try:
+            with self._phase('propagacao'):
+                return propagate_impact(self.findings, self.all_methods, self.files)
+        except Exception as e:
+            logging.error(f"Erro na propagação de impacto: {str(e)}", exc_info=True)
+            return None
+
+    def sample_pending(self, sample_size, seed=None):
+        """
+        Substitui os métodos pendentes por uma amostra estratificada.
+
+        Os estratos combinam linguagem, tamanho do método e risco estático.
+
+        Args:
+            sample_size (int | float): Tamanho da amostra (quantidade ou fração da população)
+            seed (int, optional): Semente do sorteio
+
+        Returns:
+            int: Tamanho da amostra sorteada (também em self.sample_drawn), limitado a sample_size
+        """
+        self.prioritize_pending()
+        sample, self.sample_population = draw_stratified_sample(self.pending, sample_size, seed)
+        logging.info(f"Amostragem: {len(sample)} de {len(self.pending)} métodos em {len(self.sample_population)} estratos")
+        self.pending = sample
+        self.sample_drawn = len(sample)
+        return self.sample_drawn
+
+    def estimate_from_sample(self):
+        """
+        Extrapola horas e distribuição de severidade da amostra analisada para a população.
+
+        Returns:
+            dict: Estimativas com intervalo de 95% de confiança (também em self.estimate)
+        """
+        if self.sample_population is None:
+            raise ValueError("Nenhuma amostra foi sorteada; use sample_pending antes")
+        self.estimate = extrapolate(self.findings, self.sample_population, self.sample_drawn)
+        logging.info(
+            f"Estimativa por amostragem: {self.estimate['horas_total']['estimativa']}h "
+            f"(IC 95%: {self.estimate['horas_total']['ic_inferior']}-{self.estimate['horas_total']['ic_superior']}h)"
+        )
+        return self.estimate
+
+    def collect(self, directory, ref=None):
+        """
+        Extrai os métodos com CNPJ de uma origem sem chamar o modelo de IA.
+
+        Os métodos encontrados são acumulados em self.pending e analisados
+        depois por run_pending ou submit_pending.
+
+        Args:
+            directory (str): Caminho do diretório, arquivo compactado ou repositório git
+            ref (str, optional): Revisão git a ser analisada
+
+        Returns:
+            int: Quantidade de métodos pendentes de análise
+        """
         # Criar uma lista com todas as extensões para procurar
         all_extensions = []
         for ext_list in self.supported_extensions.values():
@@ -292,12 +549,18 @@ IMPORTANTE:
         processed_count = {lang: 0 for lang in self.supported_extensions.keys()}
         cnpj_count = {lang: 0 for lang in self.supported_extensions.keys()}
         
-        for file in Path(directory).rglob("*"):
-            if file.suffix.lower() in all_extensions:
-                language = self.detect_language(file.suffix.lower())
+        with self._phase('extracao'), open_source(directory, ref) as source:
+            # Arquivos de origens compactadas ou git são relidos pela própria origem
+            origin = None if isinstance(source, FileSystemSource) else (directory, ref)
+            for file_path, content in source.iter_documents(all_extensions):
+                language = self.detect_language(os.path.splitext(file_path)[1].lower())
                 if language:
                     processed_count[language] += 1
-                    has_cnpj = self.analyze_file(file, language)
+                    if self.profiler is not None:
+                        with self.profiler.file(file_path, language, len(content)):
+                            has_cnpj = self.analyze_file(file_path, language, content, origin)
+                    else:
+                        has_cnpj = self.analyze_file(file_path, language, content, origin)
                     if has_cnpj:
                         cnpj_count[language] += 1
         
@@ -306,6 +569,304 @@ IMPORTANTE:
         for lang in processed_count:
             if processed_count[lang] > 0:
                 logging.info(f"{lang}: {cnpj_count[lang]} arquivos com CNPJ de {processed_count[lang]} processados")
+        return len(self.pending)
+
+    def prompt_estimates(self):
+        """
+        Tamanho estimado do prompt de cada método pendente, sem reler os arquivos.
+
+        Returns:
+            list: (id do arquivo, tokens do início reaproveitável entre chamadas, tokens totais)
+            de cada método, para analyzer.estimation.estimate_run
+        """
+        static = estimate_tokens(SYSTEM_PROMPT + self.prompt)
+        prompts = []
+        for candidate in self.pending:
+            cacheable = static + self.files.context_size(candidate.file_id) // 4
+            dependencies = sum(len(self.all_methods.describe(idx, self.files)) + 1 for idx in candidate.dependencies)
+            prompts.append((candidate.file_id, cacheable, cacheable + max(1, candidate.size // 4) + dependencies // 4))
+        return prompts
+
+    def prioritize_pending(self):
+        """
+        Ordena os métodos pendentes pelo risco estático, do maior para o menor.
+
+        Returns:
+            list: Métodos pendentes ordenados, com risk_score preenchido
+        """
+        for candidate, score in zip(self.pending, score_candidates(self.pending, self.callers)):
+            candidate.risk_score = score
+        self.pending.sort(key=lambda candidate: candidate.risk_score, reverse=True)
+        return self.pending
+
+    def submit_pending(self, executor):
+        """
+        Envia os métodos pendentes para análise em um pool de execução.
+
+        Os métodos são submetidos em ordem decrescente de risco. Com um
+        PriorityExecutor, a prioridade vale também entre repositórios que
+        compartilham o mesmo pool.
+
+        Args:
+            executor (concurrent.futures.Executor): Pool compartilhado de chamadas ao modelo
+
+        Returns:
+            list: Futures das análises submetidas
+        """
+        self.prioritize_pending()
+        pending, self.pending = self.pending, []
+        if hasattr(executor, 'submit_with_priority'):
+            return [
+                executor.submit_with_priority(
+                    candidate.risk_score,
+                    estimate_tokens(self.prompt) + max(1, candidate.size // 4),
+                    self.analyze_candidate, candidate
+                )
+                for candidate in pending
+            ]
+        return [executor.submit(self.analyze_candidate, candidate) for candidate in pending]
+
+    def run_pending(self, executor=None):
+        """
+        Analisa todos os métodos pendentes, dos de maior risco para os de menor, e aguarda a conclusão.
+
+        Args:
+            executor (concurrent.futures.Executor, optional): Pool para as chamadas ao modelo
+
+        Returns:
+            int: Quantidade de métodos não analisados por orçamento esgotado
+        """
+        with self._phase('analise_ia'):
+            skipped = self._run_pending(executor)
+            while self.requeue_failed(executor=executor):
+                skipped += self._run_pending(executor)
+        self.files.close()
+        return skipped
+
+    def _run_pending(self, executor):
+        """Executa uma rodada de análise dos métodos pendentes."""
+        if executor is None:
+            self.prioritize_pending()
+            pending, self.pending = self.pending, []
+            for candidate in pending:
+                self.analyze_candidate(candidate)
+            return 0
+        skipped = 0
+        for future in self.submit_pending(executor):
+            if future.cancelled():
+                skipped += 1
+                continue
+            try:
+                future.result()
+            except CancelledError:
+                skipped += 1
+        self.skipped += skipped
+        return skipped
+
+    def requeue_failed(self, max_retries=AI_PARSE_RETRIES, executor=None):
+        """
+        Devolve à fila apenas os métodos cuja análise falhou, para uma nova tentativa.
+
+        O resultado ERRO de cada método continua em self.findings até a nova
+        tentativa registrar outro resultado (ver _register_candidate): se a
+        tentativa for cancelada por orçamento esgotado, o método continua no
+        relatório como ERRO. Os resultados substituídos desde a chamada
+        anterior são removidos aqui. Deve ser chamado quando não há análises
+        em andamento, exceto as de outros métodos em nova tentativa (modo em lote).
+
+        Args:
+            max_retries (int): Tentativas adicionais permitidas por método
+            executor (concurrent.futures.Executor, optional): Pool das novas tentativas; com o
+                orçamento esgotado (PriorityExecutor ou FairShareJob), nenhum método volta à fila
+
+        Returns:
+            int: Quantidade de métodos devolvidos a self.pending
+        """
+        with self._stats_lock:
+            failed, self.failed = self.failed, []
+            replaced, self._replaced = self._replaced, set()
+        if replaced:
+            self.findings = [finding for finding in self.findings if id(finding) not in replaced]
+        if getattr(executor, 'exhausted', False):
+            return 0
+        retry = [(candidate, finding) for candidate, finding in failed if candidate.attempts < max_retries]
+        if not retry:
+            return 0
+        with self._stats_lock:
+            for candidate, finding in retry:
+                self._retrying[candidate] = finding
+        for candidate, _ in retry:
+            candidate.attempts += 1
+            self.pending.append(candidate)
+        logging.info(f"Nova tentativa para {len(retry)} métodos com resposta inválida do modelo")
+        return len(retry)
+
+    @property
+    def provider_name(self):
+        """Nome do provedor do modelo de IA, usado nas estatísticas de parse."""
+        return getattr(self.ai_model, 'provider_name', None) or type(self.ai_model).__name__
+
+    def _count_response(self, parse_failed=False, recovered=False):
+        with self._stats_lock:
+            stats = self.parse_stats.setdefault(
+                self.provider_name, {'respostas': 0, 'falhas_parse': 0, 'recuperadas': 0})
+            if recovered:
+                stats['recuperadas'] += 1
+                return
+            stats['respostas'] += 1
+            if parse_failed:
+                stats['falhas_parse'] += 1
+
+    def parse_failure_rate(self):
+        """
+        Taxa de respostas sem JSON válido por provedor.
+
+        Returns:
+            dict: Provedor -> respostas, falhas_parse, recuperadas (na nova tentativa) e taxa_falha_parse
+        """
+        with self._stats_lock:
+            return {
+                provider: dict(stats, taxa_falha_parse=round(stats['falhas_parse'] / stats['respostas'], 4)
+                               if stats['respostas'] else 0.0)
+                for provider, stats in self.parse_stats.items()
+            }
+
+    def candidate_inputs(self, candidate):
+        """
+        Dados de um método pendente para a análise, relendo seu texto e suas dependências sob demanda.
+
+        Args:
+            candidate (MethodCandidate): Método extraído por analyze_file
+
+        Returns:
+            tuple: (código, arquivo, linha inicial, linguagem, dependências descritas, risco estático,
+            estrato, início do arquivo), na ordem dos argumentos de analyze_with_llm
+        """
+        return (
+            candidate.text(self.files),
+            self.files.path(candidate.file_id),
+            candidate.start_line,
+            candidate.language,
+            [self.all_methods.describe(idx, self.files) for idx in candidate.dependencies],
+            candidate.risk_score,
+            candidate.stratum,
+            self.files.context(candidate.file_id)
+        )
+
+    def analyze_candidate(self, candidate):
+        """
+        Analisa um método pendente, relendo seu texto e suas dependências sob demanda.
+
+        Args:
+            candidate (MethodCandidate): Método extraído por analyze_file
+
+        Returns:
+            dict: Resultado registrado em self.findings
+        """
+        return self._register_candidate(candidate, self.analyze_with_llm(*self.candidate_inputs(candidate)))
+
+    def complete_candidate(self, candidate, response_text=None, error=None):
+        """
+        Registra o resultado de um método cuja resposta foi obtida fora de analyze_code (ex.: lote do provedor).
+
+        Como em analyze_candidate, um resultado ERRO fica em self.failed para
+        uma nova tentativa (requeue_failed).
+
+        Args:
+            candidate (MethodCandidate): Método extraído por analyze_file
+            response_text (str, optional): Texto da resposta do modelo
+            error (str, optional): Erro informado pelo provedor no lugar da resposta
+
+        Returns:
+            dict: Resultado registrado em self.findings
+        """
+        node, file_path, start_line, language, dependencies, risk_score, stratum, _ = self.candidate_inputs(candidate)
+        if error is None:
+            finding = self.finding_from_response(node, file_path, start_line, language, dependencies, risk_score,
+                                                 response_text)
+        else:
+            logging.error(f"Erro na análise: {error}")
+            finding = self._error_finding(node, file_path, language, risk_score, error)
+        if stratum is not None:
+            finding['estrato'] = stratum
+        self.findings.append(finding)
+        return self._register_candidate(candidate, finding)
+
+    def _register_candidate(self, candidate, finding):
+        """
+        Identifica o resultado de um método, guarda as falhas para uma nova tentativa e marca o
+        resultado ERRO da tentativa anterior, se houver, para remoção.
+        """
+        finding['hash_corpo'] = candidate.digest.hex()  # Identidade estável do método entre execuções (analyzer.diff)
+        with self._stats_lock:
+            previous = self._retrying.pop(candidate, None)
+            if previous is not None:
+                self._replaced.add(id(previous))
+            if finding['tipo_uso'] == 'ERRO':
+                self.failed.append((candidate, finding))
+        if finding['tipo_uso'] != 'ERRO' and candidate.attempts:
+            self._count_response(recovered=True)
+        return finding
+
+    def _enqueue(self, content, spans, file_id, start_line, language, dependencies=()):
+        """
+        Registra um método com CNPJ para análise posterior pelo modelo de IA.
+
+        Apenas os deslocamentos do trecho são guardados; os sinais estáticos
+        de risco e as chamadas (fan-in) são calculados aqui, enquanto o texto
+        ainda está em memória.
+
+        Args:
+            content (str): Conteúdo do arquivo
+            spans (list): Trechos (início, fim) do método no conteúdo
+            file_id (int): Id do arquivo na FileTable
+            start_line (int): Número da linha inicial
+            language (str): Linguagem de programação
+            dependencies (list, optional): Índices das dependências na SymbolTable
+        """
+        text = SECTION_SEPARATOR.join(content[start:end] for start, end in spans)
+        self.callers.update(called_names(text))
+        self.pending.append(MethodCandidate(
+            file_id, tuple(spans), start_line, text.count('\n') + 1, language,
+            self.extract_method_name(text, language), content_digest(text),
+            tuple(dependencies), static_risk(text)
+        ))
+
+    def _set_file_context(self, file_id, content, end):
+        """
+        Registra o início do arquivo (até o primeiro método) como contexto dos prompts dos seus métodos.
+
+        O trecho é limitado a PROMPT_FILE_CONTEXT_CHARS, cortado na última
+        quebra de linha. Por vir antes do método no prompt, é reaproveitado
+        pelo cache de prefixo do provedor entre os métodos do mesmo arquivo.
+        """
+        end = content.rfind('\n', 0, min(end, PROMPT_FILE_CONTEXT_CHARS)) + 1
+        self.files.set_context(file_id, end if content[:end].strip() else 0)
+
+    def _phase(self, name):
+        """Mede uma fase da análise no perfil, quando ativado."""
+        return self.profiler.phase(name) if self.profiler is not None else nullcontext()
+
+    def _timed(self, pattern_name):
+        """Mede um padrão regex no arquivo atual do perfil, quando ativado."""
+        return self.profiler.pattern(pattern_name) if self.profiler is not None else nullcontext()
+
+    def _dependencies(self, calls, matches=None):
+        """
+        Índices na SymbolTable dos métodos chamados (por correspondência parcial do nome).
+
+        Com matches, a busca de cada nome é guardada nele e reaproveitada
+        pelas próximas chamadas, enquanto a SymbolTable não recebe novos métodos.
+        """
+        dependencies = []
+        for call in calls:
+            if matches is None:
+                dependencies.extend(self.all_methods.matching(call))
+                continue
+            if call not in matches:
+                matches[call] = self.all_methods.matching(call)
+            dependencies.extend(matches[call])
+        return dependencies
     
     def detect_language(self, extension):
         """
@@ -319,20 +880,23 @@ IMPORTANTE:
         """
         return detect_language(extension, self.supported_extensions)
     
-    def analyze_file(self, file_path, language):
+    def analyze_file(self, file_path, language, content=None, origin=None):
         """
         Analisa um arquivo específico em busca de uso de CNPJ.
 
         Args:
             file_path (Path): Caminho do arquivo a ser analisado
             language (str): Linguagem de programação do arquivo
+            content (str, optional): Conteúdo já lido do arquivo; se omitido, é lido do disco
+            origin (tuple, optional): (location, ref) da origem compactada ou git do arquivo
 
         Returns:
             bool: True se encontrou CNPJ, False caso contrário
         """
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
+            if content is None:
+                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    content = f.read()
             
             if not language or language not in self.patterns:
                 logging.warning(f"Linguagem não suportada para o arquivo: {file_path}")
@@ -340,153 +904,84 @@ IMPORTANTE:
                 
             logging.info(f"Analisando arquivo {language}: {file_path}")
             
-            # Usar o padrão específico para a linguagem, se disponível
-            lang_cnpj_pattern = self.cnpj_language_patterns.get(language, self.cnpj_pattern)
-            
-            # Verificar se o arquivo contém CNPJ antes de prosseguir
-            has_cnpj = bool(re.search(lang_cnpj_pattern, content, re.IGNORECASE | re.MULTILINE | re.DOTALL))
+            # Menções a CNPJ em uma única passagem; o arquivo segue se menciona os termos da linguagem
+            with self._timed('cnpj'):
+                index = SourceIndex(content, self.mention_patterns[language])
+            has_cnpj = bool(index.terms)
             if not has_cnpj:
                 return False
                 
             logging.info(f"CNPJ encontrado no arquivo: {file_path}")
+            file_id = self.files.add(str(file_path), origin)
+            self.files.remember(file_id, content)
+            if language == 'python':
+                # Árvore sintática: trechos exatos, nomes qualificados e chamadas em uma única análise
+                with self._timed('python_ast'):
+                    found_cnpj_method = self._collect_python(content, file_id, index)
+            else:
+                # Padrões de classe e método rodam com prazo (o de CNPJ acima é linear e roda direto)
+                guard = self.regex_guard
+                guard.start_file(content)
             
-            # Obter padrões específicos da linguagem
-            patterns = self.patterns[language]
-            
-            # Construir dinamicamente o padrão para métodos com CNPJ
-            # Tratamento especial para Java, restaurando o padrão original que funcionava
-            if language == 'java':
-                # Restaurar o padrão original do JavaCNPJAnalyzer que funcionava bem
-                patterns['cnpj_method'] = r'(?:public|private|protected)?\s+(?:static\s+)?[\w<>\[\]]+\s+(\w+)\s*\([^)]*\)\s*(?:\{|throws)[^}]*cnpj[^}]*\}'
-            elif language == 'csharp':
-                # Padrão específico e mais abrangente para C#
-                patterns['cnpj_method'] = r'(?:public|private|protected|internal)?\s+(?:static\s+|virtual\s+|async\s+|override\s+|readonly\s+)?[\w<>\[\]\.]+\s+(\w+)\s*\([^)]*\)\s*(?:\{|=>|\s*where)[^}]*(?:cnpj|CNPJ|Cnpj)[^}]*\}'
-            elif language == 'cpp':
-                # Padrão específico e mais abrangente para C++
-                patterns['cnpj_method'] = r'(?:(?:virtual|static|explicit|inline|constexpr)\s+)?(?:[\w:~\*<>\[\]&]+\s+)?(\w+)\s*\([^{;]*\)(?:\s*(?:const|noexcept|override|final|=\s*0))?\s*\{[^}]*(?:cnpj|CNPJ|Cnpj)[^}]*\}'
-                logging.debug(f"Usando padrão C++ melhorado: {patterns['cnpj_method']}")
-            elif language == 'python':
-                patterns['cnpj_method'] = patterns['method'] + r'(?:[^#]*?(?:' + lang_cnpj_pattern + r'))'
-            elif language == 'sql':
-                patterns['cnpj_method'] = patterns['method'] + r'(?:[^;]*?(?:' + lang_cnpj_pattern + r')[^;]*?;)'
-            elif language == 'html' or language == 'javascript':
-                patterns['cnpj_method'] = patterns['method'].replace(')', r')[^}]*(?:' + lang_cnpj_pattern + r')[^}]*\}')
-            elif language == 'go':
-                patterns['cnpj_method'] = patterns['method'] + r'(?:[^}]*?(?:' + lang_cnpj_pattern + r')[^}]*?\})'
-            elif language == 'c':
-                patterns['cnpj_method'] = patterns['method'].replace('{', r'{[^}]*(?:' + lang_cnpj_pattern + r')[^}]*\}')
-            
-            # Primeira passagem: coletar todos os métodos/funções
-            current_class = None
-            for match in re.finditer(patterns['class'], content, re.IGNORECASE | re.MULTILINE | re.DOTALL):
-                # Diferentes linguagens podem ter diferentes grupos para o nome da classe
-                for group in match.groups():
-                    if group:
-                        current_class = group
-                        break
-            
-            # Encontrar todos os métodos
-            for match in re.finditer(patterns['method'], content, re.IGNORECASE | re.MULTILINE | re.DOTALL):
-                method_name = None
-                # Diferentes linguagens podem ter diferentes grupos para o nome do método
-                for group in match.groups():
-                    if group and not re.match(r'(public|private|protected|internal|static|const|let|var)', group):
-                        method_name = group
-                        break
-                
-                if method_name:
-                    full_name = f"{current_class}.{method_name}" if current_class else method_name
-                    self.all_methods[full_name] = {
-                        'file': str(file_path),
-                        'content': match.group(0),
-                        'line': content.count('\n', 0, match.start()) + 1,
-                        'language': language
-                    }
+                # Obter padrões específicos da linguagem
+                patterns = self.patterns[language]
             
-            # Variável para rastrear se algum método com CNPJ foi encontrado
-            found_cnpj_method = False
+                # Primeira passagem: coletar todos os métodos/funções
+                current_class = None
+                with self._timed('class'):
+                    for match in guard.finditer('class', patterns['class'], re.IGNORECASE | re.MULTILINE | re.DOTALL):
+                        # Diferentes linguagens podem ter diferentes grupos para o nome da classe
+                        for group in match.groups():
+                            if group:
+                                current_class = group
+                                break
             
-            # Segunda passagem: verificar blocos de código para CNPJ
-            if language == 'python':
-                # Para Python, precisamos considerar a indentação, não chaves
-                lines = content.split('\n')
-                i = 0
-                while i < len(lines):
-                    line = lines[i]
-                    match = re.search(patterns['method'], line)
-                    if match:
+                # Encontrar todos os métodos
+                methods = []
+                with self._timed('method'):
+                    for match in guard.finditer('method', patterns['method'], re.IGNORECASE | re.MULTILINE | re.DOTALL):
                         method_name = None
+                        # Diferentes linguagens podem ter diferentes grupos para o nome do método
                         for group in match.groups():
-                            if group:
+                            if group and not re.match(r'(public|private|protected|internal|static|const|let|var)', group):
                                 method_name = group
                                 break
-                        
-                        # Encontrar o fim do método baseado na indentação
-                        method_start = i
-                        method_indent = len(line) - len(line.lstrip())
-                        i += 1
-                        method_body = [line]
-                        
-                        while i < len(lines) and (not lines[i].strip() or len(lines[i]) - len(lines[i].lstrip()) > method_indent):
-                            method_body.append(lines[i])
-                            i += 1
-                            
-                        method_content = '\n'.join(method_body)
-                        
-                        # Usar flags como parâmetros, não como parte do padrão
-                        if re.search(self.cnpj_pattern, method_content, re.IGNORECASE):
-                            found_cnpj_method = True
-                            method_signature = f"{str(file_path)}:{method_name}"
-                            
-                            # Encontrar chamadas para outros métodos
-                            calls = re.findall(r'(\w+)\s*\(', method_content)
-                            dependencies = []
-                            for call in calls:
-                                for full_name, details in self.all_methods.items():
-                                    if call in full_name:
-                                        dependencies.append(f"{full_name} ({details['file']}:{details['line']})")
-                            
-                            self.analyze_with_llm(method_content, str(file_path), method_start + 1, language, dependencies)
-                        continue
-                    i += 1
-            else:
-                # Para outras linguagens, usar o regex definido
-                if patterns['cnpj_method']:
-                    try:
-                        cnpj_methods = re.finditer(
-                            patterns['cnpj_method'], 
-                            content, 
-                            re.IGNORECASE | re.MULTILINE | re.DOTALL
-                        )
-                        
-                        # Usar set para evitar métodos duplicados
-                        analyzed_methods = set()
-                        
-                        for method in cnpj_methods:
-                            found_cnpj_method = True
-                            method_name = self.extract_method_name(method.group(), language)
-                            method_signature = f"{str(file_path)}:{method_name}"
-                            
-                            # Pular se já analisou este método
-                            if method_signature in analyzed_methods:
-                                continue
-                                
-                            analyzed_methods.add(method_signature)
-                            
-                            start_line = content.count('\n', 0, method.start()) + 1
-                            method_content = method.group()
-                            
-                            # Encontrar chamadas para outros métodos (padrão genérico)
-                            calls = re.findall(r'(\w+)\s*\([^)]*\)', method_content)
-                            dependencies = []
-                            for call in calls:
-                                for full_name, details in self.all_methods.items():
-                                    if call in full_name:
-                                        dependencies.append(f"{full_name} ({details['file']}:{details['line']})")
-                            
-                            self.analyze_with_llm(method_content, str(file_path), start_line, language, dependencies)
-                    except Exception as e:
-                        logging.error(f"Erro ao analisar métodos com CNPJ: {str(e)}")
+                
+                        # Blocos como "if (...) {" casam com o padrão de método de algumas linguagens
+                        if method_name and method_name not in CONTROL_KEYWORDS:
+                            methods.append((match, method_name))
+                self._set_file_context(file_id, content, methods[0][0].start() if methods else 0)
+            
+                # O corpo de cada método vai até a chave que fecha o bloco (ou até o início do próximo
+                # método, o que vier antes); as chamadas alimentam o grafo de chamadas
+                bodies = []
+                with self._timed('chamadas'):
+                    for i, (match, method_name) in enumerate(methods):
+                        full_name = f"{current_class}.{method_name}" if current_class else method_name
+                        next_start = methods[i + 1][0].start() if i + 1 < len(methods) else len(content)
+                        body_end = max(index.block_end(match.start(), next_start), match.end())
+                        calls = CALL_PATTERN.findall(content, match.end(), body_end)
+                        self.all_methods.add(full_name, file_id, match.start(), index.line(match.start()), language,
+                                             calls)
+                        bodies.append((match, method_name, body_end, calls))
+            
+                # Variável para rastrear se algum método com CNPJ foi encontrado
+                found_cnpj_method = False
+            
+                # Segunda passagem: as menções do índice são atribuídas aos corpos por busca binária
+                # (após a assinatura), sem procurar CNPJ de novo em cada método
+                with self._timed('cnpj_method'):
+                    analyzed_methods = set()  # Sobrecargas: apenas o primeiro método de cada nome
+                    matches = {}  # Busca de cada nome chamado na SymbolTable, que não muda até o fim do arquivo
+                    for match, method_name, body_end, calls in bodies:
+                        if index.first_in(match.end(), body_end, terms=True) is None:
+                            continue
+                        found_cnpj_method = True
+                        if method_name in analyzed_methods:
+                            continue
+                        analyzed_methods.add(method_name)
+                        self._enqueue(content, [(match.start(), body_end)], file_id, index.line(match.start()),
+                                      language, self._dependencies(dict.fromkeys(calls), matches))
             
             # FALLBACK: Se não encontrou métodos específicos, mas o arquivo contém CNPJ,
             # analisar o arquivo como um todo para linguagens específicas
@@ -498,13 +993,16 @@ IMPORTANTE:
                     # Tentar encontrar métodos de forma menos restritiva
                     fallback_pattern = r'(?:public|private|protected)?\s+\w+\s+(\w+)\s*\([^)]*\)\s*\{[^}]*(?:cnpj|CNPJ)[^}]*\}'
                     try:
-                        fallback_methods = list(re.finditer(fallback_pattern, content, re.IGNORECASE | re.MULTILINE | re.DOTALL))
+                        with self._timed('fallback'):
+                            fallback_methods = guard.finditer('fallback', fallback_pattern, re.IGNORECASE | re.MULTILINE | re.DOTALL)
                         if fallback_methods:
                             for method in fallback_methods:
                                 method_name = self.extract_method_name(method.group(), 'java')
-                                start_line = content.count('\n', 0, method.start()) + 1
-                                self.analyze_with_llm(method.group(), str(file_path), start_line, 'java', [])
+                                start_line = index.line(method.start())
+                                self._enqueue(content, [method.span()], file_id, start_line, 'java')
                             return has_cnpj
+                    except RegexTimeout:
+                        raise
                     except Exception as e:
                         logging.error(f"Erro ao tentar fallback Java: {str(e)}")
                 
@@ -513,13 +1011,16 @@ IMPORTANTE:
                     # Tentar encontrar métodos de forma menos restritiva
                     fallback_pattern = r'(?:public|private|protected|internal)?\s+[\w<>\[\]\.]+\s+(\w+)\s*\([^)]*\)\s*\{[^}]*(?:cnpj|CNPJ|Cnpj)[^}]*\}'
                     try:
-                        fallback_methods = list(re.finditer(fallback_pattern, content, re.IGNORECASE | re.MULTILINE | re.DOTALL))
+                        with self._timed('fallback'):
+                            fallback_methods = guard.finditer('fallback', fallback_pattern, re.IGNORECASE | re.MULTILINE | re.DOTALL)
                         if fallback_methods:
                             for method in fallback_methods:
                                 method_name = self.extract_method_name(method.group(), 'csharp')
-                                start_line = content.count('\n', 0, method.start()) + 1
-                                self.analyze_with_llm(method.group(), str(file_path), start_line, 'csharp', [])
+                                start_line = index.line(method.start())
+                                self._enqueue(content, [method.span()], file_id, start_line, 'csharp')
                             return has_cnpj
+                    except RegexTimeout:
+                        raise
                     except Exception as e:
                         logging.error(f"Erro ao tentar fallback C#: {str(e)}")
                 
@@ -528,14 +1029,17 @@ IMPORTANTE:
                     # Tentar encontrar métodos de forma menos restritiva
                     fallback_pattern = r'[\w:~<>\[\]&\*]+\s+(\w+)\s*\([^)]*\)\s*\{[^}]*(?:cnpj|CNPJ|Cnpj)[^}]*\}'
                     try:
-                        fallback_methods = list(re.finditer(fallback_pattern, content, re.IGNORECASE | re.MULTILINE | re.DOTALL))
+                        with self._timed('fallback'):
+                            fallback_methods = guard.finditer('fallback', fallback_pattern, re.IGNORECASE | re.MULTILINE | re.DOTALL)
                         if fallback_methods:
                             logging.info(f"Fallback: Encontrados {len(fallback_methods)} métodos C++ com CNPJ")
                             for method in fallback_methods:
                                 method_name = self.extract_method_name(method.group(), 'cpp')
-                                start_line = content.count('\n', 0, method.start()) + 1
-                                self.analyze_with_llm(method.group(), str(file_path), start_line, 'cpp', [])
+                                start_line = index.line(method.start())
+                                self._enqueue(content, [method.span()], file_id, start_line, 'cpp')
                             return has_cnpj
+                    except RegexTimeout:
+                        raise
                     except Exception as e:
                         logging.error(f"Erro ao tentar fallback C++: {str(e)}")
                 
@@ -544,26 +1048,70 @@ IMPORTANTE:
                    language in ['javascript', 'python', 'c', 'cpp'] and 
                    len(content) < 5000):  # Limitar tamanho para evitar tokens demais
                     
-                    # Extrai um trecho relevante contendo CNPJ
-                    cnpj_sections = []
-                    # Usar flags como parâmetros em vez de inline
-                    for match in re.finditer(self.cnpj_pattern, content, re.IGNORECASE):
-                        # Pegar contexto de 500 caracteres antes e depois
-                        start = max(0, match.start() - 500)
-                        end = min(len(content), match.end() + 500)
-                        cnpj_context = content[start:end]
-                        cnpj_sections.append(cnpj_context)
-                    
-                    if cnpj_sections:
-                        # Juntar seções com contexto para criar um trecho representativo
-                        context_sample = "\n\n[...]\n\n".join(cnpj_sections[:3])  # Limitar a 3 seções
-                        self.analyze_with_llm(context_sample, str(file_path), 1, language, [])
+                    self._enqueue_sections(content, file_id, language, index)
             
             return has_cnpj
-                
+        
+        except RegexTimeout as e:
+            # Padrões de método inviáveis neste arquivo: analisa trechos em torno das menções a CNPJ
+            logging.warning(f"{str(e)} em {file_path} ({len(content)} bytes); analisando por trechos")
+            self.degraded.append({
+                'arquivo': str(file_path),
+                'linguagem': language,
+                'padrao': e.pattern_name,
+                'segundos': round(e.elapsed, 2),
+                'tamanho_bytes': len(content)
+            })
+            self._enqueue_sections(content, file_id, language, index)
+            return True
         except Exception as e:
             logging.error(f"Erro ao analisar arquivo {file_path}: {str(e)}", exc_info=True)
             return False
+        finally:
+            self.regex_guard.finish_file()
+
+    def _collect_python(self, content, file_id, index):
+        """
+        Registra as funções e métodos de um arquivo Python e enfileira os que mencionam CNPJ.
+
+        Os trechos, nomes qualificados e chamadas vêm de uma única análise do
+        arquivo (analyzer.python_extractor); as menções a CNPJ do índice do
+        arquivo são atribuídas às funções pelos deslocamentos.
+
+        Args:
+            content (str): Conteúdo do arquivo
+            file_id (int): Id do arquivo na FileTable
+            index (SourceIndex): Índice de menções e linhas do arquivo
+
+        Returns:
+            bool: True se alguma função menciona CNPJ
+        """
+        functions = extract_functions(content, index.line_starts)
+        self._set_file_context(file_id, content, functions[0].start if functions else 0)
+        for function in functions:
+            self.all_methods.add(function.qualified_name, file_id, function.start, function.start_line, 'python',
+                                 function.calls)
+        matches = {}  # Busca de cada nome chamado na SymbolTable, que não muda até o fim do arquivo
+        found = False
+        for function in functions:
+            if index.first_in(function.start, function.end) is not None:
+                found = True
+                self._enqueue(content, [(function.start, function.end)], file_id, function.start_line, 'python',
+                              self._dependencies(function.calls, matches))
+        return found
+
+    def _enqueue_sections(self, content, file_id, language, index):
+        """Enfileira um trecho com até 3 seções de contexto em torno das menções a CNPJ."""
+        cnpj_sections = []
+        for mention in index.mentions[:3]:  # Limitar a 3 seções
+            # Pegar contexto de 500 caracteres antes e depois da menção
+            start = max(0, mention - 500)
+            end = min(len(content), mention + 500)
+            cnpj_sections.append((start, end))
+        
+        if cnpj_sections:
+            # Juntar seções com contexto para criar um trecho representativo
+            self._enqueue(content, cnpj_sections, file_id, 1, language)
 
     def extract_method_name(self, method_code, language):
         """
@@ -578,6 +1126,15 @@ IMPORTANTE:
         """
         return extract_method_name(method_code, language)
 
+    @property
+    def parser(self):
+        """Parser Pydantic das respostas (langchain é importado só no primeiro uso)."""
+        if self._parser is None:
+            from langchain.output_parsers import PydanticOutputParser
+            from ai.basemodel import AnaliseResponse
+            self._parser = PydanticOutputParser(pydantic_object=AnaliseResponse)
+        return self._parser
+
     def generate_report(self):
         """
         Gera um DataFrame pandas com os resultados da análise.
@@ -585,6 +1142,7 @@ IMPORTANTE:
         Returns:
             pandas.DataFrame: DataFrame contendo os resultados
         """
+        import pandas as pd
         df = pd.DataFrame(self.findings)
         return df
 
@@ -598,6 +1156,7 @@ IMPORTANTE:
         Returns:
             None
         """
+        import pandas as pd
         df = self.generate_report()
         
         # Configurar formatação do Excel
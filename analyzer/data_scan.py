@@ -0,0 +1,555 @@
+"""
+Varredura de literais de CNPJ em arquivos de dados.
+
+Fixtures CSV, mocks JSON, cargas SQL e arquivos de configuração costumam
+trazer CNPJs numéricos fixos, que quebram com o formato alfanumérico, mas
+não têm métodos para o analisador de código. O DataFileScanner lê esses
+arquivos em blocos de tamanho fixo (a memória não depende do tamanho do
+arquivo) e, em cada bloco:
+
+- localiza as sequências de dígitos e pontuação com operações do NumPy sobre
+  os bytes, sem percorrer o bloco em Python;
+- aceita as de 14 dígitos, com ou sem a pontuação do CNPJ formatado, que não
+  estejam coladas a letras (como o \\b de CNPJ_PATTERN);
+- valida os dígitos verificadores de todos os literais do bloco de uma vez,
+  em uma matriz de dígitos;
+- atribui cada literal a uma coluna ou chave, conforme o formato:
+    CSV/TSV      coluna do cabeçalho, pela contagem de delimitadores na linha
+                 (delimitadores entre aspas deslocam a coluna)
+    JSON/JSONL   chave mais próxima antes do valor
+    SQL          tabela e coluna do INSERT (coluna só com lista de colunas)
+    chave_valor  chave da linha (YAML, .properties, .ini, .env)
+    XML          elemento ou atributo mais próximo
+
+Só literais numéricos são procurados: em dados, sequências de letras e
+dígitos gerariam falsos positivos demais.
+"""
+import csv
+import json
+import logging
+import re
+import time
+from pathlib import PurePosixPath
+
+import numpy as np
+
+from config import DATA_SCAN_CHUNK_BYTES
+from analyzer.sources import open_source
+
+# Formato de cada extensão de arquivo de dados
+DATA_FORMATS = {
+    '.csv': 'csv', '.tsv': 'csv',
+    '.json': 'json', '.jsonl': 'json', '.ndjson': 'json',
+    '.sql': 'sql',
+    '.yaml': 'chave_valor', '.yml': 'chave_valor', '.properties': 'chave_valor', '.ini': 'chave_valor',
+    '.env': 'chave_valor', '.cfg': 'chave_valor', '.conf': 'chave_valor', '.toml': 'chave_valor',
+    '.xml': 'xml',
+    '.txt': 'texto', '.dat': 'texto'
+}
+
+# Bytes anteriores ao bloco mantidos como contexto (chaves de XML e linhas cortadas)
+CONTEXT_BYTES = 512
+
+# Sequência mais longa de dígitos e pontuação considerada (o formatado tem 18 bytes)
+MAX_LITERAL = 22
+_PADDING = 32
+
+# Colunas ou chaves distintas contadas por arquivo; as demais são somadas em OTHER_KEYS
+MAX_KEYS = 1000
+OTHER_KEYS = '(outras)'
+
+# Abaixo de um literal a cada tantos bytes, linhas e colunas são localizadas literal a literal;
+# acima, por posições de todas as quebras de linha e delimitadores do bloco
+SPARSE_BYTES = 2048
+# Bytes de palavra (UTF-8 não ASCII incluído): literal colado a eles não é CNPJ
+_WORD_BYTES = np.zeros(256, dtype=bool)
+_WORD_BYTES[list(b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')] = True
+_WORD_BYTES[128:] = True
+
+# 00.000.000/0000-00: posições dos dígitos e da pontuação no literal formatado
+_FORMATTED_DIGITS = np.array([0, 1, 3, 4, 5, 7, 8, 9, 11, 12, 13, 14, 16, 17])
+_PLAIN_DIGITS = np.arange(14)
+_LITERAL = re.compile(rb'\d{2}[.-]?\d{3}[.-]?\d{3}/?\d{4}-?\d{2}')
+
+# Pesos dos dígitos verificadores
+_WEIGHTS_1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+_WEIGHTS_2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+
+_SQL_INSERT = re.compile(rb'insert\s+into\s+([\w."`\[\]]+)\s*(?:\(([^()]*)\))?\s*values', re.IGNORECASE)
+_KEY_VALUE = re.compile(rb'[ \t]*(?:-[ \t]+)?(?:export[ \t]+)?["\']?([\w.\-]+)["\']?[ \t]*[:=]')
+_KEY_INDEX = re.compile(r'\b\d+\b')
+_XML_KEY = re.compile(rb'<([\w:.-]+)|([\w:.-]+)\s*=\s*["\']')
+
+
+def data_format(path):
+    """
+    Formato de um arquivo de dados pelo nome (ver DATA_FORMATS).
+
+    Returns:
+        str: Formato, ou None se o arquivo não é de dados
+    """
+    name = PurePosixPath(path.replace('\\', '/')).name.lower()
+    return DATA_FORMATS.get(PurePosixPath(name).suffix or name)
+
+
+def valid_check_digits(digits):
+    """
+    Valida os dígitos verificadores de vários CNPJs de uma vez.
+
+    Sequências de um só dígito repetido (ex.: 00000000000000) passam no
+    cálculo, mas são consideradas inválidas.
+
+    Args:
+        digits (numpy.ndarray): Matriz (n, 14) com os dígitos de cada CNPJ
+
+    Returns:
+        numpy.ndarray: Vetor booleano (n,), True para os CNPJs válidos
+    """
+    digits = digits.astype(np.int64)
+    rest = digits[:, :12] @ _WEIGHTS_1 % 11
+    first = np.where(rest < 2, 0, 11 - rest)
+    rest = digits[:, :13] @ _WEIGHTS_2 % 11
+    second = np.where(rest < 2, 0, 11 - rest)
+    repeated = (digits == digits[:, :1]).all(axis=1)
+    return (digits[:, 12] == first) & (digits[:, 13] == second) & ~repeated
+
+
+def _literal_runs(data, literal, difference):
+    """
+    Sequências de 14 a MAX_LITERAL bytes de dígitos e pontuação (-./).
+
+    Os bytes -./0123456789 são contíguos na tabela ASCII (45 a 57). Uma
+    sequência de 14 bytes ou mais contém três blocos inteiros de 4 bytes
+    consecutivos, alinhados em múltiplos de 4 ou em múltiplos de 4 mais 2:
+    os blocos são comparados como inteiros de 32 bits e só em volta dos
+    trios encontrados as sequências são delimitadas, sem percorrer as
+    sequências curtas (datas, valores, identificadores) do bloco.
+
+    As áreas de trabalho são reaproveitadas entre os blocos de um arquivo:
+    alocar vetores novos a cada bloco custa mais que as próprias comparações.
+
+    Args:
+        data (numpy.ndarray): Bytes do bloco
+        literal (numpy.ndarray): Área de 2 * _PADDING bytes além de data, arredondada a múltiplo de 4
+        difference (numpy.ndarray): Área do tamanho de data, ao menos
+
+    Returns:
+        tuple: (inícios, fins) das sequências, em ordem
+    """
+    n = len(data)
+    literal = literal[:2 * _PADDING + (n + 3) // 4 * 4]
+    np.subtract(data, 45, out=difference[:n])
+    np.less(difference[:n], 13, out=literal[_PADDING:_PADDING + n].view(bool))
+    literal[_PADDING + n:] = 0
+    found = []
+    for shift in (0, 2):
+        blocks = literal[shift:len(literal) - 4 + shift].view(np.uint32) == 0x01010101
+        triple = blocks[:-2] & blocks[1:-1] & blocks[2:]
+        triple[1:] &= ~triple[:-1]  # Um trio por sequência em cada alinhamento
+        found.append(np.flatnonzero(triple) * 4 + shift)
+    triples = np.concatenate(found)
+    if not len(triples):
+        return triples, triples
+    # Além dos 12 bytes do trio, cabem MAX_LITERAL - 12 bytes; um a mais = longa demais
+    steps = np.arange(MAX_LITERAL - 11)
+    left = literal[triples[:, None] - 1 - steps]
+    right = literal[triples[:, None] + 12 + steps]
+    left_size = np.where(left.all(axis=1), len(steps), left.argmin(axis=1))
+    right_size = np.where(right.all(axis=1), len(steps), right.argmin(axis=1))
+    starts = triples - left_size - _PADDING
+    ends = triples + 12 + right_size - _PADDING
+    keep = (ends - starts >= 14) & (ends - starts <= MAX_LITERAL)
+    starts, index = np.unique(starts[keep], return_index=True)
+    return starts, ends[keep][index]
+
+
+def _line_starts(buffer, data, positions):
+    """Início da linha de cada posição do bloco."""
+    if len(positions) * SPARSE_BYTES < len(data):
+        return np.array([buffer.rfind(b'\n', 0, p) + 1 for p in positions.tolist()], dtype=np.intp)
+    newlines = np.flatnonzero(data == 10)
+    return np.concatenate(([-1], newlines))[np.searchsorted(newlines, positions)] + 1
+
+
+def _count_before(buffer, data, positions, line_starts, delimiter):
+    """
+    Quantidade de delimitadores entre o início da linha e cada posição do bloco.
+
+    Delimitadores dentro de um campo entre aspas (ex.: "Empresa, Ltda") não
+    contam: só valem os precedidos, desde o início da linha, por um número
+    par de aspas. Aspas duplicadas ("") dentro do campo não mudam a paridade.
+    """
+    if len(positions) * SPARSE_BYTES < len(data):
+        # Nos trechos separados por aspas, os de índice par estão fora dos campos entre aspas
+        return np.array([sum(part.count(delimiter) for part in buffer[s:p].split(b'"')[::2])
+                         for s, p in zip(line_starts.tolist(), positions.tolist())], dtype=np.intp)
+    if buffer.find(b'"', 0, len(data)) < 0:
+        delimiters = np.flatnonzero(data == delimiter[0])
+        return np.searchsorted(delimiters, positions) - np.searchsorted(delimiters, line_starts)
+    # Paridade acumulada das aspas desde o início do bloco: os delimitadores ficam em dois grupos,
+    # e a paridade no início de cada linha indica qual dos dois está fora das aspas naquela linha
+    is_delimiter = data == delimiter[0]
+    odd = np.bitwise_xor.accumulate(data == 34)
+    even_delimiters = np.flatnonzero(is_delimiter & ~odd)
+    odd_delimiters = np.flatnonzero(is_delimiter & odd)
+    line_odd = odd[np.maximum(line_starts - 1, 0)] & (line_starts > 0)
+    return np.where(line_odd,
+                    np.searchsorted(odd_delimiters, positions) - np.searchsorted(odd_delimiters, line_starts),
+                    np.searchsorted(even_delimiters, positions) - np.searchsorted(even_delimiters, line_starts))
+
+
+class DataFileResult:
+    """
+    Literais de CNPJ encontrados em um arquivo de dados.
+
+    Attributes:
+        path (str): Caminho do arquivo
+        format (str): Formato (ver DATA_FORMATS)
+        size (int): Bytes lidos
+        literals (int): Literais encontrados
+        valid (int): Literais com dígitos verificadores válidos
+        keys (dict): Coluna ou chave -> [literais, válidos, linha do primeiro, primeiro literal]
+    """
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.format = fmt
+        self.size = 0
+        self.literals = 0
+        self.valid = 0
+        self.keys = {}
+
+    def rows(self):
+        """Linhas do relatório: uma por coluna ou chave com literais."""
+        return [{
+            'arquivo': self.path,
+            'formato': self.format,
+            'chave': key,
+            'literais': literals,
+            'validos': valid,
+            'invalidos': literals - valid,
+            'linha_exemplo': line,
+            'exemplo': example
+        } for key, (literals, valid, line, example) in sorted(self.keys.items(), key=lambda item: -item[1][0])]
+
+    def summary(self):
+        return {'arquivo': self.path, 'formato': self.format, 'bytes': self.size, 'literais': self.literals,
+                'validos': self.valid, 'invalidos': self.literals - self.valid}
+
+
+class DataFileScanner:
+    """
+    Procura literais de CNPJ em arquivos de dados, lidos em blocos.
+
+    Args:
+        chunk_bytes (int): Bytes lidos por vez de cada arquivo
+
+    Attributes:
+        bytes_scanned (int): Bytes lidos em todos os arquivos
+        seconds (float): Tempo gasto na varredura
+    """
+
+    def __init__(self, chunk_bytes=DATA_SCAN_CHUNK_BYTES):
+        self.chunk_bytes = chunk_bytes
+        self.bytes_scanned = 0
+        self.seconds = 0.0
+
+    def scan(self, location, ref=None):
+        """
+        Varre os arquivos de dados de uma origem (diretório, arquivo compactado ou repositório git).
+
+        Args:
+            location (str): Origem, como em analyzer.sources.open_source
+            ref (str, optional): Revisão git
+
+        Returns:
+            list: DataFileResult dos arquivos com literais
+        """
+        start, scanned = time.perf_counter(), self.bytes_scanned
+        results = []
+        with open_source(location, ref) as source:
+            for path in source.iter_paths():
+                fmt = data_format(path)
+                if fmt is None:
+                    continue
+                try:
+                    with source.open_binary(path) as stream:
+                        result = self.scan_stream(stream, path, fmt)
+                except OSError as e:
+                    logging.warning(f"Erro ao ler o arquivo de dados {path}: {str(e)}")
+                    continue
+                if result.literals:
+                    results.append(result)
+        elapsed = time.perf_counter() - start
+        logging.info(f"Arquivos de dados de {location}: {sum(r.literals for r in results)} literais de CNPJ "
+                     f"em {len(results)} arquivos ({(self.bytes_scanned - scanned) / 1e6:.0f} MB lidos em {elapsed:.1f}s)")
+        return results
+
+    def scan_file(self, path):
+        """Varre um arquivo de dados do disco (ver scan_stream)."""
+        with open(path, 'rb') as stream:
+            return self.scan_stream(stream, path)
+
+    def scan_stream(self, stream, path, fmt=None):
+        """
+        Varre um arquivo de dados aberto em modo binário.
+
+        Cada bloco termina na última quebra de linha (ou, em linhas maiores
+        que o bloco, no último byte que não pode fazer parte de um literal);
+        o restante passa para o bloco seguinte.
+
+        Args:
+            stream (io.BufferedIOBase): Arquivo aberto em modo binário
+            path (str): Caminho usado no resultado e para deduzir o formato
+            fmt (str, optional): Formato (padrão: pela extensão; desconhecida = texto)
+
+        Returns:
+            DataFileResult: Literais encontrados
+        """
+        start = time.perf_counter()
+        result = DataFileResult(path, fmt or data_format(path) or 'texto')
+        state = {'header': None, 'delimiter': b',', 'json_key': '', 'insert': None}
+        # Contexto do bloco anterior, restante da última linha e o bloco lido, sempre no mesmo buffer
+        buffer = bytearray(CONTEXT_BYTES + 2 * self.chunk_bytes)
+        view = memoryview(buffer)
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        scratch = (np.zeros(2 * _PADDING + (len(buffer) + 3) // 4 * 4, dtype=np.uint8),
+                   np.empty(len(buffer), dtype=np.uint8))
+        base = filled = 0
+        lines = 0  # Quebras de linha antes do bloco atual
+        try:
+            while True:
+                read = stream.readinto(view[filled:filled + self.chunk_bytes])
+                result.size += read
+                filled += read
+                if not read:
+                    cut = filled
+                else:
+                    cut = buffer.rfind(b'\n', base, filled) + 1
+                    if cut <= base or filled - cut > self.chunk_bytes:
+                        # Linha maior que o bloco: corta no último byte que não faz parte de um literal
+                        cut = filled
+                        while cut > base and 45 <= buffer[cut - 1] <= 57:
+                            cut -= 1
+                        if cut == base:
+                            cut = filled
+                if cut > base:
+                    if state['header'] is None and result.format == 'csv':
+                        self._read_header(buffer, base, cut, path, state)
+                    self._scan_region(buffer, base, cut, lines - int(np.count_nonzero(data[:base] == 10)),
+                                      result, state, scratch)
+                    lines += int(np.count_nonzero(data[base:cut] == 10))
+                if not read:
+                    break
+                context = min(CONTEXT_BYTES, cut)
+                data[:context + filled - cut] = data[cut - context:filled]
+                base, filled = context, context + filled - cut
+        finally:
+            view.release()
+        self.bytes_scanned += result.size
+        self.seconds += time.perf_counter() - start
+        return result
+
+    def _read_header(self, buffer, base, end, path, state):
+        """Nomes das colunas e delimitador de um CSV, pela primeira linha."""
+        line_end = buffer.find(b'\n', base, end)
+        line = bytes(buffer[base:line_end if line_end >= 0 else end]).rstrip(b'\r').decode('utf-8', errors='ignore')
+        if path.lower().endswith('.tsv'):
+            delimiter = '\t'
+        else:
+            delimiter = max(',;|\t', key=line.count)
+        state['delimiter'] = delimiter.encode()
+        state['header'] = next(csv.reader([line], delimiter=delimiter), [])
+
+    def _scan_region(self, buffer, base, end, lines, result, state, scratch):
+        """
+        Procura os literais de um bloco (buffer[base:end]; buffer[:base] é só contexto).
+
+        Args:
+            buffer (bytearray): Contexto seguido do bloco
+            base (int): Início do bloco em buffer
+            end (int): Fim do bloco em buffer
+            lines (int): Quebras de linha antes de buffer no arquivo
+            result (DataFileResult): Resultado acumulado do arquivo
+            state (dict): Estado do arquivo entre blocos (cabeçalho, última chave, último INSERT)
+            scratch (tuple): Áreas de trabalho reaproveitadas entre blocos (ver _literal_runs)
+        """
+        data = np.frombuffer(buffer, dtype=np.uint8, count=end)
+        starts, ends = _literal_runs(data, *scratch)
+        keep = starts >= base
+        starts, ends = starts[keep], ends[keep]
+        lengths = ends - starts
+        if not len(starts):
+            self._finish_region(buffer, base, end, state, result.format)
+            return
+
+        # Colado a letras (antes ou depois): não é um literal isolado
+        before = np.where(starts > 0, data[np.maximum(starts - 1, 0)], 32)
+        after = np.where(ends < len(data), data[np.minimum(ends, len(data) - 1)], 32)
+        isolated = ~_WORD_BYTES[before] & ~_WORD_BYTES[after]
+        starts, ends, lengths = starts[isolated], ends[isolated], lengths[isolated]
+
+        # Sem pontuação ou com a pontuação completa: dígitos lidos direto da matriz de bytes
+        plain = starts[lengths == 14]
+        plain_digits = data[plain[:, None] + _PLAIN_DIGITS] - 48
+        plain_ok = (plain_digits < 10).all(axis=1)
+        formatted = starts[lengths == 18]
+        formatted_bytes = data[formatted[:, None] + np.arange(18)]
+        formatted_digits = formatted_bytes[:, _FORMATTED_DIGITS] - 48
+        formatted_ok = ((formatted_digits < 10).all(axis=1)
+                        & np.isin(formatted_bytes[:, 2], (46, 45)) & np.isin(formatted_bytes[:, 6], (46, 45))
+                        & (formatted_bytes[:, 10] == 47) & (formatted_bytes[:, 15] == 45))
+
+        # Pontuação parcial ou sobrando nas pontas: validados pela expressão regular
+        other_starts, other_digits = [], []
+        others = (lengths != 14) & (lengths != 18)
+        others[lengths == 18] = ~formatted_ok
+        for run_start, run_end in zip(starts[others].tolist(), ends[others].tolist()):
+            token = bytes(buffer[run_start:run_end])
+            stripped = token.lstrip(b'./-')
+            run_start += len(token) - len(stripped)
+            stripped = stripped.rstrip(b'./-')
+            if _LITERAL.fullmatch(stripped):
+                other_starts.append(run_start)
+                other_digits.append(stripped.translate(None, b'./-'))
+
+        found = np.concatenate([plain[plain_ok], formatted[formatted_ok],
+                                np.array(other_starts, dtype=plain.dtype)])
+        if not len(found):
+            self._finish_region(buffer, base, end, state, result.format)
+            return
+        digits = np.concatenate([
+            plain_digits[plain_ok], formatted_digits[formatted_ok],
+            np.frombuffer(b''.join(other_digits), dtype=np.uint8).reshape(-1, 14) - 48])
+        order = np.argsort(found, kind='stable')
+        found, digits = found[order], digits[order]
+        valid = valid_check_digits(digits)
+
+        labels, inverse = self._keys(buffer, data, base, found, state, result.format)
+
+        counts = np.bincount(inverse, minlength=len(labels))
+        valid_counts = np.bincount(inverse, weights=valid, minlength=len(labels))
+        _, first = np.unique(inverse, return_index=True)
+        newlines = None
+        for label, count, valid_count, index in zip(labels, counts.tolist(), valid_counts.tolist(), first.tolist()):
+            if label not in result.keys and len(result.keys) >= MAX_KEYS:
+                label = OTHER_KEYS
+            entry = result.keys.get(label)
+            if entry is None:
+                if newlines is None:
+                    newlines = np.flatnonzero(data == 10)
+                position = int(found[index])
+                example_end = position + 14
+                while example_end < end and 45 <= buffer[example_end] <= 57:
+                    example_end += 1
+                entry = result.keys[label] = [0, 0, lines + int(np.searchsorted(newlines, position)) + 1,
+                                              buffer[position:example_end].decode('ascii')]
+            entry[0] += count
+            entry[1] += int(valid_count)
+        result.literals += len(found)
+        result.valid += int(valid.sum())
+        self._finish_region(buffer, base, end, state, result.format)
+
+    def _keys(self, buffer, data, base, found, state, fmt):
+        """
+        Coluna ou chave de cada literal.
+
+        Returns:
+            tuple: (rótulos distintos, índice do rótulo de cada literal)
+        """
+        if fmt == 'csv':
+            columns = _count_before(buffer, data, found, _line_starts(buffer, data, found), state['delimiter'])
+            distinct, inverse = np.unique(columns, return_inverse=True)
+            header = state['header'] or []
+            return ([header[c] if c < len(header) and header[c] else f"coluna {c + 1}" for c in distinct.tolist()],
+                    inverse)
+        if fmt == 'json':
+            # Aspas que fecham uma chave: seguidas de dois-pontos
+            quotes = np.flatnonzero((data[:-1] == 34) & (data[1:] == 58))
+            nearest = np.searchsorted(quotes, found) - 1
+            distinct, inverse = np.unique(nearest, return_inverse=True)
+            labels = []
+            for q in distinct.tolist():
+                if q < 0:
+                    labels.append(state['json_key'])
+                else:
+                    end = int(quotes[q])
+                    labels.append(buffer[buffer.rfind(b'"', 0, end) + 1:end].decode('utf-8', errors='ignore'))
+            return labels, inverse
+
+        keys = []
+        if fmt == 'sql':
+            # INSERT mais recente antes de cada literal; cada trecho do bloco é procurado uma vez
+            insert, searched = state['insert'], 0
+            for position in found.tolist():
+                statement = max(buffer.rfind(b'INSERT', searched, position),
+                                buffer.rfind(b'insert', searched, position))
+                match = _SQL_INSERT.match(buffer, statement, position) if statement >= 0 else None
+                if match:
+                    insert = (match.end(), match.group(1).decode('utf-8', errors='ignore').strip('"`[]'),
+                              [c.strip().strip('"`[]') for c in match.group(2).decode('utf-8', errors='ignore')
+                               .split(',')] if match.group(2) else None)
+                searched = position
+                if insert is None:
+                    keys.append('')
+                    continue
+                insert_end, table, columns = insert
+                column = ''
+                if columns:
+                    row_start = buffer.rfind(b'(', insert_end, position)
+                    index = buffer.count(b',', row_start, position) if row_start >= 0 else -1
+                    column = columns[index] if 0 <= index < len(columns) else ''
+                keys.append(f"{table}.{column}" if column else table)
+            if insert is not None:
+                state['insert'] = (0,) + insert[1:]  # No próximo bloco, a linha começa no contexto
+        elif fmt == 'chave_valor':
+            for position, line_start in zip(found.tolist(), _line_starts(buffer, data, found).tolist()):
+                match = _KEY_VALUE.match(buffer, line_start, position)
+                # empresa.12.cnpj e empresa.13.cnpj contam como empresa.*.cnpj
+                keys.append(_KEY_INDEX.sub('*', match.group(1).decode('utf-8', errors='ignore')) if match else '')
+        elif fmt == 'xml':
+            for position in found.tolist():
+                matches = _XML_KEY.findall(buffer, max(position - CONTEXT_BYTES, 0), position)
+                keys.append((matches[-1][0] or matches[-1][1]).decode('utf-8', errors='ignore') if matches else '')
+        else:
+            return [''], np.zeros(len(found), dtype=np.intp)
+
+        index = {}
+        inverse = np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.intp, count=len(keys))
+        return list(index), inverse
+
+    def _finish_region(self, buffer, base, end, state, fmt):
+        """Guarda a última chave JSON do bloco para os literais do início do próximo."""
+        if fmt != 'json':
+            return
+        key_end = buffer.rfind(b'":', base, end)
+        if key_end >= 0:
+            state['json_key'] = buffer[buffer.rfind(b'"', 0, key_end) + 1:key_end].decode('utf-8', errors='ignore')
+
+
+def write_data_scan(results, basename):
+    """
+    Grava o resultado da varredura dos arquivos de dados.
+
+    Args:
+        results (list): DataFileResult dos arquivos com literais
+        basename (str): Caminho do relatório sem extensão
+
+    Returns:
+        dict: Artefato ('chaves', 'resumo') -> caminho
+    """
+    paths = {'chaves': f"{basename}_dados.csv", 'resumo': f"{basename}_dados.json"}
+    with open(paths['chaves'], 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['arquivo', 'formato', 'chave', 'literais', 'validos', 'invalidos',
+                                               'linha_exemplo', 'exemplo'])
+        writer.writeheader()
+        for result in results:
+            writer.writerows(result.rows())
+    with open(paths['resumo'], 'w', encoding='utf-8') as f:
+        json.dump({
+            'literais': sum(r.literals for r in results),
+            'validos': sum(r.valid for r in results),
+            'arquivos': [dict(r.summary(), chaves=r.rows()) for r in results]
+        }, f, ensure_ascii=False, indent=2)
+    logging.info(f"Literais de CNPJ em arquivos de dados salvos em: {paths['chaves']}")
+    return paths
@@ -0,0 +1,263 @@
+"""
+Diferença entre duas execuções da análise (delta de resultados).
+
+Cada resultado é identificado por (arquivo, método, hash do corpo), o hash
+gravado na coluna 'hash_corpo' dos relatórios. A comparação é uma junção
+por hash em uma única passagem sobre cada execução: os resultados da
+execução anterior vão para um dicionário pela identidade e os da atual são
+procurados nele. Os que sobram dos dois lados são casados por (arquivo,
+método), o que identifica métodos cujo corpo mudou; o restante são métodos
+novos ou removidos. Um resultado com a mesma identidade nas duas execuções
+só entra no delta se o modelo mudou o tipo de uso, a severidade ou as horas.
+
+As execuções são lidas dos relatórios já gravados (CSV, Parquet ou Excel),
+apenas com as colunas usadas na comparação.
+"""
+import csv
+import logging
+import os
+import sys
+
+# Campos do resultado comparados entre as execuções
+DIFF_FIELDS = ('tipo_uso', 'severidade', 'horas_dev', 'horas_teste', 'horas_total')
+
+# Identidade estável de um resultado entre execuções
+IDENTITY = ('arquivo', 'metodo', 'hash_corpo')
+
+# Colunas lidas dos relatórios
+DIFF_COLUMNS = ('arquivo', 'metodo', 'linha', 'hash_corpo') + DIFF_FIELDS
+
+# Formatos de relatório aceitos, do mais rápido de ler ao mais lento
+DIFF_FORMATS = ('csv', 'parquet', 'xlsx')
+
+SEVERITY_RANK = {'BAIXA': 1, 'MEDIA': 2, 'ALTA': 3}
+SITUATION_ORDER = {'novo': 0, 'alterado': 1, 'removido': 2}
+
+
+def find_report(basename, formats=DIFF_FORMATS):
+    """
+    Arquivo de um relatório gravado, no formato mais rápido de ler disponível.
+
+    Args:
+        basename (str): Caminho do relatório sem extensão
+        formats (tuple): Formatos aceitos, em ordem de preferência
+
+    Returns:
+        str: Caminho do arquivo, ou None se o relatório não existe em nenhum formato
+    """
+    for fmt in formats:
+        path = f"{basename}.{fmt}"
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def load_run(path):
+    """
+    Lê os resultados de um relatório gravado (CSV, Parquet ou Excel).
+
+    Args:
+        path (str): Caminho do relatório
+
+    Returns:
+        list: Resultados, apenas com as colunas de DIFF_COLUMNS presentes no relatório
+    """
+    fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt == 'csv':
+        csv.field_size_limit(sys.maxsize)  # Campos de lista podem ser longos
+        with open(path, encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            columns = [(idx, column) for idx, column in enumerate(header) if column in DIFF_COLUMNS]
+            rows = [{column: row[idx] if idx < len(row) else None for idx, column in columns} for row in reader]
+    elif fmt == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("A leitura de relatórios Parquet requer o pacote pyarrow (pip install pyarrow)")
+        available = pq.read_schema(path).names
+        rows = pq.read_table(path, columns=[c for c in DIFF_COLUMNS if c in available]).to_pylist()
+    elif fmt == 'xlsx':
+        import pandas as pd
+        df = pd.read_excel(path, sheet_name='Análise CNPJ', usecols=lambda column: column in DIFF_COLUMNS)
+        rows = df.astype(object).where(df.notna(), None).to_dict('records')
+    else:
+        raise ValueError(f"Formato de relatório não suportado na comparação: {fmt} (use {', '.join(DIFF_FORMATS)})")
+    for row in rows:
+        row['linha'] = _integer(row.get('linha'))
+        for field in ('horas_dev', 'horas_teste', 'horas_total'):
+            row[field] = _number(row.get(field))
+        row['hash_corpo'] = row.get('hash_corpo') or None
+    return rows
+
+
+def diff_findings(base, current):
+    """
+    Compara os resultados de duas execuções.
+
+    Args:
+        base (list): Resultados da execução anterior
+        current (list): Resultados da execução atual
+
+    Returns:
+        dict: 'resumo' (totais do delta) e 'alteracoes' (uma linha por método novo,
+        removido ou alterado, ver _delta_row)
+    """
+    # Junção pela identidade (arquivo, método, hash do corpo)
+    index = {}
+    for finding in base:
+        index.setdefault(_identity(finding), []).append(finding)
+    changes = []
+    unmatched = []
+    unchanged = 0
+    for finding in current:
+        bucket = index.get(_identity(finding))
+        if not bucket:
+            unmatched.append(finding)
+            continue
+        previous = bucket.pop()
+        fields = _changed_fields(previous, finding)
+        if fields:
+            changes.append(_delta_row('alterado', previous, finding, fields, False))
+        else:
+            unchanged += 1
+
+    # O que sobrou da execução anterior é casado por (arquivo, método): corpo alterado
+    by_name = {}
+    for bucket in index.values():
+        for previous in bucket:
+            by_name.setdefault((previous.get('arquivo'), previous.get('metodo')), []).append(previous)
+    for finding in unmatched:
+        bucket = by_name.get((finding.get('arquivo'), finding.get('metodo')))
+        if not bucket:
+            changes.append(_delta_row('novo', None, finding))
+            continue
+        previous = bucket.pop()
+        # Relatórios sem hash (anteriores à coluna) não permitem saber se o corpo mudou
+        body_changed = previous.get('hash_corpo') is not None and finding.get('hash_corpo') is not None
+        fields = _changed_fields(previous, finding)
+        if fields or body_changed:
+            changes.append(_delta_row('alterado', previous, finding, fields, body_changed))
+        else:
+            unchanged += 1
+    for bucket in by_name.values():
+        changes.extend(_delta_row('removido', previous, None) for previous in bucket)
+
+    changes.sort(key=lambda row: (SITUATION_ORDER[row['situacao']], str(row['arquivo']), row['linha'] or 0))
+    return {'resumo': _summary(base, current, changes, unchanged), 'alteracoes': changes}
+
+
+def diff_reports(base_path, current_path):
+    """
+    Compara dois relatórios gravados.
+
+    Args:
+        base_path (str): Relatório da execução anterior
+        current_path (str): Relatório da execução atual
+
+    Returns:
+        dict: Resultado de diff_findings, com os relatórios comparados no resumo
+    """
+    delta = diff_findings(load_run(base_path), load_run(current_path))
+    delta['resumo'].update(base=os.path.basename(base_path), atual=os.path.basename(current_path))
+    return delta
+
+
+def _identity(finding):
+    return tuple(map(finding.get, IDENTITY))
+
+
+def _changed_fields(previous, finding):
+    """Campos de DIFF_FIELDS com valores diferentes (horas comparadas com uma casa decimal)."""
+    if tuple(map(previous.get, DIFF_FIELDS)) == tuple(map(finding.get, DIFF_FIELDS)):
+        return []  # Caso comum, sem comparar campo a campo
+    changed = []
+    for field in DIFF_FIELDS:
+        old, new = previous.get(field), finding.get(field)
+        if field.startswith('horas_'):
+            if round(_number(old), 1) != round(_number(new), 1):
+                changed.append(field)
+        elif old != new:
+            changed.append(field)
+    return changed
+
+
+def _delta_row(situation, previous, finding, fields=(), body_changed=False):
+    """Linha do delta: valores atuais e anteriores dos campos comparados."""
+    reference = finding if finding is not None else previous
+    previous = previous or {}
+    finding = finding or {}
+    hours, previous_hours = _number(finding.get('horas_total')), _number(previous.get('horas_total'))
+    return {
+        'situacao': situation,
+        'arquivo': reference.get('arquivo'),
+        'metodo': reference.get('metodo'),
+        'linha': finding.get('linha'),
+        'linha_anterior': previous.get('linha'),
+        'corpo_alterado': body_changed,
+        'campos_alterados': ', '.join(fields),
+        'tipo_uso': finding.get('tipo_uso'),
+        'tipo_uso_anterior': previous.get('tipo_uso'),
+        'severidade': finding.get('severidade'),
+        'severidade_anterior': previous.get('severidade'),
+        'horas_total': hours,
+        'horas_total_anterior': previous_hours,
+        'delta_horas': round(hours - previous_hours, 2)
+    }
+
+
+def _summary(base, current, changes, unchanged):
+    counts = {situation: 0 for situation in SITUATION_ORDER}
+    raised = lowered = body_changed = 0
+    for row in changes:
+        counts[row['situacao']] += 1
+        body_changed += row['corpo_alterado']
+        old = SEVERITY_RANK.get(row['severidade_anterior'], 0)
+        new = SEVERITY_RANK.get(row['severidade'], 0)
+        if row['situacao'] == 'alterado' and old and new:
+            raised += new > old
+            lowered += new < old
+    severities = {}
+    for key, findings in (('base', base), ('atual', current)):
+        for finding in findings:
+            entry = severities.setdefault(finding.get('severidade') or 'N/A', {'base': 0, 'atual': 0})
+            entry[key] += 1
+    base_hours = sum(_number(finding.get('horas_total')) for finding in base)
+    current_hours = sum(_number(finding.get('horas_total')) for finding in current)
+    summary = {
+        'metodos_base': len(base),
+        'metodos_atual': len(current),
+        'novos': counts['novo'],
+        'removidos': counts['removido'],
+        'alterados': counts['alterado'],
+        'corpo_alterado': body_changed,
+        'inalterados': unchanged,
+        'severidade_aumentou': raised,
+        'severidade_reduziu': lowered,
+        'horas_base': round(base_hours, 1),
+        'horas_atual': round(current_hours, 1),
+        'delta_horas': round(current_hours - base_hours, 1),
+        'por_severidade': {severity: dict(entry, delta=entry['atual'] - entry['base'])
+                           for severity, entry in sorted(severities.items())}
+    }
+    logging.info(f"Delta: {summary['novos']} novos, {summary['removidos']} removidos, "
+                 f"{summary['alterados']} alterados, {summary['delta_horas']:+.1f} horas")
+    return summary
+
+
+def _number(value):
+    """Horas como float (0.0 para ausentes ou inválidas, como em relatórios CSV)."""
+    if value is None or value == '':
+        return 0.0
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if value != value else value  # NaN de células vazias no Excel
+
+
+def _integer(value):
+    try:
+        return int(float(value)) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,393 @@
+"""
+Modo distribuído: um coordenador extrai os métodos e vários workers chamam o modelo de IA.
+
+O coordenador executa a extração (collect), monta o índice de símbolos e
+grava cada método pendente como uma unidade de trabalho autocontida (texto
+do método, dependências já descritas, risco e estrato) em uma fila SQLite
+em um diretório compartilhado. Os workers, em outras máquinas ou processos,
+não precisam de acesso às origens: alocam unidades por um tempo limitado
+(lease), chamam o modelo e gravam o resultado.
+
+- Um worker que morre com unidades alocadas não as perde: quando o lease
+  expira, outra alocação as devolve ao trabalho.
+- A gravação de resultados é idempotente: o primeiro resultado de cada
+  unidade vale, e uma unidade concluída duas vezes (lease expirado de um
+  worker lento) não gera resultado duplicado.
+- O id do trabalho é derivado da origem e do conteúdo dos métodos, então
+  executar o coordenador de novo sobre a mesma origem retoma o trabalho e
+  reaproveita os resultados já gravados.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import AI_PARSE_RETRIES
+
+QUEUE_FILENAME = 'fila_cnpj.db'
+
+# Alocações de uma mesma unidade (leases expirados) antes de desistir dela
+MAX_LEASES = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trabalhos (
+    trabalho TEXT PRIMARY KEY,
+    origem TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    criado REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS unidades (
+    trabalho TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    prioridade REAL NOT NULL,
+    dados TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pendente',
+    worker TEXT,
+    lease_ate REAL,
+    alocacoes INTEGER NOT NULL DEFAULT 0,
+    retentativas INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (trabalho, seq)
+);
+CREATE INDEX IF NOT EXISTS unidades_status ON unidades (status, prioridade);
+CREATE TABLE IF NOT EXISTS resultados (
+    trabalho TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    resultado TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    gravado REAL NOT NULL,
+    PRIMARY KEY (trabalho, seq)
+);
+CREATE TABLE IF NOT EXISTS controle (
+    chave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+"""
+
+
+class WorkUnit:
+    """Unidade de trabalho alocada a um worker."""
+
+    __slots__ = ('job', 'seq', 'data', 'retries')
+
+    def __init__(self, job, seq, data, retries):
+        self.job = job
+        self.seq = seq
+        self.data = data  # Dicionário com o método e seu contexto
+        self.retries = retries
+
+
+class WorkQueue:
+    """
+    Fila de unidades de trabalho em um arquivo SQLite compartilhado, segura para uso entre threads e processos.
+
+    Args:
+        directory (str): Diretório compartilhado entre o coordenador e os workers
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, QUEUE_FILENAME)
+        self._lock = threading.Lock()
+        # Autocommit: as transações são abertas explicitamente com BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.path, timeout=60, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    def _transaction(self, statements):
+        """Executa uma função sobre a conexão dentro de uma transação de escrita."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def add_job(self, job, origin, prompt, units):
+        """
+        Publica um trabalho e suas unidades; republicar o mesmo trabalho não duplica nada.
+
+        Args:
+            job (str): Id do trabalho
+            origin (str): Origem analisada
+            prompt (str): Prompt usado pelos workers
+            units (list): Tuplas (seq, prioridade, dados em JSON)
+
+        Returns:
+            int: Unidades novas gravadas
+        """
+        def statements(conn):
+            conn.execute("INSERT OR IGNORE INTO trabalhos (trabalho, origem, prompt, total, criado) "
+                         "VALUES (?, ?, ?, ?, ?)", (job, origin, prompt, len(units), time.time()))
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO unidades (trabalho, seq, prioridade, dados) VALUES (?, ?, ?, ?)",
+                             [(job, seq, priority, data) for seq, priority, data in units])
+            return conn.total_changes - before
+        return self._transaction(statements)
+
+    def prompt(self, job):
+        with self._lock:
+            return self._conn.execute("SELECT prompt FROM trabalhos WHERE trabalho = ?", (job,)).fetchone()[0]
+
+    def lease(self, worker, lease_seconds):
+        """
+        Aloca a unidade pendente (ou com lease expirado) de maior prioridade.
+
+        Unidades que já tiveram MAX_LEASES alocações expiradas são marcadas
+        como falha em vez de alocadas de novo.
+
+        Args:
+            worker (str): Id do worker
+            lease_seconds (float): Tempo até a unidade voltar a ficar disponível
+
+        Returns:
+            WorkUnit: Unidade alocada, ou None se não há trabalho disponível
+        """
+        def statements(conn):
+            now = time.time()
+            while True:
+                row = conn.execute(
+                    "SELECT trabalho, seq, dados, alocacoes, retentativas FROM unidades "
+                    "WHERE status = 'pendente' OR (status = 'alocado' AND lease_ate < ?) "
+                    "ORDER BY prioridade DESC, seq LIMIT 1", (now,)
+                ).fetchone()
+                if row is None:
+                    return None
+                job, seq, data, leases, retries = row
+                if leases >= MAX_LEASES:
+                    logging.warning(f"Unidade {job}/{seq} abandonada após {leases} leases expirados")
+                    conn.execute("UPDATE unidades SET status = 'falha', worker = NULL WHERE trabalho = ? AND seq = ?",
+                                 (job, seq))
+                    continue
+                conn.execute("UPDATE unidades SET status = 'alocado', worker = ?, lease_ate = ?, "
+                             "alocacoes = alocacoes + 1 WHERE trabalho = ? AND seq = ?",
+                             (worker, now + lease_seconds, job, seq))
+                return WorkUnit(job, seq, json.loads(data), retries)
+        return self._transaction(statements)
+
+    def complete(self, unit, worker, finding):
+        """
+        Grava o resultado de uma unidade. Apenas o primeiro resultado de cada unidade é mantido.
+
+        Returns:
+            bool: Se este resultado foi o gravado
+        """
+        def statements(conn):
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO resultados (trabalho, seq, resultado, worker, gravado) VALUES (?, ?, ?, ?, ?)",
+                (unit.job, unit.seq, json.dumps(finding, ensure_ascii=False), worker, time.time()))
+            conn.execute("UPDATE unidades SET status = 'concluido', lease_ate = NULL WHERE trabalho = ? AND seq = ?",
+                         (unit.job, unit.seq))
+            return cursor.rowcount == 1
+        return self._transaction(statements)
+
+    def retry(self, unit, worker):
+        """Devolve à fila uma unidade cuja resposta não pôde ser usada, contando a nova tentativa."""
+        def statements(conn):
+            conn.execute("UPDATE unidades SET status = 'pendente', worker = NULL, lease_ate = NULL, alocacoes = 0, "
+                         "retentativas = retentativas + 1 "
+                         "WHERE trabalho = ? AND seq = ? AND status = 'alocado' AND worker = ?",
+                         (unit.job, unit.seq, worker))
+        self._transaction(statements)
+
+    def close_publishing(self):
+        """Indica que o coordenador não vai publicar mais trabalhos (workers ociosos podem encerrar)."""
+        self._transaction(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO controle (chave, valor) VALUES ('publicacao_encerrada', '1')"))
+
+    def reopen_publishing(self):
+        """Indica que o coordenador vai publicar trabalhos (workers ociosos aguardam)."""
+        self._transaction(lambda conn: conn.execute("DELETE FROM controle WHERE chave = 'publicacao_encerrada'"))
+
+    def drained(self):
+        """Se a publicação foi encerrada e não há unidades pendentes ou alocadas."""
+        with self._lock:
+            closed = self._conn.execute(
+                "SELECT 1 FROM controle WHERE chave = 'publicacao_encerrada'").fetchone() is not None
+            active = self._conn.execute(
+                "SELECT 1 FROM unidades WHERE status IN ('pendente', 'alocado') LIMIT 1").fetchone() is not None
+            return closed and not active
+
+    def progress(self, job):
+        """
+        Unidades de um trabalho por status.
+
+        Returns:
+            dict: status -> quantidade
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM unidades WHERE trabalho = ? GROUP BY status",
+                                      (job,)).fetchall()
+        return dict(rows)
+
+    def results(self, job):
+        """
+        Resultados gravados de um trabalho, na ordem de prioridade das unidades.
+
+        Returns:
+            list: Tuplas (resultado, worker)
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT resultado, worker FROM resultados WHERE trabalho = ? ORDER BY seq",
+                                      (job,)).fetchall()
+        return [(json.loads(finding), worker) for finding, worker in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def job_id(origin, ref, digests):
+    """Id determinístico de um trabalho: a mesma origem com os mesmos métodos gera o mesmo id."""
+    digest = hashlib.sha256(f"{origin}\0{ref or ''}\0".encode('utf-8'))
+    for item in digests:
+        digest.update(item)
+    return digest.hexdigest()[:16]
+
+
+def publish(queue, analyzer, origin, ref=None):
+    """
+    Publica os métodos pendentes de um analisador como unidades de trabalho.
+
+    O texto de cada método e a descrição das dependências são gravados na
+    unidade, para que os workers não precisem acessar a origem.
+
+    Args:
+        queue (WorkQueue): Fila compartilhada
+        analyzer (GenericCNPJAnalyzer): Analisador com os métodos já extraídos (collect)
+        origin (str): Origem analisada
+        ref (str, optional): Revisão git analisada
+
+    Returns:
+        str: Id do trabalho
+    """
+    pending = analyzer.prioritize_pending()
+    units = []
+    for seq, candidate in enumerate(pending):
+        data = {
+            'codigo': candidate.text(analyzer.files),
+            'arquivo': analyzer.files.path(candidate.file_id),
+            'linha': candidate.start_line,
+            'linguagem': candidate.language,
+            'dependencias': [analyzer.all_methods.describe(idx, analyzer.files) for idx in candidate.dependencies],
+            'risco_estatico': candidate.risk_score,
+            'estrato': candidate.stratum,
+            'hash_corpo': candidate.digest.hex(),
+            'contexto_arquivo': analyzer.files.context(candidate.file_id)
+        }
+        units.append((seq, candidate.risk_score, json.dumps(data, ensure_ascii=False)))
+    job = job_id(origin, ref, (candidate.digest for candidate in pending))
+    added = queue.add_job(job, origin, analyzer.prompt, units)
+    analyzer.pending = []
+    analyzer.files.close()
+    logging.info(f"Trabalho {job} ({origin}): {len(units)} unidades, {len(units) - added} já publicadas antes")
+    return job
+
+
+def wait_for_job(queue, job, poll_interval=2.0, workers_alive=None):
+    """
+    Aguarda a conclusão de um trabalho e retorna os resultados.
+
+    Args:
+        queue (WorkQueue): Fila compartilhada
+        job (str): Id do trabalho
+        poll_interval (float): Intervalo entre as consultas à fila
+        workers_alive (callable, optional): Retorna False quando não há mais workers para
+            concluir o trabalho (ex.: todos os workers locais terminaram)
+
+    Returns:
+        tuple: (resultados, unidades abandonadas, resultados por worker)
+
+    Raises:
+        RuntimeError: Se os workers terminarem com unidades ainda pendentes
+    """
+    last = None
+    while True:
+        progress = queue.progress(job)
+        remaining = progress.get('pendente', 0) + progress.get('alocado', 0)
+        if remaining == 0:
+            break
+        if progress != last:
+            logging.info(f"Trabalho {job}: {progress.get('concluido', 0)} concluídas, {remaining} restantes")
+            last = progress
+        if workers_alive is not None and not workers_alive():
+            raise RuntimeError(f"Os workers terminaram com {remaining} unidades pendentes no trabalho {job}")
+        time.sleep(poll_interval)
+    results = queue.results(job)
+    per_worker = {}
+    for _, worker in results:
+        per_worker[worker] = per_worker.get(worker, 0) + 1
+    return [finding for finding, _ in results], progress.get('falha', 0), per_worker
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(queue, analyzer_factory, worker_id=None, concurrency=1, lease_seconds=300.0,
+               poll_interval=1.0, exit_when_idle=True, max_retries=AI_PARSE_RETRIES):
+    """
+    Executa um worker: aloca unidades, chama o modelo e grava os resultados.
+
+    Args:
+        queue (WorkQueue): Fila compartilhada
+        analyzer_factory (callable): Cria um GenericCNPJAnalyzer (com o modelo de IA do worker)
+        worker_id (str, optional): Id do worker (padrão: host:pid)
+        concurrency (int): Unidades analisadas ao mesmo tempo
+        lease_seconds (float): Tempo de alocação de cada unidade; deve superar a duração de uma chamada
+        poll_interval (float): Espera quando a fila está vazia
+        exit_when_idle (bool): Encerrar quando a publicação terminou e a fila esvaziou
+        max_retries (int): Novas tentativas de unidades com resposta inválida do modelo
+
+    Returns:
+        int: Unidades cujo resultado foi gravado por este worker
+    """
+    worker_id = worker_id or default_worker_id()
+    analyzers = {}
+    analyzers_lock = threading.Lock()
+
+    def analyzer_for(job):
+        with analyzers_lock:
+            analyzer = analyzers.get(job)
+            if analyzer is None:
+                analyzer = analyzers[job] = analyzer_factory()
+                analyzer.prompt = queue.prompt(job)
+            return analyzer
+
+    def work():
+        written = 0
+        while True:
+            unit = queue.lease(worker_id, lease_seconds)
+            if unit is None:
+                if exit_when_idle and queue.drained():
+                    return written
+                time.sleep(poll_interval)
+                continue
+            data = unit.data
+            analyzer = analyzer_for(unit.job)
+            finding = analyzer._analyze_with_llm(data['codigo'], data['arquivo'], data['linha'], data['linguagem'],
+                                                 data['dependencias'], data['risco_estatico'],
+                                                 data.get('contexto_arquivo', ''))
+            if data['estrato'] is not None:
+                finding['estrato'] = data['estrato']
+            if data.get('hash_corpo'):
+                finding['hash_corpo'] = data['hash_corpo']
+            if finding['tipo_uso'] == 'ERRO' and unit.retries < max_retries:
+                queue.retry(unit, worker_id)
+                continue
+            if queue.complete(unit, worker_id, finding):
+                written += 1
+
+    logging.info(f"Worker {worker_id} iniciado ({concurrency} chamadas simultâneas)")
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='worker') as executor:
+        written = sum(future.result() for future in [executor.submit(work) for _ in range(concurrency)])
+    logging.info(f"Worker {worker_id} encerrado: {written} resultados gravados")
+    return written
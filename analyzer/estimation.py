@@ -0,0 +1,241 @@
+"""
+Previsão de duração e custo de uma análise antes de iniciá-la.
+
+A pré-análise extrai os métodos com CNPJ sem chamar o modelo de IA e estima
+os tokens de entrada do prompt de cada um (instruções, início do arquivo,
+método e dependências). Com o histórico de latência das análises anteriores
+do mesmo provedor e modelo (LatencyHistory), a concorrência e o limite de
+requisições por minuto configurados, prevê o tempo total e o custo na API.
+Ao fim da análise, os números reais são comparados com a previsão e
+acrescentados ao histórico.
+
+A latência de uma chamada é modelada como uma reta em função dos tokens de
+entrada (tempo fixo de rede e geração mais o processamento do prompt),
+ajustada por mínimos quadrados sobre as chamadas mais recentes. Sem
+histórico suficiente, são usados valores padrão por provedor.
+"""
+import json
+import logging
+import os
+import threading
+
+from config import (AI_MODEL_TYPE, OLLAMA_MODEL, MISTRAL_MODEL, AI_MAX_CONCURRENCY, AI_REQUESTS_PER_MINUTE,
+                    AI_PROMPT_CACHE, AI_PRICE_INPUT_PER_MTOK, AI_PRICE_OUTPUT_PER_MTOK, LATENCY_HISTORY_PATH)
+
+# Preço em dólares por milhão de tokens: (entrada, saída, leitura do cache, gravação no cache)
+PRICING = {
+    ('anthropic', 'claude-3-haiku-20240307'): (0.25, 1.25, 0.03, 0.30),
+    ('mistral', 'mistral-large-latest'): (2.0, 6.0, 2.0, 2.0),
+    ('mistral', 'codestral-latest'): (0.3, 0.9, 0.3, 0.3),
+}
+DEFAULT_PRICING = {'anthropic': (3.0, 15.0, 0.3, 3.75), 'mistral': (2.0, 6.0, 2.0, 2.0), 'ollama': (0, 0, 0, 0)}
+
+# Tamanho mínimo de um prefixo guardado no cache da Anthropic
+PROMPT_CACHE_MIN_TOKENS = 2048
+
+# Sem histórico: (segundos fixos por chamada, segundos por token de entrada, tokens de saída por chamada)
+DEFAULT_LATENCY = {'anthropic': (3.0, 0.0002, 250), 'mistral': (4.0, 0.0002, 250), 'ollama': (10.0, 0.002, 250)}
+
+# Chamadas guardadas por provedor e modelo e mínimo para usar o ajuste
+HISTORY_SIZE = 500
+MIN_SAMPLES = 5
+
+
+def configured_model():
+    """
+    Provedor e modelo configurados (config.py), sem criar o cliente.
+
+    Returns:
+        tuple: (provedor, modelo)
+    """
+    provider = AI_MODEL_TYPE.lower()
+    if provider == 'ollama':
+        return provider, OLLAMA_MODEL
+    if provider == 'mistral':
+        return provider, MISTRAL_MODEL
+    from ai.Anthropic import AnthropicModel  # Não carrega o SDK: só o nome do modelo padrão
+    return provider, AnthropicModel.DEFAULT_MODEL
+
+
+def pricing(provider, model):
+    """Preços por milhão de tokens (entrada, saída, leitura e gravação do cache), com os de config.py."""
+    price_in, price_out, price_read, price_write = PRICING.get((provider, model),
+                                                               DEFAULT_PRICING.get(provider, (0, 0, 0, 0)))
+    if AI_PRICE_INPUT_PER_MTOK is not None:
+        # O cache mantém a mesma proporção do preço de entrada da tabela
+        scale = AI_PRICE_INPUT_PER_MTOK / price_in if price_in else 1.0
+        price_in, price_read, price_write = AI_PRICE_INPUT_PER_MTOK, price_read * scale, price_write * scale
+    if AI_PRICE_OUTPUT_PER_MTOK is not None:
+        price_out = AI_PRICE_OUTPUT_PER_MTOK
+    return price_in, price_out, price_read, price_write
+
+
+class LatencyHistory:
+    """
+    Latência observada das chamadas ao modelo, por provedor e modelo, gravada em JSON.
+
+    Args:
+        path (str): Arquivo do histórico (vazio = apenas em memória)
+    """
+
+    def __init__(self, path=LATENCY_HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._samples = {}  # "provedor:modelo" -> [[tokens de entrada, tokens de saída, segundos], ...]
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    self._samples = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.warning(f"Histórico de latência ignorado ({path}): {str(e)}")
+
+    def record(self, provider, model, samples):
+        """
+        Acrescenta as chamadas de uma análise e grava o histórico.
+
+        Args:
+            provider (str): Provedor
+            model (str): Modelo
+            samples (list): (tokens de entrada, tokens de saída, segundos) de cada chamada
+        """
+        if not samples:
+            return
+        key = f"{provider}:{model}"
+        with self._lock:
+            history = self._samples.setdefault(key, [])
+            history.extend([list(sample) for sample in samples])
+            del history[:-HISTORY_SIZE]
+            if self.path:
+                try:
+                    with open(self.path, 'w', encoding='utf-8') as f:
+                        json.dump(self._samples, f)
+                except OSError as e:
+                    logging.warning(f"Não foi possível gravar o histórico de latência: {str(e)}")
+
+    def model(self, provider, model):
+        """
+        Modelo de latência de um provedor e modelo.
+
+        Returns:
+            tuple: (segundos fixos, segundos por token de entrada, tokens de saída por chamada,
+            chamadas do histórico usadas, ou 0 se foram usados os valores padrão)
+        """
+        with self._lock:
+            samples = list(self._samples.get(f"{provider}:{model}", ()))
+        if len(samples) < MIN_SAMPLES:
+            return (*DEFAULT_LATENCY.get(provider, DEFAULT_LATENCY['anthropic']), 0)
+        n = len(samples)
+        mean_x = sum(sample[0] for sample in samples) / n
+        mean_y = sum(sample[2] for sample in samples) / n
+        var_x = sum((sample[0] - mean_x) ** 2 for sample in samples)
+        slope = sum((sample[0] - mean_x) * (sample[2] - mean_y) for sample in samples) / var_x if var_x else 0.0
+        slope = max(slope, 0.0)  # Prompts maiores não ficam mais rápidos: sem inclinação, vale a média
+        intercept = max(mean_y - slope * mean_x, 0.0)
+        return intercept, slope, sum(sample[1] for sample in samples) / n, n
+
+
+def estimate_run(prompts, history, provider=None, model=None, concurrency=AI_MAX_CONCURRENCY,
+                 requests_per_minute=AI_REQUESTS_PER_MINUTE, prompt_cache=AI_PROMPT_CACHE, extraction_s=0.0):
+    """
+    Prevê a duração e o custo da análise de um conjunto de prompts.
+
+    As chamadas são distribuídas entre `concurrency` execuções simultâneas;
+    com limite de requisições por minuto, a duração não fica abaixo do que o
+    limite permite. Na Anthropic com cache de prompt, o início repetido
+    (instruções e início do arquivo) de prompts do mesmo arquivo é cobrado
+    como gravação na primeira chamada e como leitura nas seguintes, quando
+    atinge o tamanho mínimo do cache.
+
+    Args:
+        prompts (list): (id do arquivo, tokens do início reaproveitável, tokens totais) de cada prompt
+        history (LatencyHistory): Histórico de latência
+        provider (str, optional): Provedor (padrão: o configurado)
+        model (str, optional): Modelo (padrão: o configurado)
+        concurrency (int): Chamadas simultâneas ao modelo
+        requests_per_minute (float): Limite de requisições por minuto (0 = sem limite)
+        prompt_cache (bool): Cache de prefixo do prompt ativo
+        extraction_s (float): Duração da extração, somada à previsão
+
+    Returns:
+        dict: metodos, tokens_entrada, tokens_saida, duracao_s, custo_usd, provedor, modelo,
+        chamadas_historico (0 = valores padrão) e o modelo de latência usado
+    """
+    if provider is None:
+        provider, model = configured_model()
+    intercept, slope, output_tokens, samples = history.model(provider, model)
+    price_in, price_out, price_read, price_write = pricing(provider, model)
+
+    latencies = []
+    input_tokens = 0
+    cost = 0.0
+    cached_files = set()
+    for file_id, cacheable, total in prompts:
+        latencies.append(intercept + slope * total)
+        input_tokens += total
+        if prompt_cache and provider == 'anthropic' and cacheable >= PROMPT_CACHE_MIN_TOKENS:
+            cost += cacheable * (price_read if file_id in cached_files else price_write)
+            cost += (total - cacheable) * price_in
+            cached_files.add(file_id)
+        else:
+            cost += total * price_in
+    cost += len(prompts) * output_tokens * price_out
+
+    duration = 0.0
+    if latencies:
+        duration = max(sum(latencies) / max(concurrency, 1), max(latencies))
+        if requests_per_minute:
+            duration = max(duration, len(latencies) * 60.0 / requests_per_minute)
+
+    return {
+        'provedor': provider,
+        'modelo': model,
+        'metodos': len(prompts),
+        'tokens_entrada': input_tokens,
+        'tokens_saida': round(len(prompts) * output_tokens),
+        'concorrencia': concurrency,
+        'requisicoes_por_minuto': requests_per_minute,
+        'duracao_extracao_s': round(extraction_s, 2),
+        'duracao_s': round(extraction_s + duration, 1),
+        'custo_usd': round(cost / 1e6, 4),
+        'chamadas_historico': samples,
+        'latencia': {'segundos_fixos': round(intercept, 3), 'segundos_por_mil_tokens': round(slope * 1000, 4)}
+    }
+
+
+def compare(estimate, duration_s, samples, history=None):
+    """
+    Compara a previsão com a análise executada e acrescenta as chamadas ao histórico.
+
+    Args:
+        estimate (dict, optional): Previsão feita na pré-análise (estimate_run)
+        duration_s (float): Duração real da análise
+        samples (list): (tokens de entrada, tokens de saída, segundos) de cada chamada feita
+        history (LatencyHistory, optional): Histórico que recebe as chamadas
+
+    Returns:
+        dict: 'prevista', 'real' e o erro relativo da duração e do custo (None sem previsão)
+    """
+    provider, model = (estimate['provedor'], estimate['modelo']) if estimate else configured_model()
+    price_in, price_out = pricing(provider, model)[:2]
+    real = {
+        'metodos': len(samples),
+        'tokens_entrada': sum(sample[0] for sample in samples),
+        'tokens_saida': sum(sample[1] for sample in samples),
+        'duracao_s': round(duration_s, 1),
+        # Sem os descontos do cache de prompt, que só o provedor conhece ao certo
+        'custo_usd': round(sum(sample[0] * price_in + sample[1] * price_out for sample in samples) / 1e6, 4)
+    }
+    if history is not None:
+        history.record(provider, model, samples)
+    if not estimate:
+        return {'prevista': None, 'real': real}
+
+    def error(key):
+        return round((real[key] - estimate[key]) / estimate[key], 3) if estimate[key] else None
+
+    result = {'prevista': estimate, 'real': real,
+              'erro_duracao': error('duracao_s'), 'erro_custo': error('custo_usd')}
+    logging.info(f"Previsão x real: {estimate['duracao_s']}s x {real['duracao_s']}s, "
+                 f"US$ {estimate['custo_usd']} x US$ {real['custo_usd']}")
+    return result
+
@@ -0,0 +1,199 @@
+import re
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+# Sinais estáticos de risco: (padrão, peso). Calculados sem chamar o modelo de IA.
+RISK_SIGNALS = {
+    # CNPJ tratado como número: tipos numéricos e conversões
+    'tipo_numerico': (re.compile(
+        r'\b(?:int|long|Long|Integer|BigInteger|BigDecimal|decimal|double|float|Int64|Int32|UInt64|'
+        r'int64_t|uint64_t|unsigned|bigint|number|parseInt|parseLong|parseFloat|atoi|atol|atoll|'
+        r'strtol|strtoll|strtoull|Convert\.ToInt64|Long\.valueOf|Number)\b'), 3.0),
+    # Aritmética típica de dígito verificador
+    'aritmetica': (re.compile(
+        r'%\s*11|\bmod\b|\*\s*peso|\bpesos?\b|d[ií]gito|verificador|\bsoma\b|\bsum\b|- ?\'0\'|-\s*48\b'), 2.5),
+    # Colunas de banco de dados com tipo numérico ou tamanho fixo
+    'schema_banco': (re.compile(
+        r'\b(?:CREATE\s+TABLE|ALTER\s+TABLE|NUMERIC\s*\(\s*14|DECIMAL\s*\(\s*14|BIGINT|CHAR\s*\(\s*14\s*\)|'
+        r'VARCHAR\s*\(\s*1[48]\s*\)|@Column|\[Column|HasMaxLength|MaxLength)', re.IGNORECASE), 2.0),
+    # Chamadas a sistemas externos
+    'api_externa': (re.compile(
+        r'\b(?:requests\.|HttpClient|RestTemplate|WebClient|fetch\s*\(|axios|http\.(?:Get|Post|NewRequest)|'
+        r'urllib|curl_easy|SoapClient|wsdl|receita|sefaz)', re.IGNORECASE), 1.5),
+}
+
+# Peso de cada chamador (fan-in) e teto para não dominar os demais sinais
+FAN_IN_WEIGHT = 0.5
+FAN_IN_CAP = 10
+
+_CALL_PATTERN = re.compile(r'(\w+)\s*\(')
+
+
+def estimate_tokens(text):
+    """Estimativa rápida de tokens (aproximadamente 4 caracteres por token)."""
+    return max(1, len(text) // 4)
+
+
+def called_names(code):
+    """Nomes chamados em um trecho de código (cada nome uma vez), usados no fan-in."""
+    return set(_CALL_PATTERN.findall(code))
+
+
+def static_risk(code):
+    """
+    Pontuação dos sinais estáticos de risco de um trecho de código.
+
+    Calculada uma única vez, na extração, para que o texto do método não
+    precise ser mantido em memória até a priorização.
+
+    Args:
+        code (str): Código do método
+
+    Returns:
+        float: Soma ponderada dos sinais encontrados
+    """
+    score = 0.0
+    for pattern, weight in RISK_SIGNALS.values():
+        hits = len(pattern.findall(code))
+        if hits:
+            # Retorno decrescente: a presença do sinal vale mais que a repetição
+            score += weight * (1 + min(hits, 5) / 5)
+    return score
+
+
+def score_candidates(candidates, callers):
+    """
+    Calcula o risco estático de cada método pendente de análise.
+
+    O risco combina sinais baratos (tipos numéricos, aritmética de dígito
+    verificador, colunas de banco, chamadas externas), já pontuados na
+    extração, com o fan-in do método, isto é, quantos outros métodos com
+    CNPJ o chamam.
+
+    Args:
+        candidates (list): Métodos pendentes (MethodCandidate de GenericCNPJAnalyzer.pending)
+        callers (Counter): Quantos métodos pendentes chamam cada nome (ver called_names)
+
+    Returns:
+        list: Pontuação de cada método, na mesma ordem
+    """
+    scores = []
+    for candidate in candidates:
+        score = candidate.static_score
+        fan_in = callers.get(candidate.name, 0) - 1 if candidate.name != 'unknown' else 0
+        score += FAN_IN_WEIGHT * min(max(fan_in, 0), FAN_IN_CAP)
+        score += 0.1 * min(len(candidate.dependencies), 10)
+        scores.append(round(score, 2))
+    return scores
+
+
+class PriorityExecutor:
+    """
+    Pool de execução que despacha primeiro as tarefas de maior prioridade.
+
+    Usado na frente das chamadas ao modelo de IA para que os métodos de maior
+    risco sejam analisados primeiro. Opcionalmente interrompe o despacho ao
+    atingir um orçamento de tempo, de quantidade de métodos (top-K) ou de
+    tokens estimados; as tarefas restantes são canceladas.
+
+    Attributes:
+        dispatched (int): Tarefas iniciadas
+        skipped (int): Tarefas canceladas por orçamento esgotado
+    """
+
+    def __init__(self, max_workers=4, time_budget=None, max_items=None, token_budget=None):
+        self.max_workers = max_workers
+        self.time_budget = time_budget
+        self.max_items = max_items
+        self.token_budget = token_budget
+        self.dispatched = 0
+        self.skipped = 0
+        self._tokens_used = 0
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._shutdown = False
+        self._started_at = None  # Início do orçamento de tempo: primeira tarefa submetida
+
+    def submit(self, fn, *args, **kwargs):
+        return self.submit_with_priority(0.0, 0, fn, *args, **kwargs)
+
+    def submit_with_priority(self, priority, cost, fn, *args, **kwargs):
+        """
+        Agenda uma tarefa com prioridade (maior = antes) e custo estimado em tokens.
+
+        Returns:
+            concurrent.futures.Future: Resultado da tarefa
+        """
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("PriorityExecutor já foi encerrado")
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            heapq.heappush(self._heap, (-priority, next(self._counter), future, cost, fn, args, kwargs))
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker, daemon=True,
+                                          name=f"prioridade-{len(self._threads)}")
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def _budget_exhausted(self, cost):
+        if self.max_items is not None and self.dispatched >= self.max_items:
+            return True
+        if self.time_budget is not None and time.monotonic() - self._started_at >= self.time_budget:
+            return True
+        if self.token_budget is not None and self._tokens_used + cost > self.token_budget:
+            return True
+        return False
+
+    @property
+    def exhausted(self):
+        """Se o orçamento já acabou: as próximas tarefas seriam canceladas sem executar."""
+        with self._cond:
+            return self._started_at is not None and self._budget_exhausted(0)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._shutdown:
+                    self._cond.wait()
+                if not self._heap:
+                    return
+                _, _, future, cost, fn, args, kwargs = heapq.heappop(self._heap)
+                if self._budget_exhausted(cost):
+                    self.skipped += 1
+                    future.cancel()
+                    future.set_running_or_notify_cancel()  # Notifica quem aguarda com wait()
+                    continue
+                if not future.set_running_or_notify_cancel():
+                    continue
+                self.dispatched += 1
+                self._tokens_used += cost
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        if self.skipped:
+            logging.info(f"Orçamento esgotado: {self.skipped} métodos de menor risco não foram analisados")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(wait=True)
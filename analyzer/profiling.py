@@ -0,0 +1,176 @@
+"""
+Perfil de desempenho de uma análise.
+
+Um RunProfiler associado a um GenericCNPJAnalyzer (atributo profiler)
+registra, sem alterar os resultados:
+
+- as fases da análise (extração, chamadas ao modelo, propagação) sob
+  cProfile, com um perfil por thread que são somados ao final;
+- o tempo de cada arquivo na extração;
+- o tempo de cada padrão regex da linguagem (ex.: patterns['java']['method'])
+  em cada arquivo, para achar o padrão e o arquivo que mais custaram.
+
+Os artefatos são gravados ao lado do relatório: o perfil do cProfile
+(.prof, legível com pstats ou snakeviz), a tabela dos arquivos mais lentos
+(CSV) e um JSON com as fases e os tempos por padrão e linguagem.
+"""
+import cProfile
+import csv
+import json
+import logging
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RunProfiler:
+    """
+    Coleta o perfil de uma análise.
+
+    Args:
+        top_n (int): Arquivos listados na tabela dos mais lentos
+    """
+
+    def __init__(self, top_n=20):
+        self.top_n = top_n
+        self.phases = {}  # Fase -> segundos
+        self.files = {}  # Arquivo -> {'linguagem', 'tamanho', 'segundos', 'padroes': {padrão: segundos}}
+        self.patterns = {}  # (linguagem, padrão) -> [segundos, execuções]
+        self._profiles = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """Mede uma fase da análise e a executa sob cProfile na thread atual."""
+        local = self._local
+        depth = getattr(local, 'depth', 0)
+        if depth == 0:
+            if not hasattr(local, 'profile'):
+                local.profile = cProfile.Profile()
+                with self._lock:
+                    self._profiles.append(local.profile)
+            local.profile.enable()
+        local.depth = depth + 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            local.depth = depth
+            if depth == 0:
+                local.profile.disable()
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def file(self, path, language, size):
+        """Mede a extração de um arquivo; os padrões medidos dentro do bloco são atribuídos a ele."""
+        entry = {'linguagem': language, 'tamanho': size, 'segundos': 0.0, 'padroes': {}}
+        self._local.file = entry
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry['segundos'] = time.perf_counter() - started
+            self._local.file = None
+            with self._lock:
+                self.files[str(path)] = entry
+
+    @contextmanager
+    def pattern(self, name):
+        """Mede a execução de um padrão regex no arquivo atual."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            entry = getattr(self._local, 'file', None)
+            if entry is not None:
+                entry['padroes'][name] = entry['padroes'].get(name, 0.0) + elapsed
+                key = (entry['linguagem'], name)
+                with self._lock:
+                    totals = self.patterns.setdefault(key, [0.0, 0])
+                    totals[0] += elapsed
+                    totals[1] += 1
+
+    def slowest_files(self):
+        """
+        Arquivos mais lentos na extração.
+
+        Returns:
+            list: Até top_n dicionários (arquivo, linguagem, tamanho_bytes, segundos,
+            padrao_mais_lento, segundos_padrao), do mais lento para o mais rápido
+        """
+        with self._lock:
+            ranked = sorted(self.files.items(), key=lambda item: item[1]['segundos'], reverse=True)[:self.top_n]
+        rows = []
+        for path, entry in ranked:
+            slowest = max(entry['padroes'].items(), key=lambda item: item[1], default=(None, 0.0))
+            rows.append({
+                'arquivo': path,
+                'linguagem': entry['linguagem'],
+                'tamanho_bytes': entry['tamanho'],
+                'segundos': round(entry['segundos'], 4),
+                'padrao_mais_lento': slowest[0],
+                'segundos_padrao': round(slowest[1], 4)
+            })
+        return rows
+
+    def summary(self):
+        """
+        Resumo do perfil: fases, padrões por linguagem e arquivos mais lentos.
+
+        Returns:
+            dict: 'fases', 'padroes' e 'arquivos_mais_lentos'
+        """
+        with self._lock:
+            patterns = sorted(self.patterns.items(), key=lambda item: item[1][0], reverse=True)
+            phases = {name: round(seconds, 3) for name, seconds in self.phases.items()}
+        return {
+            'fases': phases,
+            'padroes': [{'linguagem': language, 'padrao': name, 'segundos': round(seconds, 4), 'execucoes': runs}
+                        for (language, name), (seconds, runs) in patterns],
+            'arquivos_mais_lentos': self.slowest_files()
+        }
+
+    def write(self, basename):
+        """
+        Grava os artefatos do perfil.
+
+        Args:
+            basename (str): Caminho do relatório sem extensão
+
+        Returns:
+            dict: Artefato ('prof', 'arquivos', 'resumo') -> caminho
+        """
+        paths = {
+            'prof': f"{basename}_perfil.prof",
+            'arquivos': f"{basename}_perfil_arquivos.csv",
+            'resumo': f"{basename}_perfil.json"
+        }
+        with self._lock:
+            profiles = [profile for profile in self._profiles if profile.getstats()]
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(paths['prof'])
+        else:
+            del paths['prof']
+
+        summary = self.summary()
+        with open(paths['arquivos'], 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['arquivo', 'linguagem', 'tamanho_bytes', 'segundos',
+                                                   'padrao_mais_lento', 'segundos_padrao'])
+            writer.writeheader()
+            writer.writerows(summary['arquivos_mais_lentos'])
+        with open(paths['resumo'], 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        logging.info(f"Perfil da análise: fases {summary['fases']}")
+        for row in summary['padroes'][:5]:
+            logging.info(f"Padrão {row['linguagem']}/{row['padrao']}: {row['segundos']}s em {row['execucoes']} execuções")
+        logging.info(f"Perfil gravado em: {', '.join(paths.values())}")
+        return paths
@@ -0,0 +1,227 @@
+"""
+Extração de funções e métodos Python pela árvore sintática.
+
+Uma única análise do arquivo com ast.parse fornece o trecho exato de cada
+função ou método (com decoradores, "async def" e assinaturas em várias
+linhas), o nome qualificado (Classe.metodo) e os nomes chamados no corpo,
+em vez de procurar "def" linha a linha e deduzir o fim do corpo pela
+indentação. Arquivos que não compilam na versão do Python em execução (ex.:
+código Python 2 ou com erro de sintaxe) são lidos com tokenize, que não
+exige código válido e acompanha os blocos pelos tokens INDENT e DEDENT.
+
+Funções definidas dentro de outras funções fazem parte do trecho da
+função externa (e suas chamadas também); classes aninhadas entram no nome
+qualificado.
+"""
+import ast
+import gc
+import io
+import keyword
+import logging
+import re
+import tokenize
+from itertools import accumulate
+
+# Campos de um comando que contêm outros comandos (if, for, while, try, with, match)
+_BLOCK_FIELDS = ('body', 'orelse', 'finalbody', 'handlers', 'cases')
+
+# Nome seguido de "(" que não é a declaração de uma função ou classe aninhada
+_CALL_PATTERN = re.compile(r'(?<!def )(?<!class )\b(\w+)\s*\(')
+
+
+class PythonFunction:
+    """
+    Função ou método encontrado em um arquivo Python.
+
+    Attributes:
+        name (str): Nome da função
+        qualified_name (str): Nome com as classes que a contêm (Classe.metodo)
+        start (int): Deslocamento do início (primeiro decorador ou "def") no conteúdo
+        end (int): Deslocamento do fim da última linha do corpo
+        start_line (int): Linha inicial (1 = primeira)
+        calls (list): Nomes chamados no corpo, cada um uma vez, na ordem em que aparecem
+    """
+
+    __slots__ = ('name', 'qualified_name', 'start', 'end', 'start_line', 'calls')
+
+    def __init__(self, name, qualified_name, start, end, start_line, calls):
+        self.name = name
+        self.qualified_name = qualified_name
+        self.start = start
+        self.end = end
+        self.start_line = start_line
+        self.calls = calls
+
+
+def extract_functions(content, line_starts=None):
+    """
+    Funções e métodos de um arquivo Python, na ordem em que aparecem.
+
+    Args:
+        content (str): Conteúdo do arquivo
+        line_starts (list, optional): Início de cada linha (SourceIndex.line_starts), se já calculado
+
+    Returns:
+        list: PythonFunction de cada função de módulo ou método de classe
+    """
+    # Início de cada linha (as linhas do ast são contadas por '\n')
+    if line_starts is None:
+        line_starts = [0, *accumulate(len(line) + 1 for line in content.split('\n'))]
+    # A árvore de um módulo grande tem milhões de nós, sem ciclos: o coletor de ciclos, que
+    # seria disparado várias vezes percorrendo a árvore inteira, fica parado até ela ser liberada
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError, RecursionError, MemoryError) as e:
+            logging.debug(f"Código Python inválido ({type(e).__name__}); extraindo funções com tokenize")
+            return _from_tokens(content, line_starts)
+        functions = _from_tree(tree, content, line_starts)
+        del tree
+        return functions
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def _span(line_starts, content_size, first_line, last_line):
+    """Deslocamentos do início da primeira linha ao fim da última (sem a quebra de linha)."""
+    end = line_starts[last_line] - 1 if last_line < len(line_starts) - 1 else content_size
+    return line_starts[first_line - 1], min(end, content_size)
+
+
+def _from_tree(tree, content, line_starts):
+    functions = []
+    content_size = len(content)
+    stack = [(node, ()) for node in reversed(tree.body)]
+    while stack:
+        node, scope = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            first_line = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            start, end = _span(line_starts, content_size, first_line, node.end_lineno)
+            functions.append(PythonFunction(node.name, '.'.join(scope + (node.name,)), start, end, first_line,
+                                            _calls(content, line_starts, node, end)))
+            continue
+        if isinstance(node, ast.ClassDef):
+            scope = scope + (node.name,)
+        children = []
+        for field in _BLOCK_FIELDS:
+            for child in getattr(node, field, None) or ():
+                # Blocos de match guardam os comandos em cada case
+                children.extend(child.body if isinstance(child, getattr(ast, 'match_case', ())) else (child,))
+        stack.extend((child, scope) for child in reversed(children))
+    return functions
+
+
+def _calls(content, line_starts, function, end):
+    """
+    Nomes chamados no corpo de uma função (obj.metodo() -> metodo), sem decoradores e assinatura.
+
+    O corpo é delimitado pela árvore, mas as chamadas são procuradas por
+    regex no texto: percorrer os nós de cada corpo custa mais que a própria
+    análise do arquivo.
+    """
+    body_line = function.body[0].lineno
+    calls = dict.fromkeys(name for name in _CALL_PATTERN.findall(content, line_starts[body_line - 1], end)
+                          if not keyword.iskeyword(name))
+    if body_line == function.lineno:
+        calls.pop(function.name, None)  # Corpo na linha do "def": def f(): return g()
+    return list(calls)
+
+
+class _Block:
+    """Função ou classe aberta durante a leitura por tokens."""
+
+    __slots__ = ('kind', 'name', 'depth', 'first_line', 'calls')
+
+    def __init__(self, kind, name, depth, first_line):
+        self.kind = kind
+        self.name = name
+        self.depth = depth  # Indentação do corpo
+        self.first_line = first_line
+        self.calls = {}
+
+
+def _from_tokens(content, line_starts):
+    """Extração por tokens, para arquivos que o ast não aceita; lê até o primeiro erro de tokenização."""
+    functions = []
+    blocks = []
+    depth = 0
+    last_line = 0  # Última linha lógica completa
+    statement_start = True
+    decorator_line = None
+    header = None  # (tipo, linha) de um "def" ou "class" aguardando o nome
+    signature = None  # Bloco com o cabeçalho ainda em leitura (assinaturas podem ter várias linhas)
+    awaiting_body = None  # Bloco com o cabeçalho completo, aguardando o INDENT do corpo
+    previous_name = None
+
+    def close(block, end_line):
+        if block.kind != 'def' or any(outer.kind == 'def' for outer in blocks):
+            return  # Classe, ou função aninhada (faz parte da função externa)
+        qualified = '.'.join([outer.name for outer in blocks] + [block.name])
+        start, end = _span(line_starts, len(content), block.first_line, max(end_line, block.first_line))
+        functions.append(PythonFunction(block.name, qualified, start, end, block.first_line, list(block.calls)))
+
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(content).readline):
+            kind, text, row = token.type, token.string, token.start[0]
+            if kind in (tokenize.NL, tokenize.COMMENT):
+                continue
+            if awaiting_body is not None:
+                if kind == tokenize.INDENT:
+                    awaiting_body.depth = depth + 1
+                    blocks.append(awaiting_body)
+                else:
+                    close(awaiting_body, last_line)  # Corpo na mesma linha: def f(): return x
+                awaiting_body = None
+            if kind == tokenize.INDENT:
+                depth += 1
+                statement_start = True
+                continue
+            if kind == tokenize.DEDENT:
+                depth -= 1
+                while blocks and blocks[-1].depth > depth:
+                    close(blocks.pop(), last_line)
+                statement_start = True
+                continue
+            if kind == tokenize.NEWLINE:
+                last_line = token.end[0]
+                awaiting_body, signature = signature, None
+                statement_start = True
+                previous_name = None
+                continue
+            if kind == tokenize.ENDMARKER:
+                break
+            if header is not None:
+                if kind == tokenize.NAME:
+                    signature = _Block(header[0], text, None, decorator_line or header[1])
+                decorator_line = header = None
+                continue
+            if statement_start:
+                statement_start = False
+                if kind == tokenize.OP and text == '@':
+                    decorator_line = decorator_line or row
+                elif kind == tokenize.NAME and text == 'async':
+                    statement_start = True
+                    continue
+                elif kind == tokenize.NAME and text in ('def', 'class'):
+                    header = ('def' if text == 'def' else 'class', row)
+                    continue
+                else:
+                    decorator_line = None
+            if kind == tokenize.OP and text == '(' and previous_name is not None:
+                # Chamadas vão para a função mais externa (ou para a que está no cabeçalho: def f(): g())
+                outer = next((block for block in blocks if block.kind == 'def'), None)
+                if outer is None and signature is not None and signature.kind == 'def':
+                    outer = signature
+                if outer is not None:
+                    outer.calls[previous_name] = None
+            previous_name = text if kind == tokenize.NAME and not keyword.iskeyword(text) else None
+    except (tokenize.TokenError, SyntaxError) as e:
+        logging.debug(f"Leitura por tokens interrompida na linha {last_line + 1}: {str(e)}")
+    while blocks:
+        block = blocks.pop()
+        close(block, last_line)
+    functions.sort(key=lambda function: function.start)
+    return functions
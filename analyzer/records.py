@@ -0,0 +1,276 @@
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+
+from analyzer.sources import open_source
+
+# Separador usado quando um candidato é formado por vários trechos do arquivo
+SECTION_SEPARATOR = "\n\n[...]\n\n"
+
+
+def content_digest(text):
+    """Hash compacto (16 bytes) do texto de um método."""
+    return hashlib.blake2b(text.encode('utf-8', errors='ignore'), digest_size=16).digest()
+
+
+class FileTable:
+    """
+    Tabela de arquivos analisados, indexada por um id inteiro.
+
+    Os registros de métodos guardam apenas o id do arquivo e os deslocamentos
+    do trecho; o texto é relido da origem sob demanda (com um pequeno cache LRU
+    de arquivos decodificados) somente quando o prompt é montado. Arquivos de
+    origens compactadas ou git são relidos pela mesma origem, sem extração.
+    """
+
+    def __init__(self, cache_size=32):
+        self.cache_size = cache_size
+        self._paths = []
+        self._ids = {}
+        self._origins = []  # (location, ref) das origens não lidas diretamente do disco
+        self._origin_ids = {}
+        self._file_origins = array('i')  # -1 = arquivo lido diretamente do disco
+        self._context_ends = array('I')  # Fim do início do arquivo repetido nos prompts dos seus métodos
+        self._cache = OrderedDict()
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def add(self, path, origin=None):
+        """
+        Registra um arquivo e retorna seu id (o mesmo id para o mesmo caminho).
+
+        Args:
+            path (str): Caminho do arquivo, como aparece nos resultados
+            origin (tuple, optional): (location, ref) da origem compactada ou git do arquivo
+
+        Returns:
+            int: Id do arquivo
+        """
+        file_id = self._ids.get(path)
+        if file_id is None:
+            origin_id = -1
+            if origin is not None:
+                origin_id = self._origin_ids.setdefault(origin, len(self._origins))
+                if origin_id == len(self._origins):
+                    self._origins.append(origin)
+            file_id = len(self._paths)
+            self._ids[path] = file_id
+            self._paths.append(path)
+            self._file_origins.append(origin_id)
+            self._context_ends.append(0)
+        return file_id
+
+    def path(self, file_id):
+        return self._paths[file_id]
+
+    def __len__(self):
+        return len(self._paths)
+
+    def set_context(self, file_id, end):
+        """Registra o fim do trecho inicial do arquivo (imports, cabeçalho da classe) usado nos prompts."""
+        self._context_ends[file_id] = end
+
+    def context_size(self, file_id):
+        """Tamanho, em caracteres, do trecho inicial do arquivo usado nos prompts."""
+        return self._context_ends[file_id]
+
+    def context(self, file_id):
+        """
+        Trecho inicial do arquivo, comum aos prompts de todos os seus métodos.
+
+        Returns:
+            str: O trecho, relido sob demanda, ou vazio se não registrado
+        """
+        end = self._context_ends[file_id]
+        return self.read(file_id)[:end] if end else ""
+
+    def remember(self, file_id, content):
+        """Guarda o conteúdo de um arquivo recém-lido no cache LRU."""
+        with self._lock:
+            self._remember(file_id, content)
+
+    def _remember(self, file_id, content):
+        self._cache[file_id] = content
+        self._cache.move_to_end(file_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def read(self, file_id):
+        """
+        Retorna o conteúdo de um arquivo, relendo-o da origem se não estiver em cache.
+
+        Args:
+            file_id (int): Id do arquivo
+
+        Returns:
+            str: Conteúdo decodificado do arquivo
+        """
+        with self._lock:
+            content = self._cache.get(file_id)
+            if content is not None:
+                self._cache.move_to_end(file_id)
+                return content
+            path = self._paths[file_id]
+            origin_id = self._file_origins[file_id]
+            if origin_id < 0:
+                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                    content = f.read()
+            else:
+                source = self._sources.get(origin_id)
+                if source is None:
+                    source = self._sources[origin_id] = open_source(*self._origins[origin_id])
+                content = source.read_text(path)
+            self._remember(file_id, content)
+            return content
+
+    def close(self):
+        """Fecha as origens abertas para releitura e esvazia o cache."""
+        with self._lock:
+            self._cache.clear()
+            for source in self._sources.values():
+                source.close()
+            self._sources.clear()
+
+
+class MethodCandidate:
+    """
+    Registro compacto de um método com CNPJ pendente de análise.
+
+    Não guarda o texto do método: apenas o id do arquivo, os trechos
+    (deslocamentos de início e fim no conteúdo decodificado) e um hash do
+    texto, usado para detectar alterações entre a extração e a releitura.
+    """
+
+    __slots__ = ('file_id', 'spans', 'start_line', 'line_count', 'language', 'name',
+                 'digest', 'dependencies', 'static_score', 'risk_score', 'stratum', 'attempts')
+
+    def __init__(self, file_id, spans, start_line, line_count, language, name, digest,
+                 dependencies=(), static_score=0.0):
+        self.file_id = file_id
+        self.spans = spans
+        self.start_line = start_line
+        self.line_count = line_count
+        self.language = language
+        self.name = name
+        self.digest = digest
+        self.dependencies = dependencies  # Índices na SymbolTable
+        self.static_score = static_score
+        self.risk_score = None
+        self.stratum = None
+        self.attempts = 0  # Novas tentativas após resposta inválida do modelo
+
+    @property
+    def size(self):
+        """Quantidade de caracteres do método."""
+        return sum(end - start for start, end in self.spans)
+
+    def text(self, files):
+        """
+        Relê o texto do método a partir da tabela de arquivos.
+
+        Args:
+            files (FileTable): Tabela de arquivos da análise
+
+        Returns:
+            str: Texto do método
+        """
+        content = files.read(self.file_id)
+        text = SECTION_SEPARATOR.join(content[start:end] for start, end in self.spans)
+        if content_digest(text) != self.digest:
+            logging.warning(f"Arquivo alterado desde a extração: {files.path(self.file_id)}")
+        return text
+
+
+class SymbolTable:
+    """
+    Índice compacto de todos os métodos encontrados, usado na análise de dependências.
+
+    Os atributos numéricos ficam em arrays contíguos e os nomes em uma lista,
+    em vez de um dicionário por método com o texto da assinatura. Os registros
+    nunca são sobrescritos: um método redefinido em outro arquivo ganha um novo
+    registro, e as dependências já extraídas continuam apontando para o anterior.
+    Os nomes chamados por cada método (usados no grafo de chamadas) também
+    ficam em arrays: ids de nomes internados, com o início de cada registro.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.file_ids = array('I')
+        self.offsets = array('Q')
+        self.lines = array('I')
+        self.languages = []
+        self._latest = {}  # Nome completo -> registro mais recente, na ordem da primeira ocorrência
+        self.call_names = []  # Nomes chamados, cada um uma vez
+        self._call_ids = {}
+        self._call_starts = array('I', [0])
+        self._calls = array('I')
+
+    def add(self, full_name, file_id, offset, line, language, calls=()):
+        """Registra um método (e os nomes que ele chama) e retorna o índice do registro."""
+        idx = len(self.names)
+        self.names.append(full_name)
+        self.file_ids.append(file_id)
+        self.offsets.append(offset)
+        self.lines.append(line)
+        self.languages.append(language)
+        self._latest[full_name] = idx
+        for call in set(calls):
+            call_id = self._call_ids.get(call)
+            if call_id is None:
+                call_id = self._call_ids[call] = len(self.call_names)
+                self.call_names.append(call)
+            self._calls.append(call_id)
+        self._call_starts.append(len(self._calls))
+        return idx
+
+    def remove_files(self, file_ids):
+        """
+        Remove os registros dos métodos dos arquivos informados (ex.: alterados ou apagados no modo watch).
+
+        A tabela é reconstruída com os registros restantes, na mesma ordem:
+        os índices mudam, e os índices obtidos antes (dependências dos métodos
+        pendentes) deixam de valer. Um nome também definido em outro arquivo
+        volta a apontar para o registro restante mais recente.
+
+        Args:
+            file_ids (set): Ids dos arquivos na FileTable
+
+        Returns:
+            int: Registros removidos
+        """
+        keep = [idx for idx in range(len(self.names)) if self.file_ids[idx] not in file_ids]
+        removed = len(self.names) - len(keep)
+        if not removed:
+            return 0
+        records = [(self.names[idx], self.file_ids[idx], self.offsets[idx], self.lines[idx], self.languages[idx],
+                    [self.call_names[call_id] for call_id in self.calls(idx)]) for idx in keep]
+        self.__init__()
+        for record in records:
+            self.add(*record)
+        return removed
+
+    def calls(self, idx):
+        """Ids (em call_names) dos nomes chamados pelo registro idx."""
+        return self._calls[self._call_starts[idx]:self._call_starts[idx + 1]]
+
+    def __len__(self):
+        return len(self._latest)
+
+    def __contains__(self, full_name):
+        return full_name in self._latest
+
+    def __iter__(self):
+        return iter(self._latest)
+
+    def index_of(self, full_name):
+        return self._latest.get(full_name)
+
+    def matching(self, call):
+        """Registros atuais dos métodos cujo nome completo contém o nome chamado."""
+        return [idx for full_name, idx in self._latest.items() if call in full_name]
+
+    def describe(self, idx, files):
+        """Descrição legível de um método: 'Classe.metodo (arquivo:linha)'."""
+        return f"{self.names[idx]} ({files.path(self.file_ids[idx])}:{self.lines[idx]})"
@@ -0,0 +1,283 @@
+"""
+Execução dos padrões regex da extração com limite de tempo.
+
+Alguns padrões de método (ex.: `[^}]*(?:cnpj|CNPJ)[^}]*\\}` com DOTALL)
+têm custo superlinear quando o corpo do método não fecha: um bundle
+JavaScript minificado ou um arquivo C# gerado pode prender a extração por
+minutos, e o módulo re não pode ser interrompido no meio de uma busca.
+
+O RegexGuard executa esses padrões em processos filhos reaproveitáveis e
+aguarda a resposta com prazo: por padrão (pattern_timeout) e por arquivo
+(file_timeout, somando todos os padrões do arquivo). Se o prazo vence, o
+processo é encerrado e RegexTimeout é levantada; o analisador então trata
+o arquivo pelo caminho de trechos em torno das menções a CNPJ. Arquivos
+menores que min_bytes são processados no próprio processo, sem o custo de
+comunicação.
+"""
+import atexit
+import logging
+import multiprocessing
+import re
+import threading
+import time
+
+from config import REGEX_PATTERN_TIMEOUT, REGEX_FILE_TIMEOUT, REGEX_GUARD_MIN_BYTES
+
+
+class RegexTimeout(Exception):
+    """
+    Prazo de um padrão ou do arquivo esgotado.
+
+    Attributes:
+        pattern_name (str): Padrão em execução quando o prazo venceu
+        elapsed (float): Segundos gastos no padrão
+    """
+
+    def __init__(self, pattern_name, elapsed):
+        super().__init__(f"Padrão '{pattern_name}' excedeu o prazo ({elapsed:.1f}s)")
+        self.pattern_name = pattern_name
+        self.elapsed = elapsed
+
+
+class GuardedMatch:
+    """
+    Resultado de um padrão executado no processo filho.
+
+    Oferece a parte da interface de re.Match usada na extração: group,
+    groups, start, end e span.
+    """
+
+    __slots__ = ('string', 'regs')
+
+    def __init__(self, string, regs):
+        self.string = string
+        self.regs = regs
+
+    def group(self, index=0):
+        start, end = self.regs[index]
+        return self.string[start:end] if start >= 0 else None
+
+    def groups(self):
+        return tuple(self.group(index) for index in range(1, len(self.regs)))
+
+    def start(self, index=0):
+        return self.regs[index][0]
+
+    def end(self, index=0):
+        return self.regs[index][1]
+
+    def span(self, index=0):
+        return self.regs[index]
+
+
+def _serve(connection):
+    """Laço do processo filho: guarda o arquivo atual e executa os padrões recebidos."""
+    content = ''
+    compiled = {}
+    while True:
+        try:
+            message = connection.recv()
+        except (EOFError, OSError):
+            return  # Processo principal encerrado
+        if message[0] == 'conteudo':
+            content = message[1]
+            continue
+        op, pattern, flags = message
+        try:
+            regex = compiled.get((pattern, flags))
+            if regex is None:
+                regex = compiled[(pattern, flags)] = re.compile(pattern, flags)
+            if op == 'search':
+                match = regex.search(content)
+                result = ('ok', match.regs if match else None)
+            else:
+                result = ('ok', [match.regs for match in regex.finditer(content)])
+        except re.error as e:
+            result = ('erro', str(e))
+        connection.send(result)
+
+
+class _Worker:
+    """Processo filho e a ponta da conexão usada pelo processo principal."""
+
+    def __init__(self, context):
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), name='regex-guard', daemon=True)
+        self.process.start()
+        child.close()
+
+    def close(self):
+        self.connection.close()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+
+class RegexGuard:
+    """
+    Executa padrões regex com prazo por padrão e por arquivo.
+
+    Cada thread trata um arquivo por vez (start_file/finish_file) e usa um
+    processo filho do conjunto de ociosos enquanto o arquivo é processado;
+    o conteúdo do arquivo é enviado ao processo uma vez por arquivo.
+
+    Args:
+        pattern_timeout (float): Prazo de cada padrão em segundos
+        file_timeout (float): Prazo somado de todos os padrões de um arquivo (0 = sem limite e sem processo filho)
+        min_bytes (int): Arquivos menores que isso são processados no próprio processo
+    """
+
+    def __init__(self, pattern_timeout=REGEX_PATTERN_TIMEOUT, file_timeout=REGEX_FILE_TIMEOUT,
+                 min_bytes=REGEX_GUARD_MIN_BYTES):
+        self.pattern_timeout = pattern_timeout
+        self.file_timeout = file_timeout
+        self.min_bytes = min_bytes
+        self.timeouts = 0  # Padrões interrompidos por prazo
+        self._context = multiprocessing.get_context('spawn')  # Não herda threads nem travas do processo principal
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.file_timeout > 0
+
+    def start_file(self, content):
+        """Inicia o prazo de um arquivo na thread atual."""
+        local = self._local
+        local.content = content
+        local.deadline = time.monotonic() + self.file_timeout
+        local.guarded = self.enabled and len(content) >= self.min_bytes
+        local.worker = None
+        local.sent = False
+
+    def finish_file(self):
+        """Encerra o arquivo da thread atual e devolve o processo filho ao conjunto de ociosos."""
+        local = self._local
+        worker, local.worker, local.content = getattr(local, 'worker', None), None, None
+        if worker is not None:
+            with self._lock:
+                self._idle.append(worker)
+
+    def finditer(self, name, pattern, flags=0):
+        """
+        Todas as ocorrências de um padrão no arquivo atual.
+
+        Args:
+            name (str): Nome do padrão, usado no relatório de prazos esgotados
+            pattern (str): Expressão regular
+            flags (int): Flags do módulo re
+
+        Returns:
+            list: Ocorrências (re.Match ou GuardedMatch)
+
+        Raises:
+            RegexTimeout: Se o prazo do padrão ou do arquivo vencer
+        """
+        local = self._local
+        if not (local.guarded and self._acquire()):
+            return list(re.finditer(pattern, local.content, flags))
+        return [GuardedMatch(local.content, regs) for regs in self._run(name, 'finditer', pattern, flags)]
+
+    def search(self, name, pattern, flags=0):
+        """Primeira ocorrência de um padrão no arquivo atual (ver finditer), ou None."""
+        local = self._local
+        if not (local.guarded and self._acquire()):
+            return re.search(pattern, local.content, flags)
+        regs = self._run(name, 'search', pattern, flags)
+        return GuardedMatch(local.content, regs) if regs is not None else None
+
+    def _acquire(self):
+        """
+        Processo filho do arquivo atual, reaproveitando um ocioso quando possível.
+
+        Se não for possível criar processos (ex.: script sem a proteção
+        if __name__ == '__main__'), o prazo é desativado e os padrões
+        passam a rodar no próprio processo.
+
+        Returns:
+            bool: Se há um processo filho disponível
+        """
+        local = self._local
+        if local.worker is None:
+            with self._lock:
+                local.worker = self._idle.pop() if self._idle else None
+            if local.worker is None:
+                try:
+                    local.worker = _Worker(self._context)
+                except (OSError, RuntimeError) as e:
+                    logging.warning(f"Não foi possível iniciar o processo dos padrões regex; "
+                                    f"seguindo sem prazo: {str(e)}")
+                    self.file_timeout = 0
+                    local.guarded = False
+                    return False
+            local.sent = False
+        return True
+
+    def _run(self, name, op, pattern, flags):
+        local = self._local
+        started = time.monotonic()
+        budget = min(self.pattern_timeout, local.deadline - started)
+        if budget <= 0:
+            raise RegexTimeout(name, 0.0)
+        worker = local.worker
+        try:
+            if not local.sent:
+                worker.connection.send(('conteudo', local.content))
+                local.sent = True
+            worker.connection.send((op, pattern, flags))
+            if not worker.connection.poll(budget):
+                # O re não pode ser interrompido: o processo é descartado e outro é criado no próximo arquivo
+                local.worker = None
+                worker.kill()
+                with self._lock:
+                    self.timeouts += 1
+                raise RegexTimeout(name, time.monotonic() - started)
+            status, result = worker.connection.recv()
+        except (EOFError, OSError) as e:
+            # Processo filho morto (ex.: falta de memória): é descartado, em vez de voltar aos ociosos,
+            # e o arquivo segue pelo caminho degradado, como em um prazo esgotado
+            logging.warning(f"Processo dos padrões regex encerrado durante '{name}': {type(e).__name__}")
+            local.worker = None
+            worker.kill()
+            raise RegexTimeout(name, time.monotonic() - started)
+        if status == 'erro':
+            raise re.error(result)
+        return result
+
+    def close(self):
+        """Encerra os processos filhos ociosos."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_guard():
+    """
+    RegexGuard do processo, com os prazos de config.py.
+
+    Os processos filhos ficam ociosos entre arquivos e são reaproveitados
+    por todos os analisadores; são encerrados ao final do processo.
+
+    Returns:
+        RegexGuard: Instância compartilhada
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RegexGuard()
+            atexit.register(_shared.close)
+            logging.info(f"Prazo dos padrões regex: {REGEX_PATTERN_TIMEOUT}s por padrão, "
+                         f"{REGEX_FILE_TIMEOUT}s por arquivo (arquivos a partir de {REGEX_GUARD_MIN_BYTES} bytes)")
+        return _shared
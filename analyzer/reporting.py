@@ -1,19 +1,221 @@
-import pandas as pd
+import csv
+import json
 import logging
 
+# Formatos de exportação, pela extensão do arquivo
+EXPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+
+# Campos que o modelo devolve como listas; no Excel ficam como texto, um item por linha
+LIST_COLUMNS = ('operacoes_numericas', 'impactos', 'riscos', 'modificacoes', 'dependencias',
+                'sistemas_impactados', 'exemplos_chamadores')
+NO_DEPENDENCIES = "Nenhuma dependência encontrada"
+
+# Tipos das colunas numéricas no Parquet (as demais são texto ou lista de textos)
+INTEGER_COLUMNS = ('linha', 'chamadores_transitivos', 'chamados_transitivos')
+FLOAT_COLUMNS = ('horas_dev', 'horas_teste', 'horas_total', 'risco_estatico')
+
+HOUR_COLUMNS = ['horas_dev', 'horas_teste', 'horas_total']
+
+# Tabelas de resumo: nome -> título da aba no Excel (até 31 caracteres)
+SUMMARY_SHEETS = {
+    'por_linguagem': 'Resumo por Linguagem',
+    'por_severidade': 'Resumo por Severidade',
+    'por_tipo_uso': 'Resumo por Tipo de Uso',
+    'linguagem_x_severidade': 'Horas Linguagem x Severidade',
+    'arquivos': 'Arquivos com Mais Horas',
+    'provedores': 'Falhas por Provedor'
+}
+
+
 class ReportGenerator:
     """
     Classe responsável por gerar e exportar relatórios a partir dos resultados da análise.
+
+    Args:
+        findings (list): Resultados da análise
+        estimate (dict, optional): Estimativas do modo de amostragem (analyzer.sampling)
+        parse_stats (dict, optional): Respostas e falhas de parse por provedor (GenericCNPJAnalyzer.parse_stats)
+        top_files (int): Arquivos listados no resumo de arquivos com mais horas
+        delta (dict, optional): Diferença para a execução anterior (analyzer.diff.diff_findings)
     """
-    def __init__(self, findings):
+    def __init__(self, findings, estimate=None, parse_stats=None, top_files=20, delta=None):
         self.findings = findings
+        self.estimate = estimate  # Estimativas do modo de amostragem (analyzer.sampling)
+        self.parse_stats = parse_stats or {}
+        self.delta = delta
+        self.top_files = top_files
+        self._summaries = None
+
+    def export(self, basename, formats=('xlsx',)):
+        """
+        Exporta os resultados em um ou mais formatos.
+
+        Args:
+            basename (str): Caminho do relatório sem extensão
+            formats (iterable): Formatos desejados (ver EXPORT_FORMATS)
+
+        Returns:
+            dict: Formato -> caminho do arquivo gerado
+        """
+        exporters = {'xlsx': self.export_to_excel, 'csv': self.export_to_csv, 'parquet': self.export_to_parquet}
+        files = {}
+        for fmt in formats:
+            if fmt not in exporters:
+                raise ValueError(f"Formato de relatório não suportado: {fmt} (use {', '.join(EXPORT_FORMATS)})")
+            files[fmt] = f"{basename}.{fmt}"
+            exporters[fmt](files[fmt])
+        return files
+
+    def columns(self):
+        """Colunas do relatório, na ordem em que aparecem nos resultados (as mesmas do Excel)."""
+        return list(dict.fromkeys(key for finding in self.findings for key in finding))
+
+    def iter_rows(self, columns):
+        """
+        Percorre os resultados com os campos de lista como listas de verdade.
+
+        Args:
+            columns (list): Colunas a extrair de cada resultado
+
+        Yields:
+            list: Valores de um resultado, na ordem das colunas
+        """
+        list_columns = {idx for idx, column in enumerate(columns) if column in LIST_COLUMNS}
+        for finding in self.findings:
+            row = [finding.get(column) for column in columns]
+            for idx in list_columns:
+                row[idx] = _as_list(row[idx])
+            yield row
+
+    def export_to_csv(self, filename):
+        """
+        Exporta os resultados para CSV, uma linha por vez, sem montar um DataFrame.
+
+        Os campos de lista são gravados como arrays JSON.
+
+        Args:
+            filename (str): Caminho do arquivo CSV
+        """
+        columns = self.columns()
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in self.iter_rows(columns):
+                writer.writerow([json.dumps(value, ensure_ascii=False) if isinstance(value, list) else value
+                                 for value in row])
+        logging.info(f'Relatório CSV exportado para: {filename}')
+
+    def export_to_parquet(self, filename, batch_size=50000):
+        """
+        Exporta os resultados para Parquet em lotes de batch_size linhas (um row group por lote).
+
+        Os campos de lista são colunas list<string>. Requer o pacote pyarrow.
+
+        Args:
+            filename (str): Caminho do arquivo Parquet
+            batch_size (int): Linhas por lote gravado
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("A exportação em Parquet requer o pacote pyarrow (pip install pyarrow)")
+        columns = self.columns()
+        schema = pa.schema([
+            (column, pa.list_(pa.string()) if column in LIST_COLUMNS
+             else pa.int64() if column in INTEGER_COLUMNS
+             else pa.float64() if column in FLOAT_COLUMNS
+             else pa.string())
+            for column in columns
+        ])
+        text_columns = [idx for idx, field in enumerate(schema) if field.type == pa.string()]
+        with pq.ParquetWriter(filename, schema) as writer:
+            batch = []
+            for row in self.iter_rows(columns):
+                for idx in text_columns:
+                    if row[idx] is not None and not isinstance(row[idx], str):
+                        row[idx] = str(row[idx])
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    writer.write_table(_arrow_table(pa, schema, batch))
+                    batch = []
+            if batch or not self.findings:
+                writer.write_table(_arrow_table(pa, schema, batch))
+        logging.info(f'Relatório Parquet exportado para: {filename}')
 
     def generate_dataframe(self):
         """Gera um DataFrame pandas com os resultados da análise."""
+        import pandas as pd  # Importado só na exportação, para não pesar na inicialização
         return pd.DataFrame(self.findings)
 
+    def generate_summaries(self):
+        """
+        Calcula as tabelas de resumo em uma única passagem vetorizada sobre os resultados.
+
+        Os resultados são convertidos uma vez em colunas (horas numéricas e um
+        indicador de erro) e cada tabela é um groupby sobre essas colunas, sem
+        laços por linha. O cálculo é feito uma vez por relatório.
+
+        Returns:
+            dict: Nome da tabela (ver SUMMARY_SHEETS) -> DataFrame
+        """
+        if self._summaries is not None:
+            return self._summaries
+        import pandas as pd
+        df = self.generate_dataframe()
+        if df.empty:
+            self._summaries = {}
+            return self._summaries
+
+        base = df.reindex(columns=['arquivo', 'linguagem', 'severidade', 'tipo_uso'] + HOUR_COLUMNS)
+        base[HOUR_COLUMNS] = base[HOUR_COLUMNS].apply(pd.to_numeric, errors='coerce').fillna(0.0)
+        base[['linguagem', 'severidade', 'tipo_uso']] = base[['linguagem', 'severidade', 'tipo_uso']].fillna('N/A')
+        base['erro'] = base['tipo_uso'].eq('ERRO')
+        aggregations = {
+            'metodos': ('erro', 'size'),
+            'erros': ('erro', 'sum'),
+            **{column: (column, 'sum') for column in HOUR_COLUMNS}
+        }
+
+        def grouped(key):
+            table = base.groupby(key, sort=False).agg(**aggregations)
+            table['taxa_erro'] = (table['erros'] / table['metodos']).round(4)
+            return table.sort_values('horas_total', ascending=False).reset_index()
+
+        summaries = {
+            'por_linguagem': grouped('linguagem'),
+            'por_severidade': grouped('severidade'),
+            'por_tipo_uso': grouped('tipo_uso'),
+            'linguagem_x_severidade': base.pivot_table(index='linguagem', columns='severidade', values='horas_total',
+                                                       aggfunc='sum', fill_value=0.0).reset_index(),
+            'arquivos': grouped('arquivo').head(self.top_files)
+        }
+        summaries['linguagem_x_severidade'].columns.name = None
+        if self.parse_stats:
+            providers = pd.DataFrame.from_dict(self.parse_stats, orient='index')
+            providers['taxa_falha_parse'] = (providers['falhas_parse'] / providers['respostas'].clip(lower=1)).round(4)
+            summaries['provedores'] = providers.rename_axis('provedor').reset_index()
+        self._summaries = summaries
+        return summaries
+
+    def summaries_json(self):
+        """
+        Tabelas de resumo em formato serializável em JSON, com os totais gerais.
+
+        Returns:
+            dict: 'totais' e uma lista de registros por tabela de resumo
+        """
+        summaries = self.generate_summaries()
+        totals = {'metodos': len(self.findings)}
+        if 'por_severidade' in summaries:
+            table = summaries['por_severidade']
+            totals.update({column: round(float(table[column].sum()), 1) for column in HOUR_COLUMNS})
+            totals['erros'] = int(table['erros'].sum())
+        return {'totais': totals, **{name: table.to_dict('records') for name, table in summaries.items()}}
+
     def export_to_excel(self, filename):
         """Exporta os resultados da análise para um arquivo Excel formatado."""
+        import pandas as pd
         df = self.generate_dataframe()
         writer = pd.ExcelWriter(filename, engine='xlsxwriter')
         df.to_excel(writer, sheet_name='Análise CNPJ', index=False)
@@ -55,7 +257,13 @@ class ReportGenerator:
             'horas_teste': 12,
             'horas_total': 12,
             'dependencias': 50,
-            'sistemas_impactados': 30
+            'sistemas_impactados': 30,
+            'risco_estatico': 12,
+            'estrato': 30,
+            'chamadores_transitivos': 14,
+            'chamados_transitivos': 14,
+            'exemplos_chamadores': 50,
+            'hash_corpo': 34
         }
         for col_name, width in col_widths.items():
             if col_name in df.columns:
@@ -63,10 +271,13 @@ class ReportGenerator:
                 worksheet.set_column(col_idx, col_idx, width)
         for row_num in range(1, len(df) + 1):
             for col_num in range(len(df.columns)):
+                value = df.iloc[row_num-1, col_num]
+                if pd.isna(value):
+                    value = None  # Campo ausente no resultado (ex.: linha em ERRO, impacto não propagado)
                 if df.columns[col_num] in ['horas_dev', 'horas_teste', 'horas_total']:
-                    worksheet.write(row_num, col_num, df.iloc[row_num-1, col_num], number_format)
+                    worksheet.write(row_num, col_num, value, number_format)
                 else:
-                    worksheet.write(row_num, col_num, df.iloc[row_num-1, col_num], cell_format)
+                    worksheet.write(row_num, col_num, value, cell_format)
         dep_sheet = workbook.add_worksheet('Dependências')
         dep_sheet.write(0, 0, 'Linguagem', header_format)
         dep_sheet.write(0, 1, 'Método', header_format)
@@ -76,10 +287,126 @@ class ReportGenerator:
             if 'linguagem' in finding:
                 dep_sheet.write(row, 0, finding['linguagem'])
             dep_sheet.write(row, 1, finding['metodo'])
-            dep_sheet.write(row, 2, finding['dependencias'])
+            dep_sheet.write(row, 2, finding.get('dependencias', ''))
             row += 1
         dep_sheet.set_column(0, 0, 15)
         dep_sheet.set_column(1, 1, 30)
         dep_sheet.set_column(2, 2, 100)
+        if self.estimate:
+            self._write_estimate_sheets(workbook, header_format, number_format)
+        self._write_impact_sheet(workbook, header_format)
+        if self.delta is not None:
+            self._write_delta_sheet(workbook, header_format, number_format)
+        self._write_summary_sheets(writer, header_format)
         writer.close()
         logging.info(f'Relatório Excel exportado para: {filename}')
+
+    def _write_estimate_sheets(self, workbook, header_format, number_format):
+        """Adiciona as abas de estimativa por amostragem ao relatório Excel."""
+        sheet = workbook.add_worksheet('Estimativa Amostral')
+        headers = ['Métrica', 'Estimativa', 'Erro padrão', 'IC 95% inferior', 'IC 95% superior']
+        for col, header in enumerate(headers):
+            sheet.write(0, col, header, header_format)
+        rows = [(field, self.estimate[field]) for field in ('horas_dev', 'horas_teste', 'horas_total')]
+        rows += [(f'métodos {severity}', values) for severity, values in self.estimate['severidade'].items()]
+        for row, (label, values) in enumerate(rows, start=1):
+            sheet.write(row, 0, label)
+            for col, key in enumerate(('estimativa', 'erro_padrao', 'ic_inferior', 'ic_superior'), start=1):
+                sheet.write(row, col, values[key], number_format)
+        row = len(rows) + 2
+        sheet.write(row, 0, 'População de métodos')
+        sheet.write(row, 1, self.estimate['populacao'])
+        sheet.write(row + 1, 0, 'Métodos sorteados na amostra')
+        sheet.write(row + 1, 1, self.estimate['amostra_sorteada'])
+        sheet.write(row + 2, 0, 'Métodos analisados na amostra')
+        sheet.write(row + 2, 1, self.estimate['amostra'])
+        sheet.write(row + 3, 0, 'Erros na amostra')
+        sheet.write(row + 3, 1, self.estimate['erros_amostra'])
+        sheet.set_column(0, 0, 30)
+        sheet.set_column(1, 4, 16)
+
+        strata_sheet = workbook.add_worksheet('Estratos')
+        for col, header in enumerate(['Estrato', 'População', 'Amostra', 'Imputado']):
+            strata_sheet.write(0, col, header, header_format)
+        for row, stratum in enumerate(self.estimate['estratos'], start=1):
+            strata_sheet.write(row, 0, stratum['estrato'])
+            strata_sheet.write(row, 1, stratum['populacao'])
+            strata_sheet.write(row, 2, stratum['amostra'])
+            strata_sheet.write(row, 3, 'sim' if stratum['imputado'] else 'não')
+        strata_sheet.set_column(0, 0, 40)
+        strata_sheet.set_column(1, 3, 12)
+
+    def _write_impact_sheet(self, workbook, header_format):
+        """Adiciona a aba de impacto transitivo (analyzer.call_graph), do maior para o menor."""
+        propagated = [f for f in self.findings if 'chamadores_transitivos' in f]
+        if not propagated:
+            return
+        propagated.sort(key=lambda f: (f['chamadores_transitivos'], f['chamados_transitivos']), reverse=True)
+        sheet = workbook.add_worksheet('Impacto Transitivo')
+        headers = ['Arquivo', 'Método', 'Linha', 'Severidade', 'Chamadores (transitivos)',
+                   'Chamados (transitivos)', 'Exemplos de chamadores']
+        for col, header in enumerate(headers):
+            sheet.write(0, col, header, header_format)
+        for row, finding in enumerate(propagated, start=1):
+            sheet.write(row, 0, finding['arquivo'])
+            sheet.write(row, 1, finding['metodo'])
+            sheet.write(row, 2, finding.get('linha'))
+            sheet.write(row, 3, finding['severidade'])
+            sheet.write(row, 4, finding['chamadores_transitivos'])
+            sheet.write(row, 5, finding['chamados_transitivos'])
+            sheet.write(row, 6, finding['exemplos_chamadores'])
+        sheet.set_column(0, 0, 40)
+        sheet.set_column(1, 1, 25)
+        sheet.set_column(2, 5, 14)
+        sheet.set_column(6, 6, 80)
+
+    def _write_delta_sheet(self, workbook, header_format, number_format):
+        """Adiciona a aba com os métodos novos, removidos e alterados desde a execução anterior."""
+        sheet = workbook.add_worksheet('Delta')
+        headers = ['Situação', 'Arquivo', 'Método', 'Linha', 'Linha anterior', 'Corpo alterado',
+                   'Campos alterados', 'Tipo de uso', 'Tipo de uso anterior', 'Severidade',
+                   'Severidade anterior', 'Horas', 'Horas anteriores', 'Delta de horas']
+        keys = ['situacao', 'arquivo', 'metodo', 'linha', 'linha_anterior', 'corpo_alterado', 'campos_alterados',
+                'tipo_uso', 'tipo_uso_anterior', 'severidade', 'severidade_anterior', 'horas_total',
+                'horas_total_anterior', 'delta_horas']
+        for col, header in enumerate(headers):
+            sheet.write(0, col, header, header_format)
+        for row, change in enumerate(self.delta['alteracoes'], start=1):
+            for col, key in enumerate(keys):
+                value = change[key]
+                if key == 'corpo_alterado':
+                    value = 'sim' if value else 'não'
+                sheet.write(row, col, value, number_format if key.startswith(('horas', 'delta')) else None)
+        sheet.set_column(0, 0, 12)
+        sheet.set_column(1, 1, 40)
+        sheet.set_column(2, 2, 25)
+        sheet.set_column(3, 5, 12)
+        sheet.set_column(6, 6, 30)
+        sheet.set_column(7, 13, 14)
+
+    def _write_summary_sheets(self, writer, header_format):
+        """Adiciona as tabelas de resumo (generate_summaries) como abas do relatório Excel."""
+        for name, table in self.generate_summaries().items():
+            sheet_name = SUMMARY_SHEETS[name]
+            table.to_excel(writer, sheet_name=sheet_name, index=False)
+            sheet = writer.sheets[sheet_name]
+            for col, header in enumerate(table.columns):
+                sheet.write(0, col, header, header_format)
+            sheet.set_column(0, 0, 60 if name == 'arquivos' else 20)
+            sheet.set_column(1, len(table.columns) - 1, 14)
+
+
+def _as_list(value):
+    """Converte um campo de lista do resultado (texto com um item por linha) em lista."""
+    if value is None or value == NO_DEPENDENCIES:
+        return []
+    if isinstance(value, list):
+        return value
+    return [item for item in str(value).split('\n') if item]
+
+
+def _arrow_table(pa, schema, rows):
+    """Tabela Arrow de um lote de linhas (listas de valores na ordem do schema)."""
+    return pa.Table.from_arrays(
+        [pa.array([row[idx] for row in rows], type=field.type) for idx, field in enumerate(schema)],
+        schema=schema)
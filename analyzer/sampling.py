@@ -0,0 +1,201 @@
+import math
+import random
+from collections import defaultdict
+
+# Faixas de tamanho (linhas) e de risco estático usadas na estratificação
+SIZE_BUCKETS = ((20, 'pequeno'), (80, 'medio'), (float('inf'), 'grande'))
+RISK_BUCKETS = ((3.0, 'risco_baixo'), (8.0, 'risco_medio'), (float('inf'), 'risco_alto'))
+
+# Valor crítico da normal para intervalos de 95% de confiança
+Z_95 = 1.96
+
+HOUR_FIELDS = ('horas_dev', 'horas_teste', 'horas_total')
+SEVERITIES = ('ALTA', 'MEDIA', 'BAIXA')
+
+
+def _bucket(value, buckets):
+    for limit, label in buckets:
+        if value < limit:
+            return label
+    return buckets[-1][1]
+
+
+def stratum_of(candidate):
+    """
+    Define o estrato de um método: linguagem, faixa de tamanho e faixa de risco.
+
+    Args:
+        candidate (MethodCandidate): Método pendente, com risk_score já calculado
+
+    Returns:
+        str: Identificador do estrato (ex.: 'java/medio/risco_alto')
+    """
+    return '/'.join((
+        candidate.language,
+        _bucket(candidate.line_count, SIZE_BUCKETS),
+        _bucket(candidate.risk_score or 0.0, RISK_BUCKETS)
+    ))
+
+
+def _allocate(sizes, sample_size):
+    """
+    Divide sample_size métodos entre os estratos (sizes: estrato -> população), sem ultrapassá-lo.
+
+    Cada estrato recebe primeiro até dois métodos, dos maiores para os menores,
+    enquanto houver orçamento; o restante é dividido proporcionalmente à
+    população, pelos maiores restos, sem passar do tamanho de cada estrato.
+    """
+    allocation = {}
+    remaining = sample_size
+    for stratum in sorted(sizes, key=lambda s: (-sizes[s], s)):
+        allocation[stratum] = min(2, sizes[stratum], remaining)
+        remaining -= allocation[stratum]
+    while remaining:
+        room = {s: size for s, size in sizes.items() if allocation[s] < size}
+        weight = sum(room.values())
+        shares = {s: remaining * size / weight for s, size in room.items()}
+        given = 0
+        for s, share in shares.items():
+            extra = min(int(share), sizes[s] - allocation[s])
+            allocation[s] += extra
+            given += extra
+        if not given:
+            for s in sorted(shares, key=lambda s: (-(shares[s] % 1), s))[:remaining]:
+                allocation[s] += 1
+                given += 1
+        remaining -= given
+    return allocation
+
+
+def draw_stratified_sample(candidates, sample_size, seed=None):
+    """
+    Sorteia uma amostra estratificada dos métodos pendentes.
+
+    A amostra tem exatamente sample_size métodos (ou a população inteira, se
+    menor). Cada estrato recebe até dois métodos enquanto o tamanho permitir,
+    para que a variância possa ser estimada, e o restante é alocado
+    proporcionalmente ao tamanho de cada estrato. Estratos que ficam sem
+    nenhum método sorteado são imputados na extrapolação (ver extrapolate).
+
+    Args:
+        candidates (list): Métodos pendentes (MethodCandidate), com risk_score calculado
+        sample_size (int | float): Tamanho da amostra; valores entre 0 e 1 são frações da população
+        seed (int, optional): Semente do sorteio, para reprodutibilidade
+
+    Returns:
+        tuple: (amostra, população por estrato). Cada método sorteado recebe o atributo stratum
+    """
+    population = defaultdict(list)
+    for candidate in candidates:
+        population[stratum_of(candidate)].append(candidate)
+
+    total = len(candidates)
+    if 0 < sample_size < 1:
+        sample_size = math.ceil(total * sample_size)
+    sample_size = min(int(sample_size), total)
+
+    allocation = _allocate({stratum: len(members) for stratum, members in population.items()}, sample_size)
+    rng = random.Random(seed)
+    sample = []
+    for stratum, members in sorted(population.items()):
+        for candidate in rng.sample(members, allocation[stratum]):
+            candidate.stratum = stratum
+            sample.append(candidate)
+    return sample, {stratum: len(members) for stratum, members in population.items()}
+
+
+def _total_estimate(per_stratum, population, pooled_mean, pooled_variance, imputed=()):
+    """
+    Estimador de total estratificado com sua variância (com correção de população finita).
+
+    Os estratos em imputed, sem nenhum resultado próprio, entram com a média
+    e a variância gerais da amostra e sem correção de população finita: a
+    amostra geral não foi sorteada nesses estratos.
+    """
+    total = 0.0
+    variance = 0.0
+    for stratum, size in population.items():
+        if stratum in imputed:
+            total += size * pooled_mean
+            variance += size ** 2 * pooled_variance
+            continue
+        values = per_stratum.get(stratum, [])
+        n = len(values)
+        if n == 0:
+            continue
+        mean = sum(values) / n
+        if n > 1:
+            s2 = sum((v - mean) ** 2 for v in values) / (n - 1)
+        else:
+            s2 = pooled_variance
+        total += size * mean
+        variance += size ** 2 * (1 - n / size) * s2 / n
+    return total, variance
+
+
+def _interval(estimate, variance):
+    error = math.sqrt(max(variance, 0.0))
+    return {
+        'estimativa': round(estimate, 1),
+        'erro_padrao': round(error, 1),
+        'ic_inferior': round(max(0.0, estimate - Z_95 * error), 1),
+        'ic_superior': round(estimate + Z_95 * error, 1)
+    }
+
+
+def extrapolate(findings, population, drawn=None):
+    """
+    Extrapola horas e distribuição de severidade da amostra para a população.
+
+    Estratos sem nenhum resultado válido (apenas erros ou nenhum método
+    sorteado) são estimados pela média geral da amostra e aparecem marcados
+    em 'estratos'.
+
+    Args:
+        findings (list): Resultados da amostra (com a chave 'estrato')
+        population (dict): Quantidade de métodos por estrato na população
+        drawn (int, optional): Métodos sorteados (padrão: quantidade de resultados)
+
+    Returns:
+        dict: Estimativas com erro padrão e intervalo de 95% de confiança
+    """
+    valid = [f for f in findings if f.get('tipo_uso') != 'ERRO' and f.get('estrato')]
+    by_stratum = defaultdict(list)
+    for finding in valid:
+        by_stratum[finding['estrato']].append(finding)
+
+    # Estratos sem resultados herdam a média e a variância gerais (ver _total_estimate)
+    imputed = {s for s in population if s not in by_stratum}
+
+    estimate = {
+        'populacao': sum(population.values()),
+        'amostra_sorteada': len(findings) if drawn is None else drawn,
+        'amostra': len(valid),
+        'erros_amostra': len(findings) - len(valid),
+        'nivel_confianca': 0.95
+    }
+    for field in HOUR_FIELDS:
+        per_stratum = {s: [float(f.get(field) or 0) for f in members] for s, members in by_stratum.items()}
+        all_values = [float(f.get(field) or 0) for f in valid]
+        mean = sum(all_values) / len(all_values) if all_values else 0.0
+        pooled = sum((v - mean) ** 2 for v in all_values) / (len(all_values) - 1) if len(all_values) > 1 else 0.0
+        estimate[field] = _interval(*_total_estimate(per_stratum, population, mean, pooled, imputed))
+
+    estimate['severidade'] = {}
+    for severity in SEVERITIES:
+        per_stratum = {s: [1.0 if f.get('severidade') == severity else 0.0 for f in members]
+                       for s, members in by_stratum.items()}
+        p = sum(1 for f in valid if f.get('severidade') == severity) / len(valid) if valid else 0.0
+        estimate['severidade'][severity] = _interval(*_total_estimate(per_stratum, population, p, p * (1 - p),
+                                                                      imputed))
+
+    estimate['estratos'] = [
+        {
+            'estrato': stratum,
+            'populacao': size,
+            'amostra': sum(1 for f in valid if f['estrato'] == stratum),
+            'imputado': stratum in imputed
+        }
+        for stratum, size in sorted(population.items())
+    ]
+    return estimate
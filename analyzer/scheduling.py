@@ -0,0 +1,273 @@
+"""
+Divisão justa das vagas de chamada ao provedor entre análises simultâneas.
+
+O FairShareScheduler é dono das vagas de chamada ao modelo de IA do
+processo (AI_MAX_CONCURRENCY) e as distribui entre as análises ativas por
+enfileiramento justo ponderado (start-time fair queuing): cada análise
+(FairShareJob) tem um tempo virtual que avança, a cada chamada despachada,
+pelo custo estimado da chamada (tokens) dividido pelo seu peso, e a vaga
+livre vai para a análise de menor tempo virtual. Uma análise que estava
+ociosa entra com o tempo virtual atual do sistema, sem acumular crédito.
+Assim, uma análise pequena iniciada durante uma grande recebe metade das
+vagas (com pesos iguais) e termina logo, em vez de esperar a fila da grande.
+
+Cada análise pode ter:
+- prioridade: análises de prioridade maior são atendidas antes (estrita);
+- peso: fração das vagas entre análises da mesma prioridade;
+- limite de chamadas simultâneas, mesmo com vagas sobrando.
+
+Dentro de uma análise, os métodos continuam saindo pelo risco estático e os
+orçamentos de tempo, quantidade e tokens valem como no PriorityExecutor.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from config import AI_MAX_CONCURRENCY
+
+
+class FairShareJob:
+    """
+    Análise registrada no FairShareScheduler, com a interface do PriorityExecutor.
+
+    Criada por FairShareScheduler.job; ao sair do bloco with (ou em
+    shutdown), aguarda as chamadas da análise e deixa de concorrer às vagas.
+
+    Attributes:
+        dispatched (int): Tarefas iniciadas
+        skipped (int): Tarefas canceladas por orçamento esgotado
+    """
+
+    def __init__(self, scheduler, name, weight=1.0, max_concurrent=None, priority=0,
+                 time_budget=None, max_items=None, token_budget=None):
+        if weight <= 0:
+            raise ValueError("O peso de uma análise deve ser positivo")
+        self.scheduler = scheduler
+        self.name = name
+        self.weight = weight
+        self.max_concurrent = max_concurrent or None
+        self.priority = priority
+        self.time_budget = time_budget
+        self.max_items = max_items
+        self.token_budget = token_budget
+        self.dispatched = 0
+        self.skipped = 0
+        self.running = 0
+        self.virtual_time = 0.0
+        self._tokens_used = 0
+        self._heap = []
+        self._started_at = None
+        self._closed = False
+        self._waits = []  # Segundos entre a submissão e o início de cada tarefa
+        self._latencies = []  # Segundos entre a submissão e o fim de cada tarefa
+
+    def submit(self, fn, *args, **kwargs):
+        return self.submit_with_priority(0.0, 0, fn, *args, **kwargs)
+
+    def submit_with_priority(self, priority, cost, fn, *args, **kwargs):
+        """
+        Agenda uma tarefa da análise com prioridade (maior = antes, dentro da análise) e custo em tokens.
+
+        Returns:
+            concurrent.futures.Future: Resultado da tarefa
+        """
+        future = Future()
+        self.scheduler._enqueue(self, (-priority, next(self.scheduler._counter), future, cost,
+                                       time.monotonic(), fn, args, kwargs))
+        return future
+
+    def _budget_exhausted(self, cost):
+        if self.max_items is not None and self.dispatched >= self.max_items:
+            return True
+        if self.time_budget is not None and time.monotonic() - self._started_at >= self.time_budget:
+            return True
+        if self.token_budget is not None and self._tokens_used + cost > self.token_budget:
+            return True
+        return False
+
+    @property
+    def exhausted(self):
+        """Se o orçamento já acabou: as próximas tarefas seriam canceladas sem executar."""
+        with self.scheduler._cond:
+            return self._started_at is not None and self._budget_exhausted(0)
+
+    @property
+    def eligible(self):
+        """Se a análise tem tarefas na fila e pode ocupar mais uma vaga."""
+        return bool(self._heap) and (self.max_concurrent is None or self.running < self.max_concurrent)
+
+    def stats(self):
+        """
+        Espera na fila e latência das tarefas da análise.
+
+        Returns:
+            dict: tarefas, canceladas, espera média/p50/p95 e latência p50/p95/máxima, em segundos
+        """
+        with self.scheduler._cond:
+            waits = sorted(self._waits)
+            latencies = sorted(self._latencies)
+
+        def percentile(values, fraction):
+            return round(values[min(len(values) - 1, int(len(values) * fraction))], 3) if values else None
+
+        return {
+            'analise': self.name,
+            'tarefas': len(latencies),
+            'canceladas': self.skipped,
+            'espera_media_s': round(sum(waits) / len(waits), 3) if waits else None,
+            'espera_p50_s': percentile(waits, 0.5),
+            'espera_p95_s': percentile(waits, 0.95),
+            'latencia_p50_s': percentile(latencies, 0.5),
+            'latencia_p95_s': percentile(latencies, 0.95),
+            'latencia_max_s': latencies[-1] if latencies else None
+        }
+
+    def shutdown(self, wait=True):
+        """Encerra a análise; com wait, aguarda as tarefas na fila e em execução."""
+        self.scheduler._close(self, wait)
+        if self.skipped:
+            logging.info(f"Orçamento esgotado: {self.skipped} métodos de menor risco não foram analisados")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown(wait=True)
+
+
+class FairShareScheduler:
+    """
+    Vagas de chamada ao provedor compartilhadas entre análises por enfileiramento justo ponderado.
+
+    As vagas são atendidas por `slots` threads, criadas sob demanda e
+    mantidas durante a vida do processo (ou até close).
+
+    Args:
+        slots (int): Chamadas simultâneas ao provedor
+    """
+
+    def __init__(self, slots=AI_MAX_CONCURRENCY):
+        self.slots = slots
+        self._cond = threading.Condition()
+        self._counter = itertools.count()
+        self._jobs = []
+        self._threads = []
+        self._virtual_time = 0.0
+        self._shutdown = False
+
+    def job(self, name, weight=1.0, max_concurrent=None, priority=0, time_budget=None, max_items=None,
+            token_budget=None):
+        """
+        Registra uma análise.
+
+        Args:
+            name (str): Nome da análise, usado nos logs e estatísticas
+            weight (float): Peso na divisão das vagas entre análises da mesma prioridade
+            max_concurrent (int, optional): Chamadas simultâneas máximas da análise
+            priority (int): Análises de prioridade maior são atendidas antes
+            time_budget (float, optional): Segundos, a partir da primeira tarefa, para despachar tarefas
+            max_items (int, optional): Tarefas despachadas no máximo (top-K)
+            token_budget (int, optional): Tokens estimados despachados no máximo
+
+        Returns:
+            FairShareJob: Executor da análise
+        """
+        job = FairShareJob(self, name, weight, max_concurrent, priority, time_budget, max_items, token_budget)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("FairShareScheduler já foi encerrado")
+            self._jobs.append(job)
+        return job
+
+    def _enqueue(self, job, entry):
+        with self._cond:
+            if job._closed or self._shutdown:
+                raise RuntimeError(f"Análise {job.name} já foi encerrada")
+            if job._started_at is None:
+                job._started_at = time.monotonic()
+            if not job._heap and not job.running:
+                # Análise ociosa volta no tempo virtual atual, sem crédito acumulado
+                job.virtual_time = max(job.virtual_time, self._virtual_time)
+            heapq.heappush(job._heap, entry)
+            if len(self._threads) < self.slots:
+                thread = threading.Thread(target=self._worker, daemon=True, name=f"vaga-{len(self._threads)}")
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+
+    def _next(self):
+        """Próxima tarefa a despachar (com self._cond adquirida), ou None se nenhuma análise pode receber vaga."""
+        while True:
+            eligible = [job for job in self._jobs if job.eligible]
+            if not eligible:
+                return None
+            top = max(job.priority for job in eligible)
+            job = min((job for job in eligible if job.priority == top), key=lambda job: job.virtual_time)
+            entry = heapq.heappop(job._heap)
+            future, cost = entry[2], entry[3]
+            if job._budget_exhausted(cost):
+                job.skipped += 1
+                future.cancel()
+                future.set_running_or_notify_cancel()  # Notifica quem aguarda com wait()
+                self._cond.notify_all()  # A análise pode ter terminado
+                continue
+            if not future.set_running_or_notify_cancel():
+                continue
+            self._virtual_time = job.virtual_time
+            job.virtual_time += max(cost, 1) / job.weight
+            job.dispatched += 1
+            job.running += 1
+            job._tokens_used += cost
+            job._waits.append(time.monotonic() - entry[4])
+            return job, entry
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                item = self._next()
+                while item is None and not self._shutdown:
+                    self._cond.wait()
+                    item = self._next()
+                if item is None:
+                    return
+            job, (_, _, future, _, submitted, fn, args, kwargs) = item
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._cond:
+                    job.running -= 1
+                    job._latencies.append(time.monotonic() - submitted)
+                    self._release(job)
+                    self._cond.notify_all()
+
+    def _release(self, job):
+        """Remove uma análise encerrada e sem tarefas pendentes (com self._cond adquirida)."""
+        if job._closed and not job._heap and not job.running and job in self._jobs:
+            self._jobs.remove(job)
+
+    def _close(self, job, wait):
+        with self._cond:
+            job._closed = True
+            if wait:
+                while job._heap or job.running:
+                    self._cond.wait()
+            self._release(job)
+
+    def active_jobs(self):
+        """Estatísticas das análises registradas."""
+        with self._cond:
+            jobs = list(self._jobs)
+        return [dict(job.stats(), em_execucao=job.running, na_fila=len(job._heap)) for job in jobs]
+
+    def close(self):
+        """Encerra as threads das vagas depois de despachadas as tarefas na fila."""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,130 @@
+"""
+Índice de deslocamentos de um arquivo analisado.
+
+Uma única passagem do padrão combinado de menções (termos de CNPJ da
+linguagem e o padrão geral, com números de CNPJ, em uma só expressão)
+fornece os deslocamentos ordenados de todas as menções. A tabela com o
+início de cada linha é montada na primeira consulta. Com isso, a linha de
+um deslocamento e as menções dentro do trecho de um método são obtidas por
+busca binária, e o arquivo é percorrido um número fixo de vezes, qualquer
+que seja a quantidade de métodos.
+"""
+import re
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+# Chaves de abertura e fechamento de blocos
+_BRACES = re.compile(r'[{}]')
+
+
+def mention_pattern(language_pattern, general_pattern, first_chars):
+    """
+    Padrão combinado de menções a CNPJ de uma linguagem.
+
+    O grupo 'termo' identifica as menções pelos termos da linguagem; as
+    demais vêm apenas do padrão geral (ex.: números de CNPJ no código). As
+    alternativas só são tentadas nas posições com um dos primeiros
+    caracteres possíveis de uma menção, o que torna a passagem algumas
+    vezes mais rápida que a alternância sozinha.
+
+    Args:
+        language_pattern (str): Termos de CNPJ da linguagem
+        general_pattern (str): Padrão geral de menções a CNPJ
+        first_chars (str): Classe de caracteres (sem colchetes) com que qualquer menção pode começar
+
+    Returns:
+        re.Pattern: Padrão compilado, sem distinção de maiúsculas
+    """
+    return re.compile(f"(?=[{first_chars}])(?:(?P<termo>{language_pattern})|{general_pattern})",
+                      re.IGNORECASE | re.MULTILINE | re.DOTALL)
+
+
+class SourceIndex:
+    """
+    Menções a CNPJ e início das linhas de um arquivo.
+
+    Attributes:
+        content (str): Conteúdo do arquivo
+        mentions (list): Deslocamentos de todas as menções (termos e padrão geral), em ordem
+        terms (list): Deslocamentos das menções pelos termos da linguagem, em ordem
+    """
+
+    __slots__ = ('content', 'mentions', 'terms', '_line_starts', '_block_ends')
+
+    def __init__(self, content, pattern):
+        """
+        Args:
+            content (str): Conteúdo do arquivo
+            pattern (re.Pattern): Padrão de mention_pattern
+        """
+        self.content = content
+        self.mentions = []
+        self.terms = []
+        for match in pattern.finditer(content):
+            self.mentions.append(match.start())
+            if match.lastgroup == 'termo':
+                self.terms.append(match.start())
+        self._line_starts = None
+        self._block_ends = None
+
+    @property
+    def line_starts(self):
+        """Deslocamento do início de cada linha (com o fim do conteúdo + 1 ao final)."""
+        if self._line_starts is None:
+            self._line_starts = [0, *accumulate(len(line) + 1 for line in self.content.split('\n'))]
+        return self._line_starts
+
+    def line(self, offset):
+        """Número da linha (1 = primeira) de um deslocamento."""
+        return bisect_right(self.line_starts, offset)
+
+    def first_in(self, start, end, terms=False):
+        """
+        Primeira menção no trecho [start, end).
+
+        Args:
+            start (int): Início do trecho
+            end (int): Fim do trecho (exclusivo)
+            terms (bool): Considerar apenas as menções pelos termos da linguagem
+
+        Returns:
+            int: Deslocamento da menção, ou None se o trecho não menciona CNPJ
+        """
+        offsets = self.terms if terms else self.mentions
+        first = bisect_left(offsets, start)
+        return offsets[first] if first < len(offsets) and offsets[first] < end else None
+
+    def block_end(self, offset, limit):
+        """
+        Fim do bloco entre chaves aberto a partir de um deslocamento.
+
+        As chaves do arquivo são pareadas uma única vez, na primeira consulta
+        (sem considerar strings e comentários).
+
+        Args:
+            offset (int): Deslocamento a partir do qual procurar a chave de abertura
+            limit (int): Limite do trecho (ex.: início do próximo método)
+
+        Returns:
+            int: Deslocamento logo após a chave de fechamento, ou limit se o bloco
+            não abre nem fecha antes dele
+        """
+        if self._block_ends is None:
+            self._block_ends = self._pair_braces()
+        opens, closes = self._block_ends
+        first = bisect_left(opens, offset)
+        if first == len(opens) or opens[first] >= limit or closes[first] is None:
+            return limit
+        return min(closes[first] + 1, limit)
+
+    def _pair_braces(self):
+        """Chaves de abertura em ordem e o deslocamento da chave que fecha cada uma."""
+        opens, closes, stack = [], [], []
+        for match in _BRACES.finditer(self.content):
+            if match.group() == '{':
+                stack.append(len(opens))
+                opens.append(match.start())
+                closes.append(None)
+            elif stack:
+                closes[stack.pop()] = match.start()
+        return opens, closes
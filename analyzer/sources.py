@@ -0,0 +1,333 @@
+import io
+import os
+import tarfile
+import zipfile
+import logging
+import subprocess
+from pathlib import Path, PurePosixPath
+
+
+class CodeSource:
+    """
+    Interface base para as origens de código lidas pelo analisador.
+
+    Uma origem enumera os arquivos de código e entrega o conteúdo de cada um
+    sem exigir que o material esteja extraído em disco.
+
+    Attributes:
+        location (str): Caminho da origem (diretório, arquivo compactado ou repositório git)
+    """
+
+    def __init__(self, location):
+        self.location = str(location)
+
+    def iter_paths(self):
+        """
+        Enumera os caminhos de todos os arquivos da origem.
+
+        Returns:
+            Iterator[str]: Caminhos dos arquivos, como aparecerão nos resultados
+        """
+        raise NotImplementedError("Este método deve ser implementado nas subclasses")
+
+    def read_text(self, path):
+        """
+        Lê o conteúdo textual de um arquivo da origem.
+
+        Args:
+            path (str): Caminho do arquivo, como retornado por iter_paths
+
+        Returns:
+            str: Conteúdo decodificado em UTF-8 (bytes inválidos são ignorados)
+        """
+        raise NotImplementedError("Este método deve ser implementado nas subclasses")
+
+    def open_binary(self, path):
+        """
+        Abre um arquivo da origem para leitura em bytes, em blocos.
+
+        A implementação padrão carrega o conteúdo textual inteiro; as origens
+        que permitem leitura em fluxo a sobrescrevem.
+
+        Args:
+            path (str): Caminho do arquivo, como retornado por iter_paths
+
+        Returns:
+            io.BufferedIOBase: Arquivo aberto em modo binário (o chamador o fecha)
+        """
+        return io.BytesIO(self.read_text(path).encode('utf-8'))
+
+    def iter_documents(self, extensions):
+        """
+        Percorre os arquivos com as extensões informadas entregando o conteúdo.
+
+        Args:
+            extensions (Iterable[str]): Extensões aceitas (com ponto, em minúsculas)
+
+        Returns:
+            Iterator[tuple]: Pares (caminho, conteúdo)
+        """
+        extensions = set(extensions)
+        for path in self.iter_paths():
+            if PurePosixPath(path.replace('\\', '/')).suffix.lower() in extensions:
+                yield path, self.read_text(path)
+
+    def count_subdirs(self):
+        """
+        Conta os subdiretórios presentes na origem.
+
+        Returns:
+            int: Quantidade de subdiretórios
+        """
+        dirs = set()
+        for path in self.iter_paths():
+            parent = PurePosixPath(path.replace('\\', '/')).parent
+            while str(parent) not in ('.', '/', ''):
+                dirs.add(str(parent))
+                parent = parent.parent
+        return len(dirs)
+
+    def close(self):
+        """Libera os recursos abertos pela origem."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FileSystemSource(CodeSource):
+    """Origem de código em um diretório comum do sistema de arquivos."""
+
+    def iter_paths(self):
+        for file in Path(self.location).rglob("*"):
+            if file.is_file():
+                yield str(file)
+
+    def read_text(self, path):
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            return f.read()
+
+    def open_binary(self, path):
+        return open(path, 'rb')
+
+    def count_subdirs(self):
+        return sum(len(dirs) for _, dirs, _ in os.walk(self.location))
+
+
+class ZipSource(CodeSource):
+    """
+    Origem de código em um arquivo .zip.
+
+    Os membros são descompactados individualmente, sob demanda, sem extração
+    para o disco.
+    """
+
+    def __init__(self, location):
+        super().__init__(location)
+        self._zip = zipfile.ZipFile(self.location)
+
+    def iter_paths(self):
+        for info in self._zip.infolist():
+            if not info.is_dir():
+                yield info.filename
+
+    def read_text(self, path):
+        return self._zip.read(path).decode('utf-8', errors='ignore')
+
+    def open_binary(self, path):
+        return self._zip.open(path)
+
+    def close(self):
+        self._zip.close()
+
+
+class TarSource(CodeSource):
+    """
+    Origem de código em um arquivo .tar (opcionalmente .gz, .bz2 ou .xz).
+
+    A varredura completa (iter_documents) lê o arquivo em modo de fluxo, em uma
+    única passagem, o que evita descompactar o conteúdo repetidas vezes; os
+    caminhos vistos nela são guardados, e iter_paths e count_subdirs chamados
+    depois não percorrem o arquivo de novo. O acesso pontual (read_text) abre
+    o arquivo em modo aleatório apenas quando necessário.
+    """
+
+    def __init__(self, location):
+        super().__init__(location)
+        self._tar = None
+        self._paths = None  # Arquivos vistos na última passagem completa pelo arquivo
+
+    def _random_access(self):
+        if self._tar is None:
+            self._tar = tarfile.open(self.location, mode='r:*')
+        return self._tar
+
+    def iter_paths(self):
+        if self._paths is not None:
+            yield from self._paths
+            return
+        paths = []
+        with tarfile.open(self.location, mode='r|*') as tar:
+            for member in tar:
+                if member.isfile():
+                    paths.append(member.name)
+                    yield member.name
+        self._paths = paths
+
+    def read_text(self, path):
+        f = self._random_access().extractfile(path)
+        if f is None:
+            return ''
+        with f:
+            return f.read().decode('utf-8', errors='ignore')
+
+    def open_binary(self, path):
+        return self._random_access().extractfile(path) or io.BytesIO()
+
+    def iter_documents(self, extensions):
+        extensions = set(extensions)
+        paths = []
+        with tarfile.open(self.location, mode='r|*') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                paths.append(member.name)
+                if PurePosixPath(member.name).suffix.lower() not in extensions:
+                    continue
+                f = tar.extractfile(member)
+                if f is None:
+                    continue
+                with f:
+                    yield member.name, f.read().decode('utf-8', errors='ignore')
+        self._paths = paths
+
+    def close(self):
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+
+
+class GitSource(CodeSource):
+    """
+    Origem de código lida diretamente do banco de objetos de um repositório git.
+
+    Os blobs de uma revisão são lidos com `git cat-file --batch`, sem checkout,
+    o que também funciona em repositórios bare.
+
+    Attributes:
+        ref (str): Revisão analisada (commit, branch ou tag)
+    """
+
+    def __init__(self, location, ref='HEAD'):
+        super().__init__(location)
+        self.ref = ref or 'HEAD'
+        self._batch = None
+        self._blobs = None
+
+    def _git(self, *args):
+        result = subprocess.run(
+            ['git', '-C', self.location, *args],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+        )
+        if result.returncode != 0:
+            raise ValueError(f"Erro ao executar git {' '.join(args)}: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+        return result.stdout
+
+    def _tree(self):
+        if self._blobs is None:
+            self._blobs = {}
+            output = self._git('ls-tree', '-r', '-z', '--full-tree', self.ref)
+            for entry in output.split(b'\0'):
+                if not entry:
+                    continue
+                meta, path = entry.split(b'\t', 1)
+                _, obj_type, sha = meta.split(b' ')
+                if obj_type == b'blob':
+                    self._blobs[path.decode('utf-8', errors='ignore')] = sha.decode('ascii')
+        return self._blobs
+
+    def _cat_file(self, sha):
+        if self._batch is None:
+            self._batch = subprocess.Popen(
+                ['git', '-C', self.location, 'cat-file', '--batch'],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE
+            )
+        self._batch.stdin.write(sha.encode('ascii') + b'\n')
+        self._batch.stdin.flush()
+        header = self._batch.stdout.readline().split()
+        if len(header) < 3 or header[1] == b'missing':
+            raise ValueError(f"Objeto git não encontrado: {sha}")
+        data = self._batch.stdout.read(int(header[2]))
+        self._batch.stdout.read(1)  # quebra de linha após o conteúdo
+        return data
+
+    def iter_paths(self):
+        yield from self._tree().keys()
+
+    def read_text(self, path):
+        sha = self._tree().get(path)
+        if sha is None:
+            raise FileNotFoundError(f"{path} não existe em {self.ref}")
+        return self._cat_file(sha).decode('utf-8', errors='ignore')
+
+    def open_binary(self, path):
+        # O cat-file entrega o blob inteiro: a memória acompanha o maior arquivo lido
+        sha = self._tree().get(path)
+        if sha is None:
+            raise FileNotFoundError(f"{path} não existe em {self.ref}")
+        return io.BytesIO(self._cat_file(sha))
+
+    def close(self):
+        if self._batch is not None:
+            self._batch.stdin.close()
+            self._batch.wait()
+            self._batch = None
+
+
+def is_bare_git_repo(location):
+    """
+    Verifica se o caminho é um repositório git bare (sem working tree).
+
+    Args:
+        location (str): Caminho do diretório
+
+    Returns:
+        bool: True se o diretório contém diretamente HEAD, objects e refs
+    """
+    path = Path(location)
+    return (path / 'HEAD').is_file() and (path / 'objects').is_dir() and (path / 'refs').is_dir()
+
+
+def open_source(location, ref=None):
+    """
+    Cria a origem de código adequada para o caminho informado.
+
+    Diretórios comuns são lidos do disco, a menos que uma revisão git seja
+    informada; repositórios bare são sempre lidos do banco de objetos. Arquivos
+    .zip e .tar(.gz/.bz2/.xz) são lidos sem extração.
+
+    Args:
+        location (str): Diretório, arquivo compactado ou repositório git
+        ref (str, optional): Revisão git a ser analisada
+
+    Returns:
+        CodeSource: Origem correspondente
+
+    Raises:
+        ValueError: Se o formato da origem não for reconhecido
+    """
+    location = str(location)
+    if os.path.isdir(location):
+        if ref or is_bare_git_repo(location):
+            logging.info(f"Lendo repositório git {location} na revisão {ref or 'HEAD'}")
+            return GitSource(location, ref)
+        return FileSystemSource(location)
+    if zipfile.is_zipfile(location):
+        logging.info(f"Lendo arquivo zip sem extração: {location}")
+        return ZipSource(location)
+    if tarfile.is_tarfile(location):
+        logging.info(f"Lendo arquivo tar sem extração: {location}")
+        return TarSource(location)
+    raise ValueError(f"Formato de origem não suportado: {location}")
@@ -0,0 +1,267 @@
+"""
+Modo de acompanhamento (watch): reanalisa apenas o que mudou em um diretório.
+
+Um DirectoryWatcher verifica o diretório periodicamente comparando apenas
+data de modificação e tamanho dos arquivos de código (os.scandir, sem ler
+conteúdo) e agrupa rajadas de alterações (ex.: "salvar tudo" no editor,
+troca de branch) em um único lote. A WatchSession reextrai somente os
+arquivos do lote e só consulta o modelo de IA para os métodos cujo hash
+mudou; os demais reaproveitam o resultado anterior. Cada lote gera uma
+nova versão dos resultados, que pode ser aguardada (long polling) pela
+interface web ou pela linha de comando.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analyzer.cnpj_analyzer import GenericCNPJAnalyzer, SUPPORTED_EXTENSIONS
+
+
+def snapshot(directory, extensions):
+    """
+    Estado dos arquivos de código de um diretório.
+
+    Args:
+        directory (str): Diretório monitorado
+        extensions (set): Extensões aceitas (com ponto, em minúsculas)
+
+    Returns:
+        dict: Caminho -> (mtime em ns, tamanho)
+    """
+    state = {}
+    stack = [directory]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue  # Diretório removido durante a varredura
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in extensions:
+                        stat = entry.stat()
+                        state[entry.path] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    continue
+    return state
+
+
+class DirectoryWatcher:
+    """
+    Monitora um diretório por varredura periódica e entrega as alterações em lotes.
+
+    Um lote é entregue quando nenhuma nova alteração aparece por debounce
+    segundos, de modo que uma rajada de gravações gera uma única reanálise.
+
+    Args:
+        directory (str): Diretório monitorado
+        on_change (callable): Recebe (arquivos alterados ou criados, arquivos removidos)
+        extensions (set, optional): Extensões monitoradas (padrão: as suportadas pelo analisador)
+        interval (float): Intervalo entre varreduras em segundos
+        debounce (float): Tempo sem alterações para fechar um lote
+    """
+
+    def __init__(self, directory, on_change, extensions=None, interval=1.0, debounce=0.5):
+        self.directory = directory
+        self.on_change = on_change
+        self.extensions = extensions or {ext for exts in SUPPORTED_EXTENSIONS.values() for ext in exts}
+        self.interval = interval
+        self.debounce = debounce
+        self._state = snapshot(directory, self.extensions)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        """
+        Compara o diretório com a última varredura.
+
+        Returns:
+            tuple: (arquivos alterados ou criados, arquivos removidos)
+        """
+        current = snapshot(self.directory, self.extensions)
+        changed = {path for path, state in current.items() if self._state.get(path) != state}
+        deleted = set(self._state) - set(current)
+        self._state = current
+        return changed, deleted
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name='watch', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self):
+        changed, deleted = set(), set()
+        last_change = None
+        while not self._stop.wait(self.interval if last_change is None else min(self.interval, self.debounce)):
+            new_changed, new_deleted = self.poll()
+            if new_changed or new_deleted:
+                changed = (changed | new_changed) - new_deleted
+                deleted = (deleted | new_deleted) - new_changed
+                last_change = time.monotonic()
+                continue
+            if last_change is not None and time.monotonic() - last_change >= self.debounce:
+                batch, changed, deleted, last_change = (changed, deleted), set(), set(), None
+                try:
+                    self.on_change(*batch)
+                except Exception as e:
+                    logging.error(f"Erro ao reanalisar alterações: {str(e)}")
+
+
+class WatchSession:
+    """
+    Resultados de um diretório mantidos atualizados enquanto os arquivos são editados.
+
+    Args:
+        directory (str): Diretório monitorado
+        ai_model (AIModelInterface): Modelo de IA compartilhado
+        workers (int): Chamadas simultâneas ao modelo em cada lote (com scheduler, 0 = sem limite próprio)
+        interval (float): Intervalo entre varreduras em segundos
+        debounce (float): Tempo sem alterações para fechar um lote
+        scheduler (FairShareScheduler, optional): Divisor das vagas do provedor; com ele, as
+            chamadas da sessão disputam as vagas com as demais análises (ex.: /analyze)
+
+    Attributes:
+        version (int): Incrementada a cada lote processado
+        last_update (dict): Resumo do último lote (arquivos, métodos reanalisados e reaproveitados)
+        error (str): Erro que interrompeu a análise inicial, ou None
+    """
+
+    def __init__(self, directory, ai_model, workers=4, interval=1.0, debounce=0.5, scheduler=None):
+        self.directory = directory
+        self.analyzer = GenericCNPJAnalyzer(ai_model=ai_model)
+        self.workers = workers
+        self._executor = (scheduler.job(f"watch {directory}", max_concurrent=workers) if scheduler is not None
+                          else ThreadPoolExecutor(max_workers=workers, thread_name_prefix='watch'))
+        self.version = 0
+        self.last_update = None
+        self.error = None
+        self._stopped = False
+        self._lifecycle_lock = threading.Lock()  # Serializa o início do monitoramento com stop()
+        self._results = {}  # Arquivo -> pares (hash do método, resultado)
+        self._by_digest = {}  # Hash do método -> resultado, para reaproveitar métodos inalterados
+        self._condition = threading.Condition()
+        self._process_lock = threading.Lock()
+        self._watcher = DirectoryWatcher(directory, self.update, interval=interval, debounce=debounce)
+
+    def start(self):
+        """
+        Faz a análise inicial completa e passa a monitorar o diretório.
+
+        Pode levar minutos em um diretório grande: quem inicia a sessão em uma
+        requisição deve chamá-lo em outra thread e acompanhar o resultado por
+        wait(). Se stop() for chamado antes do fim, o monitoramento não começa.
+        """
+        try:
+            self.update(set(self._watcher._state), set())
+        except Exception as e:
+            logging.error(f"Erro na análise inicial do watch {self.directory}: {str(e)}")
+            with self._condition:
+                self.error = str(e)
+                self._condition.notify_all()
+            return self
+        with self._lifecycle_lock:
+            if not self._stopped:
+                self._watcher.start()
+        return self
+
+    def stop(self):
+        with self._lifecycle_lock:
+            self._stopped = True
+            self._watcher.stop()
+        with self._process_lock:  # Aguarda o lote em andamento antes de fechar as origens
+            self.analyzer.files.close()
+        self._executor.shutdown()
+
+    def update(self, changed, deleted):
+        """
+        Reanalisa os arquivos alterados e remove os resultados dos arquivos apagados.
+
+        Args:
+            changed (set): Arquivos alterados ou criados
+            deleted (set): Arquivos removidos
+        """
+        with self._process_lock:
+            if self._stopped:
+                return
+            started = time.perf_counter()
+            analyzer = self.analyzer
+            # Os métodos dos arquivos alterados ou apagados saem do índice antes da reextração: as
+            # dependências não apontam para métodos que não existem mais, e o índice não cresce a cada gravação
+            touched = changed | deleted
+            analyzer.all_methods.remove_files({analyzer.files.add(path) for path in touched})
+            analyzer.degraded = [entry for entry in analyzer.degraded if entry['arquivo'] not in touched]
+            for path in changed:
+                language = analyzer.detect_language(os.path.splitext(path)[1].lower())
+                if language:
+                    analyzer.analyze_file(path, language)
+            pending, analyzer.pending = analyzer.pending, []
+
+            reused = [candidate for candidate in pending if candidate.digest in self._by_digest]
+            new = [candidate for candidate in pending if candidate.digest not in self._by_digest]
+            futures = [self._executor.submit(analyzer.analyze_candidate, candidate) for candidate in new]
+            analyzed = [future.result() for future in futures]
+            analyzer.findings.clear()
+            analyzer.failed.clear()
+            analyzer.callers.clear()  # Fan-in dos métodos pendentes, que já foram todos analisados
+
+            results = {path: [] for path in changed}
+            for candidate, finding in zip(new, analyzed):
+                results[analyzer.files.path(candidate.file_id)].append((candidate.digest, finding))
+            for candidate in reused:
+                path = analyzer.files.path(candidate.file_id)
+                finding = dict(self._by_digest[candidate.digest], arquivo=path, linha=candidate.start_line)
+                results[path].append((candidate.digest, finding))
+
+            with self._condition:
+                for path in deleted:
+                    self._results.pop(path, None)
+                for path, entries in results.items():
+                    if entries:
+                        self._results[path] = sorted(entries, key=lambda entry: entry[1].get('linha') or 0)
+                    else:
+                        self._results.pop(path, None)
+                # Só os métodos atuais com resultado válido: ERRO é reconsultado na próxima alteração
+                self._by_digest = {
+                    digest: finding
+                    for entries in self._results.values() for digest, finding in entries
+                    if finding['tipo_uso'] != 'ERRO'
+                }
+                self.version += 1
+                self.last_update = {
+                    'versao': self.version,
+                    'arquivos': sorted(changed | deleted),
+                    'reanalisados': len(new),
+                    'reaproveitados': len(reused),
+                    'duracao_s': round(time.perf_counter() - started, 2)
+                }
+                self._condition.notify_all()
+            logging.info(f"Watch {self.directory}: {len(changed)} alterados, {len(deleted)} removidos, "
+                         f"{len(new)} métodos reanalisados, {len(reused)} reaproveitados")
+
+    def findings(self):
+        """Resultados atuais, ordenados por arquivo e linha."""
+        with self._condition:
+            return [finding for path in sorted(self._results) for _, finding in self._results[path]]
+
+    def wait(self, version, timeout=25.0):
+        """
+        Aguarda uma versão mais nova que a informada, ou o erro da análise inicial (long polling).
+
+        Args:
+            version (int): Última versão conhecida pelo cliente
+            timeout (float): Espera máxima em segundos
+
+        Returns:
+            bool: Se há uma versão mais nova
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self.version > version or self.error is not None, timeout)
@@ -0,0 +1,623 @@
+"""
+Interface de linha de comando do analisador de CNPJ.
+
+Permite analisar vários repositórios (diretórios, arquivos compactados ou
+repositórios git) em uma única execução, sem a interface web. Todos os
+repositórios compartilham o mesmo pool de chamadas ao modelo de IA, o mesmo
+cache de respostas e o mesmo limitador de taxa do provedor.
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+from config import (AI_MODEL_TYPE, OLLAMA_URL, OLLAMA_MODEL, MISTRAL_MODEL,
+                    AI_MAX_CONCURRENCY, AI_REQUESTS_PER_MINUTE, LLM_CACHE_PATH, REPORT_FORMATS,
+                    ANALYZER_PROFILE, PROFILE_TOP_N, BATCH_MAX_REQUESTS, BATCH_POLL_INTERVAL)
+from ai import CachedModel, LLMCache, RateLimitedModel, RateLimiter
+from analyzer.cnpj_analyzer import GenericCNPJAnalyzer, create_ai_model
+from analyzer.reporting import ReportGenerator, EXPORT_FORMATS
+from analyzer.prioritization import PriorityExecutor
+from analyzer.distributed import WorkQueue, publish, wait_for_job, run_worker
+from analyzer.bulk import BulkJob, run_jobs
+from analyzer.profiling import RunProfiler
+from analyzer.diff import diff_findings, find_report, load_run
+
+
+def parse_args(argv=None):
+    """
+    Interpreta os argumentos da linha de comando.
+
+    Args:
+        argv (list, optional): Argumentos (padrão: sys.argv[1:])
+
+    Returns:
+        argparse.Namespace: Argumentos interpretados
+    """
+    parser = argparse.ArgumentParser(description="Analisa o impacto do CNPJ alfanumérico em um ou mais repositórios.")
+    parser.add_argument('paths', nargs='*', help="Diretórios, arquivos .zip/.tar.gz ou repositórios git")
+    parser.add_argument('--path', action='append', default=[], dest='extra_paths',
+                        help="Origem a ser analisada (pode ser repetido)")
+    parser.add_argument('--list', dest='list_file',
+                        help="Arquivo texto com uma origem por linha")
+    parser.add_argument('--ref', help="Revisão git a ser analisada nos repositórios git")
+    parser.add_argument('--output-dir', default='reports', help="Diretório dos relatórios (padrão: reports)")
+    parser.add_argument('--formats', default=','.join(REPORT_FORMATS),
+                        type=lambda value: tuple(fmt.strip().lower() for fmt in value.split(',') if fmt.strip()),
+                        help=f"Formatos dos relatórios separados por vírgula: {', '.join(EXPORT_FORMATS)} "
+                             f"(padrão: {','.join(REPORT_FORMATS)})")
+    parser.add_argument('--profile', action='store_true', default=ANALYZER_PROFILE,
+                        help="Gravar o perfil de desempenho de cada origem ao lado do relatório "
+                             "(cProfile, arquivos e padrões regex mais lentos)")
+    parser.add_argument('--data-files', action='store_true',
+                        help="Procurar também literais de CNPJ em arquivos de dados (CSV, JSON, SQL, configuração) "
+                             "e gravar as contagens por arquivo e coluna ou chave ao lado do relatório")
+    parser.add_argument('--compare-with', metavar='DIR',
+                        help="Diretório dos relatórios de uma execução anterior (pode ser o próprio --output-dir): "
+                             "grava os métodos novos, removidos e alterados de cada origem (aba Delta e "
+                             "<origem>_analise_cnpj.delta.json)")
+    parser.add_argument('--model', default=AI_MODEL_TYPE, help="Provedor de IA: anthropic, ollama ou mistral")
+    parser.add_argument('--workers', type=int, default=AI_MAX_CONCURRENCY,
+                        help="Chamadas simultâneas ao provedor de IA, compartilhadas por todos os repositórios")
+    parser.add_argument('--extract-workers', type=int, default=2,
+                        help="Repositórios extraídos em paralelo enquanto o modelo processa os anteriores")
+    parser.add_argument('--rpm', type=float, default=AI_REQUESTS_PER_MINUTE,
+                        help="Limite de requisições por minuto ao provedor (0 = sem limite)")
+    parser.add_argument('--cache', default=LLM_CACHE_PATH,
+                        help="Arquivo SQLite do cache de respostas (vazio = apenas em memória)")
+    parser.add_argument('--time-budget', type=float,
+                        help="Tempo máximo (s) para iniciar chamadas ao modelo; os métodos de menor risco restantes são ignorados")
+    parser.add_argument('--top-k', type=int,
+                        help="Analisar apenas os K métodos de maior risco (somando todos os repositórios)")
+    parser.add_argument('--token-budget', type=int,
+                        help="Orçamento de tokens de entrada estimados para as chamadas ao modelo")
+    parser.add_argument('--sample', type=float,
+                        help="Modo de amostragem: analisa apenas uma amostra estratificada (quantidade ou fração) e extrapola as horas")
+    parser.add_argument('--seed', type=int, help="Semente do sorteio da amostra")
+    parser.add_argument('--partial-every', type=int, default=0,
+                        help="Gravar um relatório parcial a cada N métodos analisados em cada repositório")
+    parser.add_argument('--queue',
+                        help="Modo distribuído: diretório compartilhado da fila de trabalho. Sem --worker, "
+                             "extrai e publica os métodos e aguarda os resultados dos workers")
+    parser.add_argument('--worker', action='store_true',
+                        help="Executar como worker da fila informada em --queue (usa --workers chamadas simultâneas)")
+    parser.add_argument('--local-workers', type=int, default=0,
+                        help="Workers iniciados nesta máquina pelo coordenador do modo distribuído")
+    parser.add_argument('--lease-seconds', type=float, default=300,
+                        help="Tempo de alocação de cada método a um worker antes de voltar à fila")
+    parser.add_argument('--keep-running', action='store_true',
+                        help="Worker continua aguardando trabalho mesmo com a fila vazia")
+    parser.add_argument('--bulk', metavar='DIR',
+                        help="Modo em lote: envia os métodos às APIs de lote do provedor (anthropic ou mistral) "
+                             "e guarda em DIR o estado para retomar uma execução interrompida")
+    parser.add_argument('--poll-interval', type=float, default=BATCH_POLL_INTERVAL,
+                        help=f"Segundos entre as consultas aos lotes no modo em lote (padrão: {BATCH_POLL_INTERVAL:g})")
+    parser.add_argument('--batch-size', type=int, default=BATCH_MAX_REQUESTS,
+                        help=f"Métodos por lote no modo em lote (padrão: {BATCH_MAX_REQUESTS})")
+    return parser.parse_args(argv)
+
+
+def read_targets(args):
+    """
+    Monta a lista de origens a partir dos argumentos e do arquivo de lista.
+
+    Returns:
+        list: Origens sem duplicatas, na ordem informada
+    """
+    targets = list(args.paths) + list(args.extra_paths)
+    if args.list_file:
+        with open(args.list_file, 'r', encoding='utf-8') as f:
+            targets.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    return list(dict.fromkeys(targets))
+
+
+def build_shared_model(args):
+    """
+    Cria o modelo de IA compartilhado, com cache e limitador de taxa.
+
+    O cache fica por fora do limitador: respostas do cache não ocupam vaga
+    nem consomem requisições por minuto, e uma reexecução com o cache
+    preenchido não fica presa à cota do provedor.
+
+    Returns:
+        tuple: (modelo, cache)
+    """
+    base_model = create_ai_model(args.model, OLLAMA_URL, OLLAMA_MODEL, MISTRAL_MODEL)
+    cache = LLMCache(args.cache or None)
+    limiter = RateLimiter(max_concurrent=args.workers, requests_per_minute=args.rpm)
+    return CachedModel(RateLimitedModel(base_model, limiter), cache), cache
+
+
+def report_basename(target, used):
+    """Gera um nome de relatório legível e único para a origem."""
+    name = os.path.basename(os.path.normpath(target)) or 'raiz'
+    name = re.sub(r'(\.tar\.gz|\.tar\.bz2|\.tar\.xz|\.tgz|\.zip|\.tar|\.git)$', '', name)
+    name = re.sub(r'[^\w.-]+', '_', name)
+    candidate, i = name, 2
+    while candidate in used:
+        candidate = f"{name}_{i}"
+        i += 1
+    used.add(candidate)
+    return candidate
+
+
+def summarize(target, analyzer, status, elapsed, report=None, error=None):
+    """
+    Resume o resultado de um repositório para o relatório consolidado.
+
+    Returns:
+        dict: Linha do resumo consolidado
+    """
+    findings = analyzer.findings if analyzer else []
+    estimate = analyzer.estimate if analyzer else None
+    parse = analyzer.parse_failure_rate() if analyzer else {}
+    responses = sum(stats['respostas'] for stats in parse.values())
+    parse_failures = sum(stats['falhas_parse'] for stats in parse.values())
+    severities = [f.get('severidade') for f in findings]
+    return {
+        'origem': target,
+        'status': status,
+        'metodos_analisados': len(findings),
+        'erros_analise': sum(1 for f in findings if f.get('tipo_uso') == 'ERRO'),
+        'ALTA': severities.count('ALTA'),
+        'MEDIA': severities.count('MEDIA'),
+        'BAIXA': severities.count('BAIXA'),
+        'horas_dev': sum(f.get('horas_dev', 0) for f in findings),
+        'horas_teste': sum(f.get('horas_teste', 0) for f in findings),
+        'horas_total': sum(f.get('horas_total', 0) for f in findings),
+        'nao_analisados': analyzer.skipped if analyzer else 0,
+        'arquivos_degradados': len(analyzer.degraded) if analyzer else 0,
+        'falhas_parse': parse_failures,
+        'taxa_falha_parse': round(parse_failures / responses, 4) if responses else 0.0,
+        'recuperadas_retentativa': sum(stats['recuperadas'] for stats in parse.values()),
+        'amostra_sorteada': estimate['amostra_sorteada'] if estimate else None,
+        'horas_total_estimadas': estimate['horas_total']['estimativa'] if estimate else None,
+        'horas_total_ic95': (f"{estimate['horas_total']['ic_inferior']}-{estimate['horas_total']['ic_superior']}"
+                             if estimate else ''),
+        'duracao_s': round(elapsed, 1),
+        'relatorio': report or '',
+        'erro': error or ''
+    }
+
+
+def finish_target(target, analyzer, name, start, output_dir, status, error=None, sample_size=None,
+                  formats=REPORT_FORMATS, data_results=None, compare_dir=None):
+    """
+    Gera o relatório de uma origem analisada (nos formatos informados) e monta sua linha no resumo consolidado.
+
+    Com data_results (varredura dos arquivos de dados), grava também os
+    literais de CNPJ encontrados e soma-os ao resumo. Com compare_dir, os
+    resultados são comparados com o relatório da mesma origem naquele
+    diretório (lido antes de ser sobrescrito, se for o mesmo) e o delta
+    entra no relatório, em <origem>_analise_cnpj.delta.json e no resumo.
+
+    Returns:
+        dict: Linha do resumo consolidado
+    """
+    analyzer.files.close()  # Libera as origens reabertas para reler os métodos
+    report = delta = None
+    basename = os.path.join(output_dir, f"{name}_analise_cnpj")
+    if status != 'falha':
+        try:
+            if sample_size:
+                analyzer.estimate_from_sample()
+            analyzer.propagate_impact()
+            base_report = find_report(os.path.join(compare_dir, f"{name}_analise_cnpj")) if compare_dir else None
+            if base_report:
+                delta = diff_findings(load_run(base_report), analyzer.findings)
+                delta['resumo'].update(base=base_report, atual=basename)
+                with open(f"{basename}.delta.json", 'w', encoding='utf-8') as f:
+                    json.dump(delta, f, ensure_ascii=False)
+            elif compare_dir:
+                logging.info(f"Sem relatório anterior de {target} em {compare_dir}: delta não gerado")
+            files = ReportGenerator(analyzer.findings, analyzer.estimate, analyzer.parse_stats,
+                                    delta=delta).export(basename, formats)
+            report = ', '.join(files.values())
+            if analyzer.profiler is not None:
+                analyzer.profiler.write(basename)
+        except Exception as e:
+            logging.error(f"Erro ao gerar relatório de {target}: {str(e)}")
+            status, error, report = 'falha', str(e), None
+    if status == 'ok' and any(f.get('tipo_uso') == 'ERRO' for f in analyzer.findings):
+        status = 'com_erros'
+    summary = summarize(target, analyzer, status, time.monotonic() - start, report, error)
+    if data_results is not None:
+        from analyzer.data_scan import write_data_scan  # numpy: só com --data-files
+        write_data_scan(data_results, basename)
+        summary['literais_dados'] = sum(r.literals for r in data_results)
+        summary['literais_dados_invalidos'] = sum(r.literals - r.valid for r in data_results)
+    if delta is not None:
+        summary.update({key if key.startswith('delta_') else f'delta_{key}': delta['resumo'][key]
+                        for key in ('novos', 'removidos', 'alterados', 'severidade_aumentou', 'delta_horas')})
+    logging.info(f"[{status}] {target}: {summary['metodos_analisados']} métodos analisados")
+    return summary
+
+
+def run_batch(targets, model, output_dir, workers, extract_workers=2, ref=None,
+              time_budget=None, top_k=None, token_budget=None, partial_every=0, sample_size=None, seed=None,
+              formats=REPORT_FORMATS, profile=False, data_files=False, compare_dir=None):
+    """
+    Analisa várias origens compartilhando o pool de chamadas ao modelo de IA.
+
+    A extração de cada repositório roda em um pool próprio; assim que termina,
+    os métodos encontrados entram na fila do pool de IA. Com isso, a extração
+    dos próximos repositórios acontece enquanto o modelo processa os anteriores
+    e nenhum slot do provedor fica ocioso esperando um repositório terminar.
+    Quando todas as análises de um repositório terminam, apenas os métodos com
+    resposta inválida voltam ao pool (até AI_PARSE_RETRIES vezes).
+    A fila do pool de IA é ordenada pelo risco estático dos métodos, de modo
+    que os de maior risco são analisados primeiro.
+
+    Args:
+        targets (list): Origens a serem analisadas
+        model (AIModelInterface): Modelo compartilhado (com cache e limitador)
+        output_dir (str): Diretório dos relatórios por repositório
+        workers (int): Tamanho do pool de chamadas ao modelo
+        extract_workers (int): Repositórios extraídos em paralelo
+        ref (str, optional): Revisão git a ser analisada
+        time_budget (float, optional): Tempo máximo (s) para iniciar novas chamadas
+        top_k (int, optional): Quantidade máxima de métodos analisados
+        token_budget (int, optional): Orçamento de tokens de entrada estimados
+        partial_every (int): Intervalo, em métodos analisados, dos relatórios parciais (0 = desativado)
+        sample_size (int | float, optional): Ativa o modo de amostragem em cada repositório
+        seed (int, optional): Semente do sorteio da amostra
+        formats (tuple): Formatos dos relatórios (ver analyzer.reporting.EXPORT_FORMATS)
+        profile (bool): Gravar o perfil de desempenho de cada origem (as chamadas ao modelo
+            rodam nas threads do pool e entram apenas no tempo total, não no cProfile)
+        data_files (bool): Varrer também os arquivos de dados de cada origem, na extração
+        compare_dir (str, optional): Diretório dos relatórios da execução anterior, para o delta
+
+    Returns:
+        list: Linhas do resumo consolidado, na ordem das origens
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    used_names = set()
+    jobs = {}
+    for target in targets:
+        analyzer = GenericCNPJAnalyzer(ai_model=model)
+        if profile:
+            analyzer.profiler = RunProfiler(PROFILE_TOP_N)
+        jobs[target] = {
+            'analyzer': analyzer,
+            'name': report_basename(target, used_names),
+            'start': time.monotonic(),
+            'futures': set(),
+            'done': 0,
+            'data': None
+        }
+
+    summaries = {}
+    owner = {}
+
+    def finish(target, status, error=None):
+        job = jobs[target]
+        summaries[target] = finish_target(target, job['analyzer'], job['name'], job['start'], output_dir,
+                                          status, error, sample_size, formats, job['data'], compare_dir)
+
+    def write_partial(target):
+        job = jobs[target]
+        partial = os.path.join(output_dir, f"{job['name']}_analise_cnpj_parcial.xlsx")
+        try:
+            ReportGenerator(list(job['analyzer'].findings)).export_to_excel(partial)
+        except Exception as e:
+            logging.warning(f"Erro ao gravar relatório parcial de {target}: {str(e)}")
+
+    def submit(target, job):
+        for llm_future in job['analyzer'].submit_pending(llm_pool):
+            owner[llm_future] = (target, 'ia')
+            job['futures'].add(llm_future)
+            active.add(llm_future)
+
+    def extract(analyzer, target):
+        analyzer.collect(target, ref)
+        if sample_size:
+            analyzer.sample_pending(sample_size, seed)
+        if data_files:
+            jobs[target]['data'] = DataFileScanner().scan(target, ref)
+
+    if data_files:
+        from analyzer.data_scan import DataFileScanner  # numpy: só com --data-files
+
+    llm_pool = PriorityExecutor(max_workers=workers, time_budget=time_budget,
+                                max_items=top_k, token_budget=token_budget)
+    with llm_pool, ThreadPoolExecutor(max_workers=extract_workers, thread_name_prefix='extracao') as extract_pool:
+        active = set()
+        for target, job in jobs.items():
+            future = extract_pool.submit(extract, job['analyzer'], target)
+            owner[future] = (target, 'extracao')
+            active.add(future)
+
+        while active:
+            done, active = wait(active, return_when=FIRST_COMPLETED)
+            for future in done:
+                target, stage = owner.pop(future)
+                job = jobs[target]
+                if target in summaries:
+                    continue
+                if future.cancelled():
+                    job['analyzer'].skipped += 1
+                elif future.exception() is not None:
+                    logging.error(f"Erro ao analisar {target}: {future.exception()}")
+                    for pending in job['futures']:
+                        pending.cancel()
+                    finish(target, 'falha', str(future.exception()))
+                    continue
+                if stage == 'extracao':
+                    submit(target, job)
+                else:
+                    job['futures'].discard(future)
+                    if not future.cancelled():
+                        job['done'] += 1
+                        if partial_every and job['futures'] and job['done'] % partial_every == 0:
+                            write_partial(target)
+                if not job['futures'] and job['analyzer'].requeue_failed(executor=llm_pool):
+                    submit(target, job)
+                if not job['futures']:
+                    finish(target, 'ok')
+
+    return [summaries[target] for target in targets]
+
+
+def run_distributed(targets, model, output_dir, queue_dir, ref=None, sample_size=None, seed=None,
+                    local_workers=0, worker_argv=(), formats=REPORT_FORMATS, profile=False, compare_dir=None):
+    """
+    Coordenador do modo distribuído: extrai e publica os métodos e aguarda os workers.
+
+    A extração, o índice de símbolos e os relatórios ficam no coordenador;
+    os workers (nesta ou em outras máquinas, apontando para o mesmo
+    diretório) só chamam o modelo de IA. Ver analyzer.distributed.
+
+    Args:
+        targets (list): Origens a serem analisadas
+        model (AIModelInterface): Modelo do coordenador (não é chamado para análise)
+        output_dir (str): Diretório dos relatórios por repositório
+        queue_dir (str): Diretório compartilhado da fila
+        ref (str, optional): Revisão git a ser analisada
+        sample_size (int | float, optional): Ativa o modo de amostragem em cada repositório
+        seed (int, optional): Semente do sorteio da amostra
+        local_workers (int): Processos worker iniciados nesta máquina
+        worker_argv (list): Argumentos repassados aos workers locais
+        formats (tuple): Formatos dos relatórios (ver analyzer.reporting.EXPORT_FORMATS)
+        profile (bool): Gravar o perfil de desempenho da extração de cada origem
+        compare_dir (str, optional): Diretório dos relatórios da execução anterior, para o delta
+
+    Returns:
+        list: Linhas do resumo consolidado, na ordem das origens
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    queue = WorkQueue(queue_dir)
+    queue.reopen_publishing()
+    processes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--worker', '--queue', queue_dir, *worker_argv])
+        for _ in range(local_workers)
+    ]
+    workers_alive = (lambda: any(process.poll() is None for process in processes)) if processes else None
+    used_names = set()
+    summaries = {}
+    jobs = {}
+    try:
+        for target in targets:
+            analyzer = GenericCNPJAnalyzer(ai_model=model)
+            if profile:
+                analyzer.profiler = RunProfiler(PROFILE_TOP_N)
+            name, start = report_basename(target, used_names), time.monotonic()
+            try:
+                analyzer.collect(target, ref)
+                if sample_size:
+                    analyzer.sample_pending(sample_size, seed)
+                jobs[target] = (analyzer, publish(queue, analyzer, target, ref), name, start)
+            except Exception as e:
+                logging.error(f"Erro ao analisar {target}: {str(e)}")
+                summaries[target] = finish_target(target, analyzer, name, start, output_dir, 'falha', str(e))
+        queue.close_publishing()
+
+        for target, (analyzer, job, name, start) in jobs.items():
+            try:
+                findings, abandoned, per_worker = wait_for_job(queue, job, workers_alive=workers_alive)
+            except RuntimeError as e:
+                logging.error(str(e))
+                summaries[target] = finish_target(target, analyzer, name, start, output_dir, 'falha', str(e))
+                continue
+            analyzer.findings = findings
+            analyzer.skipped = abandoned
+            logging.info(f"Resultados de {target} por worker: {per_worker}")
+            summaries[target] = finish_target(target, analyzer, name, start, output_dir, 'ok',
+                                              sample_size=sample_size, formats=formats, compare_dir=compare_dir)
+    except BaseException:
+        for process in processes:
+            process.terminate()
+        raise
+    finally:
+        for process in processes:
+            process.wait()
+        queue.close()
+    return [summaries[target] for target in targets]
+
+
+def run_bulk(targets, model, output_dir, state_dir, ref=None, sample_size=None, seed=None,
+             poll_interval=BATCH_POLL_INTERVAL, batch_size=BATCH_MAX_REQUESTS, formats=REPORT_FORMATS,
+             profile=False, compare_dir=None):
+    """
+    Modo em lote: extrai os métodos, envia os prompts às APIs de lote do provedor e aguarda os resultados.
+
+    A extração e os relatórios são os mesmos das demais execuções; só as
+    chamadas ao modelo são substituídas por lotes (ver analyzer.bulk). Uma
+    execução interrompida é retomada executando o mesmo comando, com o
+    mesmo diretório de estado.
+
+    Args:
+        targets (list): Origens a serem analisadas
+        model (AIModelInterface): AnthropicModel ou MistralAPIModel, sem cache nem limitador de taxa
+        output_dir (str): Diretório dos relatórios por repositório
+        state_dir (str): Diretório do estado dos lotes
+        ref (str, optional): Revisão git a ser analisada
+        sample_size (int | float, optional): Ativa o modo de amostragem (use seed para poder retomar)
+        seed (int, optional): Semente do sorteio da amostra
+        poll_interval (float): Intervalo entre as consultas aos lotes
+        batch_size (int): Métodos por lote
+        formats (tuple): Formatos dos relatórios (ver analyzer.reporting.EXPORT_FORMATS)
+        profile (bool): Gravar o perfil de desempenho da extração de cada origem
+        compare_dir (str, optional): Diretório dos relatórios da execução anterior, para o delta
+
+    Returns:
+        list: Linhas do resumo consolidado, na ordem das origens
+    """
+    from ai import create_batch_client  # ai.Batch importa requests: só no modo em lote
+
+    os.makedirs(output_dir, exist_ok=True)
+    client = create_batch_client(model)
+    used_names = set()
+    summaries = {}
+    jobs = {}
+    for target in targets:
+        analyzer = GenericCNPJAnalyzer(ai_model=model)
+        if profile:
+            analyzer.profiler = RunProfiler(PROFILE_TOP_N)
+        name, start = report_basename(target, used_names), time.monotonic()
+        try:
+            analyzer.collect(target, ref)
+            if sample_size:
+                analyzer.sample_pending(sample_size, seed)
+            jobs[target] = (BulkJob(analyzer, client, state_dir, target, ref), name, start)
+        except Exception as e:
+            logging.error(f"Erro ao analisar {target}: {str(e)}")
+            summaries[target] = finish_target(target, analyzer, name, start, output_dir, 'falha', str(e))
+
+    run_jobs([job for job, _, _ in jobs.values()], poll_interval, batch_size)
+    for target, (job, name, start) in jobs.items():
+        if job.error is not None:
+            summaries[target] = finish_target(target, job.analyzer, name, start, output_dir, 'falha', job.error)
+            continue
+        summaries[target] = finish_target(target, job.analyzer, name, start, output_dir, 'ok',
+                                          sample_size=sample_size, formats=formats, compare_dir=compare_dir)
+    return [summaries[target] for target in targets]
+
+
+def write_summary(summaries, output_dir):
+    """
+    Grava o resumo consolidado em Excel e JSON.
+
+    Returns:
+        str: Caminho do resumo em Excel
+    """
+    import pandas as pd
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    excel_file = os.path.join(output_dir, f"resumo_consolidado_{timestamp}.xlsx")
+    pd.DataFrame(summaries).to_excel(excel_file, sheet_name='Resumo', index=False)
+    with open(os.path.join(output_dir, f"resumo_consolidado_{timestamp}.json"), 'w', encoding='utf-8') as f:
+        json.dump(summaries, f, ensure_ascii=False, indent=2)
+    logging.info(f"Resumo consolidado salvo em: {excel_file}")
+    return excel_file
+
+
+def main(argv=None):
+    """
+    Ponto de entrada da linha de comando.
+
+    Returns:
+        int: 0 se todas as origens foram analisadas sem erros, 1 caso contrário
+    """
+    args = parse_args(argv)
+    if args.worker:
+        if not args.queue:
+            logging.error("O modo worker exige --queue")
+            return 2
+        model, cache = build_shared_model(args)
+        queue = WorkQueue(args.queue)
+        try:
+            run_worker(queue, lambda: GenericCNPJAnalyzer(ai_model=model), concurrency=args.workers,
+                       lease_seconds=args.lease_seconds, exit_when_idle=not args.keep_running)
+        finally:
+            queue.close()
+            cache.close()
+        return 0
+
+    unknown = [fmt for fmt in args.formats if fmt not in EXPORT_FORMATS]
+    if unknown or not args.formats:
+        logging.error(f"Formatos de relatório inválidos: {', '.join(unknown) or '(nenhum)'}")
+        return 2
+    targets = read_targets(args)
+    if not targets:
+        logging.error("Nenhuma origem informada")
+        return 2
+    if args.queue and (args.time_budget or args.top_k or args.token_budget or args.partial_every or args.data_files):
+        logging.error("Orçamentos, relatórios parciais e arquivos de dados não são suportados no modo distribuído")
+        return 2
+    if args.bulk and (args.queue or args.time_budget or args.top_k or args.token_budget or args.partial_every
+                      or args.data_files):
+        logging.error("Fila distribuída, orçamentos, relatórios parciais e arquivos de dados não são suportados "
+                      "no modo em lote")
+        return 2
+
+    if args.bulk:
+        # Sem streaming, cache de respostas nem limitador: cada lote é uma única requisição ao provedor
+        try:
+            summaries = run_bulk(targets, create_ai_model(args.model, OLLAMA_URL, OLLAMA_MODEL, MISTRAL_MODEL,
+                                                          stream=False),
+                                 args.output_dir, args.bulk, args.ref, args.sample, args.seed, args.poll_interval,
+                                 args.batch_size, args.formats, args.profile, args.compare_with)
+        except ValueError as e:
+            logging.error(str(e))
+            return 2
+        write_summary(summaries, args.output_dir)
+        return report_status(summaries)
+
+    model, cache = build_shared_model(args)
+    try:
+        if args.queue:
+            worker_argv = ['--model', args.model, '--workers', str(args.workers), '--rpm', str(args.rpm),
+                           '--cache', args.cache or '', '--lease-seconds', str(args.lease_seconds)]
+            summaries = run_distributed(targets, model, args.output_dir, args.queue, args.ref, args.sample,
+                                        args.seed, args.local_workers, worker_argv, args.formats,
+                                        args.profile, args.compare_with)
+        else:
+            summaries = run_batch(targets, model, args.output_dir, args.workers, args.extract_workers, args.ref,
+                                  args.time_budget, args.top_k, args.token_budget, args.partial_every,
+                                  args.sample, args.seed, args.formats, args.profile, args.data_files,
+                                  args.compare_with)
+    finally:
+        cache.close()
+    write_summary(summaries, args.output_dir)
+    logging.info(f"Cache de respostas: {cache.hits} acertos, {cache.misses} falhas")
+    stats = getattr(model, 'stats', None)
+    if stats is not None and not args.queue:  # No modo distribuído, as chamadas são feitas pelos workers
+        logging.info(f"Streaming: {stats.summary()}")
+    cache_stats = getattr(model, 'cache_stats', None)
+    if cache_stats is not None and not args.queue:
+        logging.info(f"Cache de prompt: {cache_stats.summary()}")
+    node_stats = getattr(model, 'node_stats', None)  # Pool de servidores Ollama
+    if node_stats is not None:
+        for node in node_stats():
+            logging.info(f"Servidor {node['url']}: {node}")
+    return report_status(summaries)
+
+
+def report_status(summaries):
+    """
+    Registra as respostas inválidas e as origens com falhas de uma execução.
+
+    Returns:
+        int: 0 se todas as origens foram analisadas sem erros, 1 caso contrário
+    """
+    parse_failures = sum(s['falhas_parse'] for s in summaries)
+    if parse_failures:
+        logging.info(f"Respostas inválidas do modelo: {parse_failures} "
+                     f"({sum(s['recuperadas_retentativa'] for s in summaries)} recuperadas na nova tentativa)")
+
+    failures = [s for s in summaries if s['status'] != 'ok']
+    if failures:
+        logging.error(f"{len(failures)} de {len(summaries)} origens com falhas ou erros de análise")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,19 +6,139 @@ permitindo que usuários realizem análises de código através do navegador.
 """
 
 from flask import Flask, render_template, request, jsonify, send_file
-from analyzer.cnpj_analyzer import GenericCNPJAnalyzer
-from analyzer.reporting import ReportGenerator
+from analyzer.cnpj_analyzer import (GenericCNPJAnalyzer, create_ai_model, SUPPORTED_EXTENSIONS,
+                                    CNPJ_PATTERN, PATTERNS)
+from analyzer.reporting import ReportGenerator, EXPORT_FORMATS
+from analyzer.sources import open_source, FileSystemSource
+from analyzer.estimation import LatencyHistory, estimate_run, compare
+from analyzer.diff import diff_findings, diff_reports, find_report, load_run
+from analyzer.scheduling import FairShareScheduler
+from analyzer.watch import WatchSession
+from analyzer.profiling import RunProfiler
+from ai import AIModelInterface, RateLimitedModel, RateLimiter
 from datetime import datetime
 from pathlib import Path
-import re, os, logging
-from config import AI_MODEL_TYPE, OLLAMA_URL, OLLAMA_MODEL, MISTRAL_MODEL
+from collections import OrderedDict
+import re, os, json, logging, threading, hashlib, time
+from config import (AI_MODEL_TYPE, OLLAMA_URL, OLLAMA_MODEL, MISTRAL_MODEL, AI_MAX_CONCURRENCY,
+                    AI_REQUESTS_PER_MINUTE, AI_JOB_MAX_CONCURRENCY, WATCH_INTERVAL, WATCH_DEBOUNCE, REPORT_FORMATS,
+                    ANALYZER_PROFILE, PROFILE_TOP_N, REPORTS_DIR)
 
 app = Flask(__name__)
 
 # Criar diretório reports se não existir
-REPORTS_DIR = os.path.join(os.path.dirname(__file__), 'reports')
+REPORTS_DIR = REPORTS_DIR or os.path.join(os.path.dirname(__file__), 'reports')
 os.makedirs(REPORTS_DIR, exist_ok=True)
 
+# Modelo de IA compartilhado por todas as requisições do processo
+_ai_model = None
+_ai_model_lock = threading.Lock()
+
+
+def get_ai_model():
+    """
+    Retorna o modelo de IA do processo, criando-o na primeira chamada.
+
+    O cliente do provedor é construído uma única vez e reutilizado por todas
+    as análises; o limite de concorrência e de requisições por minuto vale
+    para o processo inteiro, mesmo com várias análises simultâneas.
+
+    Returns:
+        AIModelInterface: Modelo compartilhado
+    """
+    global _ai_model
+    with _ai_model_lock:
+        if _ai_model is None:
+            _ai_model = RateLimitedModel(
+                create_ai_model(AI_MODEL_TYPE, OLLAMA_URL, OLLAMA_MODEL, MISTRAL_MODEL),
+                RateLimiter(AI_MAX_CONCURRENCY, AI_REQUESTS_PER_MINUTE)
+            )
+        return _ai_model
+
+
+# Vagas de chamada ao provedor divididas entre as análises simultâneas (enfileiramento justo ponderado)
+_scheduler = FairShareScheduler(AI_MAX_CONCURRENCY)
+
+# Tipo de conteúdo de cada formato de relatório
+EXPORT_MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Resumos dos relatórios gerados (nome do relatório sem extensão -> JSON), os mais recentes em memória
+SUMMARY_CACHE_SIZE = 32
+_summaries = OrderedDict()
+_summaries_lock = threading.Lock()
+
+
+def _report_stem(report_name):
+    """Nome do relatório sem diretório e extensão (o mesmo para todos os formatos)."""
+    return os.path.splitext(os.path.basename(report_name))[0]
+
+
+def _summary_path(report_name):
+    """Arquivo JSON do resumo, gravado ao lado do relatório para sobreviver a reinícios."""
+    return os.path.join(REPORTS_DIR, _report_stem(report_name) + '.resumo.json')
+
+
+def store_summary(report_name, summary):
+    """Guarda o resumo de um relatório no cache e em disco."""
+    with open(_summary_path(report_name), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False)
+    _cache_summary(_report_stem(report_name), summary)
+
+
+def _new_report_name():
+    """
+    Nome de um novo relatório, reservado pela criação exclusiva do arquivo de resumo.
+
+    Análises simultâneas (inclusive em outros workers do gunicorn) podem
+    terminar no mesmo segundo; a segunda recebe o sufixo _2, e assim por
+    diante, em vez de sobrescrever os relatórios da primeira.
+    """
+    base = f'analise_cnpj_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+    attempt = 1
+    while True:
+        report_name = base if attempt == 1 else f'{base}_{attempt}'
+        try:
+            os.close(os.open(_summary_path(report_name), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return report_name
+        except FileExistsError:
+            attempt += 1
+
+
+def _delta_path(report_name):
+    """Arquivo JSON do delta de um relatório para a execução com que foi comparado."""
+    return os.path.join(REPORTS_DIR, _report_stem(report_name) + '.delta.json')
+
+
+def _cache_summary(report_name, summary):
+    with _summaries_lock:
+        _summaries[report_name] = summary
+        _summaries.move_to_end(report_name)
+        while len(_summaries) > SUMMARY_CACHE_SIZE:
+            _summaries.popitem(last=False)
+
+# Previsões da pré-análise ((diretório, ref) -> previsão), comparadas com a análise seguinte
+ESTIMATE_CACHE_SIZE = 32
+_estimates = OrderedDict()
+_estimates_lock = threading.Lock()
+_latency_history = LatencyHistory()
+
+
+def _remember_estimate(key, estimate):
+    with _estimates_lock:
+        _estimates[key] = estimate
+        _estimates.move_to_end(key)
+        while len(_estimates) > ESTIMATE_CACHE_SIZE:
+            _estimates.popitem(last=False)
+
+
+def _pop_estimate(key):
+    with _estimates_lock:
+        return _estimates.pop(key, None)
+
 @app.route('/')
 def index():
     """
@@ -35,7 +155,12 @@ def pre_analyze():
     Rota para análise prévia do diretório.
 
     Realiza uma análise rápida para contar arquivos e métodos,
-    sem executar a análise completa.
+    sem executar a análise completa. Extrai os métodos com CNPJ como a
+    análise, sem chamar o modelo de IA, e estima os tokens do prompt de cada
+    um; em 'previsao' vêm a duração e o custo previstos com o provedor, a
+    concorrência e o histórico de latência atuais (ver analyzer.estimation).
+    A previsão é comparada com os números reais no /analyze seguinte do
+    mesmo diretório.
 
     Returns:
         Response: JSON com estatísticas preliminares
@@ -48,15 +173,9 @@ def pre_analyze():
         return jsonify({'error': 'Diretório não encontrado'}), 404
 
     try:
-        # Obter extensões suportadas do analisador com configuração do modelo
-        analyzer = GenericCNPJAnalyzer(
-            model_type=AI_MODEL_TYPE,
-            ollama_url=OLLAMA_URL,
-            ollama_model=OLLAMA_MODEL,
-            mistral_model=MISTRAL_MODEL
-        )
+        # Obter extensões suportadas das tabelas do analisador (sem criar o modelo de IA)
         supported_extensions = []
-        for ext_list in analyzer.supported_extensions.values():
+        for ext_list in SUPPORTED_EXTENSIONS.values():
             supported_extensions.extend(ext_list)
         
         stats = {
@@ -68,95 +187,54 @@ def pre_analyze():
         }
         
         # Inicializar contagens por linguagem
-        for language in analyzer.supported_extensions.keys():
+        for language in SUPPORTED_EXTENSIONS.keys():
             stats['by_language'][language] = 0
         
-        # Contagem de arquivos e subdiretórios
-        for root, dirs, files in os.walk(directory):
-            stats['subdirs'] += len(dirs)
-            
-            # Filtrar apenas arquivos com extensões suportadas
-            code_files = []
-            for file in files:
-                file_ext = os.path.splitext(file)[1].lower()
-                if file_ext in supported_extensions:
-                    code_files.append(file)
-            
-            stats['files'] += len(code_files)
+        # Extração completa dos métodos, sem chamar o modelo: a mesma da análise, para estimar os prompts
+        analyzer = GenericCNPJAnalyzer(ai_model=AIModelInterface())
+        ref = request.form.get('ref') or None
+        started = time.perf_counter()
+        
+        # Contagem de arquivos e subdiretórios (diretório, arquivo compactado ou repositório git)
+        with open_source(directory, ref) as source:
+            origin = None if isinstance(source, FileSystemSource) else (directory, ref)
             
             # Padrão para encontrar CNPJ em qualquer contexto (usar o mesmo do analisador)
-            cnpj_pattern = analyzer.cnpj_pattern
+            cnpj_pattern = CNPJ_PATTERN
             
-            for file in code_files:
-                file_path = os.path.join(root, file)
-                file_ext = os.path.splitext(file)[1].lower()
+            for file_path, content in source.iter_documents(supported_extensions):
+                stats['files'] += 1
+                file_ext = os.path.splitext(file_path)[1].lower()
                 
                 # Determinar a linguagem pela extensão
                 file_language = None
-                for language, extensions in analyzer.supported_extensions.items():
+                for language, extensions in SUPPORTED_EXTENSIONS.items():
                     if file_ext in extensions:
                         file_language = language
                         break
                 
                 if file_language:
                     try:
-                        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()
-                            lines = content.splitlines()
-                            stats['lines'] += len(lines)
+                        stats['lines'] += len(content.splitlines())
                             
-                            # Verificar se contém CNPJ - usar flags como parâmetros
-                            if re.search(cnpj_pattern, content, re.IGNORECASE | re.MULTILINE | re.DOTALL):
-                                stats['by_language'][file_language] += 1
+                        # Verificar se contém CNPJ - usar flags como parâmetros
+                        if re.search(cnpj_pattern, content, re.IGNORECASE | re.MULTILINE | re.DOTALL):
+                            stats['by_language'][file_language] += 1
                                 
-                                # Tentar contar métodos com CNPJ usando os padrões do analisador
-                                if file_language in analyzer.patterns:
-                                    # Definir o método pattern para métodos com CNPJ
-                                    method_pattern = analyzer.patterns[file_language]['method']
-                                    
-                                    # Contagem específica para Python
-                                    if file_language == 'python':
-                                        method_matches = re.finditer(method_pattern, content, re.IGNORECASE | re.MULTILINE)
-                                        for method_match in method_matches:
-                                            # Extrair o método e seu conteúdo indentado
-                                            method_start_line = content.count('\n', 0, method_match.start())
-                                            if method_start_line < len(lines):
-                                                method_line = lines[method_start_line]
-                                                method_indent = len(method_line) - len(method_line.lstrip())
-                                                
-                                                # Construir o corpo do método
-                                                method_body = [method_line]
-                                                for i in range(method_start_line + 1, len(lines)):
-                                                    if not lines[i].strip() or len(lines[i]) - len(lines[i].lstrip()) > method_indent:
-                                                        method_body.append(lines[i])
-                                                    else:
-                                                        break
-                                                
-                                                method_text = '\n'.join(method_body)
-                                                # Usar flags como parâmetros
-                                                if re.search(cnpj_pattern, method_text, re.IGNORECASE):
-                                                    stats['methods'] += 1
-                                    else:
-                                        # Para outras linguagens
-                                        method_matches = list(re.finditer(method_pattern, content, re.IGNORECASE | re.MULTILINE | re.DOTALL))
-                                        
-                                        for i, method_match in enumerate(method_matches):
-                                            method_start = method_match.start()
-                                            
-                                            # Encontrar o final do método - ou próximo método ou fim do arquivo
-                                            if i < len(method_matches) - 1:
-                                                method_end = method_matches[i+1].start()
-                                            else:
-                                                method_end = len(content)
-                                            
-                                            method_content = content[method_start:method_end]
-                                            
-                                            # Verifique se contém CNPJ no conteúdo do método
-                                            if re.search(cnpj_pattern, method_content, re.IGNORECASE):
-                                                stats['methods'] += 1
+                            # Métodos com CNPJ extraídos pelos padrões do analisador (com prazo)
+                            if file_language in PATTERNS:
+                                analyzer.analyze_file(file_path, file_language, content, origin)
                     except Exception as e:
                         logging.warning(f"Erro ao analisar arquivo {file_path}: {str(e)}")
+
+            # Depois da leitura: em um .tar, usa os caminhos já vistos em vez de descompactar de novo
+            stats['subdirs'] = source.count_subdirs()
         
+        stats['methods'] = len(analyzer.pending)
+        stats['previsao'] = estimate_run(analyzer.prompt_estimates(), _latency_history,
+                                         extraction_s=time.perf_counter() - started)
+        analyzer.files.close()
+        _remember_estimate((directory, ref), stats['previsao'])
         return jsonify(stats)
     except Exception as e:
         logging.error(f"Erro na pré-análise: {str(e)}", exc_info=True)
@@ -167,8 +245,25 @@ def analyze():
     """
     Rota para executar a análise completa de um diretório.
 
-    Espera receber o caminho do diretório via POST.
-    Gera um relatório Excel com os resultados.
+    Espera receber o caminho do diretório via POST. Os métodos de maior risco
+    estático são analisados primeiro; os campos opcionais 'time_budget'
+    (segundos) e 'top_k' limitam a análise aos métodos de maior risco, e
+    'sample_size' (quantidade ou fração) ativa a estimativa por amostragem.
+    As vagas de chamada ao provedor são divididas com as demais análises em
+    andamento: 'weight' (peso), 'priority' (prioridade estrita) e
+    'max_concurrency' (limite de chamadas simultâneas da análise; padrão:
+    AI_JOB_MAX_CONCURRENCY) ajustam a divisão, e 'fila' traz a espera e a
+    latência das chamadas da análise.
+    Gera o relatório nos formatos do campo 'formats' (ex.: "xlsx,parquet";
+    padrão: REPORT_FORMATS), baixados em /download/<relatorio>/<formato>.
+    Com 'profile' (ou ANALYZER_PROFILE), grava também o perfil de desempenho
+    da análise, listado em 'perfil' e baixado em /download/<arquivo>. Em
+    'previsao', a duração e o custo previstos na pré-análise são comparados
+    com os reais, e a latência das chamadas entra no histórico das próximas
+    previsões. Com 'compare_with' (nome de um relatório anterior), os
+    resultados são comparados com os daquele relatório: o resumo do delta
+    vem em 'delta', a aba Delta entra no Excel e os métodos novos, removidos
+    e alterados ficam em /diff/<anterior>/<relatorio>.
 
     Returns:
         Response: JSON com status da análise e caminho do relatório
@@ -184,33 +279,164 @@ def analyze():
     if not os.path.exists(directory):
         logging.error("Diretório não encontrado")
         return jsonify({'error': 'Diretório não encontrado'}), 404
+    
+    formats = request.form.get('formats')
+    formats = tuple(fmt.strip().lower() for fmt in formats.split(',') if fmt.strip()) if formats else REPORT_FORMATS
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unknown or not formats:
+        return jsonify({'error': f"Formatos de relatório inválidos: {', '.join(unknown) or '(nenhum)'}"}), 400
+    base_report = None
+    if request.form.get('compare_with'):
+        base_report = find_report(os.path.join(REPORTS_DIR, _report_stem(request.form['compare_with'])))
+        if base_report is None:
+            return jsonify({'error': 'Relatório de comparação não encontrado'}), 404
 
     try:
-        # Inicializar analisador com o modelo de IA configurado
-        analyzer = GenericCNPJAnalyzer(
-            model_type=AI_MODEL_TYPE,
-            ollama_url=OLLAMA_URL,
-            ollama_model=OLLAMA_MODEL,
-            mistral_model=MISTRAL_MODEL
-        )
-        analyzer.scan_directory(directory)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
+        # Inicializar analisador com o modelo de IA compartilhado do processo
+        analyzer = GenericCNPJAnalyzer(ai_model=get_ai_model())
+        if request.form.get('profile', '1' if ANALYZER_PROFILE else '0') not in ('0', 'false', ''):
+            analyzer.profiler = RunProfiler(PROFILE_TOP_N)
+        time_budget = request.form.get('time_budget', type=float)
+        top_k = request.form.get('top_k', type=int)
+        ref = request.form.get('ref') or None
+        started = time.perf_counter()
+        job = _scheduler.job(directory, weight=request.form.get('weight', 1.0, type=float),
+                             max_concurrent=request.form.get('max_concurrency', AI_JOB_MAX_CONCURRENCY, type=int),
+                             priority=request.form.get('priority', 0, type=int),
+                             time_budget=time_budget, max_items=top_k)
+        with job as executor:
+            analyzer.scan_directory(directory, ref, executor,
+                                    sample_size=request.form.get('sample_size', type=float))
+        forecast = compare(_pop_estimate((directory, ref)), time.perf_counter() - started,
+                           analyzer.call_samples, _latency_history)
         # Gerar relatórios no diretório reports usando ReportGenerator
-        excel_file = os.path.join(REPORTS_DIR, f'analise_cnpj_{timestamp}.xlsx')
-        report = ReportGenerator(analyzer.findings)
-        report.export_to_excel(excel_file)
+        report_name = _new_report_name()
+        delta = None
+        if base_report:
+            delta = diff_findings(load_run(base_report), analyzer.findings)
+            delta['resumo'].update(base=_report_stem(base_report), atual=report_name)
+            with open(_delta_path(report_name), 'w', encoding='utf-8') as f:
+                json.dump(delta, f, ensure_ascii=False)
+        report = ReportGenerator(analyzer.findings, analyzer.estimate, analyzer.parse_stats, delta=delta)
+        files = report.export(os.path.join(REPORTS_DIR, report_name), formats)
+        store_summary(report_name, report.summaries_json())
+        profile_files = analyzer.profiler.write(os.path.join(REPORTS_DIR, report_name)) if analyzer.profiler else {}
         
-        logging.info(f"Análise concluída com sucesso. Relatório salvo em: {excel_file}")
+        logging.info(f"Análise concluída com sucesso. Relatórios salvos em: {', '.join(files.values())}")
+        stream_stats = getattr(analyzer.ai_model, 'stats', None)  # TTFT e tempo economizado no streaming
+        cache_stats = getattr(analyzer.ai_model, 'cache_stats', None)  # Tokens do prefixo lidos do cache do provedor
         return jsonify({
             'status': 'success',
             'data': analyzer.findings,
-            'excel_file': os.path.basename(excel_file)
+            'nao_analisados': analyzer.skipped,
+            'arquivos_degradados': analyzer.degraded,
+            'estimativa': analyzer.estimate,
+            'streaming': stream_stats.summary() if stream_stats else None,
+            'cache_prompt': cache_stats.summary() if cache_stats else None,
+            'falhas_parse': analyzer.parse_failure_rate(),
+            'servidores': analyzer.ai_model.node_stats() if hasattr(analyzer.ai_model, 'node_stats') else None,
+            'excel_file': os.path.basename(files['xlsx']) if 'xlsx' in files else None,
+            'relatorio': report_name,
+            'formatos': list(files),
+            'perfil': {kind: os.path.basename(path) for kind, path in profile_files.items()} or None,
+            'previsao': forecast,
+            'delta': delta['resumo'] if delta else None,
+            'fila': job.stats()
         })
     except Exception as e:
         logging.error(f"Erro durante a análise: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+# Sessões do modo watch, uma por diretório acompanhado
+_watch_sessions = {}
+_watch_lock = threading.Lock()
+
+
+def _watch_response(session_id, session):
+    if session.error is not None:
+        return jsonify({'error': f"Falha na análise inicial: {session.error}"}), 500
+    return jsonify({
+        'status': 'success',
+        'session': session_id,
+        'versao': session.version,
+        'atualizacao': session.last_update,
+        'data': session.findings()
+    })
+
+
+@app.route('/watch', methods=['POST'])
+def watch_start():
+    """
+    Inicia o acompanhamento de um diretório, ou reaproveita a sessão já existente.
+
+    A primeira chamada dispara a análise completa em segundo plano e
+    responde logo, com a versão 0 e sem resultados; depois, apenas os
+    arquivos alterados são reanalisados. Os resultados de cada versão ficam
+    disponíveis em GET /watch/<session>.
+
+    Returns:
+        Response: JSON com o id da sessão, a versão e os resultados atuais
+    """
+    directory = request.form.get('directory')
+    if not directory or not os.path.isdir(directory):
+        return jsonify({'error': 'O modo watch exige um diretório local existente'}), 400
+    directory = os.path.abspath(directory)
+    session_id = hashlib.sha1(directory.encode('utf-8')).hexdigest()[:12]
+    try:
+        created = False
+        with _watch_lock:
+            session = _watch_sessions.get(session_id)
+            if session is None:
+                session = WatchSession(directory, get_ai_model(), AI_JOB_MAX_CONCURRENCY, WATCH_INTERVAL,
+                                       WATCH_DEBOUNCE, scheduler=_scheduler)
+                _watch_sessions[session_id] = session
+                created = True
+        # A análise inicial fica fora do lock: não bloqueia as demais sessões nem o DELETE desta
+        if created:
+            threading.Thread(target=session.start, name=f'watch-{session_id}', daemon=True).start()
+        return _watch_response(session_id, session)
+    except Exception as e:
+        logging.error(f"Erro ao iniciar o modo watch: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/watch/<session_id>', methods=['GET'])
+def watch_poll(session_id):
+    """
+    Aguarda (até 25 s) uma versão dos resultados mais nova que a informada em ?versao=.
+
+    Returns:
+        Response: JSON com a versão e os resultados atuais
+    """
+    session = _watch_sessions.get(session_id)
+    if session is None:
+        return jsonify({'error': 'Sessão de watch não encontrada'}), 404
+    session.wait(request.args.get('versao', 0, type=int))
+    return _watch_response(session_id, session)
+
+
+@app.route('/watch/<session_id>', methods=['DELETE'])
+def watch_stop(session_id):
+    """Encerra uma sessão de watch."""
+    with _watch_lock:
+        session = _watch_sessions.pop(session_id, None)
+    if session is None:
+        return jsonify({'error': 'Sessão de watch não encontrada'}), 404
+    session.stop()
+    return jsonify({'status': 'success'})
+
+
+@app.route('/jobs', methods=['GET'])
+def jobs():
+    """
+    Rota com as análises que disputam as vagas de chamada ao provedor.
+
+    Returns:
+        Response: JSON com as vagas e, por análise, as tarefas em execução,
+        na fila e a espera e latência das já concluídas
+    """
+    return jsonify({'vagas': _scheduler.slots, 'analises': _scheduler.active_jobs()})
+
 @app.route('/download/<filename>')
 def download(filename):
     """
@@ -228,6 +454,101 @@ def download(filename):
         download_name=filename
     )
 
+@app.route('/download/<report>/<fmt>')
+def download_format(report, fmt):
+    """
+    Rota para download de um relatório em um formato gerado na análise (xlsx, csv ou parquet).
+
+    Args:
+        report (str): Nome do relatório sem extensão (campo 'relatorio' da resposta de /analyze)
+        fmt (str): Formato desejado
+
+    Returns:
+        Response: Arquivo do relatório, enviado em blocos
+    """
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Formato não suportado: {fmt}"}), 400
+    filename = f"{_report_stem(report)}.{fmt}"
+    path = os.path.join(REPORTS_DIR, filename)
+    if not os.path.isfile(path):
+        return jsonify({'error': 'Relatório não gerado neste formato'}), 404
+    return send_file(path, mimetype=EXPORT_MIMETYPES[fmt], as_attachment=True, download_name=filename)
+
+@app.route('/summary/<filename>')
+def summary(filename):
+    """
+    Rota com as tabelas de resumo de um relatório (horas por linguagem, severidade,
+    tipo de uso, arquivos com mais horas e falhas por provedor).
+
+    Os resumos são calculados uma vez, junto com o relatório, e servidos do
+    cache; como um relatório não muda depois de gerado, a resposta pode ser
+    guardada pelo navegador (ETag e Cache-Control).
+
+    Args:
+        filename (str): Nome do relatório Excel
+
+    Returns:
+        Response: JSON com os totais e as tabelas de resumo
+    """
+    filename = _report_stem(filename)
+    with _summaries_lock:
+        data = _summaries.get(filename)
+    if data is None:
+        try:
+            with open(_summary_path(filename), encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):  # Vazio: nome reservado, relatório ainda em gravação
+            return jsonify({'error': 'Resumo não encontrado'}), 404
+        _cache_summary(filename, data)
+    response = jsonify(data)
+    response.set_etag(hashlib.sha1(filename.encode('utf-8')).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
+
+@app.route('/diff/<base>/<report>')
+def diff(base, report):
+    """
+    Rota com os métodos novos, removidos e alterados entre dois relatórios.
+
+    O delta gravado na análise (campo 'compare_with' de /analyze) é servido
+    direto do disco; para outros pares, os relatórios são lidos e comparados
+    na hora (ver analyzer.diff). Como relatórios não mudam depois de
+    gerados, a resposta pode ser guardada pelo navegador.
+
+    Args:
+        base (str): Relatório da execução anterior
+        report (str): Relatório da execução atual
+
+    Returns:
+        Response: JSON com 'resumo' (totais) e 'alteracoes' (uma linha por método)
+    """
+    base, report = _report_stem(base), _report_stem(report)
+    data = None
+    try:
+        with open(_delta_path(report), encoding='utf-8') as f:
+            data = json.load(f)
+        if data['resumo'].get('base') != base:
+            data = None
+    except FileNotFoundError:
+        pass
+    if data is None:
+        base_path = find_report(os.path.join(REPORTS_DIR, base))
+        report_path = find_report(os.path.join(REPORTS_DIR, report))
+        if base_path is None or report_path is None:
+            return jsonify({'error': 'Relatório não encontrado'}), 404
+        try:
+            data = diff_reports(base_path, report_path)
+        except Exception as e:
+            logging.error(f"Erro ao comparar {base} e {report}: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+        data['resumo'].update(base=base, atual=report)
+    response = jsonify(data)
+    response.set_etag(hashlib.sha1(f"{base}\0{report}".encode('utf-8')).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
+
 @app.route('/resolve-path', methods=['POST'])
 def resolve_path():
     """Resolver caminho parcial para caminho completo"""
@@ -0,0 +1,156 @@
+"""
+Testa de ponta a ponta o modo em lote (analyzer.bulk) contra um servidor de lotes local.
+
+Gera um repositório Java sintético com --files arquivos de --methods
+métodos com CNPJ e, com um FakeBatchServer no formato do provedor (--kind):
+
+    envio        executa analyzer_cli.py --bulk em um subprocesso e o encerra
+                 (SIGKILL) assim que todos os lotes foram enviados, antes de
+                 qualquer lote terminar
+    retomada     retoma o mesmo trabalho (run_bulk com o mesmo diretório de
+                 estado): os lotes enviados são consultados e coletados, sem
+                 reenvio; só as requisições com erro (--errored-every) voltam
+                 em novos lotes
+    reexecucao   executa de novo com o trabalho concluído: os resultados vêm
+                 do estado, sem nenhum lote novo
+
+São informados o tempo de cada etapa, os lotes e requisições recebidos pelo
+servidor e as chamadas HTTP ao provedor, comparadas com uma chamada por
+método no modo síncrono. O código de saída é 1 se algum método ficar sem
+resultado, se houver resultados ERRO no relatório ou se alguma requisição
+for reenviada sem ter falhado.
+
+Uso:
+    python benchmarks/bulk_batch.py --kind anthropic --files 100 --methods 10
+    python benchmarks/bulk_batch.py --kind mistral --files 100 --methods 10
+"""
+import argparse
+import csv
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ai import AIModelInterface
+from ai.Anthropic import AnthropicModel
+from ai.Mistral import MistralAPIModel
+from analyzer.cnpj_analyzer import GenericCNPJAnalyzer
+from analyzer_cli import run_bulk
+from benchmarks.fake_servers import FakeBatchServer
+
+
+def generate(directory, files, methods):
+    """Repositório sintético; retorna a quantidade de métodos com CNPJ."""
+    for i in range(files):
+        body = ''.join(f"    public String valida{j}(String cnpj) {{\n"
+                       f"        String limpo = cnpj.replaceAll(\"[^0-9]\", \"\");\n"
+                       f"        return formata(limpo, {j});\n    }}\n\n" for j in range(methods))
+        with open(os.path.join(directory, f"Cadastro{i}.java"), 'w', encoding='utf-8') as f:
+            f.write(f"package br.gov.exemplo;\n\npublic class Cadastro{i} {{\n\n{body}}}\n")
+    analyzer = GenericCNPJAnalyzer(ai_model=AIModelInterface())
+    analyzer.collect(directory)
+    return len(analyzer.pending)
+
+
+def interrupted_run(server, kind, repo, workdir, total, batch_size, timeout):
+    """Executa a linha de comando em modo em lote e a encerra quando todos os métodos foram enviados."""
+    env = dict(os.environ, AI_MODEL_TYPE=kind, ANTHROPIC_API_KEY='fake', ANTHROPIC_BASE_URL=server.url,
+               MISTRAL_API_KEY='fake', MISTRAL_API_URL=server.url)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'analyzer_cli.py'), repo, '--model', kind,
+         '--bulk', os.path.join(workdir, 'estado'), '--poll-interval', '0.2', '--batch-size', str(batch_size),
+         '--output-dir', os.path.join(workdir, 'relatorios'), '--formats', 'csv'],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    try:
+        while server.requests_received < total:
+            if process.poll() is not None:
+                raise RuntimeError(f"analyzer_cli.py terminou (código {process.returncode}) antes de enviar "
+                                   f"todos os métodos; ver {workdir}/analyzer.log")
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Envio não concluído em {timeout}s")
+            time.sleep(0.02)
+    finally:
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+
+
+def resumed_run(server, kind, repo, workdir, batch_size):
+    model = (AnthropicModel('fake', stream=False, base_url=server.url) if kind == 'anthropic'
+             else MistralAPIModel('fake', stream=False, base_url=server.url))
+    return run_bulk([repo], model, os.path.join(workdir, 'relatorios'), os.path.join(workdir, 'estado'),
+                    poll_interval=0.2, batch_size=batch_size, formats=('csv',))[0]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modo em lote de ponta a ponta contra um servidor de lotes local")
+    parser.add_argument('--kind', default='anthropic', choices=('anthropic', 'mistral'))
+    parser.add_argument('--files', type=int, default=100, help="Arquivos no repositório gerado")
+    parser.add_argument('--methods', type=int, default=10, help="Métodos com CNPJ por arquivo")
+    parser.add_argument('--batch-size', type=int, default=300, help="Métodos por lote")
+    parser.add_argument('--delay', type=float, default=2.0, help="Segundos até cada lote terminar no servidor")
+    parser.add_argument('--errored-every', type=int, default=25,
+                        help="Uma a cada N requisições falha no primeiro envio (0 = nenhuma)")
+    parser.add_argument('--timeout', type=float, default=120)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bulk_batch_')
+    try:
+        repo = os.path.join(workdir, 'repositorio')
+        os.makedirs(repo)
+        total = generate(repo, args.files, args.methods)
+        print(f"Repositório: {args.files} arquivos, {total} métodos com CNPJ ({args.kind})")
+        logging.disable(logging.ERROR)  # As falhas injetadas pelo servidor (--errored-every) são esperadas
+
+        with FakeBatchServer(args.kind, processing_delay=args.delay, errored_every=args.errored_every) as server:
+            _, submit_s = timed(interrupted_run, server, args.kind, repo, workdir, total, args.batch_size,
+                                args.timeout)
+            submitted_batches = len(server.batches)
+            print(f"envio      {submit_s:7.2f}s  {server.requests_received} métodos em {submitted_batches} lotes "
+                  f"(execução encerrada com SIGKILL após o envio)")
+
+            summary, resume_s = timed(resumed_run, server, args.kind, repo, workdir, args.batch_size)
+            resent = server.requests_received - total
+            print(f"retomada   {resume_s:7.2f}s  {summary['metodos_analisados']} resultados, "
+                  f"{summary['erros_analise']} ERRO, {len(server.batches) - submitted_batches} lotes novos com "
+                  f"{resent} reenvios ({server.errored_sent} requisições com erro no servidor, "
+                  f"{summary['recuperadas_retentativa']} recuperadas)")
+
+            batches_before = len(server.batches)
+            rerun, rerun_s = timed(resumed_run, server, args.kind, repo, workdir, args.batch_size)
+            print(f"reexecucao {rerun_s:7.2f}s  {rerun['metodos_analisados']} resultados do estado, "
+                  f"{len(server.batches) - batches_before} lotes novos")
+            print(f"chamadas HTTP ao provedor: {server.http_calls} (modo síncrono: {total + resent})")
+
+        with open(summary['relatorio'], 'r', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        failed = []
+        if summary['metodos_analisados'] != total or len(rows) != total or rerun['metodos_analisados'] != total:
+            failed.append(f"{summary['metodos_analisados']} resultados ({len(rows)} no relatório, "
+                          f"{rerun['metodos_analisados']} na reexecução) para {total} métodos")
+        if summary['erros_analise'] or any(row['tipo_uso'] == 'ERRO' for row in rows):
+            failed.append(f"{summary['erros_analise']} resultados ERRO")
+        if resent != server.errored_sent or len(server.batches) != batches_before:
+            failed.append(f"{resent} requisições reenviadas para {server.errored_sent} com erro")
+        if failed:
+            print("\n" + "\n".join(failed))
+            sys.exit(1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
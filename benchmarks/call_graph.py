@@ -0,0 +1,116 @@
+"""
+Mede a propagação de impacto (analyzer.call_graph) em um grafo de chamadas sintético.
+
+Gera um grafo em camadas (cada método chama métodos das camadas de baixo,
+como serviços que chamam validadores) com alguns ciclos de chamadas e,
+com --pair-cycles, muitos ciclos pequenos (métodos que se chamam em par), monta
+o CallGraph e calcula chamadores e chamados transitivos de um conjunto de
+métodos de origem. Para comparação, mede uma busca em largura independente
+por método de origem (sem memoização) em uma parte das origens e extrapola.
+
+Uso:
+    python benchmarks/call_graph.py --methods 100000 --edges 500000 --sources 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.call_graph import CallGraph
+
+
+def generate_edges(methods, edges, layers, cycle_fraction, seed, pair_cycles=0):
+    """
+    Arestas de um grafo em camadas: o método da camada k chama métodos das camadas k+1 em diante.
+
+    Uma fração das arestas aponta para a camada de cima, formando ciclos, e
+    pair_cycles pares de métodos vizinhos da mesma camada se chamam (recursão mútua).
+    """
+    rng = random.Random(seed)
+    per_layer = methods // layers
+    callers, callees = array('I'), array('I')
+    seen = set()
+    while len(callers) < edges:
+        caller = rng.randrange(methods - per_layer)
+        layer = caller // per_layer
+        if rng.random() < cycle_fraction and layer:
+            callee = rng.randrange((layer - 1) * per_layer, layer * per_layer)
+        else:
+            callee = rng.randrange((layer + 1) * per_layer, min(methods, (layer + 3) * per_layer))
+        if (caller, callee) not in seen:
+            seen.add((caller, callee))
+            callers.append(caller)
+            callees.append(callee)
+    for first in rng.sample(range(0, methods - 1, 2), min(pair_cycles, methods // 2)):
+        callers.extend((first, first + 1))
+        callees.extend((first + 1, first))
+    return callers, callees
+
+
+def bfs_count(adjacency, source):
+    """Métodos alcançáveis a partir de um método, por busca em largura sem memoização."""
+    seen = {source}
+    frontier = [source]
+    while frontier:
+        following = []
+        for node in frontier:
+            for target in adjacency[node]:
+                if target not in seen:
+                    seen.add(target)
+                    following.append(target)
+        frontier = following
+    return len(seen) - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propagação de impacto pelo grafo de chamadas")
+    parser.add_argument('--methods', type=int, default=100000, help="Métodos (nós)")
+    parser.add_argument('--edges', type=int, default=500000, help="Chamadas (arestas)")
+    parser.add_argument('--layers', type=int, default=20, help="Camadas do grafo sintético")
+    parser.add_argument('--cycles', type=float, default=0.02, help="Fração de arestas que formam ciclos")
+    parser.add_argument('--pair-cycles', type=int, default=0, help="Pares de métodos que se chamam (ciclos pequenos)")
+    parser.add_argument('--sources', type=int, default=2000, help="Métodos de origem (resultados ALTA/MEDIA)")
+    parser.add_argument('--baseline', type=int, default=20, help="Origens medidas com a busca sem memoização")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    callers, callees = generate_edges(args.methods, args.edges, args.layers, args.cycles, args.seed,
+                                     args.pair_cycles)
+    # Origens nas camadas de baixo, como os validadores de CNPJ chamados por todo o sistema
+    rng = random.Random(args.seed)
+    per_layer = args.methods // args.layers
+    sources = rng.sample(range(args.methods - 3 * per_layer, args.methods), args.sources)
+
+    start = time.perf_counter()
+    graph = CallGraph(args.methods, callers, callees)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    upstream = graph.reach(sources, upstream=True)
+    downstream = graph.reach(sources, upstream=False)
+    sizes = [graph.size(upstream[graph.component[node]]) - 1 for node in sources]
+    [graph.size(downstream[graph.component[node]]) - 1 for node in sources]
+    propagated = time.perf_counter() - start
+
+    reverse = [[] for _ in range(args.methods)]
+    for caller, callee in zip(callers, callees):
+        reverse[callee].append(caller)
+    measured = sources[:args.baseline]
+    start = time.perf_counter()
+    expected = [bfs_count(reverse, node) for node in measured]
+    baseline = (time.perf_counter() - start) / len(measured) * len(sources) * 2
+    assert expected == sizes[:len(measured)], "Alcance diferente da busca sem memoização"
+
+    print(f"Métodos: {args.methods}  chamadas: {args.edges}  componentes: {graph.component_count}  "
+          f"ciclos: {len(graph.cycles)}")
+    print(f"Montagem do grafo (CSR + componentes): {built:.2f}s")
+    print(f"Chamadores e chamados de {args.sources} origens: {propagated:.2f}s "
+          f"(média de {sum(sizes) / len(sizes):.0f} chamadores transitivos)")
+    print(f"Busca sem memoização (estimada a partir de {len(measured)} origens): {baseline:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Mede a vazão da varredura de literais de CNPJ em arquivos de dados.
+
+Gera arquivos sintéticos de --size-mb MB em cada formato (CSV, CSV com
+campos entre aspas contendo o delimitador, JSONL, SQL e .properties), com
+uma fração --density das linhas contendo um CNPJ (metade formatada, parte
+com dígito verificador inválido), e os varre com o DataFileScanner em uma
+única thread. São informados a vazão em MB/s, os literais encontrados e o
+pico de memória alocada durante a varredura (em uma segunda passagem, com
+tracemalloc), que deve ficar na ordem do tamanho do bloco e não do arquivo.
+O código de saída é 1 se algum literal dos CSV não for atribuído à coluna
+cnpj e, com --min-mbps, se algum formato ficar abaixo da vazão informada.
+
+Uso:
+    python benchmarks/data_scan.py --size-mb 256 --density 0.5
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.data_scan import DataFileScanner
+from config import DATA_SCAN_CHUNK_BYTES
+
+
+def random_cnpj(rng, formatted, valid):
+    """CNPJ aleatório, com ou sem pontuação, com dígitos verificadores válidos ou não."""
+    digits = [rng.randint(0, 9) for _ in range(12)]
+    for weights in ([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2], [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]):
+        rest = sum(d * w for d, w in zip(digits, weights)) % 11
+        digits.append(0 if rest < 2 else 11 - rest)
+    if not valid:
+        digits[13] = (digits[13] + 1) % 10
+    text = ''.join(map(str, digits))
+    if formatted:
+        text = f"{text[:2]}.{text[2:5]}.{text[5:8]}/{text[8:12]}-{text[12:]}"
+    return text
+
+
+def line(kind, rng, i, density):
+    cnpj = random_cnpj(rng, rng.random() < 0.5, rng.random() < 0.9) if rng.random() < density else ''
+    amount = f"{rng.random() * 100000:.2f}"
+    if kind == 'csv':
+        return f"{i};Empresa {i} Ltda;{cnpj};2024-01-{i % 28 + 1:02d};{amount};Rua {i}, 100\n"
+    if kind == 'csv_aspas':
+        # O delimitador e aspas duplicadas dentro de um campo entre aspas não separam colunas
+        return f'{i},"Empresa {i}, ""Filial"" Ltda",{cnpj},2024-01-{i % 28 + 1:02d},{amount},"Rua {i}, 100"\n'
+    if kind == 'jsonl':
+        return (f'{{"id": {i}, "razao_social": "Empresa {i} Ltda", "cnpj": "{cnpj}", '
+                f'"data": "2024-01-{i % 28 + 1:02d}", "valor": {amount}}}\n')
+    if kind == 'sql':
+        return (f"INSERT INTO empresa (id, razao_social, cnpj, valor) VALUES "
+                f"({i}, 'Empresa {i} Ltda', '{cnpj}', {amount});\n")
+    return f"empresa.{i}.razao_social=Empresa {i} Ltda\nempresa.{i}.cnpj={cnpj}\n"
+
+
+def generate(directory, kind, size_mb, density, seed):
+    """Gera um arquivo de dados de aproximadamente size_mb MB."""
+    rng = random.Random(seed)
+    extension = {'csv': 'csv', 'csv_aspas': 'csv', 'jsonl': 'jsonl', 'sql': 'sql', 'properties': 'properties'}[kind]
+    path = os.path.join(directory, f"dados.{extension}")
+    target = size_mb * 1024 * 1024
+    written, i = 0, 0
+    with open(path, 'w', encoding='utf-8') as f:
+        if kind == 'csv':
+            written += f.write("id;razao_social;cnpj;data;valor;endereco\n")
+        elif kind == 'csv_aspas':
+            written += f.write("id,razao_social,cnpj,data,valor,endereco\n")
+        while written < target:
+            block = ''.join(line(kind, rng, i + j, density) for j in range(1000))
+            written += f.write(block)
+            i += 1000
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão da varredura de literais de CNPJ em arquivos de dados")
+    parser.add_argument('--size-mb', type=int, default=256, help="Tamanho de cada arquivo gerado")
+    parser.add_argument('--density', type=float, default=0.5, help="Fração das linhas com um CNPJ")
+    parser.add_argument('--chunk-kb', type=int, default=DATA_SCAN_CHUNK_BYTES // 1024, help="Bytes lidos por vez (KB)")
+    parser.add_argument('--formats', default='csv,csv_aspas,jsonl,sql,properties')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--min-mbps', type=float, help="Vazão mínima aceita, em MB/s")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    slow, misplaced = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        for kind in args.formats.split(','):
+            path = generate(directory, kind, args.size_mb, args.density, args.seed)
+            size = os.path.getsize(path)
+            scanner = DataFileScanner(chunk_bytes=args.chunk_kb * 1024)
+            start = time.perf_counter()
+            result = scanner.scan_file(path)
+            elapsed = time.perf_counter() - start
+            # O tracemalloc deixa a varredura mais lenta: a memória é medida em outra passagem
+            tracemalloc.start()
+            scanner.scan_file(path)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            mbps = size / 1e6 / elapsed
+            keys = ', '.join(f"{row['chave']}={row['literais']}" for row in result.rows()[:3])
+            print(f"{kind:10s} {size / 1e6:8.0f} MB em {elapsed:6.2f}s = {mbps:7.0f} MB/s  "
+                  f"literais {result.literals:9d} (válidos {result.valid:9d})  "
+                  f"pico de memória {peak / 1e6:6.1f} MB  chaves: {keys}")
+            os.remove(path)
+            if kind.startswith('csv') and any(row['chave'] != 'cnpj' for row in result.rows()):
+                misplaced.append(kind)
+            if args.min_mbps is not None and mbps < args.min_mbps:
+                slow.append(kind)
+    if misplaced:
+        print(f"\nLiterais fora da coluna cnpj: {', '.join(misplaced)}")
+    if slow:
+        print(f"\nAbaixo de {args.min_mbps} MB/s: {', '.join(slow)}")
+    if misplaced or slow:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Compara a vazão da exportação dos resultados em Excel, CSV e Parquet.
+
+Gera resultados sintéticos com o mesmo formato dos produzidos pela análise
+(campos de lista como texto com um item por linha) e mede, para cada formato
+de ReportGenerator, o tempo de gravação, as linhas por segundo e o tamanho
+do arquivo. O Excel é limitado a 1.048.576 linhas por aba; acima disso, use
+--formats csv,parquet.
+
+Uso:
+    python benchmarks/export_formats.py --rows 100000
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.reporting import ReportGenerator, EXPORT_FORMATS
+
+LANGUAGES = ['java', 'csharp', 'python', 'javascript', 'c', 'cpp', 'sql']
+SEVERITIES = ['ALTA', 'MEDIA', 'BAIXA']
+
+
+def generate_findings(rows, seed=42):
+    """Resultados sintéticos, com 2% de erros de análise."""
+    rng = random.Random(seed)
+    findings = []
+    for i in range(rows):
+        language = rng.choice(LANGUAGES)
+        path = f"/repos/sistema{i % 50}/src/modulo{i % 400}/Arquivo{i % 3000}.{language}"
+        if rng.random() < 0.02:
+            findings.append({
+                'arquivo': path, 'linguagem': language, 'metodo': f"metodo{i}", 'tipo_uso': 'ERRO',
+                'operacoes_numericas': 'Erro na análise: resposta inválida', 'impactos': 'Erro na análise',
+                'riscos': 'Erro na análise', 'modificacoes': 'Erro na análise', 'severidade': 'N/A',
+                'horas_dev': 0, 'horas_teste': 0, 'horas_total': 0, 'risco_estatico': rng.random()
+            })
+            continue
+        dev, test = rng.randint(1, 16), rng.randint(1, 8)
+        findings.append({
+            'arquivo': path, 'linguagem': language, 'metodo': f"metodo{i}", 'linha': rng.randint(1, 5000),
+            'tipo_uso': rng.choice(['NUMERICO', 'TEXTO', 'MISTO']),
+            'operacoes_numericas': "\n".join(["cálculo do dígito verificador", "conversão para long"][:rng.randint(0, 2)]),
+            'impactos': "\n".join(f"impacto {n} do método {i}" for n in range(rng.randint(1, 4))),
+            'riscos': "\n".join(f"risco {n}" for n in range(rng.randint(1, 3))),
+            'modificacoes': "\n".join(f"alterar tipo do campo {n} para texto" for n in range(rng.randint(1, 3))),
+            'severidade': rng.choice(SEVERITIES),
+            'horas_dev': dev, 'horas_teste': test, 'horas_total': dev + test,
+            'dependencias': "\n".join(f"Classe{n}.valida ({path}:{n * 10})" for n in range(rng.randint(0, 5)))
+                            or "Nenhuma dependência encontrada",
+            'sistemas_impactados': "\n".join(["Receita Federal", "ERP"][:rng.randint(0, 2)]),
+            'risco_estatico': rng.random()
+        })
+    return findings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão da exportação dos resultados por formato")
+    parser.add_argument('--rows', type=int, default=100000, help="Resultados gerados")
+    parser.add_argument('--formats', default=','.join(EXPORT_FORMATS), help="Formatos medidos")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    findings = generate_findings(args.rows)
+    print(f"Resultados: {args.rows}")
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in args.formats.split(','):
+            # Novo gerador a cada formato: o Excel também calcula as abas de resumo
+            report = ReportGenerator(findings)
+            start = time.perf_counter()
+            files = report.export(os.path.join(directory, 'relatorio'), [fmt])
+            elapsed = time.perf_counter() - start
+            size = os.path.getsize(files[fmt])
+            print(f"{fmt:8s} {elapsed:7.2f}s  {args.rows / elapsed:10.0f} linhas/s  {size / 1024 / 1024:7.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
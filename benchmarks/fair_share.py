@@ -0,0 +1,147 @@
+"""
+Simula análises simultâneas disputando as vagas do provedor de IA.
+
+Um provedor falso atende cada chamada em um tempo proporcional aos tokens
+do prompt. Uma análise grande começa primeiro e, pouco depois, chegam
+análises pequenas (uma delas com prioridade maior, se --priority). Cada
+cenário é executado com três formas de distribuir as vagas:
+
+    justa         FairShareScheduler (enfileiramento justo ponderado por análise)
+    fila_unica    um PriorityExecutor compartilhado, ordenado pelo risco (como o lote da linha de comando)
+    por_analise   um PriorityExecutor por análise disputando o mesmo RateLimiter (como a web fazia antes)
+
+Para cada análise são informadas a latência das chamadas (da submissão ao
+fim; p50, p95 e máxima) e o tempo até a conclusão. Com --max-small-seconds,
+o código de saída é 1 se alguma análise pequena passar desse tempo no modo
+justo.
+
+Uso:
+    python benchmarks/fair_share.py --large 1000 --small 40 --call-seconds 0.02
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import RateLimiter
+from analyzer.prioritization import PriorityExecutor
+from analyzer.scheduling import FairShareScheduler
+
+
+class FakeProvider:
+    """Provedor falso: cada chamada ocupa uma vaga por um tempo proporcional aos tokens."""
+
+    def __init__(self, slots, seconds_per_1k_tokens):
+        self.limiter = RateLimiter(slots)
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+
+    def call(self, tokens):
+        with self.limiter:
+            time.sleep(tokens / 1000 * self.seconds_per_1k_tokens)
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_job(spec, executor_for, provider, results, origin):
+    """Submete as chamadas de uma análise no instante previsto e aguarda todas."""
+    name, tasks, start, weight, priority = spec
+    time.sleep(max(0.0, origin + start - time.monotonic()))
+    started = time.monotonic()
+    executor, owned = executor_for(name, weight, priority)
+    latencies = []
+
+    def task(submitted, tokens):
+        provider.call(tokens)
+        latencies.append(time.monotonic() - submitted)
+
+    futures = [executor.submit_with_priority(risk, tokens, task, time.monotonic(), tokens)
+               for risk, tokens in tasks]
+    wait(futures)
+    results[name] = (sorted(latencies), time.monotonic() - started)
+    if owned:
+        executor.shutdown()
+
+
+def simulate(mode, jobs, slots, seconds_per_1k_tokens):
+    """Executa as análises em um modo; retorna nome -> (latências ordenadas, tempo até a conclusão)."""
+    provider = FakeProvider(slots, seconds_per_1k_tokens)
+    scheduler = FairShareScheduler(slots)
+    shared = PriorityExecutor(max_workers=slots)
+
+    def executor_for(name, weight, priority):
+        """Executor da análise e se ela deve encerrá-lo ao terminar."""
+        if mode == 'justa':
+            return scheduler.job(name, weight=weight, priority=priority), True
+        if mode == 'fila_unica':
+            return shared, False
+        return PriorityExecutor(max_workers=slots), True
+
+    results = {}
+    origin = time.monotonic()
+    threads = [threading.Thread(target=run_job, args=(spec, executor_for, provider, results, origin))
+               for spec in jobs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    scheduler.close()
+    shared.shutdown()
+    return results
+
+
+def build_jobs(args):
+    rng = random.Random(args.seed)
+
+    def tasks(count):
+        # Risco estático e tokens do prompt de cada método
+        return [(rng.random() * 10, rng.randint(args.tokens // 2, args.tokens * 3 // 2)) for _ in range(count)]
+
+    jobs = [('grande', tasks(args.large), 0.0, 1.0, 0)]
+    for i in range(args.small_jobs):
+        jobs.append((f"pequena{i}", tasks(args.small), args.small_start + i * 0.2, 1.0,
+                     1 if args.priority and i == 0 else 0))
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência por análise com as vagas do provedor compartilhadas")
+    parser.add_argument('--large', type=int, default=1000, help="Chamadas da análise grande")
+    parser.add_argument('--small', type=int, default=40, help="Chamadas de cada análise pequena")
+    parser.add_argument('--small-jobs', type=int, default=2, help="Análises pequenas")
+    parser.add_argument('--small-start', type=float, default=0.5, help="Segundos até a primeira análise pequena")
+    parser.add_argument('--slots', type=int, default=4, help="Chamadas simultâneas ao provedor")
+    parser.add_argument('--tokens', type=int, default=500, help="Tokens médios por prompt")
+    parser.add_argument('--call-seconds', type=float, default=0.02, help="Segundos por chamada de --tokens tokens")
+    parser.add_argument('--priority', action='store_true', help="Primeira análise pequena com prioridade maior")
+    parser.add_argument('--modes', default='justa,fila_unica,por_analise')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-small-seconds', type=float, help="Tempo máximo aceito das análises pequenas (modo justo)")
+    args = parser.parse_args()
+
+    jobs = build_jobs(args)
+    seconds_per_1k_tokens = args.call_seconds * 1000 / args.tokens
+    slow = []
+    for mode in args.modes.split(','):
+        results = simulate(mode, jobs, args.slots, seconds_per_1k_tokens)
+        print(f"\n{mode}:")
+        for name, *_ in jobs:
+            latencies, elapsed = results[name]
+            print(f"  {name:10s} {len(latencies):6d} chamadas  latência p50 {percentile(latencies, 0.5):7.2f}s  "
+                  f"p95 {percentile(latencies, 0.95):7.2f}s  máx {latencies[-1]:7.2f}s  concluída em {elapsed:7.2f}s")
+            if (mode == 'justa' and name != 'grande' and args.max_small_seconds is not None
+                    and elapsed > args.max_small_seconds):
+                slow.append(name)
+    if slow:
+        print(f"\nAcima de {args.max_small_seconds}s no modo justo: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,540 @@
+"""
+Servidores HTTP falsos que imitam as APIs de streaming dos provedores de IA.
+
+Usados pelos benchmarks para medir o comportamento dos clientes sem depender
+de um provedor real. Cada servidor responde com um JSON de análise válido,
+seguido de um texto "explicativo" (como os modelos costumam fazer), um token
+por vez e com atraso configurável. Conexões fechadas pelo cliente no meio da
+resposta são contadas em `cancelled`.
+
+Com malformed_every=N, uma a cada N respostas sem saída estruturada traz a
+análise em um formato que não é JSON (repr de dicionário Python, como alguns
+modelos fazem). Requisições com saída estruturada (format no Ollama,
+response_format na Mistral, tools na Anthropic) sempre recebem JSON válido;
+na Anthropic, a análise vem como input de uma chamada de ferramenta.
+
+Com max_concurrent, o servidor gera no máximo essa quantidade de respostas
+ao mesmo tempo (como um servidor com uma GPU); as demais esperam. Com
+healthy=False, responde 500 às gerações e 503 em GET /api/tags.
+
+Com prefill_delay, o primeiro token também espera esse tempo por token de
+entrada processado (cerca de 4 caracteres por token), descontados os que o
+servidor reaproveita do cache de prefixo:
+    anthropic  prefixos até cada bloco com cache_control, a partir de
+               cache_min_tokens (uso com cache_read/cache_creation_input_tokens)
+    ollama     maior início comum com o prompt anterior, enquanto o modelo
+               fica carregado (keep_alive 0 descarta; prompt_eval_count na
+               última linha)
+    mistral    sem cache
+
+Formatos suportados (kind):
+    ollama     POST /api/generate (uma linha JSON por pedaço)
+    mistral    POST /v1/chat/completions (server-sent events, estilo OpenAI)
+    anthropic  POST /v1/messages (server-sent events da Messages API)
+
+FakeBatchServer imita as APIs de lote (ai.Batch): cada lote termina
+processing_delay segundos depois de criado e, com errored_every=N, uma a
+cada N requisições volta com erro na primeira vez em que é enviada.
+    anthropic  POST/GET /v1/messages/batches[/{id}[/results]]
+    mistral    POST /v1/files, GET /v1/files/{id}/content, POST/GET /v1/batch/jobs[/{id}]
+"""
+import email.parser
+import email.policy
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANALYSIS = {
+    "tipo_uso": "NUMERICO",
+    "operacoes_numericas": ["cálculo do dígito verificador"],
+    "impactos": ["CNPJ alfanumérico não cabe em long"],
+    "riscos": ["perda de dados na conversão"],
+    "modificacoes": ["armazenar CNPJ como texto"],
+    "severidade": "ALTA",
+    "horas_desenvolvimento": 4,
+    "horas_testes": 2,
+    "dependencias": [],
+    "sistemas_impactados": []
+}
+
+TRAILING_TEXT = ("\n\nExplicação: o método converte o CNPJ para número e aplica o módulo 11, "
+                 "o que deixa de funcionar com letras. ")
+
+
+def tokens(trailing_tokens, malformed=False):
+    """Divide a resposta em 'tokens' de até 4 caracteres."""
+    text = repr(ANALYSIS) if malformed else json.dumps(ANALYSIS, ensure_ascii=False)
+    tail = (TRAILING_TEXT * (trailing_tokens // len(TRAILING_TEXT) * 4 + 1))[:trailing_tokens * 4]
+    text += tail
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+class FakeLLMServer:
+    """
+    Servidor falso de um provedor, executado em uma thread.
+
+    Args:
+        kind (str): 'ollama', 'mistral' ou 'anthropic'
+        token_delay (float): Atraso entre tokens, em segundos
+        first_token_delay (float): Atraso antes do primeiro token
+        trailing_tokens (int): Tokens de texto enviados depois do JSON
+        malformed_every (int): Uma a cada N respostas sem saída estruturada é inválida (0 = nenhuma)
+        max_concurrent (int): Gerações simultâneas (0 = sem limite)
+        prefill_delay (float): Atraso por token de entrada não reaproveitado do cache
+        cache_min_tokens (int): Tamanho mínimo de um prefixo guardado em cache (Anthropic)
+    """
+
+    def __init__(self, kind='ollama', token_delay=0.005, first_token_delay=0.05, trailing_tokens=300,
+                 malformed_every=0, max_concurrent=0, prefill_delay=0.0, cache_min_tokens=0):
+        self.kind = kind
+        self.prefill_delay = prefill_delay
+        self.cache_min_tokens = cache_min_tokens
+        self.input_tokens = 0  # Tokens de entrada processados
+        self.cached_tokens = 0  # Tokens de entrada reaproveitados do cache
+        self._prefixes = set()  # Prefixos em cache (Anthropic)
+        self._last_prompt = ''  # Prompt anterior com o modelo carregado (Ollama)
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.trailing_tokens = trailing_tokens
+        self.malformed_every = malformed_every
+        self.requests = 0
+        self.malformed_sent = 0
+        self.healthy = True
+        self._capacity = threading.Semaphore(max_concurrent) if max_concurrent else None
+        self._unstructured = 0
+        self.cancelled = 0
+        self.tokens_sent = 0
+        self.request_bodies = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _prompt_usage(self, body):
+        """
+        Tokens de entrada da requisição, conforme o cache de prefixo do provedor.
+
+        Returns:
+            tuple: (processados sem cache, lidos do cache, gravados no cache)
+        """
+        if self.kind == 'anthropic':
+            content = body['messages'][0]['content']
+            blocks = [{"text": content}] if isinstance(content, str) else content
+            text = str(body.get('system', '')) + json.dumps(body.get('tools', []))
+            breakpoints = []
+            for block in blocks:
+                text += block['text']
+                if 'cache_control' in block and len(text) // 4 >= self.cache_min_tokens:
+                    breakpoints.append(text)
+            total = len(text) // 4
+            with self._lock:
+                read = max((len(prefix) // 4 for prefix in breakpoints if prefix in self._prefixes), default=0)
+                written = 0
+                for prefix in breakpoints:
+                    if len(prefix) // 4 > read:
+                        written = len(prefix) // 4 - read
+                        self._prefixes.add(prefix)
+            return total - read - written, read, written
+        if self.kind == 'ollama':
+            text = body.get('system', '') + body['prompt']
+            with self._lock:
+                previous = self._last_prompt
+                common = 0
+                for common, (a, b) in enumerate(zip(previous, text), 1):
+                    if a != b:
+                        common -= 1
+                        break
+                # keep_alive 0 descarrega o modelo ao fim da chamada, e com ele o cache
+                self._last_prompt = '' if str(body.get('keep_alive')) in ('0', '0s') else text
+            read = common // 4
+            return len(text) // 4 - read, read, 0
+        messages = body.get('messages', [])
+        return sum(len(str(message.get('content', ''))) for message in messages) // 4, 0, 0
+
+    def _next_is_malformed(self):
+        with self._lock:
+            self._unstructured += 1
+            malformed = bool(self.malformed_every) and self._unstructured % self.malformed_every == 0
+            if malformed:
+                self.malformed_sent += 1
+            return malformed
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except ConnectionResetError:
+                    pass  # Cliente fechou a conexão ao encerrar o streaming
+
+            def do_GET(self):
+                if self.path == '/api/tags' and server.healthy:
+                    self._send_json({"models": [{"name": "fake"}]})
+                else:
+                    self._send_json({"error": "indisponível"}, 503)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                server._count(requests=1)
+                with server._lock:
+                    server.request_bodies.append(body)
+                if not server.healthy:
+                    self._send_json({"error": "servidor indisponível"}, 500)
+                    return
+                if server._capacity is None:
+                    self._generate(body)
+                    return
+                with server._capacity:
+                    self._generate(body)
+
+            def _generate(self, body):
+                uncached, read, written = self.usage = server._prompt_usage(body)
+                server._count(input_tokens=uncached + written, cached_tokens=read)
+                time.sleep(server.first_token_delay + server.prefill_delay * (uncached + written))
+                structured = any(key in body for key in ('format', 'response_format', 'tools'))
+                # Na chamada de ferramenta da Anthropic, a resposta é só o JSON de entrada
+                self.tool = body['tools'][0]['name'] if server.kind == 'anthropic' and structured else None
+                malformed = not structured and server._next_is_malformed()
+                pieces = tokens(0 if self.tool else server.trailing_tokens, malformed)
+                if not body.get('stream'):
+                    time.sleep(server.token_delay * len(pieces))
+                    server._count(tokens_sent=len(pieces))
+                    self._send_json(self._complete(''.join(pieces)))
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson' if server.kind == 'ollama'
+                                 else 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    for event in self._start_events():
+                        self._chunk(event)
+                    for piece in pieces:
+                        self._chunk(self._delta(piece))
+                        server._count(tokens_sent=1)
+                        time.sleep(server.token_delay)
+                    for event in self._end_events():
+                        self._chunk(event)
+                    self.wfile.write(b'0\r\n\r\n')
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    server._count(cancelled=1)
+                    self.close_connection = True
+
+            def _chunk(self, text):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send_json(self, payload, status=200):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _complete(self, text):
+                if server.kind == 'ollama':
+                    return {"response": text, "done": True, "prompt_eval_count": self.usage[0]}
+                if server.kind == 'mistral':
+                    return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+                content = ({"type": "tool_use", "id": "toolu_fake", "name": self.tool, "input": json.loads(text)}
+                           if self.tool else {"type": "text", "text": text})
+                return {"id": "msg_fake", "type": "message", "role": "assistant", "model": "fake",
+                        "content": [content], "stop_reason": "tool_use" if self.tool else "end_turn",
+                        "stop_sequence": None, "usage": dict(self._anthropic_usage(), output_tokens=10)}
+
+            def _anthropic_usage(self):
+                uncached, read, written = self.usage
+                return {"input_tokens": uncached, "cache_read_input_tokens": read,
+                        "cache_creation_input_tokens": written}
+
+            def _start_events(self):
+                if server.kind == 'anthropic':
+                    message = {"id": "msg_fake", "type": "message", "role": "assistant", "model": "fake",
+                               "content": [], "stop_reason": None, "stop_sequence": None,
+                               "usage": dict(self._anthropic_usage(), output_tokens=0)}
+                    yield _sse('message_start', {"type": "message_start", "message": message})
+                    block = ({"type": "tool_use", "id": "toolu_fake", "name": self.tool, "input": {}}
+                             if self.tool else {"type": "text", "text": ""})
+                    yield _sse('content_block_start', {"type": "content_block_start", "index": 0,
+                                                       "content_block": block})
+
+            def _delta(self, piece):
+                if server.kind == 'ollama':
+                    return json.dumps({"response": piece, "done": False}) + "\n"
+                if server.kind == 'mistral':
+                    return _sse(None, {"choices": [{"index": 0, "delta": {"content": piece}}]})
+                delta = ({"type": "input_json_delta", "partial_json": piece} if self.tool
+                         else {"type": "text_delta", "text": piece})
+                return _sse('content_block_delta', {"type": "content_block_delta", "index": 0, "delta": delta})
+
+            def _end_events(self):
+                if server.kind == 'ollama':
+                    yield json.dumps({"response": "", "done": True, "prompt_eval_count": self.usage[0]}) + "\n"
+                elif server.kind == 'mistral':
+                    yield "data: [DONE]\n\n"
+                else:
+                    yield _sse('content_block_stop', {"type": "content_block_stop", "index": 0})
+                    yield _sse('message_delta', {"type": "message_delta",
+                                                 "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                                 "usage": {"output_tokens": 10}})
+                    yield _sse('message_stop', {"type": "message_stop"})
+
+        return Handler
+
+
+def _sse(event, payload):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
+
+class FakeBatchServer:
+    """
+    Servidor falso das APIs de lote de um provedor, executado em uma thread.
+
+    Args:
+        kind (str): 'anthropic' ou 'mistral'
+        processing_delay (float): Segundos entre a criação de um lote e o seu término
+        errored_every (int): Uma a cada N requisições falha na primeira vez em que aparece (0 = nenhuma)
+    """
+
+    def __init__(self, kind='anthropic', processing_delay=1.0, errored_every=0):
+        self.kind = kind
+        self.processing_delay = processing_delay
+        self.errored_every = errored_every
+        self.batches = {}  # Id -> {'criado', 'requisicoes': [(custom_id, corpo)], 'resultados'}
+        self.files = {}  # Arquivos da Mistral: id -> conteúdo
+        self.http_calls = 0
+        self.requests_received = 0  # Requisições de métodos recebidas em todos os lotes
+        self.errored_sent = 0
+        self.results_downloads = 0
+        self._seen = set()  # custom_ids já enviados (os reenvios não falham)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _create(self, prefix, requests, **extra):
+        with self._lock:
+            batch_id = f"{prefix}{len(self.batches) + 1:04d}"
+            self.batches[batch_id] = dict(extra, criado=time.monotonic(), requisicoes=requests, resultados=None)
+            self.requests_received += len(requests)
+            return batch_id
+
+    def _results(self, batch_id):
+        """Resultados (custom_id, texto ou None, corpo) de um lote terminado, ou None se ainda em andamento."""
+        with self._lock:
+            batch = self.batches[batch_id]
+            if time.monotonic() - batch['criado'] < self.processing_delay:
+                return None
+            if batch['resultados'] is None:
+                batch['resultados'] = []
+                for custom_id, body in batch['requisicoes']:
+                    first = custom_id not in self._seen
+                    self._seen.add(custom_id)
+                    failing = first and self.errored_every and len(self._seen) % self.errored_every == 0
+                    self.errored_sent += bool(failing)
+                    text = None if failing else json.dumps(ANALYSIS, ensure_ascii=False)
+                    batch['resultados'].append((custom_id, text, body))
+            return batch['resultados']
+
+    def _anthropic_batch(self, batch_id):
+        batch = self.batches[batch_id]
+        results = self._results(batch_id)
+        created = datetime.now(timezone.utc) - timedelta(seconds=time.monotonic() - batch['criado'])
+        counts = {"processing": len(batch['requisicoes']), "succeeded": 0, "errored": 0, "canceled": 0, "expired": 0}
+        if results is not None:
+            counts.update(processing=0, succeeded=sum(1 for _, text, _ in results if text is not None))
+            counts['errored'] = len(results) - counts['succeeded']
+        return {
+            "id": batch_id, "type": "message_batch",
+            "processing_status": "in_progress" if results is None else "ended",
+            "request_counts": counts,
+            "created_at": created.isoformat(), "expires_at": (created + timedelta(hours=24)).isoformat(),
+            "ended_at": None if results is None else datetime.now(timezone.utc).isoformat(),
+            "archived_at": None, "cancel_initiated_at": None,
+            "results_url": None if results is None else f"{self.url}/v1/messages/batches/{batch_id}/results"
+        }
+
+    def _anthropic_results(self, batch_id):
+        lines = []
+        for custom_id, text, params in self._results(batch_id):
+            if text is None:
+                result = {"type": "errored", "error": {"type": "error", "error": {
+                    "type": "api_error", "message": "erro interno do servidor falso"}}}
+            else:
+                tool = params['tools'][0]['name'] if params.get('tools') else None
+                content = ({"type": "tool_use", "id": "toolu_fake", "name": tool, "input": json.loads(text)}
+                           if tool else {"type": "text", "text": text})
+                result = {"type": "succeeded", "message": {
+                    "id": "msg_fake", "type": "message", "role": "assistant", "model": "fake",
+                    "content": [content], "stop_reason": "tool_use" if tool else "end_turn", "stop_sequence": None,
+                    "usage": {"input_tokens": len(json.dumps(params)) // 4, "output_tokens": len(text) // 4}}}
+            lines.append(json.dumps({"custom_id": custom_id, "result": result}))
+        return "\n".join(lines) + "\n"
+
+    def _mistral_job(self, batch_id):
+        batch = self.batches[batch_id]
+        results = self._results(batch_id)
+        job = {"id": batch_id, "object": "batch", "model": batch['modelo'], "endpoint": batch['endpoint'],
+               "status": "RUNNING" if results is None else "SUCCESS", "total_requests": len(batch['requisicoes']),
+               "succeeded_requests": 0, "failed_requests": 0, "output_file": None, "error_file": None}
+        if results is None:
+            return job
+        with self._lock:
+            if 'arquivos' not in batch:
+                output, errors = [], []
+                for custom_id, text, _ in results:
+                    if text is None:
+                        errors.append({"id": f"req_{custom_id}", "custom_id": custom_id,
+                                       "response": {"status_code": 500, "body": {"message": "erro interno"}},
+                                       "error": {"message": "erro interno do servidor falso", "code": 500}})
+                    else:
+                        output.append({"id": f"req_{custom_id}", "custom_id": custom_id, "error": None,
+                                       "response": {"status_code": 200, "body": {"choices": [
+                                           {"index": 0, "message": {"role": "assistant", "content": text}}]}}})
+                batch['arquivos'] = {}
+                for kind, entries in (('output_file', output), ('error_file', errors)):
+                    if entries:
+                        file_id = f"file_{len(self.files) + 1:04d}"
+                        self.files[file_id] = ''.join(json.dumps(entry) + "\n" for entry in entries).encode('utf-8')
+                        batch['arquivos'][kind] = file_id
+                batch['contagens'] = (len(output), len(errors))
+        job.update(batch['arquivos'], succeeded_requests=batch['contagens'][0], failed_requests=batch['contagens'][1])
+        return job
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server._count_call()
+                path = self.path.split('?')[0]
+                match = re.fullmatch(r'/v1/messages/batches/(\w+)(/results)?', path)
+                if server.kind == 'anthropic' and match and match.group(1) in server.batches:
+                    if not match.group(2):
+                        self._send(server._anthropic_batch(match.group(1)))
+                    elif server._results(match.group(1)) is None:
+                        self._send({"type": "error", "error": {"type": "not_found_error",
+                                                               "message": "lote em andamento"}}, 404)
+                    else:
+                        server._count_download()
+                        self._send(server._anthropic_results(match.group(1)), content_type='application/binary')
+                    return
+                match = re.fullmatch(r'/v1/batch/jobs/(\w+)', path)
+                if server.kind == 'mistral' and match and match.group(1) in server.batches:
+                    self._send(server._mistral_job(match.group(1)))
+                    return
+                match = re.fullmatch(r'/v1/files/(\w+)/content', path)
+                if server.kind == 'mistral' and match and match.group(1) in server.files:
+                    server._count_download()
+                    self._send(server.files[match.group(1)], content_type='application/octet-stream')
+                    return
+                self._send({"error": "não encontrado"}, 404)
+
+            def do_POST(self):
+                server._count_call()
+                data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if server.kind == 'anthropic' and self.path == '/v1/messages/batches':
+                    requests = [(entry['custom_id'], entry['params']) for entry in json.loads(data)['requests']]
+                    self._send(server._anthropic_batch(server._create('msgbatch_', requests)))
+                elif server.kind == 'mistral' and self.path == '/v1/files':
+                    message = email.parser.BytesParser(policy=email.policy.default).parsebytes(
+                        f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode('latin-1') + data)
+                    content = next(part.get_content() for part in message.iter_parts()
+                                   if part.get_param('name', header='content-disposition') == 'file')
+                    with server._lock:
+                        file_id = f"file_{len(server.files) + 1:04d}"
+                        server.files[file_id] = content if isinstance(content, bytes) else content.encode('utf-8')
+                    self._send({"id": file_id, "object": "file", "purpose": "batch", "bytes": len(data)})
+                elif server.kind == 'mistral' and self.path == '/v1/batch/jobs':
+                    body = json.loads(data)
+                    lines = b''.join(server.files[file_id] for file_id in body['input_files']).decode('utf-8')
+                    entries = [json.loads(line) for line in lines.splitlines() if line.strip()]
+                    batch_id = server._create('job_', [(entry['custom_id'], entry['body']) for entry in entries],
+                                              modelo=body['model'], endpoint=body['endpoint'])
+                    self._send(server._mistral_job(batch_id))
+                else:
+                    self._send({"error": "não encontrado"}, 404)
+
+            def _send(self, payload, status=200, content_type='application/json'):
+                if isinstance(payload, dict):
+                    payload = json.dumps(payload)
+                data = payload.encode('utf-8') if isinstance(payload, str) else payload
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _count_call(self):
+        with self._lock:
+            self.http_calls += 1
+
+    def _count_download(self):
+        with self._lock:
+            self.results_downloads += 1
@@ -0,0 +1,96 @@
+"""
+Mede o tempo de importação dos pontos de entrada com `python -X importtime`.
+
+Cada módulo é importado em um processo novo (importação a frio), algumas
+vezes, e o menor tempo acumulado é informado junto com os submódulos mais
+caros. Com --check, o script termina com erro se alguma dependência pesada
+(SDK da Anthropic, langchain, pandas, numpy, requests) for carregada já na
+importação, o que indica que uma importação preguiçosa deixou de ser
+preguiçosa.
+
+Uso:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --check --max-ms 1500
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos importados por app.py e analyzer_cli.py
+ENTRY_POINTS = ('analyzer.cnpj_analyzer', 'analyzer_cli', 'app')
+
+# Dependências que só devem ser carregadas quando realmente usadas
+HEAVY_MODULES = ('anthropic', 'langchain', 'langchain_core', 'pandas', 'numpy', 'requests')
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure(module):
+    """
+    Importa um módulo em um processo novo e retorna as linhas de -X importtime.
+
+    Returns:
+        list: Tuplas (nome, tempo próprio em µs, tempo acumulado em µs, profundidade)
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT, ANTHROPIC_API_KEY=os.getenv('ANTHROPIC_API_KEY', 'x'))
+    # Diretório temporário: os módulos criam arquivos de log no diretório corrente
+    with tempfile.TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=cwd, env=env, capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            entries.append((name, int(own), int(cumulative), len(indent) // 2))
+    # Descarta a inicialização do interpretador (site e seus submódulos vêm antes)
+    for i, (name, _, _, depth) in enumerate(entries):
+        if name == 'site' and depth == 0:
+            return entries[i + 1:]
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de importação a frio dos pontos de entrada")
+    parser.add_argument('modules', nargs='*', default=list(ENTRY_POINTS), help="Módulos a medir")
+    parser.add_argument('--repeat', type=int, default=3, help="Execuções por módulo (vale o menor tempo)")
+    parser.add_argument('--top', type=int, default=8, help="Submódulos mais caros a listar")
+    parser.add_argument('--check', action='store_true',
+                        help="Falha se alguma dependência pesada for importada")
+    parser.add_argument('--max-ms', type=float, help="Falha se algum módulo passar deste tempo")
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules:
+        runs = [measure(module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda entries: entries[-1][2])
+        total_ms = best[-1][2] / 1000
+        print(f"\n{module}: {total_ms:.0f} ms (melhor de {args.repeat})")
+        for name, _, cumulative, depth in sorted(best, key=lambda e: e[2], reverse=True)[1:args.top + 1]:
+            print(f"  {cumulative / 1000:8.1f} ms  {'  ' * depth}{name}")
+
+        heavy = sorted({name for name, *_ in best if name.split('.')[0] in HEAVY_MODULES})
+        if heavy:
+            print(f"  dependências pesadas carregadas: {', '.join(heavy[:10])}")
+            if args.check:
+                failures.append(f"{module} importa {heavy[0].split('.')[0]}")
+        if args.max_ms is not None and total_ms > args.max_ms:
+            failures.append(f"{module} levou {total_ms:.0f} ms (limite {args.max_ms:.0f} ms)")
+
+    if failures:
+        print("\nFALHA: " + "; ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
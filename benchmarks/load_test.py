@@ -0,0 +1,436 @@
+"""
+Teste de carga da interface web com usuários simultâneos.
+
+Sobe o app.py em um processo separado (gunicorn, como em produção, ou o
+servidor do Flask com threads, se o gunicorn não estiver instalado) com um
+provedor de IA falso (benchmarks/fake_servers.py, no formato do Ollama) e
+repositórios gerados em um diretório temporário. Para cada quantidade de
+usuários de --users, os usuários repetem requisições por --duration
+segundos, sorteando o endpoint pelos pesos de --mix:
+
+    pre-analyze   POST /pre-analyze de um dos repositórios gerados
+    analyze       POST /analyze de um dos repositórios gerados (relatório xlsx)
+    download      GET /download/<relatorio>/xlsx de um relatório já gerado
+
+Para cada cenário e endpoint são informados as requisições, a vazão, as
+latências (p50, p95, p99 e máxima) e a taxa de erros (respostas 4xx/5xx,
+falhas de conexão ou uma análise que recebe o nome do relatório de outra), além da memória do servidor (RSS do processo e dos
+processos filhos, como os workers do gunicorn e os processos dos padrões
+regex; pico e final do cenário, lidos com psutil ou de /proc).
+
+Com --baseline, os resultados são comparados com os de uma execução
+anterior com a mesma carga: o código de saída é 1 se a vazão cair, se a
+latência p95 ou a memória de pico subirem mais que --tolerance (fração),
+ou se a taxa de erros subir mais de um ponto percentual. Os números
+dependem da máquina: regrave a linha de base (--update-baseline) ao trocar
+de máquina e compare execuções feitas no mesmo ambiente.
+
+Uso:
+    python benchmarks/load_test.py --users 1,4,8 --duration 15
+    python benchmarks/load_test.py --baseline benchmarks/load_test_baseline.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+
+from benchmarks.fake_servers import FakeLLMServer
+
+ENDPOINTS = ('pre-analyze', 'analyze', 'download')
+
+# Campos do resultado que definem a carga: a comparação com a linha de base exige os mesmos valores
+WORKLOAD_FIELDS = ('mix', 'repos', 'files', 'methods', 'duration', 'token_delay', 'first_token_delay', 'server',
+                   'workers', 'threads')
+
+
+def generate_repository(directory, files, methods, seed):
+    """Repositório sintético com arquivos Java e Python; metade dos métodos menciona CNPJ."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for i in range(files):
+        if i % 2:
+            body = []
+            for j in range(methods):
+                value = 'cnpj' if rng.random() < 0.5 else 'documento'
+                body.append(f"    public long processa{j}(String {value}) {{\n"
+                            f"        long numero = Long.parseLong({value}.replaceAll(\"\\\\D\", \"\"));\n"
+                            f"        return numero % {rng.randint(2, 97)};\n    }}\n")
+            source = f"public class Servico{i} {{\n" + "\n".join(body) + "}\n"
+            name = f"Servico{i}.java"
+        else:
+            body = []
+            for j in range(methods):
+                value = 'cnpj' if rng.random() < 0.5 else 'documento'
+                body.append(f"def processa_{j}({value}):\n"
+                            f"    numero = int(''.join(c for c in {value} if c.isdigit()))\n"
+                            f"    return numero % {rng.randint(2, 97)}\n")
+            source = "\n\n".join(body)
+            name = f"servico_{i}.py"
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            f.write(source)
+
+
+def parse_mix(text):
+    """Pesos dos endpoints: 'pre-analyze=4,analyze=1,download=5'."""
+    mix = {}
+    for item in text.split(','):
+        endpoint, _, weight = item.partition('=')
+        endpoint = endpoint.strip()
+        if endpoint not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Endpoint desconhecido: {endpoint} (use {', '.join(ENDPOINTS)})")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_rss_mb(pid):
+    """Memória residente do processo e dos seus descendentes, em MB (None se não for possível medir)."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(p.memory_info().rss for p in processes if p.is_running()) / 1e6
+        except psutil.Error:
+            return None
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    parent = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(parent, []).append(int(entry))
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/statm') as f:
+                total += int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, IndexError, ValueError):
+            continue
+        pending.extend(children.get(current, ()))
+    return total / 1e6
+
+
+class MemorySampler:
+    """Amostra a memória do servidor em uma thread enquanto um cenário roda."""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = server_rss_mb(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        rss = server_rss_mb(self.pid)
+        if rss is not None:
+            self.samples.append(rss)
+
+
+def start_server(args, workdir, provider_url):
+    """Sobe o app.py em um processo separado e aguarda responder; retorna o processo e a URL."""
+    port = free_port()
+    env = dict(os.environ,
+               AI_MODEL_TYPE='ollama', OLLAMA_URL=provider_url, OLLAMA_MODEL='fake', OLLAMA_HEALTH_INTERVAL='0',
+               LATENCY_HISTORY_PATH='', REPORT_FORMATS='xlsx', REPORTS_DIR=os.path.join(workdir, 'reports'),
+               PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    if args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--workers', str(args.workers), '--threads', str(args.threads),
+                   '--bind', f'127.0.0.1:{port}', '--timeout', str(int(args.timeout)), '--log-level', 'warning',
+                   'app:app']
+    else:
+        command = [sys.executable, os.path.abspath(__file__), '--serve', str(port)]
+    # Os logs do app (flask_app.log, analyzer.log) ficam no diretório temporário
+    log = open(os.path.join(workdir, 'servidor.log'), 'w')
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"O servidor terminou ao iniciar; veja {log.name}")
+        try:
+            requests.get(url + '/', timeout=2)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"O servidor não respondeu em 60s; veja {log.name}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+class LoadClient:
+    """Requisições de um usuário virtual e os relatórios gerados pelas análises (compartilhados)."""
+
+    def __init__(self, url, repositories, reports, timeout):
+        self.url = url
+        self.repositories = repositories
+        self.reports = reports
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def request(self, endpoint, rng):
+        """Executa uma requisição; retorna (latência em segundos, sucesso)."""
+        start = time.perf_counter()
+        try:
+            if endpoint == 'download':
+                response = self.session.get(f"{self.url}/download/{rng.choice(self.reports)}/xlsx",
+                                            timeout=self.timeout, stream=True)
+                for _ in response.iter_content(64 * 1024):
+                    pass
+            else:
+                response = self.session.post(f"{self.url}/{endpoint}", timeout=self.timeout,
+                                             data={'directory': rng.choice(self.repositories)})
+                if endpoint == 'analyze' and response.ok:
+                    report = response.json()['relatorio']
+                    if report in self.reports:
+                        return time.perf_counter() - start, False  # Sobrescreveu o relatório de outra análise
+                    self.reports.append(report)
+            ok = response.ok
+        except (requests.RequestException, ValueError, KeyError):
+            ok = False
+        return time.perf_counter() - start, ok
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_scenario(url, users, args, repositories, reports, server_pid):
+    """Roda um cenário com a quantidade de usuários; retorna o resultado por endpoint e a memória."""
+    endpoints = list(args.mix)
+    weights = [args.mix[endpoint] for endpoint in endpoints]
+    records = []  # (endpoint, latência, sucesso)
+    lock = threading.Lock()
+    deadline = [0.0]
+    ready = threading.Barrier(users + 1)
+
+    def user(index):
+        rng = random.Random(f"{args.seed}-{users}-{index}")
+        client = LoadClient(url, repositories, reports, args.timeout)
+        ready.wait()
+        while time.monotonic() < deadline[0]:
+            endpoint = rng.choices(endpoints, weights)[0]
+            latency, ok = client.request(endpoint, rng)
+            with lock:
+                records.append((endpoint, latency, ok))
+            if args.think:
+                time.sleep(rng.expovariate(1 / args.think))
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    with MemorySampler(server_pid) as memory:
+        started = time.monotonic()
+        deadline[0] = started + args.duration
+        ready.wait()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+    result = {'usuarios': users, 'segundos': round(elapsed, 1), 'endpoints': {}}
+    for endpoint in endpoints:
+        latencies = sorted(latency for name, latency, _ in records if name == endpoint)
+        errors = sum(1 for name, _, ok in records if name == endpoint and not ok)
+        if not latencies:
+            continue
+        result['endpoints'][endpoint] = {
+            'requisicoes': len(latencies),
+            'vazao_rps': round(len(latencies) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'max_ms': round(latencies[-1] * 1000, 1),
+            'taxa_erros': round(errors / len(latencies), 4)
+        }
+    result['memoria_pico_mb'] = round(max(memory.samples), 1) if memory.samples else None
+    result['memoria_final_mb'] = round(memory.samples[-1], 1) if memory.samples else None
+    return result
+
+
+def compare_baseline(results, baseline, tolerance, slack_ms):
+    """
+    Regressões em relação à linha de base.
+
+    Args:
+        results (dict): Resultado desta execução
+        baseline (dict): Resultado gravado com --update-baseline
+        tolerance (float): Variação relativa aceita na vazão, na latência p95 e na memória
+        slack_ms (float): Variação absoluta da p95 sempre aceita (latências pequenas oscilam muito)
+
+    Returns:
+        list: Descrição de cada regressão (vazia se não houver)
+    """
+    regressions = []
+    for name, base in baseline['cenarios'].items():
+        current = results['cenarios'].get(name)
+        if current is None:
+            continue
+        for endpoint, before in base['endpoints'].items():
+            after = current['endpoints'].get(endpoint)
+            if after is None:
+                regressions.append(f"{name} {endpoint}: nenhuma requisição concluída")
+                continue
+            if after['vazao_rps'] < before['vazao_rps'] * (1 - tolerance):
+                regressions.append(f"{name} {endpoint}: vazão {after['vazao_rps']} req/s "
+                                   f"(linha de base {before['vazao_rps']})")
+            if after['p95_ms'] > max(before['p95_ms'] * (1 + tolerance), before['p95_ms'] + slack_ms):
+                regressions.append(f"{name} {endpoint}: p95 {after['p95_ms']} ms (linha de base {before['p95_ms']})")
+            if after['taxa_erros'] > before['taxa_erros'] + 0.01:
+                regressions.append(f"{name} {endpoint}: erros {after['taxa_erros']:.1%} "
+                                   f"(linha de base {before['taxa_erros']:.1%})")
+        if base.get('memoria_pico_mb') and current.get('memoria_pico_mb') and \
+                current['memoria_pico_mb'] > base['memoria_pico_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: memória de pico {current['memoria_pico_mb']} MB "
+                               f"(linha de base {base['memoria_pico_mb']})")
+    return regressions
+
+
+def print_scenario(name, result):
+    memory = f"{result['memoria_pico_mb']} MB pico, {result['memoria_final_mb']} MB final" \
+        if result['memoria_pico_mb'] is not None else "memória não medida"
+    print(f"\n{name}: {result['usuarios']} usuários, {result['segundos']}s, servidor {memory}")
+    print(f"  {'endpoint':12s} {'req':>6s} {'req/s':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} "
+          f"{'max ms':>9s} {'erros':>7s}")
+    for endpoint, stats in result['endpoints'].items():
+        print(f"  {endpoint:12s} {stats['requisicoes']:6d} {stats['vazao_rps']:8.2f} {stats['p50_ms']:9.1f} "
+              f"{stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f} {stats['max_ms']:9.1f} {stats['taxa_erros']:7.1%}")
+
+
+def serve(port):
+    """Servidor do Flask com threads, usado quando o gunicorn não está instalado."""
+    from app import app
+    app.run(host='127.0.0.1', port=port, threaded=True, debug=False, use_reloader=False)
+
+
+def main():
+    try:
+        import gunicorn  # noqa: F401
+        default_server = 'gunicorn'
+    except ImportError:
+        default_server = 'flask'
+    parser = argparse.ArgumentParser(description="Teste de carga da interface web com usuários simultâneos")
+    parser.add_argument('--users', default='1,4,8', help="Usuários simultâneos de cada cenário, separados por vírgula")
+    parser.add_argument('--duration', type=float, default=15, help="Segundos de cada cenário")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('pre-analyze=4,analyze=1,download=5'),
+                        help="Pesos dos endpoints (pre-analyze, analyze, download)")
+    parser.add_argument('--think', type=float, default=0.0, help="Pausa média de cada usuário entre requisições (s)")
+    parser.add_argument('--repos', type=int, default=3, help="Repositórios gerados")
+    parser.add_argument('--files', type=int, default=20, help="Arquivos por repositório")
+    parser.add_argument('--methods', type=int, default=4, help="Métodos por arquivo")
+    parser.add_argument('--token-delay', type=float, default=0.001, help="Atraso entre tokens do provedor falso")
+    parser.add_argument('--first-token-delay', type=float, default=0.05, help="Atraso do primeiro token")
+    parser.add_argument('--server', choices=('gunicorn', 'flask'), default=default_server)
+    parser.add_argument('--workers', type=int, default=2, help="Workers do gunicorn")
+    parser.add_argument('--threads', type=int, default=8, help="Threads por worker do gunicorn")
+    parser.add_argument('--timeout', type=float, default=300, help="Prazo de cada requisição (s)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Grava o resultado em JSON")
+    parser.add_argument('--baseline', help="Linha de base (JSON) para detectar regressões")
+    parser.add_argument('--update-baseline', action='store_true', help="Grava o resultado como nova linha de base")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Piora relativa aceita em relação à linha de base")
+    parser.add_argument('--slack-ms', type=float, default=50, help="Aumento absoluto da p95 sempre aceito (ms)")
+    parser.add_argument('--serve', type=int, metavar='PORTA', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve)
+        return
+    if args.update_baseline and not args.baseline:
+        parser.error("--update-baseline requer --baseline")
+
+    logging.disable(logging.WARNING)
+    config = {field: getattr(args, field) for field in WORKLOAD_FIELDS}
+    if args.server != 'gunicorn':
+        config.update(workers=1, threads=None)
+    results = {'carga': config, 'cenarios': {}}
+    with tempfile.TemporaryDirectory() as workdir, \
+            FakeLLMServer('ollama', token_delay=args.token_delay, first_token_delay=args.first_token_delay,
+                          trailing_tokens=20) as provider:
+        repositories = []
+        for i in range(args.repos):
+            repositories.append(os.path.join(workdir, f"repositorio{i}"))
+            generate_repository(repositories[-1], args.files, args.methods, args.seed + i)
+        process, url = start_server(args, workdir, provider.url)
+        try:
+            print(f"Servidor {args.server} em {url}; {args.repos} repositórios de {args.files} arquivos")
+            # Um relatório por repositório antes dos cenários, para os downloads
+            reports = []
+            for repository in repositories:
+                _, ok = LoadClient(url, [repository], reports, args.timeout).request('analyze', random.Random())
+                if not ok:
+                    raise RuntimeError(f"A análise de aquecimento falhou; veja {os.path.join(workdir, 'servidor.log')}")
+            for users in (int(value) for value in args.users.split(',')):
+                name = f"usuarios_{users}"
+                results['cenarios'][name] = run_scenario(url, users, args, repositories, reports, process.pid)
+                print_scenario(name, results['cenarios'][name])
+            print(f"\nProvedor falso: {provider.requests} chamadas")
+        finally:
+            stop_server(process)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nLinha de base gravada em {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['carga'] != json.loads(json.dumps(config)):
+            print(f"\nA carga difere da linha de base ({baseline['carga']}); use os mesmos parâmetros")
+            sys.exit(2)
+        regressions = compare_baseline(results, baseline, args.tolerance, args.slack_ms)
+        if regressions:
+            print("\nRegressões em relação à linha de base:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("\nSem regressões em relação à linha de base")
+
+
+if __name__ == '__main__':
+    main()
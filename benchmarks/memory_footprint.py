@@ -0,0 +1,101 @@
+"""
+Mede a memória retida pela fase de extração (collect) em uma árvore sintética grande.
+
+Gera arquivos Java e Python com métodos que usam CNPJ em um diretório
+temporário, executa GenericCNPJAnalyzer.collect sob tracemalloc e informa o
+pico de memória, a memória retida após a extração e o custo por método
+pendente. O texto que antes ficava retido (um dicionário com o código de
+cada método) é informado para comparação.
+
+Uso:
+    python benchmarks/memory_footprint.py --files 2000 --methods 20
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import AIModelInterface
+from analyzer.cnpj_analyzer import GenericCNPJAnalyzer
+
+JAVA_METHOD = """
+    public long cnpj{i}x{n}Valida(String cnpj) {{
+        long numero = Long.parseLong(cnpj.replaceAll("[^0-9]", ""));
+        int soma = 0;
+        for (int i = 0; i < 12; i++) {{
+            soma += (cnpj.charAt(i) - '0') * PESOS[i];
+        }}
+        return numero % 11 == soma % 11 ? numero : -1;
+    }}
+"""
+
+PYTHON_METHOD = """
+    def cnpj_{i}_{n}_valida(self, cnpj):
+        numero = int(''.join(c for c in cnpj if c.isdigit()))
+        soma = sum(int(d) * p for d, p in zip(str(numero), PESOS))
+        return numero if soma % 11 < 2 else None
+"""
+
+
+class NullModel(AIModelInterface):
+    """Modelo que nunca é chamado: o benchmark mede apenas a extração."""
+
+    def analyze_code(self, prompt, language, code, context_extra="", file_context=""):
+        raise RuntimeError("O benchmark de memória não deve chamar o modelo")
+
+
+def generate_tree(directory, files, methods):
+    """
+    Gera metade dos arquivos em Java e metade em Python.
+
+    Os nomes dos métodos são únicos e nenhum é substring de outro, para que a
+    busca de dependências por nome parcial não domine a medição.
+    """
+    for i in range(files):
+        if i % 2:
+            body = ''.join(JAVA_METHOD.format(i=i, n=n) for n in range(methods))
+            path = os.path.join(directory, f"Cliente{i}.java")
+            content = f"public class Cliente{i} {{\n{body}}}\n"
+        else:
+            body = ''.join(PYTHON_METHOD.format(i=i, n=n) for n in range(methods))
+            path = os.path.join(directory, f"cliente_{i}.py")
+            content = f"class Cliente{i}:\n{body}"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória retida pela extração de métodos com CNPJ")
+    parser.add_argument('--files', type=int, default=1000, help="Arquivos gerados")
+    parser.add_argument('--methods', type=int, default=20, help="Métodos com CNPJ por arquivo")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)  # O log por arquivo dominaria o tempo medido
+    with tempfile.TemporaryDirectory() as directory:
+        generate_tree(directory, args.files, args.methods)
+        analyzer = GenericCNPJAnalyzer(ai_model=NullModel())
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        pending = analyzer.collect(directory)
+        elapsed = time.perf_counter() - start
+        analyzer.files.close()  # A releitura acontece só ao montar os prompts
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        text_chars = sum(candidate.size for candidate in analyzer.pending)
+        print(f"Arquivos: {args.files}  métodos pendentes: {pending}  símbolos: {len(analyzer.all_methods)}")
+        print(f"Extração: {elapsed:.2f}s")
+        print(f"Memória retida após a extração: {current / 1024 / 1024:.1f} MiB "
+              f"({current / max(pending, 1):.0f} bytes por método)")
+        print(f"Pico durante a extração: {peak / 1024 / 1024:.1f} MiB")
+        print(f"Texto dos métodos (antes retido em memória): {text_chars / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Mede o ganho de vazão ao distribuir as chamadas entre vários servidores Ollama.
+
+Sobe servidores Ollama falsos (ver fake_servers.py) que geram uma resposta
+por vez, como um servidor com uma única GPU, e dispara chamadas simultâneas
+através de OllamaPoolModel com 1, 2, 4... servidores. Em seguida, simula um
+servidor fora do ar: as chamadas devem continuar sendo atendidas pelos
+demais, o nó com falha deve ser ejetado e readmitido após se recuperar.
+
+Uso:
+    python benchmarks/ollama_pool.py --servers 1 2 4 --calls 40 --concurrency 8
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import OllamaPoolModel
+from benchmarks.fake_servers import FakeLLMServer
+from benchmarks.streaming import PROMPT, CODE
+
+
+def start_servers(stack, count, token_delay):
+    return [stack.enter_context(FakeLLMServer('ollama', token_delay=token_delay, first_token_delay=0.02,
+                                              trailing_tokens=0, max_concurrent=1))
+            for _ in range(count)]
+
+
+def call_many(model, calls, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(model.analyze_code, PROMPT, 'java', CODE) for _ in range(calls)]
+        return sum(1 for future in futures if future.exception() is None)
+
+
+def throughput(count, calls, concurrency, token_delay):
+    with ExitStack() as stack:
+        servers = start_servers(stack, count, token_delay)
+        model = OllamaPoolModel([server.url for server in servers], model_name='fake', health_interval=0)
+        start = time.perf_counter()
+        ok = call_many(model, calls, concurrency)
+        elapsed = time.perf_counter() - start
+        distribution = [node['requisicoes'] for node in model.node_stats()]
+        print(f"  {count} servidor(es): {ok / elapsed:6.1f} chamadas/s  ({ok}/{calls} ok, "
+              f"distribuição {distribution})")
+        return ok / elapsed
+
+
+def failover(calls, concurrency, token_delay):
+    with ExitStack() as stack:
+        servers = start_servers(stack, 3, token_delay)
+        servers[0].healthy = False
+        model = OllamaPoolModel([server.url for server in servers], model_name='fake', eject_after=2,
+                                eject_seconds=60, health_interval=0)
+        ok = call_many(model, calls, concurrency)
+        down = model.node_stats()[0]
+        print(f"  1 de 3 servidores fora do ar: {ok}/{calls} chamadas ok; nó com falha: "
+              f"{down['falhas']} falhas, ejetado={down['ejetado']}")
+        servers[0].healthy = True
+        available = model.check_health()
+        print(f"  após a recuperação: {available} de 3 servidores disponíveis")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão do pool de servidores Ollama")
+    parser.add_argument('--servers', type=int, nargs='*', default=[1, 2, 4], help="Tamanhos de pool a medir")
+    parser.add_argument('--calls', type=int, default=40, help="Chamadas por medição")
+    parser.add_argument('--concurrency', type=int, default=8, help="Chamadas simultâneas")
+    parser.add_argument('--token-delay', type=float, default=0.002, help="Segundos por token no servidor falso")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)  # As falhas simuladas gerariam uma linha de log por chamada
+    print("Vazão:")
+    base = None
+    for count in args.servers:
+        rate = throughput(count, args.calls, args.concurrency, args.token_delay)
+        base = base or rate
+        if rate != base:
+            print(f"    {rate / base:.1f}x em relação a {args.servers[0]} servidor(es)")
+    print("Falha de um servidor:")
+    failover(args.calls, args.concurrency, args.token_delay)
+
+
+if __name__ == '__main__':
+    main()
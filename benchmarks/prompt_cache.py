@@ -0,0 +1,89 @@
+"""
+Mede o ganho do cache de prefixo do prompt nos provedores.
+
+Sobe servidores falsos (ver fake_servers.py) que cobram um atraso por token
+de entrada processado e reaproveitam prefixos como os provedores reais: na
+Anthropic, os blocos marcados com cache_control; no Ollama, o início comum
+com o prompt anterior enquanto o modelo fica carregado. Simula a análise de
+--files arquivos com --methods métodos cada, usando o prompt do analisador
+e um início de arquivo comum aos métodos, com o cache ligado e desligado
+(prompt_cache=False na Anthropic, keep_alive=0 no Ollama). São informados a
+latência por chamada e os tokens de entrada processados e lidos do cache.
+
+Uso:
+    python benchmarks/prompt_cache.py --files 5 --methods 6 --prefill-delay 0.0005
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import AIModelInterface, AnthropicModel, OllamaModel
+from analyzer.cnpj_analyzer import GenericCNPJAnalyzer
+from benchmarks.fake_servers import FakeLLMServer
+
+FILE_HEADER = "".join(f"import br.com.empresa.cadastro.modulo{i}.Servico{i};\n" for i in range(30)) + (
+    "\n/** Cadastro de pessoas jurídicas e validação de documentos. */\n"
+    "public class CadastroEmpresa extends CadastroBase implements Validavel {\n"
+    "    private static final int TAMANHO_CNPJ = 14;\n"
+    "    private final RepositorioEmpresa repositorio;\n\n")
+
+METHOD = ("    public long valida{n}(String cnpj) {{\n"
+          "        long numero = Long.parseLong(cnpj.replaceAll(\"\\\\D\", \"\"));\n"
+          "        return repositorio.busca{n}(numero % 97);\n"
+          "    }}\n")
+
+
+class NullModel(AIModelInterface):
+    """Modelo que nunca é chamado: usado só para obter o prompt do analisador."""
+
+    def analyze_code(self, prompt, language, code, context_extra="", file_context=""):
+        raise RuntimeError("Não deve ser chamado")
+
+
+def run(kind, cached, files, methods, prefill_delay, token_delay):
+    prompt = GenericCNPJAnalyzer(ai_model=NullModel()).prompt
+    # Saída estruturada e sem texto final: o cliente lê a linha com as contagens de tokens
+    with FakeLLMServer(kind, token_delay=token_delay, first_token_delay=0.0, trailing_tokens=0,
+                       prefill_delay=prefill_delay) as server:
+        if kind == 'ollama':
+            model = OllamaModel(base_url=server.url, model_name='fake', keep_alive=None if cached else 0)
+        else:
+            model = AnthropicModel(api_key='fake', base_url=server.url, prompt_cache=cached)
+        start = time.perf_counter()
+        for f in range(files):
+            header = FILE_HEADER.replace('CadastroEmpresa', f'CadastroEmpresa{f}')
+            for m in range(methods):
+                model.analyze_code(prompt, 'java', METHOD.format(n=m), file_context=header)
+        elapsed = (time.perf_counter() - start) / (files * methods)
+        return elapsed, model.cache_stats.summary(), server.input_tokens, server.cached_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ganho do cache de prefixo do prompt")
+    parser.add_argument('--files', type=int, default=5, help="Arquivos simulados")
+    parser.add_argument('--methods', type=int, default=6, help="Métodos por arquivo")
+    parser.add_argument('--prefill-delay', type=float, default=0.0005,
+                        help="Segundos por token de entrada processado no servidor falso")
+    parser.add_argument('--token-delay', type=float, default=0.001, help="Segundos por token gerado")
+    parser.add_argument('--providers', nargs='*', default=['anthropic', 'ollama'])
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    for kind in args.providers:
+        print(f"\n{kind}:")
+        for cached in (False, True):
+            elapsed, stats, processed, reused = run(kind, cached, args.files, args.methods,
+                                                    args.prefill_delay, args.token_delay)
+            label = "com cache" if cached else "sem cache"
+            print(f"  {label}: {elapsed * 1000:7.1f} ms/chamada  tokens processados: {processed:7d}  "
+                  f"lidos do cache: {reused:7d}  fração em cache (cliente): {stats['fracao_em_cache']}  "
+                  f"latência com/sem cache: {stats['latencia_media_com_cache_s']}/"
+                  f"{stats['latencia_media_sem_cache_s']}s")
+
+
+if __name__ == '__main__':
+    main()
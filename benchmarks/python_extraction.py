@@ -0,0 +1,119 @@
+"""
+Mede a extração de funções e métodos de módulos Python grandes.
+
+Gera um módulo sintético com --functions funções e métodos (com
+decoradores, "async def", assinaturas em várias linhas, funções aninhadas
+e classes aninhadas), dos quais uma fração --cnpj menciona CNPJ, e mede:
+
+    ast         analyzer.python_extractor.extract_functions (árvore sintática)
+    tokenize    a leitura por tokens usada em arquivos que o ast não aceita
+    arquivo     GenericCNPJAnalyzer.analyze_file completo (extração, menções, símbolos e fila)
+
+São informados o tempo, a vazão em MB/s e se as funções encontradas e os
+métodos com CNPJ enfileirados conferem com os gerados. Com --max-seconds,
+o código de saída é 1 se analyze_file passar desse tempo ou se as contagens
+não conferirem.
+
+Uso:
+    python benchmarks/python_extraction.py --functions 20000 --cnpj 0.1
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from itertools import accumulate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import AIModelInterface
+from analyzer.cnpj_analyzer import GenericCNPJAnalyzer
+from analyzer.python_extractor import extract_functions, _from_tokens
+
+
+def function_source(rng, i, indent, mentions_cnpj):
+    """Código de uma função com uma das formas de declaração cobertas pelo extrator."""
+    pad = ' ' * indent
+    value = 'cnpj' if mentions_cnpj else 'documento'
+    style = i % 4
+    if style == 0:
+        header = f"{pad}def funcao_{i}(self, {value}):\n"
+    elif style == 1:
+        header = f"{pad}@cache(maxsize=128)\n{pad}@registrar('rota_{i}')\n{pad}async def funcao_{i}(self, {value}):\n"
+    elif style == 2:
+        header = (f"{pad}def funcao_{i}(\n{pad}        self,\n{pad}        {value}: str,\n"
+                  f"{pad}        opcoes: dict = None) -> bool:\n")
+    else:
+        header = (f"{pad}def funcao_{i}(self, {value}):\n{pad}    def interna(valor):\n"
+                  f"{pad}        return valor.strip()\n\n")
+    body = ''.join(f"{pad}    total_{j} = calcula_{rng.randint(0, 99)}({value}, {j}) * {j}\n"
+                   for j in range(rng.randint(3, 12)))
+    return header + f'{pad}    """Processa o registro {i}."""\n' + body + f"{pad}    return valida({value})\n\n"
+
+
+def generate(functions, cnpj_fraction, seed):
+    """Módulo sintético; retorna o código e a quantidade de funções que mencionam CNPJ."""
+    rng = random.Random(seed)
+    parts = ["import os\nfrom functools import cache\n\n\n"]
+    with_cnpj = 0
+    for i in range(functions):
+        mentions = rng.random() < cnpj_fraction
+        with_cnpj += mentions
+        if i % 50 == 0:
+            parts.append(f"class Servico{i}:\n    versao = {i}\n\n")
+        if i % 50 == 25:
+            parts.append(f"    class Interna{i}:\n")
+        indent = 8 if i % 50 >= 25 else 4
+        parts.append(function_source(rng, i, indent, mentions))
+    return ''.join(parts), with_cnpj
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extração de funções de módulos Python grandes")
+    parser.add_argument('--functions', type=int, default=20000, help="Funções e métodos no módulo gerado")
+    parser.add_argument('--cnpj', type=float, default=0.1, help="Fração das funções que mencionam CNPJ")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-seconds', type=float, help="Tempo máximo aceito de analyze_file")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    content, with_cnpj = generate(args.functions, args.cnpj, args.seed)
+    size_mb = len(content.encode('utf-8')) / 1e6
+    print(f"Módulo de {size_mb:.1f} MB, {content.count(chr(10))} linhas, {args.functions} funções "
+          f"({with_cnpj} com CNPJ)")
+
+    line_starts = [0, *accumulate(len(line) + 1 for line in content.split('\n'))]
+    from_tree, tree_s = timed(extract_functions, content)
+    from_tokens, tokens_s = timed(_from_tokens, content, line_starts)
+    analyzer = GenericCNPJAnalyzer(ai_model=AIModelInterface())
+    _, file_s = timed(analyzer.analyze_file, 'modulo_grande.py', 'python', content)
+
+    same = [(f.qualified_name, f.start, f.end) for f in from_tree] == \
+           [(f.qualified_name, f.start, f.end) for f in from_tokens]
+    print(f"ast        {tree_s:7.2f}s  {size_mb / tree_s:7.1f} MB/s  {len(from_tree)} funções")
+    print(f"tokenize   {tokens_s:7.2f}s  {size_mb / tokens_s:7.1f} MB/s  {len(from_tokens)} funções  "
+          f"(trechos {'iguais' if same else 'diferentes'} dos do ast)")
+    print(f"arquivo    {file_s:7.2f}s  {size_mb / file_s:7.1f} MB/s  {len(analyzer.pending)} métodos com CNPJ, "
+          f"{len(analyzer.all_methods)} símbolos")
+
+    failed = []
+    if len(from_tree) != args.functions or len(from_tokens) != args.functions:
+        failed.append("funções encontradas diferentes das geradas")
+    if len(analyzer.pending) != with_cnpj:
+        failed.append(f"{len(analyzer.pending)} métodos com CNPJ enfileirados, {with_cnpj} gerados")
+    if args.max_seconds is not None and file_s > args.max_seconds:
+        failed.append(f"analyze_file acima de {args.max_seconds}s")
+    if failed:
+        print("\n" + "\n".join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
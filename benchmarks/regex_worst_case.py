@@ -0,0 +1,147 @@
+"""
+Mede o pior caso da extração em entradas adversárias para os padrões regex.
+
+Gera um corpus de arquivos que levam os padrões de método ao custo
+superlinear (corpo de método sem a chave de fechamento, lista de parâmetros
+sem fechar parênteses, bundle JavaScript minificado, longas sequências de
+espaços) e, com --fuzz, variações aleatórias dos exemplos de "Test Code"
+(chaves e parênteses removidos, linhas unidas, conteúdo repetido). Cada
+arquivo passa por GenericCNPJAnalyzer.analyze_file com o RegexGuard
+configurado; são informados o tempo de cada arquivo e os que foram
+analisados por trechos após estourar o prazo.
+
+O código de saída é 1 se algum arquivo passar de --max-seconds, para
+detectar regressões no pior caso. --no-guard mostra o custo sem prazo
+(use tamanhos pequenos: pode levar minutos).
+
+Uso:
+    python benchmarks/regex_worst_case.py --sizes 8000,64000 --fuzz 20
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import AIModelInterface
+from analyzer.cnpj_analyzer import GenericCNPJAnalyzer, SUPPORTED_EXTENSIONS
+from analyzer.regex_guard import RegexGuard
+from config import REGEX_PATTERN_TIMEOUT, REGEX_FILE_TIMEOUT, REGEX_GUARD_MIN_BYTES
+
+# Família -> linguagem -> trecho repetido até o tamanho pedido
+ADVERSARIAL = {
+    'corpo_sem_fechamento': {
+        'java': "public long valida(String cnpj) { long n = parse(cnpj); ",
+        'csharp': "public void Valida(int a) { var cnpj = a; ",
+        'cpp': "int valida(int a) { cnpj(a); ",
+        'c': "int valida(char *cnpj) { int n = atoi(cnpj); ",
+        'go': "func Valida(cnpj string) { n := parse(cnpj); ",
+        'javascript': "function valida(a){cnpj=a;",
+    },
+    'parametros_sem_fechamento': {
+        'java': "public void valida(String cnpj, ",
+        'csharp': "public void Valida(string cnpj, ",
+        'cpp': "void valida(const char* cnpj, ",
+        'javascript': "function valida(cnpj, ",
+    },
+    'minificado': {
+        'javascript': "var a=function(b){return cnpj(b)};if(x){c=function(d){cnpj=d;",
+    },
+    'espacos': {
+        'java': "public   " + " " * 200 + "long cnpj",
+        'cpp': "int" + " " * 200 + "cnpj ",
+    },
+}
+
+
+class NullModel(AIModelInterface):
+    """Modelo que nunca é chamado: o benchmark mede apenas a extração."""
+
+    def analyze_code(self, prompt, language, code, context_extra="", file_context=""):
+        raise RuntimeError("O benchmark de extração não deve chamar o modelo")
+
+
+def adversarial_corpus(sizes):
+    """Arquivos adversários: (nome, linguagem, conteúdo)."""
+    for family, languages in ADVERSARIAL.items():
+        for language, unit in languages.items():
+            for size in sizes:
+                yield f"{family}_{size}{SUPPORTED_EXTENSIONS[language][0]}", language, unit * max(1, size // len(unit))
+
+
+def fuzz_corpus(directory, count, sizes, seed):
+    """Variações aleatórias dos exemplos de código: (nome, linguagem, conteúdo)."""
+    rng = random.Random(seed)
+    analyzer_languages = {ext: lang for lang, exts in SUPPORTED_EXTENSIONS.items() for ext in exts}
+    samples = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            language = analyzer_languages.get(os.path.splitext(name)[1].lower())
+            if language and language != 'python':
+                with open(os.path.join(root, name), encoding='utf-8', errors='ignore') as f:
+                    samples.append((name, language, f.read()))
+    mutations = [
+        ('sem_chaves', lambda text: text.replace('}', '')),
+        ('sem_parenteses', lambda text: ''.join(c for c in text if c != ')' or rng.random() < 0.5)),
+        ('minificado', lambda text: ' '.join(text.split())),
+    ]
+    for i in range(count if samples else 0):
+        name, language, text = rng.choice(samples)
+        label, mutate = rng.choice(mutations)
+        size = rng.choice(sizes)
+        text = mutate(text * max(1, size // max(len(text), 1)))
+        yield f"fuzz{i}_{label}_{name}", language, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pior caso da extração em entradas adversárias")
+    parser.add_argument('--sizes', default='8000,64000',
+                        type=lambda value: [int(size) for size in value.split(',')], help="Tamanhos em bytes")
+    parser.add_argument('--fuzz', type=int, default=0, help="Variações aleatórias dos exemplos de código")
+    parser.add_argument('--corpus', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                         'Test Code'), help="Exemplos usados no fuzz")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--pattern-timeout', type=float, default=REGEX_PATTERN_TIMEOUT)
+    parser.add_argument('--file-timeout', type=float, default=REGEX_FILE_TIMEOUT)
+    parser.add_argument('--min-bytes', type=int, default=REGEX_GUARD_MIN_BYTES)
+    parser.add_argument('--no-guard', action='store_true', help="Sem prazo (todos os padrões no próprio processo)")
+    parser.add_argument('--max-seconds', type=float,
+                        help="Tempo máximo aceito por arquivo (padrão: prazo por arquivo + 2s)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    analyzer = GenericCNPJAnalyzer(ai_model=NullModel())
+    analyzer.regex_guard = RegexGuard(args.pattern_timeout, 0 if args.no_guard else args.file_timeout,
+                                      args.min_bytes)
+    limit = args.max_seconds if args.max_seconds is not None else args.file_timeout + 2
+
+    corpus = list(adversarial_corpus(args.sizes)) + list(fuzz_corpus(args.corpus, args.fuzz, args.sizes, args.seed))
+    times = []
+    slow = []
+    for name, language, content in corpus:
+        degraded = len(analyzer.degraded)
+        pending = len(analyzer.pending)
+        start = time.perf_counter()
+        analyzer.analyze_file(name, language, content)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        if elapsed > limit:
+            slow.append(name)
+        status = f"trechos ({analyzer.degraded[-1]['padrao']})" if len(analyzer.degraded) > degraded else "métodos"
+        print(f"{name:48s} {len(content):8d} bytes {elapsed:7.2f}s  {status}, "
+              f"{len(analyzer.pending) - pending} pendentes")
+    analyzer.regex_guard.close()
+
+    times.sort()
+    print(f"Arquivos: {len(times)}  mediana: {times[len(times) // 2]:.2f}s  máximo: {times[-1]:.2f}s  "
+          f"analisados por trechos: {len(analyzer.degraded)}")
+    if slow:
+        print(f"Acima de {limit:.1f}s: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
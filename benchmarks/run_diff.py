@@ -0,0 +1,128 @@
+"""
+Mede o tempo da comparação entre duas execuções (analyzer.diff).
+
+Gera --methods resultados sintéticos para a execução anterior e deriva a
+atual alterando uma fração --churn deles: metade com o corpo editado, um
+quarto com severidade ou horas diferentes e o restante removido, além do
+mesmo número de métodos novos. As duas execuções são gravadas em cada
+formato de relatório e comparadas com load_run + diff_findings; são
+informados o tempo de leitura, o da junção e se as contagens do delta
+conferem com as alterações feitas. Com --max-seconds, o código de saída é 1
+se alguma comparação (leitura incluída) passar desse tempo.
+
+Uso:
+    python benchmarks/run_diff.py --methods 50000 --churn 0.05
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.diff import diff_findings, load_run
+from analyzer.records import content_digest
+from analyzer.reporting import ReportGenerator
+
+SEVERITIES = ('ALTA', 'MEDIA', 'BAIXA')
+
+
+def finding(rng, i, body=0):
+    """Resultado sintético do método i (body muda o hash do corpo)."""
+    dev, test = rng.randint(1, 16), rng.randint(1, 8)
+    return {
+        'arquivo': f"src/modulo{i // 20}/Arquivo{i // 5}.java",
+        'linguagem': 'java',
+        'metodo': f"metodo{i}",
+        'linha': (i % 5) * 40 + 1,
+        'tipo_uso': rng.choice(('validacao', 'formatacao', 'armazenamento', 'calculo')),
+        'operacoes_numericas': "cálculo do dígito verificador",
+        'impactos': "tamanho do campo\nvalidação",
+        'riscos': "CNPJ alfanumérico",
+        'modificacoes': "aceitar letras",
+        'severidade': rng.choice(SEVERITIES),
+        'horas_dev': dev,
+        'horas_teste': test,
+        'horas_total': dev + test,
+        'dependencias': "Nenhuma dependência encontrada",
+        'sistemas_impactados': "",
+        'risco_estatico': round(rng.random() * 10, 2),
+        'hash_corpo': content_digest(f"corpo {i} {body}").hex()
+    }
+
+
+def build_runs(methods, churn, seed):
+    """Execuções anterior e atual e as contagens esperadas do delta."""
+    rng = random.Random(seed)
+    base = [finding(rng, i) for i in range(methods)]
+    current = []
+    expected = {'novos': 0, 'removidos': 0, 'alterados': 0}
+    for i, previous in enumerate(base):
+        roll = rng.random()
+        if roll >= churn:
+            current.append(dict(previous, linha=previous['linha'] + rng.choice((0, 0, 3))))
+        elif roll < churn / 2:
+            current.append(dict(previous, hash_corpo=content_digest(f"corpo {i} editado").hex()))
+            expected['alterados'] += 1
+        elif roll < churn * 3 / 4:
+            severity = SEVERITIES[(SEVERITIES.index(previous['severidade']) + 1) % 3]
+            current.append(dict(previous, severidade=severity, horas_total=previous['horas_total'] + 2))
+            expected['alterados'] += 1
+        else:
+            expected['removidos'] += 1
+    for i in range(methods, methods + int(methods * churn)):
+        current.append(finding(rng, i))
+        expected['novos'] += 1
+    rng.shuffle(current)
+    return base, current, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo da comparação entre duas execuções da análise")
+    parser.add_argument('--methods', type=int, default=50000, help="Resultados da execução anterior")
+    parser.add_argument('--churn', type=float, default=0.05, help="Fração dos métodos alterados entre as execuções")
+    parser.add_argument('--formats', default='csv,parquet', help="Formatos dos relatórios comparados (csv, parquet, xlsx)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-seconds', type=float, help="Tempo máximo aceito por comparação, leitura incluída")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    base, current, expected = build_runs(args.methods, args.churn, args.seed)
+    start = time.perf_counter()
+    delta = diff_findings(base, current)
+    join_s = time.perf_counter() - start
+    print(f"{len(base)} x {len(current)} resultados; esperado {expected}")
+    print(f"memória    junção {join_s * 1000:8.1f} ms")
+
+    slow, wrong = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt in args.formats.split(','):
+            paths = []
+            for name, findings in (('anterior', base), ('atual', current)):
+                paths.append(ReportGenerator(findings).export(os.path.join(directory, name), (fmt,))[fmt])
+            start = time.perf_counter()
+            runs = [load_run(path) for path in paths]
+            load_s = time.perf_counter() - start
+            delta = diff_findings(*runs)
+            total_s = time.perf_counter() - start
+            summary = delta['resumo']
+            counts = {key: summary[key] for key in expected}
+            print(f"{fmt:10s} leitura {load_s * 1000:8.1f} ms  junção {(total_s - load_s) * 1000:8.1f} ms  "
+                  f"total {total_s * 1000:8.1f} ms  delta {counts}  {summary['delta_horas']:+.1f} horas")
+            if counts != expected:
+                wrong.append(fmt)
+            if args.max_seconds is not None and total_s > args.max_seconds:
+                slow.append(fmt)
+    if wrong:
+        print(f"\nContagens do delta diferentes do esperado: {', '.join(wrong)}")
+    if slow:
+        print(f"\nAcima de {args.max_seconds}s: {', '.join(slow)}")
+    if wrong or slow:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
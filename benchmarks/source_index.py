@@ -0,0 +1,107 @@
+"""
+Mede a atribuição das menções a CNPJ aos métodos em arquivos com muitos métodos.
+
+Gera uma classe Java sintética com --methods métodos, dos quais uma fração
+--cnpj menciona CNPJ (metade deles só depois de um bloco interno, como um
+"if { ... }" no início do corpo), e mede:
+
+    indice     analyzer.source_index.SourceIndex (menções e tabela de linhas)
+    arquivo    GenericCNPJAnalyzer.analyze_file completo (padrões com prazo, índice e fila)
+
+São informados o tempo, a vazão em MB/s e se os métodos com CNPJ
+enfileirados e as linhas iniciais conferem com os gerados. Com
+--max-seconds, o código de saída é 1 se analyze_file passar desse tempo ou
+se as contagens não conferirem.
+
+Uso:
+    python benchmarks/source_index.py --methods 5000 --cnpj 0.1
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import AIModelInterface
+from analyzer.cnpj_analyzer import GenericCNPJAnalyzer, MENTION_PATTERNS
+from analyzer.source_index import SourceIndex
+
+
+def method_source(rng, i, mentions_cnpj):
+    """Código de um método; com CNPJ, a menção vem no início do corpo ou depois de um bloco interno."""
+    value = 'cnpj' if mentions_cnpj else 'documento'
+    lines = [f"    public long processa{i}(String entrada) {{"]
+    if mentions_cnpj and i % 2:
+        lines += ["        if (entrada == null) {", "            return 0;", "        }"]
+    lines.append(f"        String {value} = normaliza(entrada);")
+    lines += [f"        long total{j} = calcula{rng.randint(0, 99)}({value}, {j}) * {j};"
+              for j in range(rng.randint(3, 12))]
+    lines += [f"        return valida({value});", "    }", ""]
+    return lines
+
+
+def generate(methods, cnpj_fraction, seed):
+    """Classe sintética; retorna o código e a linha inicial de cada método que menciona CNPJ."""
+    rng = random.Random(seed)
+    lines = ["package br.gov.exemplo;", "", "public class Processador {", ""]
+    expected = {}
+    for i in range(methods):
+        mentions = rng.random() < cnpj_fraction
+        if mentions:
+            expected[f"processa{i}"] = len(lines) + 1
+        lines += method_source(rng, i, mentions)
+    lines.append("}")
+    return '\n'.join(lines) + '\n', expected
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atribuição das menções a CNPJ aos métodos de arquivos grandes")
+    parser.add_argument('--methods', type=int, default=5000, help="Métodos na classe gerada")
+    parser.add_argument('--cnpj', type=float, default=0.1, help="Fração dos métodos que mencionam CNPJ")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-seconds', type=float, help="Tempo máximo aceito de analyze_file")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    content, expected = generate(args.methods, args.cnpj, args.seed)
+    size_mb = len(content.encode('utf-8')) / 1e6
+    print(f"Classe de {size_mb:.1f} MB, {content.count(chr(10))} linhas, {args.methods} métodos "
+          f"({len(expected)} com CNPJ)")
+
+    index, index_s = timed(SourceIndex, content, MENTION_PATTERNS['java'])
+    _, lines_s = timed(lambda: index.line_starts)
+    analyzer = GenericCNPJAnalyzer(ai_model=AIModelInterface())
+    _, file_s = timed(analyzer.analyze_file, 'Processador.java', 'java', content)
+    found = {candidate.name: candidate.start_line for candidate in analyzer.pending}
+
+    print(f"indice     {index_s + lines_s:7.2f}s  {size_mb / (index_s + lines_s):7.1f} MB/s  "
+          f"{len(index.mentions)} menções")
+    print(f"arquivo    {file_s:7.2f}s  {size_mb / file_s:7.1f} MB/s  {len(found)} métodos com CNPJ, "
+          f"{len(analyzer.all_methods)} símbolos, {len(analyzer.degraded)} por trechos")
+
+    failed = []
+    missing = [name for name in expected if name not in found]
+    wrong_lines = [name for name, line in expected.items() if name in found and found[name] != line]
+    if missing or len(found) != len(expected):
+        failed.append(f"{len(found)} métodos com CNPJ enfileirados, {len(expected)} gerados "
+                      f"({len(missing)} não encontrados)")
+    if wrong_lines:
+        failed.append(f"{len(wrong_lines)} métodos com a linha inicial errada")
+    if args.max_seconds is not None and file_s > args.max_seconds:
+        failed.append(f"analyze_file acima de {args.max_seconds}s")
+    if failed:
+        print("\n" + "\n".join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
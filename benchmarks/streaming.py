@@ -0,0 +1,72 @@
+"""
+Compara respostas completas e em streaming com encerramento antecipado.
+
+Sobe um servidor falso para cada provedor (ver fake_servers.py), que envia o
+JSON da análise seguido de texto extra, e mede a latência por chamada com e
+sem streaming, o tempo até o primeiro token, o tempo economizado estimado e
+quantas gerações o servidor viu serem canceladas.
+
+Uso:
+    python benchmarks/streaming.py --calls 10 --token-delay 0.005
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai import AnthropicModel, MistralAPIModel, OllamaModel
+from benchmarks.fake_servers import FakeLLMServer
+
+PROMPT = "Analise este código de {language}:\n{code}"
+CODE = "long cnpj = Long.parseLong(valor);"
+
+
+def build_model(kind, url, stream, structured=False):
+    if kind == 'ollama':
+        return OllamaModel(base_url=url, model_name='fake', stream=stream, structured=structured)
+    if kind == 'mistral':
+        model = MistralAPIModel(api_key='fake', model_name='fake', stream=stream, structured=structured)
+        model.api_url = f"{url}/v1/chat/completions"
+        return model
+    return AnthropicModel(api_key='fake', stream=stream, base_url=url, structured=structured)
+
+
+def run(kind, calls, token_delay, trailing_tokens):
+    results = {}
+    for stream in (False, True):
+        with FakeLLMServer(kind, token_delay=token_delay, trailing_tokens=trailing_tokens) as server:
+            model = build_model(kind, server.url, stream)
+            start = time.perf_counter()
+            for _ in range(calls):
+                model.analyze_code(PROMPT, 'java', CODE)
+            elapsed = (time.perf_counter() - start) / calls
+            # Dá tempo ao servidor de perceber a conexão fechada
+            time.sleep(token_delay * 5 + 0.05)
+            results[stream] = (elapsed, model.stats.summary(), server.cancelled, server.tokens_sent)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência com e sem streaming nos clientes de IA")
+    parser.add_argument('--calls', type=int, default=10, help="Chamadas por modo")
+    parser.add_argument('--token-delay', type=float, default=0.005, help="Segundos por token no servidor falso")
+    parser.add_argument('--trailing-tokens', type=int, default=300, help="Tokens de texto depois do JSON")
+    parser.add_argument('--providers', nargs='*', default=['ollama', 'mistral', 'anthropic'])
+    args = parser.parse_args()
+
+    for kind in args.providers:
+        results = run(kind, args.calls, args.token_delay, args.trailing_tokens)
+        full, streamed = results[False], results[True]
+        stats = streamed[1]
+        print(f"\n{kind}:")
+        print(f"  resposta completa: {full[0] * 1000:7.1f} ms/chamada  ({full[3]} tokens gerados)")
+        print(f"  streaming:         {streamed[0] * 1000:7.1f} ms/chamada  ({streamed[3]} tokens gerados, "
+              f"{streamed[2]} gerações canceladas)")
+        print(f"  TTFT médio: {stats['ttft_medio_s']}s  interrompidas cedo: {stats['interrompidas_cedo']}"
+              f"/{stats['requisicoes']}  tempo economizado (estimado): {stats['tempo_economizado_s']}s")
+
+
+if __name__ == '__main__':
+    main()
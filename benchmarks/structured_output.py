@@ -0,0 +1,69 @@
+"""
+Compara a taxa de falhas de parse com e sem saída estruturada.
+
+Para cada provedor, sobe um servidor falso (ver fake_servers.py) que responde
+com um formato inválido a cada N requisições sem saída estruturada e analisa
+uma árvore sintética (ver memory_footprint.py) com GenericCNPJAnalyzer. São
+informadas as falhas de parse, os métodos recuperados pela nova tentativa,
+os que terminaram como ERRO e o total de chamadas feitas ao servidor.
+
+Uso:
+    python benchmarks/structured_output.py --files 10 --methods 4 --malformed-every 5
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.cnpj_analyzer import GenericCNPJAnalyzer
+from benchmarks.fake_servers import FakeLLMServer
+from benchmarks.memory_footprint import generate_tree
+from benchmarks.streaming import build_model
+
+
+def run(kind, directory, structured, malformed_every, retries, workers):
+    with FakeLLMServer(kind, token_delay=0, first_token_delay=0, trailing_tokens=0,
+                       malformed_every=malformed_every) as server:
+        analyzer = GenericCNPJAnalyzer(ai_model=build_model(kind, server.url, stream=True, structured=structured))
+        analyzer.collect(directory)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            skipped = analyzer._run_pending(executor)
+            while analyzer.requeue_failed(retries):
+                skipped += analyzer._run_pending(executor)
+        analyzer.files.close()
+        stats = analyzer.parse_failure_rate().get(kind, {})
+        errors = sum(1 for f in analyzer.findings if f['tipo_uso'] == 'ERRO')
+        return stats, errors, len(analyzer.findings), server.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Falhas de parse com e sem saída estruturada")
+    parser.add_argument('--files', type=int, default=10, help="Arquivos gerados")
+    parser.add_argument('--methods', type=int, default=4, help="Métodos com CNPJ por arquivo")
+    parser.add_argument('--malformed-every', type=int, default=5,
+                        help="Uma a cada N respostas sem saída estruturada é inválida")
+    parser.add_argument('--retries', type=int, default=1, help="Novas tentativas por método (AI_PARSE_RETRIES)")
+    parser.add_argument('--workers', type=int, default=4, help="Chamadas simultâneas")
+    parser.add_argument('--providers', nargs='*', default=['ollama', 'mistral', 'anthropic'])
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)  # Cada falha de parse geraria uma linha de log
+    with tempfile.TemporaryDirectory() as directory:
+        generate_tree(directory, args.files, args.methods)
+        for kind in args.providers:
+            print(f"\n{kind}:")
+            for structured in (False, True):
+                stats, errors, findings, requests = run(kind, directory, structured, args.malformed_every,
+                                                        args.retries, args.workers)
+                label = "estruturada" if structured else "texto livre"
+                print(f"  {label:12} falhas de parse: {stats.get('falhas_parse', 0)}/{stats.get('respostas', 0)} "
+                      f"({stats.get('taxa_falha_parse', 0.0):.1%})  recuperadas: {stats.get('recuperadas', 0)}  "
+                      f"ERRO no relatório: {errors}/{findings}  chamadas: {requests}")
+
+
+if __name__ == '__main__':
+    main()
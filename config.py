@@ -13,9 +13,58 @@ logging.basicConfig(
 # Configuração do modelo de IA
 AI_MODEL_TYPE = os.getenv("AI_MODEL_TYPE", "anthropic") # Valor padrão: anthropic
 print(f"AI_MODEL_TYPE: {AI_MODEL_TYPE}")
-OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")  # Várias URLs separadas por vírgula = pool balanceado
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "codellama")
 MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "mistral-large-latest")
+MISTRAL_API_URL = os.getenv("MISTRAL_API_URL", "https://api.mistral.ai")  # Endereço base da API da Mistral
+
+# Pool de servidores Ollama (quando OLLAMA_URL tem mais de uma URL)
+OLLAMA_EJECT_AFTER = int(os.getenv("OLLAMA_EJECT_AFTER", "3"))  # Falhas seguidas para ejetar um servidor
+OLLAMA_EJECT_SECONDS = float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))  # Tempo fora do pool após ejeção
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10"))  # 0 = sem verificação de saúde
+
+# Limites de uso do provedor de IA (compartilhados entre análises em lote)
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+AI_REQUESTS_PER_MINUTE = float(os.getenv("AI_REQUESTS_PER_MINUTE", "0"))  # 0 = sem limite
+AI_JOB_MAX_CONCURRENCY = int(os.getenv("AI_JOB_MAX_CONCURRENCY", "0"))  # Vagas máximas de uma análise na web; 0 = todas
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")  # Vazio = cache apenas em memória
+AI_STREAMING = os.getenv("AI_STREAMING", "1") != "0"  # Respostas em streaming com encerramento antecipado
+AI_STRUCTURED_OUTPUT = os.getenv("AI_STRUCTURED_OUTPUT", "1") != "0"  # Saída restrita ao schema de AnaliseResponse
+AI_PARSE_RETRIES = int(os.getenv("AI_PARSE_RETRIES", "1"))  # Novas tentativas só dos métodos com resposta inválida
+
+# Cache do prefixo do prompt no provedor (instruções fixas e início do arquivo reaproveitados entre chamadas)
+AI_PROMPT_CACHE = os.getenv("AI_PROMPT_CACHE", "1") != "0"  # Marcação cache_control na Anthropic
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # Modelo carregado entre chamadas; vazio = padrão do servidor
+PROMPT_FILE_CONTEXT_CHARS = int(os.getenv("PROMPT_FILE_CONTEXT_CHARS", "1500"))  # Início do arquivo no prompt; 0 = sem
+
+# Previsão de duração e custo na pré-análise (preços em dólares por milhão de tokens; vazio = tabela do provedor)
+AI_PRICE_INPUT_PER_MTOK = float(os.getenv("AI_PRICE_INPUT_PER_MTOK")) if os.getenv("AI_PRICE_INPUT_PER_MTOK") else None
+AI_PRICE_OUTPUT_PER_MTOK = float(os.getenv("AI_PRICE_OUTPUT_PER_MTOK")) if os.getenv("AI_PRICE_OUTPUT_PER_MTOK") else None
+LATENCY_HISTORY_PATH = os.getenv("LATENCY_HISTORY_PATH", "historico_latencia.json")  # Vazio = apenas em memória
+
+# Formatos dos relatórios: xlsx, csv e/ou parquet (Parquet requer pyarrow)
+REPORT_FORMATS = tuple(fmt.strip().lower() for fmt in os.getenv("REPORT_FORMATS", "xlsx").split(",") if fmt.strip())
+REPORTS_DIR = os.getenv("REPORTS_DIR", "")  # Relatórios da interface web; vazio = pasta reports ao lado do app.py
+
+# Prazo dos padrões regex da extração (arquivos que estouram são analisados por trechos)
+REGEX_PATTERN_TIMEOUT = float(os.getenv("REGEX_PATTERN_TIMEOUT", "5"))  # Segundos por padrão em cada arquivo
+REGEX_FILE_TIMEOUT = float(os.getenv("REGEX_FILE_TIMEOUT", "15"))  # Segundos por arquivo; 0 = sem prazo
+REGEX_GUARD_MIN_BYTES = int(os.getenv("REGEX_GUARD_MIN_BYTES", "1024"))  # Menores rodam sem processo filho
+
+# Varredura de literais de CNPJ em arquivos de dados (CSV, JSON, SQL, configuração)
+DATA_SCAN_CHUNK_BYTES = int(os.getenv("DATA_SCAN_CHUNK_BYTES", str(1024 * 1024)))  # Bytes lidos por vez de cada arquivo
+
+# Modo em lote: APIs de lote dos provedores (Anthropic Message Batches, Mistral batch) em execuções longas
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "10000"))  # Métodos por lote enviado ao provedor
+BATCH_POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", "60"))  # Segundos entre consultas aos lotes em andamento
+
+# Perfil de desempenho das análises (cProfile, tempo por arquivo e por padrão regex)
+ANALYZER_PROFILE = os.getenv("ANALYZER_PROFILE", "0") != "0"  # Ativa o perfil em todas as análises
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "20"))  # Arquivos listados na tabela dos mais lentos
+
+# Modo watch: reanálise incremental de diretórios em edição
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "1.0"))  # Segundos entre varreduras do diretório
+WATCH_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", "0.5"))  # Segundos sem alterações para reanalisar um lote
 
 logging.info(f"Configuração do modelo de IA: {AI_MODEL_TYPE} " + 
              (f"(Ollama: {OLLAMA_MODEL} em {OLLAMA_URL})" if AI_MODEL_TYPE.lower() == "ollama" else "") +
@@ -198,7 +198,7 @@ ${stats.subdirs} subdiretórios
 ${stats.files} arquivos de Desenvolvimento
 ${stats.lines.toLocaleString()} linhas de código
 ${stats.methods} métodos com CNPJ
-
+${stats.previsao ? `\n${describeForecast(stats.previsao)}\n` : ''}
 Distribuição por linguagem:
 ${byLanguageHtml}</pre>
     `;
@@ -359,16 +359,22 @@ document.getElementById('analyzeForm').addEventListener('submit', async (e) => {
     try {
         updateStatus('Analisando estrutura do projeto...');
         const stats = await preAnalyzeDirectory(directory);
+        if (!confirmForecast(stats.previsao)) {
+            goToStep(1);
+            return;
+        }
         showTemporaryStats(stats);
         
         updateStatus('Iniciando análise com AI...');
         
         const formData = new FormData();
         formData.append('directory', directory);
+        const watch = document.getElementById('watchMode').checked;
         
         updateStatus('Analisando impactos com AI...');
         
-        const response = await retryFetch('/analyze', {
+        // No modo watch, a análise inicial é a mesma; depois só o que mudar é reanalisado
+        const response = await retryFetch(watch ? '/watch' : '/analyze', {
             method: 'POST',
             body: formData
         });
@@ -389,17 +395,25 @@ document.getElementById('analyzeForm').addEventListener('submit', async (e) => {
         hideProgressElements();
         
         // Atualizar resultados e ir para o passo 3
-        updateResults(data);
+        const summary = data.relatorio ? await fetchSummary(data.relatorio) : null;
+        updateResults(data, summary);
+        showForecastComparison(data.previsao);
         goToStep(3);
         
         // Mostrar botão de download
         const downloadBtn = document.getElementById('downloadExcel');
-        downloadBtn.href = `/download/${data.excel_file}`;
-        downloadBtn.style.display = 'inline-flex';
+        if (data.excel_file) {
+            downloadBtn.href = `/download/${data.excel_file}`;
+            downloadBtn.style.display = 'inline-flex';
+        }
         
         // Criar gráfico
         createImpactChart();
         
+        if (data.session) {
+            startWatching(data.session, data.versao);
+        }
+        
     } catch (error) {
         // Limpar o intervalo de simulação em caso de erro
         if (currentInterval) {
@@ -423,6 +437,48 @@ document.getElementById('analyzeForm').addEventListener('submit', async (e) => {
     }
 });
 
+// Acima destes valores previstos, a análise só começa após confirmação
+const FORECAST_CONFIRM_SECONDS = 600;
+const FORECAST_CONFIRM_USD = 1;
+
+function formatDuration(seconds) {
+    if (seconds < 60) return `${Math.round(seconds)} s`;
+    if (seconds < 3600) return `${Math.round(seconds / 60)} min`;
+    return `${(seconds / 3600).toFixed(1)} h`;
+}
+
+function describeForecast(forecast) {
+    const basis = forecast.chamadas_historico
+        ? `histórico de ${forecast.chamadas_historico} chamadas`
+        : 'valores padrão, sem histórico';
+    return `Previsão (${forecast.provedor}, ${forecast.concorrencia} chamadas simultâneas): ` +
+        `~${formatDuration(forecast.duracao_s)}, US$ ${forecast.custo_usd.toFixed(2)}\n` +
+        `${forecast.tokens_entrada.toLocaleString()} tokens de entrada (base: ${basis})`;
+}
+
+function confirmForecast(forecast) {
+    if (!forecast || (forecast.duracao_s < FORECAST_CONFIRM_SECONDS && forecast.custo_usd < FORECAST_CONFIRM_USD)) {
+        return true;
+    }
+    return window.confirm(`${describeForecast(forecast)}\n\nIniciar a análise?`);
+}
+
+// Previsão da pré-análise comparada com a duração e o custo reais
+function showForecastComparison(result) {
+    const element = document.getElementById('forecastStatus');
+    if (!element) return;
+    if (!result || !result.prevista) {
+        element.style.display = 'none';
+        return;
+    }
+    const {prevista, real} = result;
+    const percent = value => value === null ? '-' : `${value > 0 ? '+' : ''}${Math.round(value * 100)}%`;
+    element.textContent = `Duração prevista ${formatDuration(prevista.duracao_s)}, real ` +
+        `${formatDuration(real.duracao_s)} (${percent(result.erro_duracao)}); custo previsto ` +
+        `US$ ${prevista.custo_usd.toFixed(2)}, real US$ ${real.custo_usd.toFixed(2)} (${percent(result.erro_custo)})`;
+    element.style.display = 'block';
+}
+
 function hideProgressElements() {
     // Ocultar os elementos de progresso
     const tempStats = document.getElementById('tempStats');
@@ -453,11 +509,25 @@ function showError(message) {
     }, 10000);
 }
 
-function updateResults(data) {
+// Resumo (contagens e horas) calculado no servidor junto com o relatório
+async function fetchSummary(reportName) {
+    try {
+        const response = await fetch(`/summary/${encodeURIComponent(reportName)}`);
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        console.warn('Resumo indisponível, calculando no navegador:', error);
+        return null;
+    }
+}
+
+function updateResults(data, summary = null) {
+    const useSummary = Boolean(summary && summary.por_severidade);
     const counts = {high: 0, medium: 0, low: 0};
     const totals = {dev: 0, test: 0, total: 0};
     const tbody = document.querySelector('#resultsTable tbody');
     tbody.innerHTML = '';
+    const oldFooter = document.querySelector('#resultsTable tfoot');
+    if (oldFooter) oldFooter.remove();
     
     data.data.forEach(item => {
         const row = document.createElement('tr');
@@ -473,6 +543,7 @@ function updateResults(data) {
         `;
         tbody.appendChild(row);
         
+        if (useSummary) return;
         if (item.severidade === 'ALTA') counts.high++;
         else if (item.severidade === 'MEDIA') counts.medium++;
         else if (item.severidade === 'BAIXA') counts.low++;
@@ -482,6 +553,16 @@ function updateResults(data) {
         totals.total += item.horas_total;
     });
     
+    if (useSummary) {
+        const bySeverity = Object.fromEntries(summary.por_severidade.map(row => [row.severidade, row.metodos]));
+        counts.high = bySeverity.ALTA || 0;
+        counts.medium = bySeverity.MEDIA || 0;
+        counts.low = bySeverity.BAIXA || 0;
+        totals.dev = summary.totais.horas_dev;
+        totals.test = summary.totais.horas_teste;
+        totals.total = summary.totais.horas_total;
+    }
+    
     // Atualizar contadores e mostrar totais de forma separada
     document.getElementById('highImpact').textContent = `${counts.high} métodos`;
     document.getElementById('mediumImpact').textContent = `${counts.medium} métodos`;
@@ -500,6 +581,43 @@ function updateResults(data) {
     document.querySelector('#resultsTable').appendChild(tfoot);
 }
 
+// Modo watch: aguarda novas versões dos resultados (long polling) e atualiza a tela
+let watchSession = null;
+
+async function startWatching(sessionId, version) {
+    watchSession = sessionId;
+    const status = document.getElementById('watchStatus');
+    status.style.display = 'block';
+    status.textContent = version ? 'Acompanhando alterações no diretório...' : 'Análise inicial em andamento...';
+    
+    while (watchSession === sessionId) {
+        try {
+            const response = await fetch(`/watch/${sessionId}?versao=${version}`);
+            const data = await response.json();
+            if (data.error) throw new Error(data.error);
+            if (watchSession !== sessionId || data.versao <= version) continue;
+            
+            version = data.versao;
+            updateResults(data);
+            createImpactChart();
+            const update = data.atualizacao;
+            status.textContent = `Atualizado às ${new Date().toLocaleTimeString()}: ` +
+                `${update.arquivos.length} arquivo(s), ${update.reanalisados} método(s) reanalisado(s), ` +
+                `${update.reaproveitados} reaproveitado(s)`;
+        } catch (error) {
+            status.textContent = `Acompanhamento interrompido: ${error.message}`;
+            watchSession = null;
+        }
+    }
+}
+
+function stopWatching() {
+    if (!watchSession) return;
+    fetch(`/watch/${watchSession}`, { method: 'DELETE' });
+    watchSession = null;
+    document.getElementById('watchStatus').style.display = 'none';
+}
+
 // Adicionar funcionalidade de troca de etapas
 function goToStep(stepNumber) {
     // Atualizar sidebar
@@ -525,6 +643,8 @@ document.querySelectorAll('.nav-steps li').forEach(item => {
 
 // Função para resetar análise
 function resetAnalysis() {
+    stopWatching();
+    
     // Limpar resultados
     document.getElementById('highImpact').textContent = '0';
     document.getElementById('mediumImpact').textContent = '0';